@@ -0,0 +1,5 @@
+"""Performance benchmarks for PipeWire Controller.
+
+Run them with ``python -m benchmarks`` (see ``--help``) or, with the
+pytest-benchmark plugin installed, ``pytest benchmarks``.
+"""
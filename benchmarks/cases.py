@@ -0,0 +1,174 @@
+"""Benchmark cases shared by the standalone runner and pytest-benchmark."""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pipewire_controller.dump import NODE_TYPE, iter_dump_objects
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.model import DEVICE_TYPE, Device, Graph
+from pipewire_controller.utils.cache import CapabilityCache
+from tests.fake_pipewire import FakePipewire, generate_graph
+
+NODE_COUNTS = (10, 100, 1000, 10000)
+
+
+@dataclass
+class Case:
+    """
+    One benchmark.
+
+    ``setup`` is a context manager factory yielding the argument passed to
+    ``run`` on every round; it is entered once per case, outside the timing.
+    """
+
+    name: str
+    group: str
+    run: Callable[[Any], Any]
+    setup: Optional[Callable[[], Any]] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    items: int = 1
+    measure_memory: bool = False
+    rounds: int = 20
+
+
+@contextmanager
+def _no_setup() -> Iterator[None]:
+    yield None
+
+
+@contextmanager
+def fake_engine(nodes: int = 20, monitor: bool = False,
+                graph_mirror: bool = False) -> Iterator[PipewireEngine]:
+    """An engine wired to a fresh fake toolchain."""
+    with tempfile.TemporaryDirectory(prefix="pwc-bench-") as root:
+        fake = FakePipewire(root, nodes=nodes)
+        saved = {key: os.environ.get(key) for key in fake.env}
+        fake.activate()
+        engine = PipewireEngine(snapshot_ttl=0)
+        try:
+            if monitor:
+                engine.start_monitor()
+            if graph_mirror:
+                engine.start_graph_mirror()
+            yield engine
+        finally:
+            engine.stop_monitor()
+            engine.stop_graph_mirror()
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+@contextmanager
+def _dump_file(nodes: int) -> Iterator[str]:
+    """A file holding a pw-dump listing of a synthetic graph, as the tool prints it."""
+    objects, _defaults = generate_graph(nodes, ports=False)
+    with tempfile.NamedTemporaryFile("w", prefix="pwc-bench-", suffix=".json") as f:
+        json.dump(objects, f, indent=2)
+        f.flush()
+        yield f.name
+
+
+def _extract(objects: List[dict]) -> set:
+    return PipewireEngine()._extract_rates_from_devices(objects)
+
+
+def _parse_and_extract(path: str) -> set:
+    # Read from a file so that, as with the pw-dump pipe, the input is streamed
+    with open(path) as stream:
+        return PipewireEngine()._extract_rates_from_devices(
+            iter_dump_objects(stream, types={NODE_TYPE})
+        )
+
+
+@contextmanager
+def _cached_dump(nodes: int) -> Iterator[tuple]:
+    """A dump file and a capability cache that already knows its devices."""
+    with _dump_file(nodes) as path, tempfile.TemporaryDirectory(prefix="pwc-bench-") as tmp:
+        cache = CapabilityCache(os.path.join(tmp, "capabilities.json"))
+        with open(path) as stream:
+            cache.store(Graph.from_objects(iter_dump_objects(stream)))
+        yield path, cache
+
+
+def _cached_rates(arg: tuple) -> set:
+    path, cache = arg
+    with open(path) as stream:
+        devices = [Device.from_dump(obj) for obj in iter_dump_objects(stream, types={DEVICE_TYPE})]
+    return set(cache.lookup(devices).supported_rates())
+
+
+def _engine_cases() -> List[Case]:
+    """Latency of each public engine method against the fake tools."""
+    calls = {
+        "set_sample_rate": lambda e: e.set_sample_rate(48000),
+        "set_buffer_size": lambda e: e.set_buffer_size(256),
+        "apply": lambda e: e.apply({"clock.force-rate": 96000, "clock.force-quantum": 128}),
+        "get_supported_sample_rates": lambda e: e.get_supported_sample_rates(),
+        "get_settings_snapshot": lambda e: e.get_settings_snapshot(),
+        "get_current_rate": lambda e: e.get_current_rate(),
+        "get_current_quantum": lambda e: e.get_current_quantum(),
+        "get_device_info": lambda e: e.get_device_info(),
+    }
+    cases = [
+        Case(f"engine.{method}", "engine-subprocess", call, setup=fake_engine, rounds=10)
+        for method, call in calls.items()
+    ]
+    cases += [
+        Case("engine.get_current_rate[monitor]", "engine-live",
+             lambda e: e.get_current_rate(),
+             setup=lambda: fake_engine(monitor=True), rounds=200),
+        Case("engine.get_supported_sample_rates[graph-mirror]", "engine-live",
+             lambda e: e.get_supported_sample_rates(),
+             setup=lambda: fake_engine(graph_mirror=True), rounds=200),
+        Case("engine.get_device_info[graph-mirror]", "engine-live",
+             lambda e: e.get_device_info(),
+             setup=lambda: fake_engine(graph_mirror=True), rounds=200),
+        Case("engine.start_monitor+stop_monitor", "engine-live",
+             lambda e: (e.start_monitor(), e.stop_monitor()),
+             setup=fake_engine, rounds=5),
+        Case("engine.start_graph_mirror+stop_graph_mirror", "engine-live",
+             lambda e: (e.start_graph_mirror(), e.stop_graph_mirror()),
+             setup=fake_engine, rounds=5),
+    ]
+    return cases
+
+
+def _capability_cases() -> List[Case]:
+    """Rate extraction throughput and parse memory at several graph sizes."""
+    cases = []
+    for nodes in NODE_COUNTS:
+        rounds = max(3, 2000 // nodes)
+
+        @contextmanager
+        def objects(nodes=nodes):
+            yield generate_graph(nodes, ports=False)[0]
+
+        def dump(nodes=nodes):
+            return _dump_file(nodes)
+
+        cases.append(Case(f"extract_rates[{nodes}]", "capabilities", _extract,
+                          setup=objects, params={"nodes": nodes}, items=nodes, rounds=rounds))
+        cases.append(Case(f"parse_and_extract_rates[{nodes}]", "capabilities",
+                          _parse_and_extract, setup=dump, params={"nodes": nodes},
+                          items=nodes, measure_memory=True, rounds=rounds))
+        cases.append(Case(f"cached_rates[{nodes}]", "capabilities", _cached_rates,
+                          setup=lambda nodes=nodes: _cached_dump(nodes),
+                          params={"nodes": nodes}, items=nodes, rounds=rounds))
+    return cases
+
+
+def all_cases() -> List[Case]:
+    """Every benchmark, in report order."""
+    return _engine_cases() + _capability_cases()
+
+
+def case_setup(case: Case):
+    """The setup context manager of a case."""
+    return (case.setup or _no_setup)()
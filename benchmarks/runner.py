@@ -0,0 +1,178 @@
+"""Standalone benchmark runner with JSON output and regression checks."""
+
+import argparse
+import fnmatch
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .cases import Case, all_cases, case_setup
+
+SCHEMA_VERSION = 1
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(case: Case, rounds: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Time a case and, if it asks for it, record its peak memory.
+
+    Returns:
+        A result record: timings in seconds, throughput in items per second
+        and ``peak_memory`` in bytes (or None)
+    """
+    rounds = rounds or case.rounds
+    with case_setup(case) as arg:
+        case.run(arg)  # warm-up
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            case.run(arg)
+            timings.append(time.perf_counter() - start)
+
+        peak = None
+        if case.measure_memory:
+            tracemalloc.start()
+            try:
+                case.run(arg)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "name": case.name,
+        "group": case.group,
+        "params": case.params,
+        "rounds": rounds,
+        "min": timings[0],
+        "median": median,
+        "mean": statistics.fmean(timings),
+        "p95": _percentile(timings, 0.95),
+        "max": timings[-1],
+        "stddev": statistics.pstdev(timings),
+        "items": case.items,
+        "throughput": case.items / median if median else None,
+        "peak_memory": peak,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True, timeout=5)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+
+
+def run(cases: List[Case], rounds: Optional[int] = None, verbose: bool = True) -> Dict[str, Any]:
+    """Run cases and build the machine-readable report."""
+    results = []
+    for case in cases:
+        result = measure(case, rounds)
+        results.append(result)
+        if verbose:
+            print(format_result(result), file=sys.stderr)
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """One human-readable line for a result."""
+    line = (f"{result['name']:<50} median {result['median'] * 1000:9.3f} ms"
+            f"  p95 {result['p95'] * 1000:9.3f} ms")
+    if result["items"] > 1:
+        line += f"  {result['throughput']:12.0f} items/s"
+    if result["peak_memory"] is not None:
+        line += f"  peak {result['peak_memory'] / 1024:9.1f} KiB"
+    return line
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 1.25) -> List[str]:
+    """
+    Find regressions against a baseline report.
+
+    A case regresses when its median time or peak memory grew by more than
+    ``threshold`` times. Cases missing from either report are ignored.
+
+    Returns:
+        One message per regression
+    """
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        if old["median"] and result["median"] / old["median"] > threshold:
+            regressions.append(
+                f"{result['name']}: median {old['median'] * 1000:.3f} ms -> "
+                f"{result['median'] * 1000:.3f} ms"
+            )
+        if old.get("peak_memory") and result["peak_memory"] and (
+            result["peak_memory"] / old["peak_memory"] > threshold
+        ):
+            regressions.append(
+                f"{result['name']}: peak memory {old['peak_memory']} -> "
+                f"{result['peak_memory']} bytes"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns 1 if a regression was found."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Run the PipeWire Controller benchmarks.")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file")
+    parser.add_argument("-c", "--compare", help="baseline JSON report to check against")
+    parser.add_argument("-t", "--threshold", type=float, default=1.25,
+                        help="slowdown factor counted as a regression (default 1.25)")
+    parser.add_argument("-k", "--filter", default="",
+                        help="only run cases whose name contains this text or matches this glob")
+    parser.add_argument("-r", "--rounds", type=int, help="override the rounds of every case")
+    parser.add_argument("-l", "--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args(argv)
+
+    cases = [
+        case for case in all_cases()
+        if args.filter in case.name or fnmatch.fnmatch(case.name, args.filter)
+    ]
+    if args.list:
+        for case in cases:
+            print(f"{case.group:<20} {case.name}")
+        return 0
+
+    report = run(cases, args.rounds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,16 @@
+"""pytest-benchmark entry point for the shared benchmark cases."""
+
+import pytest
+
+from .cases import all_cases, case_setup
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("case", all_cases(), ids=lambda case: case.name)
+def test_benchmark(benchmark, case):
+    """Benchmark one case."""
+    benchmark.group = case.group
+    benchmark.extra_info.update(case.params)
+    with case_setup(case) as arg:
+        benchmark.pedantic(case.run, args=(arg,), rounds=case.rounds, warmup_rounds=1)
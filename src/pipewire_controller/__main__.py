@@ -1,10 +1,46 @@
 """Main entry point for PipeWire Controller."""
 
-from pipewire_controller.ui.tray import run
+import argparse
+import json
+import sys
+
+from pipewire_controller.runner import CommandRunner, format_report
+from pipewire_controller.utils.config import Config
+
+
+def parse_args(argv):
+    """Parse the options this program handles; the rest is left to Qt."""
+    parser = argparse.ArgumentParser(prog="pipewire-controller")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the command statistics of the last tray session and exit")
+    parser.add_argument("--json", action="store_true", help="print --stats as JSON")
+    return parser.parse_known_args(argv)[0]
+
+
+def print_stats(as_json: bool = False) -> int:
+    """Print the command statistics saved by the last tray session."""
+    runner = CommandRunner()
+    path = Config().stats_file
+    if not runner.load(path):
+        print(f"No command statistics saved yet ({path})", file=sys.stderr)
+        return 1
+    stats = runner.stats()
+    if as_json:
+        summary = {name: {key: value for key, value in entry.items() if key != "latencies"}
+                   for name, entry in stats.items()}
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_report(stats))
+    return 0
 
 
 def main():
     """Application entry point."""
+    args = parse_args(sys.argv[1:])
+    if args.stats:
+        sys.exit(print_stats(args.json))
+
+    from pipewire_controller.ui.tray import run
     run()
 
 
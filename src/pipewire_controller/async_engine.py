@@ -0,0 +1,431 @@
+"""Asyncio version of PipewireEngine for concurrent, cancellable queries."""
+
+import asyncio
+import codecs
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Container, Dict, List, Optional, Tuple
+
+from .backend import Backend, SubprocessBackend, parse_device_info
+from .dump import CHUNK_SIZE, COMMON_RATES, DUMP_COMMAND, NODE_TYPE, DumpScanner
+from .engine import ApplyResult, PipewireEngine, SwitchResult, int_setting, plan_writes
+from .metadata import SETTINGS_COMMAND, SettingsCallback, parse_settings, write_command
+from .model import DEVICE_TYPE, Device, Graph
+from .runner import RUNNER
+from .utils.cache import CapabilityCache
+
+logger = logging.getLogger(__name__)
+
+
+class CommandError(Exception):
+    """A command exited with an error, could not be started or timed out."""
+
+
+@dataclass
+class ProbeResult:
+    """Everything the tray needs at startup, gathered concurrently."""
+
+    rates: List[int] = field(default_factory=list)
+    settings: Dict[str, Any] = field(default_factory=dict)
+    device_info: Optional[str] = None
+    # Devices and audio nodes the rates came from, with their formats
+    graph: Optional[Graph] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether every query finished in time."""
+        return not self.errors
+
+
+class AsyncPipewireEngine:
+    """
+    Handles PipeWire interactions from an asyncio event loop.
+
+    The API mirrors ``PipewireEngine`` with coroutines, and is built on one:
+    its backend, settings monitor, graph mirror and capability cache serve
+    this engine too. With the command line tools, queries and writes run
+    as ``asyncio.create_subprocess_exec`` processes, so cancelling a call
+    kills the process it started. A persistent backend (such as the native
+    protocol one) and the engine's own blocking calls run in a worker
+    thread instead. Every call takes an optional ``timeout`` overriding
+    ``self.timeout``.
+    """
+
+    def __init__(self, backend: Optional[Backend] = None, snapshot_ttl: float = 0.25,
+                 cache: Optional[CapabilityCache] = None,
+                 engine: Optional[PipewireEngine] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            backend: How PipeWire is reached (see ``PipewireEngine``); ignored
+                with ``engine``
+            snapshot_ttl: Seconds a settings snapshot is reused by later reads
+            cache: Per-device capability cache (see ``PipewireEngine.load_capabilities``);
+                ignored with ``engine``
+            engine: Blocking engine to share; by default one is created
+        """
+        self.engine = engine or PipewireEngine(snapshot_ttl=snapshot_ttl, backend=backend,
+                                               cache=cache)
+        self.timeout = 5
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_time = 0.0
+
+    @property
+    def backend(self) -> Optional[Backend]:
+        """The engine's backend, or None when it runs the command line tools."""
+        backend = self.engine.backend
+        return None if isinstance(backend, SubprocessBackend) else backend
+
+    @property
+    def cache(self) -> Optional[CapabilityCache]:
+        """The engine's capability cache."""
+        return self.engine.cache
+
+    async def start_monitor(self) -> bool:
+        """Serve setting reads from the engine's live ``pw-metadata --monitor`` cache."""
+        return await asyncio.to_thread(self.engine.start_monitor)
+
+    async def stop_monitor(self) -> None:
+        """Stop the settings monitor and go back to one process per read."""
+        await asyncio.to_thread(self.engine.stop_monitor)
+
+    @property
+    def monitoring(self) -> bool:
+        """Whether reads are currently served from the monitor cache."""
+        return self.engine.monitoring
+
+    def subscribe(self, callback: SettingsCallback) -> Callable[[], None]:
+        """Register a callback for ``clock.*`` setting changes (see ``PipewireEngine``)."""
+        return self.engine.subscribe(callback)
+
+    async def _run(self, args: List[str], timeout: Optional[float] = None,
+                   name: Optional[str] = None) -> str:
+        """
+        Run a command and return its stdout, recording it in ``runner.RUNNER``
+        under ``name``.
+
+        Raises:
+            CommandError: If it cannot be started, fails or exceeds the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError as e:
+            RUNNER.record(args, time.monotonic() - start, error=True, name=name)
+            raise CommandError(f"{args[0]}: {e}") from e
+
+        stdout = b""
+        timed_out = False
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            raise CommandError(f"{args[0]}: timed out after {timeout} s") from None
+        finally:
+            # Also reached on cancellation: never leave the process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            RUNNER.record(args, time.monotonic() - start, returncode=process.returncode,
+                          timed_out=timed_out, output=len(stdout), name=name)
+
+        if process.returncode:
+            raise CommandError(f"{args[0]}: exit status {process.returncode}")
+        return stdout.decode(errors="replace")
+
+    async def _scan_dump(self, types: Container[str], consume: Callable[[dict], None],
+                         timeout: Optional[float] = None) -> None:
+        """
+        Run pw-dump and hand each object of ``types`` to ``consume`` as it is read.
+
+        The output is scanned chunk by chunk like ``dump.stream_command`` does
+        for the blocking engine, so it is never held in full and other objects
+        are skipped undecoded. Recorded in ``runner.RUNNER``.
+
+        Raises:
+            CommandError: If it cannot be started, fails, prints invalid JSON
+                or exceeds the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *DUMP_COMMAND,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError as e:
+            RUNNER.record(DUMP_COMMAND, time.monotonic() - start, error=True)
+            raise CommandError(f"{DUMP_COMMAND[0]}: {e}") from e
+
+        scanner = DumpScanner(types)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        size = 0
+
+        async def scan():
+            nonlocal size
+            while True:
+                data = await process.stdout.read(CHUNK_SIZE)
+                size += len(data)
+                for obj in scanner.feed(decoder.decode(data, final=not data)):
+                    consume(obj)
+                if not data:
+                    break
+            await process.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(scan(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            raise CommandError(f"{DUMP_COMMAND[0]}: timed out after {timeout} s") from None
+        except json.JSONDecodeError as e:
+            raise CommandError(f"{DUMP_COMMAND[0]}: {e}") from e
+        finally:
+            # Also reached on cancellation and bad output: never leave the process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            RUNNER.record(DUMP_COMMAND, time.monotonic() - start,
+                          returncode=process.returncode, timed_out=timed_out, output=size)
+
+        if process.returncode:
+            raise CommandError(f"{DUMP_COMMAND[0]}: exit status {process.returncode}")
+
+    async def _in_thread(self, func, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Call a blocking backend or engine method in a worker thread, with a deadline.
+
+        The thread itself cannot be cancelled; the timeout of the call itself
+        bounds how long it keeps running.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout)
+        except asyncio.TimeoutError:
+            raise CommandError(f"{func.__name__}: timed out after {timeout} s") from None
+
+    async def _backend_call(self, method: str, *args, timeout: Optional[float] = None) -> Any:
+        """Call a method of the persistent backend in a worker thread, with its timeout."""
+        timeout = self.timeout if timeout is None else timeout
+        return await self._in_thread(getattr(self.backend, method), *args, timeout,
+                                     timeout=timeout)
+
+    async def _write(self, items: List[Tuple[str, Any]],
+                     timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Write settings keys in order; returns per-key success."""
+        if self.backend is not None:
+            try:
+                return await self._backend_call("write_settings", items, timeout=timeout)
+            except CommandError:
+                return {key: False for key, _value in items}
+
+        results = {}
+        for key, value in items:
+            try:
+                await self._run(write_command(key, value), timeout, name="pw-metadata write")
+                results[key] = True
+            except CommandError:
+                results[key] = False
+        return results
+
+    async def set_sample_rate(self, rate: int, timeout: Optional[float] = None) -> bool:
+        """Set PipeWire sample rate."""
+        self._snapshot = None
+        return (await self._write([("clock.force-rate", rate)], timeout))["clock.force-rate"]
+
+    async def set_buffer_size(self, size: int, timeout: Optional[float] = None) -> bool:
+        """Set PipeWire buffer size (quantum)."""
+        self._snapshot = None
+        return (await self._write([("clock.force-quantum", size)], timeout))["clock.force-quantum"]
+
+    async def apply(self, settings: Dict[str, Any],
+                    timeout: Optional[float] = None) -> ApplyResult:
+        """
+        Write several settings metadata keys as one batch.
+
+        Same semantics as ``PipewireEngine.apply``: unchanged keys are skipped
+        and the rest are written in ``WRITE_ORDER``.
+        """
+        start = time.monotonic()
+        result, writes = plan_writes(settings, await self.get_settings_snapshot(timeout))
+        if writes:
+            result.results.update(await self._write(writes, timeout))
+
+        self._snapshot = None
+        result.elapsed = time.monotonic() - start
+        return result
+
+    async def apply_and_wait(self, settings: Dict[str, Any],
+                             timeout: float = 5.0) -> SwitchResult:
+        """
+        Write settings and wait until the driver runs with them.
+
+        ``PipewireEngine.apply_and_wait`` in a worker thread: cancelling the
+        call stops waiting for it, but not the write or the wait itself.
+        """
+        try:
+            return await asyncio.to_thread(self.engine.apply_and_wait, settings, timeout)
+        finally:
+            self._snapshot = None
+
+    async def _load_graph(self, timeout: Optional[float] = None,
+                          refresh: bool = False) -> Optional[Graph]:
+        """Load the devices and audio nodes, from the cache when it covers them."""
+        use_cache = self.cache is not None and not refresh
+        if self.backend is not None:
+            return await self._in_thread(self.engine.load_capabilities, refresh, timeout=timeout)
+
+        # Like the backends' list_devices and load_graph: a first pass
+        # decodes only the devices, and only a cache miss enumerates nodes
+        if use_cache:
+            devices: List[Device] = []
+            await self._scan_dump({DEVICE_TYPE},
+                                  lambda obj: devices.append(Device.from_dump(obj)), timeout)
+            graph = self.cache.lookup(devices)
+            if graph is not None:
+                return graph
+        graph = Graph()
+        await self._scan_dump({NODE_TYPE, DEVICE_TYPE}, graph.update, timeout)
+
+        if graph is not None and self.cache is not None:
+            self.cache.store(graph)
+            await asyncio.to_thread(self.cache.save)
+        return graph
+
+    async def get_supported_sample_rates(self, timeout: Optional[float] = None) -> List[int]:
+        """Query PipeWire for supported sample rates from connected devices."""
+        try:
+            return await self._load_rates(timeout)
+        except CommandError:
+            return list(COMMON_RATES)
+
+    async def get_settings_snapshot(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Read every ``clock.*`` key of the settings metadata at once."""
+        if self.monitoring:
+            return self.engine.get_settings_snapshot()
+        if (self._snapshot is not None
+                and time.monotonic() - self._snapshot_time < self.snapshot_ttl):
+            return dict(self._snapshot)
+        try:
+            return await self._read_settings(timeout)
+        except CommandError:
+            return {}
+
+    async def _get_setting(self, key: str, timeout: Optional[float] = None) -> Optional[int]:
+        return int_setting(await self.get_settings_snapshot(timeout), key)
+
+    async def get_current_rate(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Get current sample rate from PipeWire."""
+        return await self._get_setting("clock.force-rate", timeout)
+
+    async def get_current_quantum(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Get current buffer size from PipeWire."""
+        return await self._get_setting("clock.force-quantum", timeout)
+
+    async def get_device_info(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Get information about the current default audio device."""
+        if self.engine.graph is not None:
+            return self.engine.get_device_info()
+        try:
+            return await self._device_info(timeout)
+        except CommandError:
+            return None
+
+    async def _device_info(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Default sink description; raises CommandError instead of returning None."""
+        if self.backend is not None:
+            return await self._backend_call("device_info", timeout=timeout)
+        return parse_device_info(await self._run(["wpctl", "status"], timeout))
+
+    async def probe(self, deadline: Optional[float] = None, refresh: bool = False) -> ProbeResult:
+        """
+        Gather supported rates, the settings snapshot and the default device
+        concurrently.
+
+        Args:
+            deadline: Seconds for the whole probe (default ``self.timeout``);
+                queries still running then are cancelled and reported in
+                ``errors``, and their results fall back to defaults
+            refresh: Enumerate node formats even if the capability cache
+                knows every device
+
+        Returns:
+            The combined result with the wall time it took
+        """
+        deadline = self.timeout if deadline is None else deadline
+        start = time.monotonic()
+        result = ProbeResult(rates=list(COMMON_RATES))
+
+        async def query(name: str, call: Awaitable) -> None:
+            try:
+                setattr(result, name, await call)
+            except CommandError as e:
+                logger.warning("probe query %s failed: %s", name, e)
+                result.errors[name] = str(e)
+
+        async def load_rates() -> List[int]:
+            result.graph = await self._load_graph(deadline, refresh)
+            return _graph_rates(result.graph)
+
+        # The strict helpers raise instead of falling back, so failures are reported
+        tasks = {
+            "rates": asyncio.ensure_future(query("rates", load_rates())),
+            "settings": asyncio.ensure_future(query("settings", self._read_settings(deadline))),
+            "device_info": asyncio.ensure_future(
+                query("device_info", self._device_info(deadline))
+            ),
+        }
+        try:
+            _done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                logger.warning("probe query %s exceeded the deadline of %s s", name, deadline)
+                result.errors[name] = f"deadline of {deadline} s exceeded"
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        result.elapsed = time.monotonic() - start
+        return result
+
+    async def _load_rates(self, timeout: Optional[float] = None,
+                          refresh: bool = False) -> List[int]:
+        """Supported rates; raises CommandError instead of falling back."""
+        return _graph_rates(await self._load_graph(timeout, refresh))
+
+    async def _read_settings(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Fresh settings snapshot; raises CommandError instead of returning {}."""
+        if self.backend is not None:
+            settings = await self._backend_call("read_settings", timeout=timeout)
+            if settings is None:
+                raise CommandError("settings metadata unavailable")
+        else:
+            settings = parse_settings(
+                await self._run(SETTINGS_COMMAND, timeout, name="pw-metadata read")
+            )
+        self._snapshot = settings
+        self._snapshot_time = time.monotonic()
+        return dict(settings)
+
+
+def _graph_rates(graph: Optional[Graph]) -> List[int]:
+    """Sorted supported rates of a graph, or the common rates if it has none."""
+    rates = graph.supported_rates() if graph is not None else None
+    return sorted(rates) if rates else list(COMMON_RATES)
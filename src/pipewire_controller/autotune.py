@@ -0,0 +1,154 @@
+"""Adaptive quantum control from DSP load and xruns - Pure logic with no GUI dependencies."""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class Decision:
+    """One quantum change made by the tuner."""
+
+    time: float
+    old: int
+    new: int
+    reason: str
+    load: float
+    xruns: int
+
+    def describe(self) -> str:
+        """One line for the decision log, e.g. ``"256 -> 512: 2 xruns"``."""
+        return f"{self.old} -> {self.new}: {self.reason} (load {self.load:.0%})"
+
+
+class QuantumTuner:
+    """
+    Picks the smallest ``clock.force-quantum`` the graph runs without xruns.
+
+    ``update`` takes each profiler summary (``LoadMonitor.summary()``). When
+    the driver reports new xruns or its load goes above ``high_load`` the
+    quantum is doubled at once. Once the load has stayed below ``low_load``
+    with no xruns for ``quiet`` seconds it is halved, one step at a time.
+    The gap between the two loads is the hysteresis; in addition, a quantum
+    that had to be left again soon after it was reached needs twice as long
+    a quiet period (per failure, up to ``max_backoff`` times) before it is
+    tried again. After each change the samples of the next ``settle``
+    seconds are ignored, since reconfiguring the graph can itself cause an
+    xrun. Xrun counts are per driver, so when another driver becomes the
+    busiest its count only starts a new baseline.
+
+    Like ``WriteScheduler`` the tuner keeps no thread or timer: the caller
+    applies the returned decisions.
+    """
+
+    def __init__(self, floor: int = 64, ceiling: int = 2048, high_load: float = 0.75,
+                 low_load: float = 0.4, quiet: float = 30.0, settle: float = 3.0,
+                 max_backoff: int = 8, history: int = 100, clock=time.monotonic):
+        """
+        Initialize the tuner.
+
+        Args:
+            floor: Smallest quantum it will choose
+            ceiling: Largest quantum it will choose
+            high_load: DSP load (fraction of the cycle) above which it raises
+            low_load: DSP load below which the graph counts as quiet
+            quiet: Seconds of quiet before it lowers the quantum
+            settle: Seconds after a change during which samples are ignored
+            max_backoff: Largest multiple of ``quiet`` waited before retrying
+                a quantum that failed
+            history: Decisions kept in ``log``
+            clock: Monotonic time source
+        """
+        if floor > ceiling:
+            raise ValueError(f"floor {floor} is above ceiling {ceiling}")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.high_load = high_load
+        self.low_load = low_load
+        self.quiet = quiet
+        self.settle = settle
+        self.max_backoff = max_backoff
+        self.log: deque = deque(maxlen=history)
+        self._clock = clock
+        self.quantum: Optional[int] = None
+        # Driver of the last summary and its cumulative xrun count
+        self._driver: Optional[int] = None
+        self._xruns: Optional[int] = None
+        self._changed: Optional[float] = None
+        self._calm_since: Optional[float] = None
+        # Quantum -> times it was reached by lowering and left within ``quiet``
+        self._failures: Dict[int, int] = {}
+
+    def reset(self, quantum: Optional[int] = None) -> None:
+        """Start over from a quantum set elsewhere (None: take the driver's)."""
+        self.quantum = None if quantum is None else self._clamp(quantum)
+        self._driver = None
+        self._xruns = None
+        self._changed = None
+        self._calm_since = None
+
+    def quiet_needed(self, quantum: int) -> float:
+        """Seconds of quiet required before lowering to ``quantum``."""
+        return self.quiet * min(self.max_backoff, 2 ** self._failures.get(quantum, 0))
+
+    def update(self, summary: Optional[Dict[str, Any]]) -> Optional[Decision]:
+        """
+        Take one profiler summary.
+
+        Returns:
+            The change to apply, or None to keep the quantum
+        """
+        if summary is None:
+            return None
+        now = self._clock()
+        if self.quantum is None:
+            self.quantum = self._clamp(summary["quantum"])
+        # Another driver's cumulative count is only a new baseline
+        if summary.get("id") != self._driver:
+            self._driver = summary.get("id")
+            self._xruns = None
+        xruns = 0 if self._xruns is None else max(0, summary["xruns"] - self._xruns)
+        self._xruns = summary["xruns"]
+        load = summary["load"]
+
+        if self._changed is not None and now - self._changed < self.settle:
+            return None
+
+        if xruns or load > self.high_load:
+            self._calm_since = None
+            if self.quantum >= self.ceiling:
+                return None
+            if self._changed is not None and self.log and self.log[-1].new < self.log[-1].old \
+                    and now - self._changed < self.quiet:
+                # The last lowering did not hold
+                self._failures[self.quantum] = self._failures.get(self.quantum, 0) + 1
+            reason = f"{xruns} xruns" if xruns else f"load above {self.high_load:.0%}"
+            return self._change(min(self.ceiling, self.quantum * 2), reason, load, xruns, now)
+
+        if load >= self.low_load:
+            self._calm_since = None
+            return None
+        if self._calm_since is None:
+            self._calm_since = now
+        lower = max(self.floor, self.quantum // 2)
+        if lower < self.quantum and now - self._calm_since >= self.quiet_needed(lower):
+            return self._change(lower, f"quiet for {now - self._calm_since:.0f} s",
+                                load, xruns, now)
+        return None
+
+    def decisions(self) -> List[str]:
+        """The decision log, oldest first."""
+        return [decision.describe() for decision in self.log]
+
+    def _clamp(self, quantum: int) -> int:
+        return max(self.floor, min(self.ceiling, quantum))
+
+    def _change(self, quantum: int, reason: str, load: float, xruns: int,
+                now: float) -> Decision:
+        decision = Decision(now, self.quantum, quantum, reason, load, xruns)
+        self.log.append(decision)
+        self.quantum = quantum
+        self._changed = now
+        self._calm_since = None
+        return decision
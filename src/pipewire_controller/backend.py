@@ -0,0 +1,326 @@
+"""Pluggable I/O backends used by PipewireEngine."""
+
+import json
+import subprocess
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from .dump import DUMP_COMMAND, METADATA_TYPE, NODE_TYPE, iter_dump_objects, stream_command
+from .metadata import SETTINGS_COMMAND, format_value, parse_settings, parse_value, write_command
+from .model import DEVICE_TYPE, Device, Graph
+from .runner import RUNNER
+from .protocol import (
+    METADATA_EVENT_PROPERTY,
+    METADATA_SET_PROPERTY,
+    NODE_ENUM_PARAMS,
+    NODE_EVENT_PARAM,
+    PARAM_ENUM_FORMAT,
+    Id,
+    NativeClient,
+    Object,
+    ProtocolError,
+    format_to_dump,
+)
+
+
+def parse_device_info(output: str) -> Optional[str]:
+    """The default sink's line of ``wpctl status`` output, or None if it has none."""
+    for line in output.split("\n"):
+        if "* " in line and ("Sink" in line or "Audio/Sink" in line):
+            return line.strip()
+    return None
+
+
+class Backend(ABC):
+    """
+    Interface for the PipeWire I/O the engine performs.
+
+    Implementations never raise for PipeWire failures; they report them the
+    way the engine does (None, False or per-key False results).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def read_settings(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return every ``clock.*`` key of the settings metadata, or None on error."""
+
+    @abstractmethod
+    def write_settings(self, items: List[Tuple[str, Any]], timeout: float) -> Dict[str, bool]:
+        """Write settings metadata keys in the given order; returns per-key success."""
+
+    @abstractmethod
+    def load_graph(self, timeout: float) -> Optional[Graph]:
+        """Return the audio nodes and the devices as a ``Graph``, or None on error."""
+
+    @abstractmethod
+    def list_devices(self, timeout: float) -> Optional[List[Device]]:
+        """Return the devices without enumerating node formats, or None on error."""
+
+    @abstractmethod
+    def device_info(self, timeout: float) -> Optional[str]:
+        """Describe the current default audio sink, or None if unknown."""
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class SubprocessBackend(Backend):
+    """Backend that runs the PipeWire command line tools."""
+
+    name = "subprocess"
+
+    def read_settings(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Read the settings metadata with ``pw-metadata``."""
+        try:
+            result = RUNNER.run(SETTINGS_COMMAND, timeout, name="pw-metadata read")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return None
+        return parse_settings(result.stdout)
+
+    def write_settings(self, items: List[Tuple[str, Any]], timeout: float) -> Dict[str, bool]:
+        """Write each key with its own ``pw-metadata`` call."""
+        results = {}
+        for key, value in items:
+            try:
+                RUNNER.run(write_command(key, value), timeout, name="pw-metadata write",
+                           text=False)
+                results[key] = True
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                results[key] = False
+        return results
+
+    def load_graph(self, timeout: float) -> Optional[Graph]:
+        """Stream ``pw-dump`` into a graph of its nodes and devices."""
+        try:
+            with stream_command(DUMP_COMMAND, timeout) as stdout:
+                return Graph.from_objects(
+                    iter_dump_objects(stdout, types={NODE_TYPE, DEVICE_TYPE})
+                )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, json.JSONDecodeError):
+            return None
+
+    def list_devices(self, timeout: float) -> Optional[List[Device]]:
+        """Decode only the Device objects of ``pw-dump``; nodes are skipped unparsed."""
+        try:
+            with stream_command(DUMP_COMMAND, timeout) as stdout:
+                return [Device.from_dump(obj)
+                        for obj in iter_dump_objects(stdout, types={DEVICE_TYPE})]
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, json.JSONDecodeError):
+            return None
+
+    def device_info(self, timeout: float) -> Optional[str]:
+        """Find the default sink line in ``wpctl status``."""
+        try:
+            return parse_device_info(RUNNER.run(["wpctl", "status"], timeout).stdout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return None
+
+
+class NativeBackend(Backend):
+    """
+    Backend that talks the PipeWire native protocol over one open socket.
+
+    Metadata objects stay bound, so their properties are kept current by
+    server events and a read costs one sync round trip. Several writes are
+    sent together and confirmed by a single round trip. If the connection
+    fails, calls are answered by ``fallback`` (the subprocess backend).
+    """
+
+    name = "native"
+
+    def __init__(self, client: Optional[NativeClient] = None,
+                 fallback: Optional[Backend] = None):
+        """Initialize the backend; ``connect`` opens the connection."""
+        self.client = client or NativeClient()
+        self.fallback = fallback or SubprocessBackend()
+        self._metadata: Dict[str, int] = {}
+        self._properties: Dict[str, Dict[str, Any]] = {}
+
+    def connect(self, timeout: float = 5) -> bool:
+        """Connect to the daemon. Returns False if it is unreachable."""
+        try:
+            self.client.connect(timeout)
+            self._metadata.clear()
+            self._properties.clear()
+            return True
+        except ProtocolError:
+            return False
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.client.close()
+
+    def _ensure(self, timeout: float) -> bool:
+        """Reconnect if the connection was lost."""
+        return self.client.connected or self.connect(timeout)
+
+    def _bind_metadata(self, name: str, timeout: float) -> int:
+        """Bind a named metadata object once and keep its properties current."""
+        if name in self._metadata:
+            return self._metadata[name]
+
+        global_id = self.client.find_global(METADATA_TYPE, {"metadata.name": name})
+        if global_id is None:
+            raise ProtocolError(f"no '{name}' metadata")
+
+        properties = self._properties.setdefault(name, {})
+
+        def on_event(opcode: int, args: list):
+            if opcode != METADATA_EVENT_PROPERTY or args[0] != 0:
+                return
+            key, value = args[1], args[3]
+            if key is None:
+                properties.clear()
+            elif value is None:
+                properties.pop(key, None)
+            else:
+                properties[key] = value
+
+        self._metadata[name] = self.client.bind(global_id, on_event)
+        self.client.roundtrip(timeout)
+        return self._metadata[name]
+
+    def read_settings(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the settings metadata from the bound metadata object."""
+        with self.client.lock:
+            try:
+                if not self._ensure(timeout):
+                    return self.fallback.read_settings(timeout)
+                self._bind_metadata("settings", timeout)
+                self.client.roundtrip(timeout)
+            except ProtocolError:
+                return self.fallback.read_settings(timeout)
+            return {
+                key: parse_value(value)
+                for key, value in self._properties["settings"].items()
+                if key.startswith("clock.")
+            }
+
+    def write_settings(self, items: List[Tuple[str, Any]], timeout: float) -> Dict[str, bool]:
+        """Send every write, then confirm them all with a single round trip."""
+        with self.client.lock:
+            try:
+                if not self._ensure(timeout):
+                    return self.fallback.write_settings(items, timeout)
+                proxy = self._bind_metadata("settings", timeout)
+                self.client.take_error(proxy)
+                for key, value in items:
+                    self.client.send(proxy, METADATA_SET_PROPERTY,
+                                     [0, key, None, format_value(value)])
+                self.client.roundtrip(timeout)
+            except ProtocolError:
+                return self.fallback.write_settings(items, timeout)
+
+            properties = self._properties["settings"]
+            failed = self.client.take_error(proxy) is not None
+            return {
+                key: not failed and properties.get(key) == format_value(value)
+                for key, value in items
+            }
+
+    def load_graph(self, timeout: float) -> Optional[Graph]:
+        """Enumerate EnumFormat params of every audio node over the connection."""
+        with self.client.lock:
+            try:
+                if not self._ensure(timeout):
+                    return self.fallback.load_graph(timeout)
+                self.client.roundtrip(timeout)
+                return self._load_nodes(timeout)
+            except ProtocolError:
+                return self.fallback.load_graph(timeout)
+
+    def _load_nodes(self, timeout: float) -> Graph:
+        """Bind audio nodes, enumerate their formats and build the graph."""
+        nodes = {}
+        for global_id, (object_type, props) in list(self.client.globals.items()):
+            media_class = props.get("media.class", "")
+            if object_type != NODE_TYPE or not (
+                "Audio/Sink" in media_class or "Audio/Source" in media_class
+            ):
+                continue
+            formats: list = []
+            nodes[global_id] = (props, formats)
+
+            def on_event(opcode: int, args: list, formats=formats):
+                if opcode == NODE_EVENT_PARAM and isinstance(args[4], Object):
+                    formats.append(format_to_dump(args[4]))
+
+            proxy = self.client.bind(global_id, on_event)
+            self.client.send(proxy, NODE_ENUM_PARAMS, [0, Id(PARAM_ENUM_FORMAT), 0, 0, None])
+            nodes[global_id] += (proxy,)
+
+        self.client.roundtrip(timeout)
+        for _props, _formats, proxy in nodes.values():
+            self.client.destroy(proxy)
+
+        graph = Graph.from_objects(
+            {
+                "id": global_id,
+                "type": NODE_TYPE,
+                "info": {"props": props, "params": {"EnumFormat": formats}},
+            }
+            for global_id, (props, formats, _proxy) in nodes.items()
+        )
+        for device in self._devices():
+            graph.add(device)
+        return graph
+
+    def _devices(self) -> List[Device]:
+        """Devices from the registry globals, which carry their properties."""
+        return [
+            Device.from_dump({"id": global_id, "type": DEVICE_TYPE, "info": {"props": props}})
+            for global_id, (object_type, props) in list(self.client.globals.items())
+            if object_type == DEVICE_TYPE
+        ]
+
+    def list_devices(self, timeout: float) -> Optional[List[Device]]:
+        """List devices from the registry; costs one sync round trip."""
+        with self.client.lock:
+            try:
+                if not self._ensure(timeout):
+                    return self.fallback.list_devices(timeout)
+                self.client.roundtrip(timeout)
+                return self._devices()
+            except ProtocolError:
+                return self.fallback.list_devices(timeout)
+
+    def device_info(self, timeout: float) -> Optional[str]:
+        """Describe the default sink using the ``default`` metadata."""
+        with self.client.lock:
+            try:
+                if not self._ensure(timeout):
+                    return self.fallback.device_info(timeout)
+                self._bind_metadata("default", timeout)
+                self.client.roundtrip(timeout)
+            except ProtocolError:
+                return self.fallback.device_info(timeout)
+
+            value = self._properties["default"].get("default.audio.sink")
+            try:
+                name = json.loads(value)["name"] if value else None
+            except (json.JSONDecodeError, KeyError, TypeError):
+                name = None
+            for global_id, (object_type, props) in self.client.globals.items():
+                if object_type == NODE_TYPE and props.get("node.name") == name:
+                    return f"{global_id}. {props.get('node.description', name)}"
+            return None
+
+
+def create_backend(kind: str = "auto", timeout: float = 5) -> Backend:
+    """
+    Create a backend by name.
+
+    Args:
+        kind: ``"subprocess"``, ``"native"`` or ``"auto"`` (native when the
+            PipeWire socket is reachable, subprocess otherwise)
+        timeout: Connection timeout for the native backend
+
+    Returns:
+        A ready backend; always the subprocess backend if native fails
+    """
+    if kind in ("native", "auto"):
+        backend = NativeBackend()
+        if backend.connect(timeout):
+            return backend
+    return SubprocessBackend()
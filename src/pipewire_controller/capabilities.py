@@ -0,0 +1,235 @@
+"""Per-direction index of which audio devices support which sample rates and formats."""
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from .spa import bit_depth, format_family
+
+SINK = "sink"
+SOURCE = "source"
+DIRECTIONS = (SINK, SOURCE)
+
+# Node states in which a device takes part in the graph
+ACTIVE_STATES = frozenset({"running", "idle"})
+
+# Sample format family the graph mixes in; any other device format is
+# converted to and from it on every cycle
+PROCESSING_FORMAT = "F32"
+
+
+def node_direction(media_class: str) -> Optional[str]:
+    """``SINK`` or ``SOURCE`` for an audio device node's media class, else None."""
+    if "Audio/Sink" in media_class:
+        return SINK
+    if "Audio/Source" in media_class:
+        return SOURCE
+    return None
+
+
+class CapabilityIndex:
+    """
+    Rates and formats by device and devices by rate or format, for sinks and
+    sources separately.
+
+    Devices are audio device nodes identified by node id. Both directions of
+    the mapping are kept up to date on add/remove, so every question is a
+    lookup or a set operation over the affected devices, never a rescan of
+    their formats.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._by_rate: Dict[str, Dict[int, Set[int]]] = {d: {} for d in DIRECTIONS}
+        self._by_format: Dict[str, Dict[str, Set[int]]] = {d: {} for d in DIRECTIONS}
+        self._rates: Dict[int, FrozenSet[int]] = {}
+        self._modes: Dict[int, FrozenSet[Tuple[str, int]]] = {}
+        self._direction: Dict[int, str] = {}
+
+    def __len__(self):
+        return len(self._rates)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self._rates
+
+    def add(self, node_id: int, direction: str, rates: Iterable[int],
+            modes: Iterable[Tuple[str, int]] = ()) -> None:
+        """
+        Index a device, replacing what was known about it.
+
+        Args:
+            node_id: Audio device node
+            direction: ``SINK`` or ``SOURCE``
+            rates: Sample rates it supports
+            modes: (sample format, rate) pairs it supports
+        """
+        self.remove(node_id)
+        rates = frozenset(rates)
+        modes = frozenset(modes)
+        self._rates[node_id] = rates
+        self._modes[node_id] = modes
+        self._direction[node_id] = direction
+        by_rate = self._by_rate[direction]
+        for rate in rates:
+            by_rate.setdefault(rate, set()).add(node_id)
+        by_format = self._by_format[direction]
+        for name in {name for name, _rate in modes}:
+            by_format.setdefault(name, set()).add(node_id)
+
+    def remove(self, node_id: int) -> None:
+        """Drop a device from the index."""
+        rates = self._rates.pop(node_id, None)
+        if rates is None:
+            return
+        direction = self._direction.pop(node_id)
+        by_rate = self._by_rate[direction]
+        for rate in rates:
+            devices = by_rate[rate]
+            devices.discard(node_id)
+            if not devices:
+                del by_rate[rate]
+        by_format = self._by_format[direction]
+        for name in {name for name, _rate in self._modes.pop(node_id)}:
+            devices = by_format[name]
+            devices.discard(node_id)
+            if not devices:
+                del by_format[name]
+
+    def direction(self, node_id: int) -> Optional[str]:
+        """Direction of an indexed device."""
+        return self._direction.get(node_id)
+
+    def devices(self, direction: Optional[str] = None) -> FrozenSet[int]:
+        """Indexed devices, optionally of one direction."""
+        if direction is None:
+            return frozenset(self._rates)
+        return frozenset(n for n, d in self._direction.items() if d == direction)
+
+    def rates(self, node_id: int) -> FrozenSet[int]:
+        """Rates supported by one device."""
+        return self._rates.get(node_id, frozenset())
+
+    def formats(self, node_id: int, rate: Optional[int] = None) -> FrozenSet[str]:
+        """Sample formats of one device, at any rate or at the given one."""
+        return frozenset(
+            name for name, mode_rate in self._modes.get(node_id, ())
+            if rate is None or mode_rate == rate
+        )
+
+    def modes(self, node_id: int) -> FrozenSet[Tuple[str, int]]:
+        """(sample format, rate) pairs of one device."""
+        return self._modes.get(node_id, frozenset())
+
+    def devices_supporting_format(self, name: str,
+                                  direction: Optional[str] = None) -> FrozenSet[int]:
+        """Devices that offer a sample format (exact name, e.g. ``"S32LE"``)."""
+        directions = DIRECTIONS if direction is None else (direction,)
+        result: Set[int] = set()
+        for d in directions:
+            result |= self._by_format[d].get(name, set())
+        return frozenset(result)
+
+    def devices_supporting(self, rate: int, direction: Optional[str] = None) -> FrozenSet[int]:
+        """Devices that support a rate."""
+        directions = DIRECTIONS if direction is None else (direction,)
+        result: Set[int] = set()
+        for d in directions:
+            result |= self._by_rate[d].get(rate, set())
+        return frozenset(result)
+
+    def supported_by_any(self, direction: Optional[str] = None) -> FrozenSet[int]:
+        """Rates supported by at least one device."""
+        directions = DIRECTIONS if direction is None else (direction,)
+        return frozenset().union(*(self._by_rate[d].keys() for d in directions))
+
+    def supported_by_all(self, node_ids: Optional[Iterable[int]] = None,
+                         direction: Optional[str] = None) -> FrozenSet[int]:
+        """
+        Rates every one of the given devices supports.
+
+        Args:
+            node_ids: Devices to intersect (default: every indexed device)
+            direction: Only consider devices of this direction
+
+        Returns:
+            The common rates; empty when no device is selected
+        """
+        selected = self.devices(direction) if node_ids is None else frozenset(node_ids)
+        if direction is not None:
+            selected = frozenset(n for n in selected if self._direction.get(n) == direction)
+        rate_sets = [self._rates[n] for n in selected if n in self._rates]
+        if not rate_sets:
+            return frozenset()
+        return frozenset.intersection(*rate_sets)
+
+
+@dataclass(frozen=True)
+class Conversion:
+    """What the graph has to convert on every cycle to feed one device."""
+
+    node_id: int
+    rate: int
+    device_rate: int
+    device_format: Optional[str]
+
+    @property
+    def resample(self) -> bool:
+        """Whether the graph rate differs from the rate the device runs at."""
+        return self.rate != self.device_rate
+
+    @property
+    def convert_format(self) -> bool:
+        """Whether samples are converted from the processing format."""
+        return (self.device_format is not None
+                and format_family(self.device_format) != PROCESSING_FORMAT)
+
+    @property
+    def needed(self) -> bool:
+        """Whether any per-cycle conversion happens."""
+        return self.resample or self.convert_format
+
+    def describe(self) -> str:
+        """Short human-readable summary, e.g. "F32 → S24_32LE, 44100 → 48000 Hz"."""
+        parts = []
+        if self.convert_format:
+            parts.append(f"{PROCESSING_FORMAT} → {self.device_format}")
+        if self.resample:
+            parts.append(f"{self.rate} → {self.device_rate} Hz")
+        return ", ".join(parts) or "none"
+
+
+def best_format(formats: Iterable[str]) -> Optional[str]:
+    """The processing format if offered, else the deepest one."""
+    formats = sorted(formats)
+    for name in formats:
+        if format_family(name) == PROCESSING_FORMAT:
+            return name
+    return max(formats, key=bit_depth, default=None)
+
+
+def detect_conversion(index: CapabilityIndex, node_id: int, rate: int,
+                      forced_format: Optional[str] = None) -> Optional[Conversion]:
+    """
+    Work out the conversion needed to run a device with the graph at ``rate``.
+
+    The device runs at ``rate`` if it supports it, otherwise at its closest
+    rate (and the graph resamples). Its format is ``forced_format`` if it is
+    offered there, else the one PipeWire would negotiate: the processing
+    format when offered, else the deepest.
+
+    Returns:
+        The conversion, or None if the device is not indexed
+    """
+    rates = index.rates(node_id)
+    if not rates:
+        return None
+    device_rate = rate if rate in rates else min(rates, key=lambda r: (abs(r - rate), r))
+    formats = index.formats(node_id, device_rate)
+    device_format = forced_format if forced_format in formats else best_format(formats)
+    return Conversion(node_id, rate, device_rate, device_format)
+
+
+def conversion_free_rates(index: CapabilityIndex, node_id: int) -> FrozenSet[int]:
+    """Rates at which a device takes the processing format directly (no conversion at all)."""
+    return frozenset(
+        rate for name, rate in index.modes(node_id) if format_family(name) == PROCESSING_FORMAT
+    )
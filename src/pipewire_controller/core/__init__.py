@@ -1 +1,7 @@
-"""Core functionality for PipeWire interaction."""
+"""
+Core functionality for PipeWire interaction.
+
+Legacy static wrappers, kept for existing callers. They always run the
+command line tools and ignore the ``backend`` setting; the application goes
+through ``PipewireEngine`` and its backend instead.
+"""
@@ -2,7 +2,10 @@
 
 import json
 import subprocess
-from typing import List, Set, Optional
+from typing import Iterable, List, Set, Optional
+
+from ..dump import DUMP_COMMAND, NODE_TYPE, iter_dump_objects, stream_command
+from ..runner import RUNNER
 
 
 class HardwareDetector:
@@ -17,15 +20,9 @@ class HardwareDetector:
             List of supported sample rates in Hz, sorted ascending.
         """
         try:
-            result = subprocess.run(
-                ["pw-dump"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
-            devices = json.loads(result.stdout)
-            rates = HardwareDetector._extract_rates_from_devices(devices)
+            with stream_command(DUMP_COMMAND, timeout=5) as stdout:
+                nodes = iter_dump_objects(stdout, types={NODE_TYPE})
+                rates = HardwareDetector._extract_rates_from_devices(nodes)
             
             # Fallback to common rates if none detected
             if not rates:
@@ -38,7 +35,7 @@ class HardwareDetector:
             return [44100, 48000, 88200, 96000, 176400, 192000]
 
     @staticmethod
-    def _extract_rates_from_devices(devices: List[dict]) -> Set[int]:
+    def _extract_rates_from_devices(devices: Iterable[dict]) -> Set[int]:
         """Extract supported sample rates from pw-dump output."""
         rates = set()
         
@@ -79,13 +76,7 @@ class HardwareDetector:
     def get_current_device_info() -> Optional[str]:
         """Get information about the current default audio device."""
         try:
-            result = subprocess.run(
-                ["wpctl", "status"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
+            result = RUNNER.run(["wpctl", "status"], 5)
             # Parse default sink from wpctl status
             for line in result.stdout.split("\n"):
                 if "* " in line and ("Sink" in line or "Audio/Sink" in line):
@@ -1,7 +1,10 @@
 """PipeWire interface for controlling sample rate and buffer size."""
 
 import subprocess
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from ..metadata import SETTINGS_COMMAND, parse_settings
+from ..runner import RUNNER
 
 
 class PipeWireController:
@@ -19,12 +22,8 @@ class PipeWireController:
             True if successful, False otherwise
         """
         try:
-            subprocess.run(
-                ["pw-metadata", "-n", "settings", "0", "clock.force-rate", str(rate)],
-                check=True,
-                capture_output=True,
-                timeout=5
-            )
+            RUNNER.run(["pw-metadata", "-n", "settings", "0", "clock.force-rate", str(rate)], 5,
+                       name="pw-metadata write", text=False)
             return True
         except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
             return False
@@ -41,52 +40,34 @@ class PipeWireController:
             True if successful, False otherwise
         """
         try:
-            subprocess.run(
-                ["pw-metadata", "-n", "settings", "0", "clock.force-quantum", str(size)],
-                check=True,
-                capture_output=True,
-                timeout=5
-            )
+            RUNNER.run(["pw-metadata", "-n", "settings", "0", "clock.force-quantum", str(size)], 5,
+                       name="pw-metadata write", text=False)
             return True
         except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
             return False
 
+    @staticmethod
+    def get_settings_snapshot() -> Dict[str, Any]:
+        """
+        Read every ``clock.*`` key of the settings metadata in one call.
+        
+        Returns:
+            Mapping of metadata keys to parsed values, empty on error
+        """
+        try:
+            result = RUNNER.run(SETTINGS_COMMAND, 5, name="pw-metadata read")
+            return parse_settings(result.stdout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return {}
+
     @staticmethod
     def get_current_rate() -> Optional[int]:
         """Get current sample rate from PipeWire."""
-        try:
-            result = subprocess.run(
-                ["pw-metadata", "-n", "settings"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
-            for line in result.stdout.split("\n"):
-                if "clock.force-rate" in line:
-                    parts = line.split("'")
-                    if len(parts) >= 4:
-                        return int(parts[3])
-            return None
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError):
-            return None
+        rate = PipeWireController.get_settings_snapshot().get("clock.force-rate")
+        return rate if isinstance(rate, int) else None
 
     @staticmethod
     def get_current_quantum() -> Optional[int]:
         """Get current buffer size from PipeWire."""
-        try:
-            result = subprocess.run(
-                ["pw-metadata", "-n", "settings"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
-            for line in result.stdout.split("\n"):
-                if "clock.force-quantum" in line:
-                    parts = line.split("'")
-                    if len(parts) >= 4:
-                        return int(parts[3])
-            return None
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError):
-            return None
+        quantum = PipeWireController.get_settings_snapshot().get("clock.force-quantum")
+        return quantum if isinstance(quantum, int) else None
@@ -0,0 +1,313 @@
+"""Incremental parsing of ``pw-dump`` output."""
+
+import codecs
+import json
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    BinaryIO, Callable, Container, Iterator, List, Optional, Set, TextIO, Tuple,
+)
+
+from .runner import RUNNER
+from .spa import format_modes, format_rates
+
+DUMP_COMMAND = ["pw-dump"]
+NODE_TYPE = "PipeWire:Interface:Node"
+METADATA_TYPE = "PipeWire:Interface:Metadata"
+CHUNK_SIZE = 64 * 1024
+COMMON_RATES = [44100, 48000, 88200, 96000, 176400, 192000]
+PLAYBACK_CLASS = "Stream/Output/Audio"
+
+# A JSON string (group 1 is empty while the closing quote has not arrived yet),
+# a brace or a bracket. Braces inside strings are consumed with the string.
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(")?|[{}\[\]]')
+
+# pw-dump writes "id" and "type" first, so the type is known from the head
+# of an object without decoding the rest of it.
+_HEAD = re.compile(r'\{\s*"id"\s*:\s*\d+\s*,\s*"type"\s*:\s*"([^"]*)"')
+
+
+def is_audio_node(obj: dict) -> bool:
+    """Whether a pw-dump object is an audio sink or source node."""
+    if obj.get("type") != NODE_TYPE:
+        return False
+    media_class = (obj.get("info") or {}).get("props", {}).get("media.class", "")
+    return "Audio/Sink" in media_class or "Audio/Source" in media_class
+
+
+def node_rates(obj: dict) -> Set[int]:
+    """
+    Sample rates advertised by the EnumFormat params of a node.
+
+    Every SPA choice form is understood (see ``spa.parse_choice``); ranges
+    and steps are matched against ``spa.STANDARD_RATES``.
+    """
+    rates: Set[int] = set()
+    params = (obj.get("info") or {}).get("params", {})
+
+    for fmt in params.get("EnumFormat", []):
+        if isinstance(fmt, dict):
+            rates.update(format_rates(fmt))
+
+    return rates
+
+
+def stream_rate(obj: dict) -> Optional[int]:
+    """
+    Native sample rate of a stream node, or None if it does not say.
+
+    Taken from the negotiated Format param (the client's side of the
+    stream's converter), else from the ``audio.rate`` or ``node.rate``
+    (``"1/44100"``) properties.
+    """
+    info = obj.get("info") or {}
+    for fmt in info.get("params", {}).get("Format") or ():
+        rate = fmt.get("rate") if isinstance(fmt, dict) else None
+        if isinstance(rate, int) and rate > 0:
+            return rate
+    props = info.get("props", {})
+    for value in (props.get("audio.rate"), str(props.get("node.rate", "")).partition("/")[2]):
+        try:
+            rate = int(value)
+        except (TypeError, ValueError):
+            continue
+        if rate > 0:
+            return rate
+    return None
+
+
+def node_modes(obj: dict) -> Set[Tuple[str, int]]:
+    """(sample format, rate) pairs advertised by the EnumFormat params of a node."""
+    return node_capabilities(obj)[1]
+
+
+def node_capabilities(obj: dict) -> Tuple[Set[int], Set[Tuple[str, int]]]:
+    """``node_rates`` and ``node_modes`` in one pass over the EnumFormat params."""
+    rates: Set[int] = set()
+    modes: Set[Tuple[str, int]] = set()
+    params = (obj.get("info") or {}).get("params", {})
+
+    for fmt in params.get("EnumFormat", []):
+        if isinstance(fmt, dict):
+            fmt_rates = format_rates(fmt)
+            rates.update(fmt_rates)
+            modes.update(format_modes(fmt, rates=fmt_rates))
+
+    return rates, modes
+
+
+def _decode(text: str, types: Optional[Container[str]]) -> Optional[dict]:
+    """Decode one top-level object unless its type is filtered out."""
+    if types is not None:
+        head = _HEAD.match(text)
+        if head is not None and head.group(1) not in types:
+            return None
+
+    obj = json.loads(text)
+    if types is not None and obj.get("type") not in types:
+        return None
+    return obj
+
+
+def iter_dump_objects(
+    stream: TextIO,
+    types: Optional[Container[str]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    on_array_end: Optional[Callable[[], None]] = None
+) -> Iterator[dict]:
+    """
+    Yield top-level objects from a ``pw-dump`` stream one at a time.
+
+    Only the object currently being read is kept in memory, so peak memory
+    depends on the largest object rather than on the size of the dump.
+    Consecutive arrays, as printed by ``pw-dump --monitor``, are handled too.
+
+    Args:
+        stream: Text stream with pw-dump output
+        types: If given, only objects whose ``type`` is in this container are
+            decoded; everything else is skipped without being parsed
+        chunk_size: Number of characters read per chunk
+        on_array_end: Called whenever a top-level array has been read completely
+
+    Yields:
+        Decoded objects in output order
+
+    Raises:
+        json.JSONDecodeError: If an object is not valid JSON
+    """
+    scanner = DumpScanner(types, on_array_end)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield from scanner.feed(chunk)
+
+
+class DumpScanner:
+    """
+    Push form of ``iter_dump_objects``: text is fed in as it arrives.
+
+    For readers that cannot block on a stream, such as the pipes of asyncio
+    subprocesses. Only the object currently being read is kept.
+    """
+
+    def __init__(self, types: Optional[Container[str]] = None,
+                 on_array_end: Optional[Callable[[], None]] = None):
+        """
+        Initialize the scanner.
+
+        Args:
+            types: As for ``iter_dump_objects``
+            on_array_end: As for ``iter_dump_objects``
+        """
+        self.types = types
+        self.on_array_end = on_array_end
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+
+    def feed(self, text: str) -> Iterator[dict]:
+        """
+        Yield the objects that ``text`` completes.
+
+        Consume the iterator before feeding the next text.
+
+        Raises:
+            json.JSONDecodeError: If an object is not valid JSON
+        """
+        buffer = self._buffer + text
+        pos = self._pos
+        depth = self._depth
+        start = 0
+
+        while True:
+            match = _TOKEN.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+
+            token = match.group()
+            if token[0] == '"':
+                if match.group(1) is None:
+                    # String continues in the next chunk
+                    pos = match.start()
+                    break
+                pos = match.end()
+                continue
+
+            pos = match.end()
+            if token == "{":
+                if depth == 0:
+                    start = match.start()
+                depth += 1
+            elif token == "[" or token == "]":
+                if depth == 0 and token == "]" and self.on_array_end is not None:
+                    self.on_array_end()
+            elif depth > 0:
+                depth -= 1
+                if depth == 0:
+                    obj = _decode(buffer[start:pos], self.types)
+                    if obj is not None:
+                        yield obj
+
+        # Drop everything that is no longer needed; an unfinished object
+        # starts the buffer
+        cut = start if depth > 0 else pos
+        self._buffer = buffer[cut:]
+        self._pos = pos - cut
+        self._depth = depth
+
+
+class PipeReader:
+    """Text adapter that returns whatever a pipe has available instead of blocking for more."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def read(self, size: int = CHUNK_SIZE) -> str:
+        """Return up to ``size`` bytes worth of text, or "" at end of stream."""
+        while True:
+            data = self._raw.read1(size)
+            text = self._decoder.decode(data, final=not data)
+            if text or not data:
+                return text
+
+
+class _CountingReader:
+    """Text stream wrapper that counts the characters read through it."""
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self.size = 0
+
+    def read(self, size: int = -1) -> str:
+        text = self._stream.read(size)
+        self.size += len(text) if isinstance(text, str) else 0
+        return text
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self._stream:
+            self.size += len(line)
+            yield line
+
+
+@contextmanager
+def stream_command(args: List[str], timeout: float) -> Iterator[TextIO]:
+    """
+    Run a command and expose its stdout as a stream.
+
+    Args:
+        args: Command line to execute
+        timeout: Seconds after which the command is killed
+
+    The call is recorded in ``runner.RUNNER``.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command ran longer than ``timeout``
+        subprocess.CalledProcessError: If the command exited with an error
+    """
+    start = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True
+        )
+    except OSError:
+        RUNNER.record(args, time.monotonic() - start, error=True)
+        raise
+    stdout = _CountingReader(process.stdout)
+    expired = threading.Event()
+
+    def kill():
+        expired.set()
+        process.kill()
+
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.daemon = True
+    watchdog.start()
+    returncode = None
+    try:
+        yield stdout
+        # Let the command finish even if the caller stopped reading early
+        while stdout.read(CHUNK_SIZE):
+            pass
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        RUNNER.record(args, time.monotonic() - start, returncode=returncode,
+                      timed_out=expired.is_set(), output=stdout.size)
+
+    if expired.is_set():
+        raise subprocess.TimeoutExpired(args, timeout)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, args)
@@ -1,152 +1,694 @@
 """PipeWire engine - Pure logic with no GUI dependencies."""
 
-import json
-import subprocess
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Dict, Any, Tuple
+
+from .backend import Backend, SubprocessBackend
+from .capabilities import Conversion, detect_conversion
+from .dump import COMMON_RATES
+from .graph import GraphCallback, GraphEvent, GraphEventType, GraphMirror
+from .guard import FAILED, Probation
+from .model import Graph
+from .metadata import SettingsCallback, SettingsMonitor
+from .profiler import LoadCallback, LoadMonitor
+from .utils.cache import CapabilityCache
+
+# Order in which ``apply`` writes settings keys. Bounds go first so the forced
+# values are never clamped on the way, and the rate goes last because a rate
+# change restarts the driver: that single restart then picks up the new quantum.
+WRITE_ORDER = (
+    "clock.allowed-rates",
+    "clock.min-quantum",
+    "clock.max-quantum",
+    "clock.quantum",
+    "clock.force-quantum",
+    "clock.rate",
+    "clock.force-rate",
+)
+
+# PipeWire ignores the entries of ``clock.allowed-rates`` past this many
+MAX_ALLOWED_RATES = 32
+
+
+def allowed_rates(supported: Iterable[int], preferred: int = 48000) -> List[int]:
+    """
+    Value for ``clock.allowed-rates`` from the rates the hardware supports.
+
+    If there are more than ``MAX_ALLOWED_RATES``, the ones closest to
+    ``preferred`` are kept. The result is sorted.
+    """
+    rates = sorted(set(supported), key=lambda rate: (abs(rate - preferred), rate))
+    return sorted(rates[:MAX_ALLOWED_RATES])
+
+
+def native_rate_settings(supported: Iterable[int]) -> Dict[str, Any]:
+    """Metadata that lets PipeWire switch among ``supported`` rates: allowed, none forced."""
+    return {"clock.allowed-rates": allowed_rates(supported), "clock.force-rate": 0}
+
+
+def latency_quantum(target_ms: float, rate: int, minimum: int = 32, maximum: int = 2048) -> int:
+    """
+    Power-of-two quantum whose latency at ``rate`` is closest to ``target_ms``.
+
+    Only quanta within ``minimum`` and ``maximum`` (``clock.min-quantum`` and
+    ``clock.max-quantum``) are considered; a tie goes to the larger quantum,
+    which leaves the DSP more time per cycle.
+    """
+    quanta = [2 ** n for n in range(4, 14) if minimum <= 2 ** n <= maximum] \
+        or [2 ** n for n in range(4, 14)]
+    return min(quanta, key=lambda q: (abs(q / rate * 1000 - target_ms), -q))
+
+
+def plan_writes(settings: Dict[str, Any],
+                current: Dict[str, Any]) -> Tuple["ApplyResult", List[Tuple[str, Any]]]:
+    """
+    Split a batch for ``apply`` into the keys to write and those already set.
+
+    Returns:
+        The result with the keys already holding their value marked written,
+        and the other keys with their values in ``WRITE_ORDER``
+    """
+    order = {key: index for index, key in enumerate(WRITE_ORDER)}
+    result = ApplyResult()
+    writes = []
+    for key in sorted(settings, key=lambda k: order.get(k, -1)):
+        value = settings[key]
+        if current.get(key) == value:
+            result.results[key] = True
+        else:
+            writes.append((key, value))
+    return result, writes
+
+
+def int_setting(settings: Dict[str, Any], key: str) -> Optional[int]:
+    """An integer key of a settings snapshot, or None if it is unset or not a number."""
+    value = settings.get(key)
+    return value if isinstance(value, int) else None
+
+
+@dataclass
+class ApplyResult:
+    """Outcome of a batched settings write."""
+
+    results: Dict[str, bool] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether every key was written successfully."""
+        return all(self.results.values())
+
+
+@dataclass
+class SwitchResult:
+    """Outcome of a settings write confirmed by the running driver."""
+
+    applied: ApplyResult
+    # Forced values waited for; None for a key that was not forced
+    rate: Optional[int] = None
+    quantum: Optional[int] = None
+    confirmed: bool = False
+    # Seconds from the write until the driver ran with the new values
+    latency: Optional[float] = None
+    # Seconds during which the driver was seen stopped on the way
+    silence: float = 0.0
+    # No driver was running, so there was nothing to wait for
+    idle: bool = False
+
+
+@dataclass
+class GuardResult:
+    """Outcome of a settings write kept only if it runs without xruns."""
+
+    applied: ApplyResult
+    # Forced rate and quantum before the write, restored if it failed probation
+    previous: Dict[str, int] = field(default_factory=dict)
+    verdict: Optional[str] = None
+    xruns: int = 0
+    reverted: bool = False
+
+    @property
+    def judged(self) -> bool:
+        """Whether xruns were watched (False if the write failed or pw-top is missing)."""
+        return self.verdict is not None
+
+    @property
+    def passed(self) -> bool:
+        """Whether the settings are in place and should be kept."""
+        return self.applied.ok and self.verdict != FAILED
 
 
 class PipewireEngine:
     """Handles all PipeWire interactions without GUI dependencies."""
 
-    def __init__(self):
-        """Initialize the engine."""
+    def __init__(self, monitor: bool = False, snapshot_ttl: float = 0.25,
+                 backend: Optional[Backend] = None, cache: Optional[CapabilityCache] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            monitor: Start the settings monitor right away (see ``start_monitor``)
+            snapshot_ttl: Seconds a settings snapshot is reused by later reads
+            backend: How PipeWire is reached (see ``backend.create_backend``);
+                defaults to running the command line tools
+            cache: Per-device capability cache; without one every capability
+                query enumerates the formats of every node
+        """
         self.timeout = 5
+        self.backend = backend or SubprocessBackend()
+        self.cache = cache
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_time = 0.0
+        self._monitor = SettingsMonitor()
+        self._graph = GraphMirror()
+        self._graph.subscribe(self._on_graph_event)
+        self._profiler = LoadMonitor()
+        # Ends the probation still running (see ``start_guarded``)
+        self._end_probation: Optional[Callable[[], None]] = None
+        if monitor:
+            self.start_monitor()
+
+    def start_monitor(self) -> bool:
+        """
+        Serve setting reads from a live ``pw-metadata --monitor`` cache.
+
+        Returns:
+            True if the monitor is running, False if it could not be started
+        """
+        return self._monitor.start()
+
+    def stop_monitor(self) -> None:
+        """Stop the settings monitor and go back to one process per read."""
+        self._monitor.stop()
+
+    @property
+    def monitoring(self) -> bool:
+        """Whether reads are currently served from the monitor cache."""
+        return self._monitor.running
+
+    def subscribe(self, callback: SettingsCallback) -> Callable[[], None]:
+        """
+        Register a callback for ``clock.*`` setting changes.
+
+        Callbacks fire only while the monitor is running, on its reader thread.
+        Returns a function that unsubscribes the callback.
+        """
+        return self._monitor.subscribe(callback)
+
+    def _set_metadata(self, key: str, value: Any) -> bool:
+        """Write a single key of the settings metadata."""
+        ok = self.backend.write_settings([(key, value)], self.timeout)[key]
+        if ok:
+            self._snapshot = None
+        return ok
+
+    def start_graph_mirror(self) -> bool:
+        """
+        Serve capability queries from a live ``pw-dump --monitor`` mirror.
+
+        While it runs, a device that goes away is dropped from the capability
+        cache, so that plugging it back in probes it again even though its
+        fingerprint is the same.
+
+        Returns:
+            True once the mirror holds the current graph
+        """
+        return self._graph.start(timeout=self.timeout)
+
+    def stop_graph_mirror(self) -> None:
+        """Stop the graph mirror and go back to one pw-dump per query."""
+        self._graph.stop()
+
+    def _on_graph_event(self, event: GraphEvent) -> None:
+        """Forget the cached capabilities of an unplugged device (mirror thread)."""
+        if event.type == GraphEventType.DEVICE_REMOVED and self.cache is not None:
+            self.cache.invalidate(event.data.identity)
+            self.cache.save()
+
+    @property
+    def graph(self) -> Optional[GraphMirror]:
+        """The running graph mirror, or None while it is stopped."""
+        return self._graph if self._graph.running else None
+
+    def subscribe_graph(self, callback: GraphCallback) -> Callable[[], None]:
+        """
+        Register a callback for graph events (node or device added/removed, params changed).
+
+        Callbacks fire only while the mirror runs, on its reader thread.
+        Returns a function that unsubscribes the callback.
+        """
+        return self._graph.subscribe(callback)
+
+    def start_profiler(self) -> bool:
+        """
+        Collect DSP load and xrun statistics from a live ``pw-top --batch-mode``.
+
+        Returns:
+            True if the profiler is running, False if pw-top could not be started
+        """
+        return self._profiler.start()
+
+    def stop_profiler(self) -> None:
+        """Stop the profiler and drop its samples."""
+        self._profiler.stop()
+
+    @property
+    def profiler(self) -> Optional[LoadMonitor]:
+        """The running load profiler, or None while it is stopped."""
+        return self._profiler if self._profiler.running else None
+
+    def subscribe_load(self, callback: LoadCallback) -> Callable[[], None]:
+        """
+        Register a callback run after every pw-top refresh.
+
+        Callbacks fire only while the profiler runs, on its reader thread.
+        Returns a function that unsubscribes the callback.
+        """
+        return self._profiler.subscribe(callback)
 
     def set_sample_rate(self, rate: int) -> bool:
         """Set PipeWire sample rate."""
-        try:
-            subprocess.run(
-                ["pw-metadata", "-n", "settings", "0", "clock.force-rate", str(rate)],
-                check=True,
-                capture_output=True,
-                timeout=self.timeout
-            )
-            return True
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            return False
+        return self._set_metadata("clock.force-rate", rate)
 
     def set_buffer_size(self, size: int) -> bool:
         """Set PipeWire buffer size (quantum)."""
+        return self._set_metadata("clock.force-quantum", size)
+
+    def set_allowed_rates(self, rates: Optional[Iterable[int]] = None) -> ApplyResult:
+        """
+        Let PipeWire switch the graph between rates without forcing one.
+
+        Writes ``clock.allowed-rates`` (see ``allowed_rates``) and clears
+        ``clock.force-rate`` in one batch.
+
+        Args:
+            rates: Rates to allow (default: ``get_supported_sample_rates``)
+        """
+        rates = self.get_supported_sample_rates() if rates is None else rates
+        return self.apply(native_rate_settings(rates))
+
+    def set_quantum_limits(self, minimum: int = 0, maximum: int = 0) -> ApplyResult:
+        """
+        Bound the quantum PipeWire picks while none is forced.
+
+        Args:
+            minimum: ``clock.min-quantum``; 0 restores PipeWire's default
+            maximum: ``clock.max-quantum``; 0 restores PipeWire's default
+        """
+        if minimum and maximum and minimum > maximum:
+            raise ValueError(f"min-quantum {minimum} is above max-quantum {maximum}")
+        return self.apply({"clock.min-quantum": minimum, "clock.max-quantum": maximum})
+
+    def set_latency(self, target_ms: float, rate: Optional[int] = None) -> Optional[int]:
+        """
+        Force the quantum that gives the latency closest to ``target_ms``.
+
+        Args:
+            target_ms: Latency of one quantum in milliseconds
+            rate: Graph rate (default: the forced rate, else ``clock.rate``)
+
+        Returns:
+            The quantum written, or None if the write failed
+        """
+        settings = self.get_settings_snapshot()
+        rate = rate or settings.get("clock.force-rate") or settings.get("clock.rate") or 48000
+        minimum = settings.get("clock.min-quantum")
+        maximum = settings.get("clock.max-quantum")
+        quantum = latency_quantum(
+            target_ms, rate,
+            minimum if isinstance(minimum, int) and minimum > 0 else 32,
+            maximum if isinstance(maximum, int) and maximum > 0 else 2048,
+        )
+        return quantum if self.set_buffer_size(quantum) else None
+
+    def apply(self, settings: Dict[str, Any]) -> ApplyResult:
+        """
+        Write several settings metadata keys as one batch.
+
+        Keys already holding the requested value are skipped, and the rest are
+        written back to back in ``WRITE_ORDER`` so the graph reconfigures as
+        few times as possible.
+
+        Args:
+            settings: Mapping of metadata keys to values,
+                e.g. ``{"clock.force-rate": 48000, "clock.force-quantum": 256}``
+
+        Returns:
+            Per-key success flags and the total wall time in seconds
+        """
+        start = time.monotonic()
+        result, writes = plan_writes(settings, self.get_settings_snapshot())
+        if writes:
+            result.results.update(self.backend.write_settings(writes, self.timeout))
+
+        self._snapshot = None
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def apply_and_wait(self, settings: Dict[str, Any], timeout: float = 5.0) -> SwitchResult:
+        """
+        Write settings like ``apply`` and wait until the driver runs with them.
+
+        ``apply`` only knows that the metadata was written. This waits until
+        a driver that ran at the time of the write reports the forced rate and
+        quantum, so the switch latency and the time the graph stood still are
+        measured rather than assumed. With the graph mirror running, the
+        driver node's state and negotiated rate are taken from its updates
+        as they arrive. The load profiler (started for the purpose if it is
+        not running) tells which drivers run, and is the only source for the
+        quantum and, without the mirror, for the rate; what it confirms is
+        only as fine as pw-top's refresh period.
+
+        A suspended or idle graph only takes the settings up when something
+        plays, so if no driver runs at the time of the write this returns
+        right after it, with ``idle`` set, instead of waiting out the timeout.
+
+        Args:
+            settings: As for ``apply``
+            timeout: Seconds to wait for the driver after the write
+
+        Returns:
+            The write results, and the latency and silence once confirmed
+        """
+        result = SwitchResult(ApplyResult(), settings.get("clock.force-rate") or None,
+                              settings.get("clock.force-quantum") or None)
+        started_profiler = self.profiler is None
+        if started_profiler and not self.start_profiler():
+            result.applied = self.apply(settings)
+            return result
+
+        # Whether anything runs is only known once pw-top reported
+        if self._profiler.latest()[0] is None:
+            refreshed = threading.Event()
+            unsubscribe = self.subscribe_load(refreshed.set)
+            refreshed.wait(timeout)
+            unsubscribe()
+        # The drivers running now are the ones that will switch
+        watched = {row.id for row in self._profiler.latest()[1] if row.status == "R"}
+        result.idle = not watched
+
+        confirmed = threading.Event()
+        lock = threading.Lock()
+        clock = self._profiler.clock
+        start = clock()
+        stopped = []
+        # When the driver was first seen with each forced value
+        seen: Dict[str, float] = {}
+
+        def observe(when, running, rate=None, quantum=None):
+            with lock:
+                if confirmed.is_set() or when < start:
+                    return
+                if not running:
+                    stopped.append(when)
+                    return
+                if rate is not None and rate == result.rate:
+                    seen.setdefault("rate", when)
+                if quantum is not None and quantum == result.quantum:
+                    seen.setdefault("quantum", when)
+                if any(value is not None and key not in seen
+                       for key, value in (("rate", result.rate), ("quantum", result.quantum))):
+                    return
+                when = max(seen.values(), default=when)
+                result.latency = when - start
+                result.silence = when - min(stopped) if stopped else 0.0
+                result.confirmed = True
+                confirmed.set()
+
+        def on_load():
+            when, drivers = self._profiler.latest()
+            if when is None:
+                return
+            running = [row for row in drivers if row.status == "R" and row.busy is not None
+                       and row.id in watched]
+            if not running:
+                observe(when, False)
+            for row in running:
+                observe(when, True, row.rate, row.quantum)
+
+        def on_graph(event: GraphEvent):
+            if event.type == GraphEventType.NODE_CHANGED and event.id in watched:
+                observe(clock(), event.data.state == "running", event.data.rate)
+
+        unsubscribe_load = self.subscribe_load(on_load)
+        unsubscribe_graph = self._graph.subscribe(on_graph)
         try:
-            subprocess.run(
-                ["pw-metadata", "-n", "settings", "0", "clock.force-quantum", str(size)],
-                check=True,
-                capture_output=True,
-                timeout=self.timeout
-            )
-            return True
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            return False
+            result.applied = self.apply(settings)
+            if result.applied.ok and not result.idle:
+                confirmed.wait(timeout)
+        finally:
+            unsubscribe_graph()
+            unsubscribe_load()
+            if started_profiler:
+                self.stop_profiler()
+        return result
+
+    def apply_guarded(self, settings: Dict[str, Any],
+                      probation: Optional[Probation] = None) -> GuardResult:
+        """
+        Write settings like ``apply``, then revert them if xruns follow.
+
+        Blocks for up to ``probation.duration`` seconds until the probation
+        of ``start_guarded`` is decided.
+
+        Args:
+            settings: As for ``apply``
+            probation: Window and xrun threshold (default ``Probation()``)
+        """
+        decided = threading.Event()
+        guard = self.start_guarded(settings, probation, lambda _: decided.set())
+        decided.wait()
+        return guard
+
+    def start_guarded(self, settings: Dict[str, Any], probation: Optional[Probation] = None,
+                      on_verdict: Optional[Callable[[GuardResult], None]] = None) -> GuardResult:
+        """
+        Write settings like ``apply`` and put them on probation without waiting.
+
+        Returns right after the write. The change is judged on each refresh of
+        the load profiler (started for the purpose if it is not running); if
+        it fails, the forced rate and quantum found before it are written
+        back. ``on_verdict`` then gets the completed result, on the
+        profiler's reader thread, or on a timer thread if pw-top stops
+        reporting. A change that cannot be judged (the write failed or pw-top
+        is missing) is passed to it right away.
+
+        A new guarded write first ends the probation still running, judged by
+        the xruns seen until then, so that one never reverts over the other.
+
+        Args:
+            settings: As for ``apply``
+            probation: Window and xrun threshold (default ``Probation()``)
+            on_verdict: Called once with the result when the probation ends
+        """
+        probation = probation or Probation()
+        if self._end_probation is not None:
+            self._end_probation()
+        current = self.get_settings_snapshot()
+        previous = {key: current.get(key) or 0
+                    for key in ("clock.force-rate", "clock.force-quantum")}
+        guard = GuardResult(self.apply(settings), previous)
+        started_profiler = self.profiler is None
+        if not guard.applied.ok or (started_profiler and not self.start_profiler()):
+            if on_verdict is not None:
+                on_verdict(guard)
+            return guard
+
+        lock = threading.Lock()
+        decided = []
+
+        def finish(verdict: str):
+            with lock:
+                if decided:
+                    return
+                decided.append(verdict)
+            unsubscribe()
+            timer.cancel()
+            if self._end_probation is end:
+                self._end_probation = None
+            guard.xruns = probation.xruns
+            if verdict == FAILED:
+                guard.reverted = self.apply(previous).ok
+            if started_profiler:
+                self.stop_profiler()
+            guard.verdict = verdict
+            if on_verdict is not None:
+                on_verdict(guard)
+
+        def end():
+            finish(probation.verdict())
+
+        def on_load():
+            profiler = self.profiler
+            if profiler is None:
+                return
+            verdict = probation.update(profiler.summary())
+            if verdict is not None:
+                finish(verdict)
+
+        probation.start()
+        # pw-top may stop reporting; then judge by what was seen by the end
+        timer = threading.Timer(probation.duration + 2, end)
+        timer.daemon = True
+        self._end_probation = end
+        unsubscribe = self.subscribe_load(on_load)
+        timer.start()
+        return guard
 
     def get_supported_sample_rates(self) -> List[int]:
         """Query PipeWire for supported sample rates from connected devices."""
-        try:
-            result = subprocess.run(
-                ["pw-dump"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=self.timeout
-            )
-            devices = json.loads(result.stdout)
-            rates = self._extract_rates_from_devices(devices)
-            
-            if not rates:
-                return self._get_fallback_rates()
-            
-            return sorted(rates)
-            
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, json.JSONDecodeError):
+        if self.graph is not None:
+            rates = self.graph.supported_rates()
+            return sorted(rates) if rates else self._get_fallback_rates()
+
+        graph = self.load_capabilities()
+        rates = graph.supported_rates() if graph is not None else None
+        if not rates:
             return self._get_fallback_rates()
 
-    def _extract_rates_from_devices(self, devices: List[dict]) -> set:
+        return sorted(rates)
+
+    def get_common_rates(self, direction: Optional[str] = None) -> List[int]:
+        """
+        Rates every active audio device supports, optionally of one direction.
+
+        A rate in this list plays on all of them without resampling. Node
+        states come from the graph mirror while it runs, else from the last
+        dump; devices served from the capability cache all count as active.
+        """
+        if self.graph is not None:
+            with self.graph.lock:
+                return sorted(self.graph.graph.common_rates(direction))
+        graph = self.load_capabilities()
+        return sorted(graph.common_rates(direction)) if graph is not None else []
+
+    def get_node_rates(self, name: str) -> List[int]:
+        """Rates the audio node with the given ``node.name`` supports (empty if unknown)."""
+        if self.graph is not None:
+            with self.graph.lock:
+                return sorted(self.graph.graph.rates_of(name))
+        graph = self.load_capabilities()
+        return sorted(graph.rates_of(name)) if graph is not None else []
+
+    def load_capabilities(self, refresh: bool = False) -> Optional[Graph]:
+        """
+        Load the devices and the formats of their audio nodes.
+
+        With a cache, the devices are listed first and, if every one of them
+        is known with an unchanged fingerprint, their nodes come from the
+        cache instead of being enumerated. Otherwise (or with ``refresh``)
+        the full graph is loaded and stored in the cache.
+
+        Returns:
+            The graph, or None if PipeWire could not be queried
+        """
+        if self.cache is not None and not refresh:
+            devices = self.backend.list_devices(self.timeout)
+            graph = self.cache.lookup(devices) if devices is not None else None
+            if graph is not None:
+                return graph
+
+        graph = self.backend.load_graph(self.timeout)
+        if graph is not None and self.cache is not None:
+            self.cache.store(graph)
+            self.cache.save()
+        return graph
+
+    def get_conversion(self, sink: Optional[str] = None,
+                       rate: Optional[int] = None) -> Optional[Conversion]:
+        """
+        Per-cycle conversion the graph does to feed a sink.
+
+        Args:
+            sink: ``node.name`` of the sink (default: the default sink)
+            rate: Graph rate (default: the forced rate, else ``clock.rate``)
+
+        Returns:
+            The conversion (check ``needed``), or None if the sink, its
+            formats or the rate are unknown
+        """
+        if rate is None:
+            settings = self.get_settings_snapshot()
+            rate = settings.get("clock.force-rate") or settings.get("clock.rate")
+        if not isinstance(rate, int) or rate <= 0:
+            return None
+
+        if self.graph is not None:
+            with self.graph.lock:
+                node = (self.graph.default_node() if sink is None
+                        else self.graph.graph.node_by_name(sink))
+                if node is None:
+                    return None
+                return detect_conversion(self.graph.graph.capabilities, node.id, rate)
+
+        graph = self.load_capabilities()
+        if graph is None:
+            return None
+        if sink is not None:
+            node = graph.node_by_name(sink)
+        else:
+            info = self.backend.device_info(self.timeout)
+            node = graph.sink_for(info) if info else None
+        if node is None:
+            return None
+        return detect_conversion(graph.capabilities, node.id, rate)
+
+    def _extract_rates_from_devices(self, devices: Iterable[dict]) -> set:
         """Extract supported sample rates from pw-dump output."""
-        rates = set()
-        
-        for device in devices:
-            if device.get("type") != "PipeWire:Interface:Node":
-                continue
-            
-            info = device.get("info", {})
-            props = info.get("props", {})
-            
-            media_class = props.get("media.class", "")
-            if "Audio/Sink" not in media_class and "Audio/Source" not in media_class:
-                continue
-            
-            params = info.get("params", {})
-            enum_format = params.get("EnumFormat", [])
-            
-            for fmt in enum_format:
-                if isinstance(fmt, dict):
-                    rate = fmt.get("rate")
-                    if rate:
-                        if isinstance(rate, int):
-                            rates.add(rate)
-                        elif isinstance(rate, dict):
-                            min_rate = rate.get("min")
-                            max_rate = rate.get("max")
-                            if min_rate and max_rate:
-                                common = [44100, 48000, 88200, 96000, 176400, 192000]
-                                rates.update(r for r in common if min_rate <= r <= max_rate)
-        
-        return rates
+        return set(Graph.from_objects(devices).supported_rates())
 
     def _get_fallback_rates(self) -> List[int]:
         """Return common fallback rates."""
-        return [44100, 48000, 88200, 96000, 176400, 192000]
+        return list(COMMON_RATES)
+
+    def get_settings_snapshot(self) -> Dict[str, Any]:
+        """
+        Read every ``clock.*`` key of the settings metadata at once.
+
+        One ``pw-metadata`` call serves all keys, and its result is reused for
+        ``snapshot_ttl`` seconds so bursts of reads share a single process.
+        While the monitor runs, the snapshot comes from its cache instead.
+
+        Returns:
+            Mapping such as ``{"clock.rate": 48000, "clock.allowed-rates": [...]}``,
+            empty if the settings could not be read
+        """
+        if self.monitoring:
+            return self._monitor.snapshot()
+
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_time < self.snapshot_ttl:
+            return dict(self._snapshot)
+
+        settings = self.backend.read_settings(self.timeout)
+        if settings is None:
+            return {}
+
+        self._snapshot = settings
+        self._snapshot_time = now
+        return dict(self._snapshot)
+
+    def _get_setting(self, key: str) -> Optional[int]:
+        """Return an integer setting from the monitor cache or a snapshot."""
+        return int_setting(self.get_settings_snapshot(), key)
 
     def get_current_rate(self) -> Optional[int]:
         """Get current sample rate from PipeWire."""
-        try:
-            result = subprocess.run(
-                ["pw-metadata", "-n", "settings"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=self.timeout
-            )
-            for line in result.stdout.split("\n"):
-                if "clock.force-rate" in line:
-                    parts = line.split("'")
-                    if len(parts) >= 4:
-                        return int(parts[3])
-            return None
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError):
-            return None
+        return self._get_setting("clock.force-rate")
 
     def get_current_quantum(self) -> Optional[int]:
         """Get current buffer size from PipeWire."""
-        try:
-            result = subprocess.run(
-                ["pw-metadata", "-n", "settings"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=self.timeout
-            )
-            for line in result.stdout.split("\n"):
-                if "clock.force-quantum" in line:
-                    parts = line.split("'")
-                    if len(parts) >= 4:
-                        return int(parts[3])
-            return None
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError):
-            return None
+        return self._get_setting("clock.force-quantum")
 
     def get_device_info(self) -> Optional[str]:
         """Get information about the current default audio device."""
-        try:
-            result = subprocess.run(
-                ["wpctl", "status"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=self.timeout
-            )
-            for line in result.stdout.split("\n"):
-                if "* " in line and ("Sink" in line or "Audio/Sink" in line):
-                    return line.strip()
-            return None
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        if self.graph is not None:
+            node = self.graph.default_node()
+            if node is not None:
+                return f"{node.id}. {node.description or node.name}"
             return None
+
+        return self.backend.device_info(self.timeout)
@@ -0,0 +1,104 @@
+"""Following the sample rate of the playing streams - Pure logic with no GUI dependencies."""
+
+import time
+from collections import Counter
+from typing import Container, Dict, Iterable, Optional, Tuple
+
+from .model import Node
+
+
+class RateFollower:
+    """
+    Picks the graph rate from the native rates of the running playback streams.
+
+    ``update`` takes the running playback streams (``Graph.playback_streams``)
+    and the rates the hardware supports. A stream only counts once it has
+    been running at its rate for ``min_age`` seconds, so a notification
+    sound or a short preview does not move the clock. Of the streams that
+    count and whose rate the hardware supports, the rate most of them play
+    at wins, ties going to the rate of the stream that started first. That
+    rate must stay the winner for ``hold`` seconds before it is returned.
+    When nothing plays the current rate is kept.
+
+    Like ``QuantumTuner`` the follower keeps no thread or timer: the caller
+    applies the returned rate and calls ``update`` again on graph changes
+    and periodically, so that ages run out.
+    """
+
+    def __init__(self, min_age: float = 2.0, hold: float = 1.0, clock=time.monotonic):
+        """
+        Initialize the follower.
+
+        Args:
+            min_age: Seconds a stream must play at a rate before it counts
+            hold: Seconds a new rate must stay dominant before switching
+            clock: Monotonic time source
+        """
+        self.min_age = min_age
+        self.hold = hold
+        self._clock = clock
+        # (stream id, rate) -> when it was first seen running at that rate
+        self._started: Dict[Tuple[int, int], float] = {}
+        self._candidate: Optional[int] = None
+        self._since = 0.0
+        self.dominant: Optional[int] = None
+        self.source: Optional[str] = None
+
+    def reset(self) -> None:
+        """Forget the streams seen so far."""
+        self._started.clear()
+        self._candidate = None
+        self.dominant = None
+        self.source = None
+
+    def update(self, streams: Iterable[Node], supported: Container[int],
+               current: Optional[int]) -> Optional[int]:
+        """
+        Take the running playback streams.
+
+        Args:
+            streams: Running playback stream nodes
+            supported: Rates the hardware can be switched to
+            current: Rate in force (or about to be)
+
+        Returns:
+            The rate to switch to, or None to stay
+        """
+        now = self._clock()
+        names: Dict[Tuple[int, int], str] = {}
+        for stream in streams:
+            if stream.rate:
+                key = (stream.id, stream.rate)
+                names[key] = stream.description or stream.name
+                self._started.setdefault(key, now)
+        # A stream that stopped or changed rate starts over
+        for key in set(self._started) - set(names):
+            del self._started[key]
+
+        eligible = sorted(
+            (started, key) for key, started in self._started.items()
+            if now - started >= self.min_age and key[1] in supported
+        )
+        if not eligible:
+            self._candidate = None
+            self.dominant = None
+            self.source = None
+            return None
+
+        counts = Counter(key[1] for _, key in eligible)
+        most = max(counts.values())
+        # ``eligible`` is oldest first, so the first hit breaks ties
+        _, key = next(entry for entry in eligible if counts[entry[1][1]] == most)
+        self.dominant = key[1]
+        self.source = names[key]
+
+        if self.dominant == current:
+            self._candidate = None
+            return None
+        if self._candidate != self.dominant:
+            self._candidate = self.dominant
+            self._since = now
+        if now - self._since < self.hold:
+            return None
+        self._candidate = None
+        return self.dominant
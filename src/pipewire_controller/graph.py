@@ -0,0 +1,301 @@
+"""Live in-memory mirror of the PipeWire object graph."""
+
+import json
+import logging
+import subprocess
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from .dump import DUMP_COMMAND, METADATA_TYPE, PipeReader, iter_dump_objects
+from .model import Device, Graph, GraphObject, Node
+
+MONITOR_COMMAND = DUMP_COMMAND + ["--monitor"]
+
+logger = logging.getLogger(__name__)
+
+
+class GraphEventType(Enum):
+    """Kinds of changes reported by ``GraphMirror``."""
+
+    NODE_ADDED = "node-added"
+    NODE_REMOVED = "node-removed"
+    PARAMS_CHANGED = "params-changed"
+    # data is (metadata key, node name), the name None once unset
+    DEFAULT_CHANGED = "default-changed"
+    # A stream appeared, went away, or changed state or rate; data is the
+    # Node, or None once removed
+    STREAM_CHANGED = "stream-changed"
+    # A device (sound card) appeared or went away; data is the Device
+    DEVICE_ADDED = "device-added"
+    DEVICE_REMOVED = "device-removed"
+    # A sink or source changed state or negotiated rate; data is the Node
+    NODE_CHANGED = "node-changed"
+
+
+@dataclass
+class GraphEvent:
+    """A single change of the mirrored graph."""
+
+    type: GraphEventType
+    id: int
+    data: Any = None
+
+
+GraphCallback = Callable[[GraphEvent], None]
+
+
+class GraphMirror:
+    """
+    Mirrors the PipeWire graph from a single ``pw-dump --monitor`` process.
+
+    Every add/change/remove delta is applied to an indexed ``Graph``, and
+    derived data (supported rates, default devices) is recomputed only for the
+    objects that changed. Subscribed callbacks run on the mirror's reader thread;
+    one that raises is logged and does not stop the mirror. If the stream
+    itself fails, the process is killed and ``running`` turns False, so
+    queries go back to one pw-dump each instead of reading a stale mirror.
+    """
+
+    def __init__(self):
+        """Initialize an empty mirror."""
+        self._graph = Graph()
+        self._defaults: Dict[str, str] = {}
+        # Id of the ``default`` metadata object, which is not kept in the graph
+        self._defaults_id: Optional[int] = None
+        self._callbacks: List[GraphCallback] = []
+        self._lock = threading.RLock()
+        self._synced = threading.Event()
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor process is alive and has sent the initial graph."""
+        return (
+            self._process is not None
+            and self._process.poll() is None
+            and self._synced.is_set()
+        )
+
+    def start(self, timeout: float = 5) -> bool:
+        """
+        Start ``pw-dump --monitor`` and wait for the initial graph.
+
+        Args:
+            timeout: Seconds to wait for the first full dump
+
+        Returns:
+            True once the mirror holds the initial graph
+        """
+        if self.running:
+            return True
+        try:
+            self._process = subprocess.Popen(
+                MONITOR_COMMAND,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            self._process = None
+            return False
+
+        self._thread = threading.Thread(
+            target=self._read_loop,
+            args=(self._process,),
+            name="pw-dump-monitor",
+            daemon=True
+        )
+        self._thread.start()
+
+        if not self._synced.wait(timeout):
+            self.stop()
+            return False
+        return self.running
+
+    def stop(self) -> None:
+        """Terminate the monitor process and clear the mirror."""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+        self._synced.clear()
+        with self._lock:
+            self._graph = Graph()
+            self._defaults = {}
+
+    def subscribe(self, callback: GraphCallback) -> Callable[[], None]:
+        """Register an event callback. Returns a function that unsubscribes it."""
+        self._callbacks.append(callback)
+
+        def unsubscribe():
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+        return unsubscribe
+
+    @property
+    def graph(self) -> Graph:
+        """The indexed graph; hold ``lock`` while iterating it from another thread."""
+        return self._graph
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock guarding the graph against concurrent updates."""
+        return self._lock
+
+    def get(self, object_id: int) -> Optional[GraphObject]:
+        """Return the model object with the given id."""
+        return self._graph.get(object_id)
+
+    def supported_rates(self) -> FrozenSet[int]:
+        """Union of the sample rates of every audio sink and source node."""
+        with self._lock:
+            return self._graph.supported_rates()
+
+    def playback_streams(self) -> List[Node]:
+        """Audio playback streams that are running."""
+        with self._lock:
+            return self._graph.playback_streams()
+
+    def node_rates(self, node_id: int) -> FrozenSet[int]:
+        """Sample rates supported by one audio node."""
+        node = self._graph.get(node_id)
+        return node.rates if isinstance(node, Node) else frozenset()
+
+    def default_node_name(self, key: str = "default.audio.sink") -> Optional[str]:
+        """Name of the default node for a ``default`` metadata key."""
+        return self._defaults.get(key)
+
+    def default_node(self, key: str = "default.audio.sink") -> Optional[Node]:
+        """The default node for a ``default`` metadata key."""
+        name = self.default_node_name(key)
+        if name is None:
+            return None
+        with self._lock:
+            return self._graph.node_by_name(name)
+
+    def apply(self, obj: dict) -> List[GraphEvent]:
+        """
+        Apply one pw-dump object (an addition, change or removal) to the mirror.
+
+        Returns:
+            The events caused by the change, after notifying subscribers
+        """
+        object_id = obj.get("id")
+        if object_id is None:
+            return []
+
+        with self._lock:
+            if "type" not in obj and (obj.get("info", 0) is None or obj.get("metadata", 0) is None):
+                events = self._remove(object_id)
+            else:
+                events = self._update(object_id, obj)
+
+        for event in events:
+            for callback in list(self._callbacks):
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception("graph event callback %r failed", callback)
+        return events
+
+    def _remove(self, object_id: int) -> List[GraphEvent]:
+        """Drop an object and its derived data."""
+        if object_id == self._defaults_id:
+            # Without the metadata there are no default devices
+            self._defaults_id = None
+            return self._set_defaults(object_id, {})
+        removed = self._graph.remove(object_id)
+        if isinstance(removed, Node) and removed.is_audio_device:
+            return [GraphEvent(GraphEventType.NODE_REMOVED, object_id)]
+        if isinstance(removed, Node) and removed.is_stream:
+            return [GraphEvent(GraphEventType.STREAM_CHANGED, object_id)]
+        if isinstance(removed, Device):
+            return [GraphEvent(GraphEventType.DEVICE_REMOVED, object_id, removed)]
+        return []
+
+    def _update(self, object_id: int, obj: dict) -> List[GraphEvent]:
+        """Store an added or changed object and refresh what depends on it."""
+        if obj.get("type") == METADATA_TYPE:
+            return self._update_defaults(object_id, obj)
+
+        previous = self._graph.get(object_id)
+        item = self._graph.update(obj)
+        if isinstance(item, Device):
+            if not isinstance(previous, Device):
+                return [GraphEvent(GraphEventType.DEVICE_ADDED, object_id, item)]
+            return []
+        if not isinstance(item, Node):
+            return []
+
+        if item.is_stream:
+            if not isinstance(previous, Node) or (previous.state, previous.rate) \
+                    != (item.state, item.rate):
+                return [GraphEvent(GraphEventType.STREAM_CHANGED, object_id, item)]
+            return []
+
+        was_audio = isinstance(previous, Node) and previous.is_audio_device
+        if not item.is_audio_device:
+            # A node can lose its audio class, which counts as a removal
+            return [GraphEvent(GraphEventType.NODE_REMOVED, object_id)] if was_audio else []
+        if not was_audio:
+            return [GraphEvent(GraphEventType.NODE_ADDED, object_id, item.rates)]
+        events = []
+        if previous.enum_formats != item.enum_formats:
+            events.append(GraphEvent(GraphEventType.PARAMS_CHANGED, object_id, item.rates))
+        if (previous.state, previous.rate) != (item.state, item.rate):
+            events.append(GraphEvent(GraphEventType.NODE_CHANGED, object_id, item))
+        return events
+
+    def _update_defaults(self, object_id: int, obj: dict) -> List[GraphEvent]:
+        """Track the ``default`` metadata object."""
+        if obj.get("props", {}).get("metadata.name") != "default":
+            return []
+
+        self._defaults_id = object_id
+        defaults = {}
+        for entry in obj.get("metadata") or []:
+            if entry.get("subject") != 0 or not entry.get("key", "").startswith("default."):
+                continue
+            value = entry.get("value")
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except json.JSONDecodeError:
+                    pass
+            if isinstance(value, dict) and "name" in value:
+                defaults[entry["key"]] = value["name"]
+
+        return self._set_defaults(object_id, defaults)
+
+    def _set_defaults(self, object_id: int, defaults: Dict[str, str]) -> List[GraphEvent]:
+        """Replace the default nodes; a key that went away is reported with None."""
+        events = [
+            GraphEvent(GraphEventType.DEFAULT_CHANGED, object_id, (key, defaults.get(key)))
+            for key in {**self._defaults, **defaults}
+            if self._defaults.get(key) != defaults.get(key)
+        ]
+        self._defaults = defaults
+        return events
+
+    def _read_loop(self, process: subprocess.Popen) -> None:
+        """Reader thread body: apply every monitor delta to the mirror."""
+        try:
+            for obj in iter_dump_objects(PipeReader(process.stdout), on_array_end=self._synced.set):
+                self.apply(obj)
+        except Exception:
+            logger.exception("pw-dump --monitor stream failed")
+            process.kill()
+        finally:
+            # Whatever ended the stream, the mirror no longer follows the graph
+            if self._process is process:
+                self._synced.clear()
+            process.stdout.close()
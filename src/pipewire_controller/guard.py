@@ -0,0 +1,89 @@
+"""Probation of newly applied settings - Pure logic with no GUI dependencies."""
+
+import time
+from typing import Any, Dict, Optional
+
+PASSED = "passed"
+FAILED = "failed"
+
+
+class Probation:
+    """
+    Judges a settings change by the xruns that follow it.
+
+    ``start`` is called once the change is written, then ``update`` with
+    each profiler summary (``LoadMonitor.summary()``). Xruns during the
+    first ``settle`` seconds are not counted, since reconfiguring the graph
+    can itself cause one. The change fails as soon as the xruns counted
+    exceed ``max_rate`` per minute over the window, and passes once
+    ``window`` seconds went by without that. The caller reverts a failed
+    change. The summary is of the busiest driver, which can change, so
+    each driver's cumulative count is compared with its own baseline and
+    the xruns of all drivers are added up.
+    """
+
+    def __init__(self, window: float = 10.0, max_rate: float = 6.0, settle: float = 1.0,
+                 clock=time.monotonic):
+        """
+        Initialize the probation.
+
+        Args:
+            window: Seconds the xruns are watched for, after ``settle``
+            max_rate: Xruns per minute above which the change fails
+            settle: Seconds after the change that are not watched
+            clock: Monotonic time source
+        """
+        self.window = window
+        self.max_rate = max_rate
+        self.settle = settle
+        self._clock = clock
+        self._started: Optional[float] = None
+        # Cumulative xruns per driver id: when first watched, and last seen
+        self._baselines: Dict[Any, int] = {}
+        self._latest: Dict[Any, int] = {}
+        self.xruns = 0
+
+    @property
+    def budget(self) -> float:
+        """Xruns the window may hold before the change fails."""
+        return self.max_rate * self.window / 60
+
+    @property
+    def duration(self) -> float:
+        """Seconds from ``start`` until a change that keeps running clean passes."""
+        return self.settle + self.window
+
+    def start(self) -> None:
+        """The change was just written."""
+        self._started = self._clock()
+        self._baselines = {}
+        self._latest = {}
+        self.xruns = 0
+
+    def update(self, summary: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Take one profiler summary.
+
+        Returns:
+            ``FAILED`` or ``PASSED`` once decided, None while still on probation
+        """
+        if self._started is None:
+            raise RuntimeError("probation not started")
+        now = self._clock()
+        if summary is not None:
+            driver = summary.get("id")
+            if now - self._started < self.settle:
+                self._baselines[driver] = summary["xruns"]
+            self._baselines.setdefault(driver, summary["xruns"])
+            self._latest[driver] = summary["xruns"]
+            self.xruns = sum(max(0, count - self._baselines[key])
+                             for key, count in self._latest.items())
+        if self.xruns > self.budget:
+            return FAILED
+        if now - self._started >= self.duration:
+            return PASSED
+        return None
+
+    def verdict(self) -> str:
+        """Decision from the xruns counted so far, for when no more summaries come."""
+        return FAILED if self.xruns > self.budget else PASSED
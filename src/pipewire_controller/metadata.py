@@ -0,0 +1,236 @@
+"""PipeWire settings metadata parsing and live monitoring."""
+
+import re
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SETTINGS_COMMAND = ["pw-metadata", "-n", "settings"]
+MONITOR_COMMAND = SETTINGS_COMMAND + ["--monitor"]
+
+# One ``name:'value'`` / ``name='value'`` / ``name:value`` field of a pw-metadata line.
+# A quoted value only ends at a quote followed by the next field or the end of the line,
+# so values that contain quotes themselves (JSON objects, for example) stay intact.
+_FIELD = re.compile(r"([\w.-]+)[:=](?:'(.*?)'(?=\s+[\w.-]+[:=]|\s*$)|(\S*))")
+
+SettingsCallback = Callable[[str, Any], None]
+
+
+def tokenize_line(line: str) -> Dict[str, str]:
+    """Split one pw-metadata output line into its named fields."""
+    fields = {}
+    for match in _FIELD.finditer(line.strip()):
+        name, quoted, bare = match.groups()
+        fields[name] = quoted if quoted is not None else bare
+    return fields
+
+
+def parse_value(raw: str) -> Any:
+    """Convert a metadata value string to int, list of ints or plain string."""
+    text = raw.strip()
+    if re.fullmatch(r"-?\d+", text):
+        return int(text)
+    if text.startswith("[") and text.endswith("]"):
+        items = text[1:-1].replace(",", " ").split()
+        if all(re.fullmatch(r"-?\d+", item) for item in items):
+            return [int(item) for item in items]
+    return raw
+
+
+def format_value(value: Any) -> str:
+    """Render a value the way pw-metadata expects it on the command line."""
+    if isinstance(value, (list, tuple, set)):
+        return "[ " + " ".join(str(item) for item in value) + " ]"
+    return str(value)
+
+
+def write_command(key: str, value: Any) -> List[str]:
+    """``pw-metadata`` command line writing one key of the settings metadata."""
+    return SETTINGS_COMMAND + ["0", key, format_value(value)]
+
+
+def parse_metadata_line(line: str) -> Optional[Tuple[str, Optional[str], Any]]:
+    """
+    Parse one line of ``pw-metadata`` output.
+
+    Args:
+        line: Raw output line, either a listing or a monitor update
+
+    Returns:
+        ``(action, key, value)`` where action is ``"update"`` or ``"remove"``,
+        key is None when all keys were removed and value is None for removals.
+        None is returned for lines that carry no property for subject 0.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    action = "remove" if stripped.startswith("remove:") else "update"
+    fields = tokenize_line(stripped)
+
+    if fields.get("id", "0") != "0":
+        return None
+    if action == "remove" and "key" not in fields:
+        return (action, None, None) if stripped.endswith("all keys") else None
+    if "key" not in fields:
+        return None
+    if action == "remove" or "value" not in fields:
+        return ("remove", fields["key"], None)
+    return (action, fields["key"], parse_value(fields["value"]))
+
+
+def parse_settings(output: str, prefix: str = "clock.") -> Dict[str, Any]:
+    """
+    Parse a full ``pw-metadata -n settings`` listing.
+
+    Args:
+        output: Text printed by pw-metadata
+        prefix: Only keys starting with this prefix are returned
+
+    Returns:
+        Mapping of every matching key to its parsed value
+    """
+    settings = {}
+    for line in output.splitlines():
+        parsed = parse_metadata_line(line)
+        if parsed is None:
+            continue
+        action, key, value = parsed
+        if key is None:
+            settings.clear()
+        elif key.startswith(prefix):
+            if action == "remove":
+                settings.pop(key, None)
+            else:
+                settings[key] = value
+    return settings
+
+
+class SettingsMonitor:
+    """
+    Keeps an in-memory cache of the ``settings`` metadata.
+
+    A single long-lived ``pw-metadata --monitor`` child streams every change
+    into the cache, so reads are dictionary lookups instead of new processes.
+    Subscribed callbacks run on the monitor's reader thread.
+    """
+
+    def __init__(self, prefix: str = "clock."):
+        """Initialize the monitor for keys starting with ``prefix``."""
+        self.prefix = prefix
+        self._values: Dict[str, Any] = {}
+        self._callbacks: List[SettingsCallback] = []
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor process is alive and feeding the cache."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> bool:
+        """Start the monitor process. Returns False if it cannot be spawned."""
+        if self.running:
+            return True
+        try:
+            self._process = subprocess.Popen(
+                MONITOR_COMMAND,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+        except OSError:
+            self._process = None
+            return False
+
+        self._thread = threading.Thread(
+            target=self._read_loop,
+            args=(self._process,),
+            name="pw-metadata-monitor",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Terminate the monitor process and forget cached values."""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+        with self._lock:
+            self._values.clear()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value of ``key``."""
+        return self._values.get(key, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of every cached key."""
+        with self._lock:
+            return dict(self._values)
+
+    def subscribe(self, callback: SettingsCallback) -> Callable[[], None]:
+        """
+        Register a change callback.
+
+        Args:
+            callback: Called as ``callback(key, value)``; value is None on removal
+
+        Returns:
+            A function that removes the callback again
+        """
+        self._callbacks.append(callback)
+
+        def unsubscribe():
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+        return unsubscribe
+
+    def feed(self, line: str) -> None:
+        """Apply one line of monitor output to the cache."""
+        parsed = parse_metadata_line(line)
+        if parsed is None:
+            return
+
+        action, key, value = parsed
+        if key is None:
+            with self._lock:
+                removed = list(self._values)
+                self._values.clear()
+            for name in removed:
+                self._notify(name, None)
+            return
+
+        if not key.startswith(self.prefix):
+            return
+
+        with self._lock:
+            previous = self._values.get(key)
+            if action == "remove":
+                self._values.pop(key, None)
+            else:
+                self._values[key] = value
+
+        if previous != value:
+            self._notify(key, value)
+
+    def _notify(self, key: str, value: Any) -> None:
+        """Invoke every subscribed callback."""
+        for callback in list(self._callbacks):
+            callback(key, value)
+
+    def _read_loop(self, process: subprocess.Popen) -> None:
+        """Reader thread body: feed every output line into the cache."""
+        for line in process.stdout:
+            self.feed(line)
+        process.stdout.close()
@@ -0,0 +1,459 @@
+"""Compact, indexed object model for pw-dump data."""
+
+import hashlib
+import json
+import re
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .capabilities import ACTIVE_STATES, SINK, CapabilityIndex, node_direction
+from .dump import NODE_TYPE, PLAYBACK_CLASS, node_capabilities, stream_rate
+
+DEVICE_TYPE = "PipeWire:Interface:Device"
+PORT_TYPE = "PipeWire:Interface:Port"
+LINK_TYPE = "PipeWire:Interface:Link"
+
+AUDIO_DEVICE_CLASSES = ("Audio/Sink", "Audio/Source")
+
+# "47. Built-in Audio Analog Stereo [vol: 1.00]" as printed by wpctl status
+# (and, without the volume, by the native backend's device_info)
+_DEVICE_LINE = re.compile(r"(\d+)\.\s+(.+?)(?:\s+\[[^\]]*\])?\s*$")
+
+# Device properties that describe the hardware and its driver setup; a change
+# in any of them (for example a new card index after a replug) means cached
+# capabilities can no longer be trusted. Ids and serials of the PipeWire
+# objects themselves are left out as they change on every restart.
+FINGERPRINT_PROPS = (
+    "device.name", "device.description", "device.api", "device.serial",
+    "device.vendor.id", "device.product.id", "device.bus-path", "device.profile-set",
+    "api.alsa.card", "api.alsa.card.name", "api.alsa.card.longname", "api.alsa.path",
+)
+
+
+def _info(obj: dict) -> dict:
+    """The ``info`` section of a pw-dump object."""
+    return obj.get("info") or {}
+
+
+def _int(value) -> Optional[int]:
+    """Convert a pw-dump property (often a string) to int."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Node:
+    """A PipeWire node, reduced to the fields the controller uses."""
+
+    __slots__ = (
+        "id", "name", "description", "media_class", "device_id", "state",
+        "enum_formats", "rates", "modes", "rate",
+    )
+
+    def __init__(self, id: int, name: str = "", description: str = "",
+                 media_class: str = "", device_id: Optional[int] = None,
+                 state: str = "", enum_formats: tuple = (),
+                 rates: FrozenSet[int] = frozenset(),
+                 modes: FrozenSet[Tuple[str, int]] = frozenset(),
+                 rate: Optional[int] = None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.media_class = media_class
+        self.device_id = device_id
+        self.state = state
+        self.enum_formats = enum_formats
+        self.rates = rates
+        self.modes = modes
+        # Negotiated rate (see ``dump.stream_rate``): a stream's native rate,
+        # or the rate a sink or source currently runs at
+        self.rate = rate
+
+    @classmethod
+    def from_dump(cls, obj: dict, previous: Optional["Node"] = None) -> "Node":
+        """
+        Build a node from a pw-dump object.
+
+        Args:
+            obj: Raw pw-dump object of type Node
+            previous: Earlier version of the same node; its derived rates are
+                reused when the EnumFormat params did not change
+        """
+        info = _info(obj)
+        props = info.get("props", {})
+        node = cls(
+            obj["id"],
+            name=props.get("node.name", ""),
+            description=props.get("node.description", ""),
+            media_class=props.get("media.class", ""),
+            device_id=_int(props.get("device.id")),
+            state=info.get("state", ""),
+        )
+        if node.is_stream or node.is_audio_device:
+            node.rate = stream_rate(obj)
+        if not node.is_audio_device:
+            return node
+
+        # Only device nodes keep their raw formats; streams would only cost memory
+        enum_formats = tuple(info.get("params", {}).get("EnumFormat", ()))
+        node.enum_formats = enum_formats
+        if previous is not None and previous.enum_formats == enum_formats:
+            node.rates = previous.rates
+            node.modes = previous.modes
+        else:
+            rates, modes = node_capabilities(obj)
+            node.rates = frozenset(rates)
+            node.modes = frozenset(modes)
+        return node
+
+    @property
+    def formats(self) -> FrozenSet[str]:
+        """Sample formats the node offers at any rate."""
+        return frozenset(name for name, _rate in self.modes)
+
+    @property
+    def is_audio_device(self) -> bool:
+        """Whether this is an audio sink or source node."""
+        return any(cls in self.media_class for cls in AUDIO_DEVICE_CLASSES)
+
+    @property
+    def is_stream(self) -> bool:
+        """Whether this is an application's stream."""
+        return self.media_class.startswith("Stream/")
+
+    def __repr__(self):
+        return f"Node({self.id}, {self.name!r}, {self.media_class!r})"
+
+
+def fingerprint(props: Dict[str, object]) -> str:
+    """Short hash of the ``FINGERPRINT_PROPS`` of a device."""
+    values = [str(props.get(key, "")) for key in FINGERPRINT_PROPS]
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()[:16]
+
+
+class Device:
+    """A PipeWire device (usually one sound card)."""
+
+    __slots__ = ("id", "name", "description", "api", "card", "serial", "fingerprint")
+
+    def __init__(self, id: int, name: str = "", description: str = "", api: str = "",
+                 card: Optional[str] = None, serial: Optional[str] = None,
+                 fingerprint: str = ""):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.api = api
+        self.card = card
+        self.serial = serial
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_dump(cls, obj: dict) -> "Device":
+        """Build a device from a pw-dump object."""
+        props = _info(obj).get("props", {})
+        return cls(
+            obj["id"],
+            name=props.get("device.name", ""),
+            description=props.get("device.description", ""),
+            api=props.get("device.api", ""),
+            card=props.get("api.alsa.card.name", props.get("alsa.card_name")),
+            serial=props.get("device.serial"),
+            fingerprint=fingerprint(props),
+        )
+
+    @property
+    def identity(self) -> str:
+        """Key that stays the same for the same hardware across restarts."""
+        return "|".join((self.name, self.card or "", self.serial or ""))
+
+    def __repr__(self):
+        return f"Device({self.id}, {self.name!r})"
+
+
+class Port:
+    """A port of a node."""
+
+    __slots__ = ("id", "node_id", "direction", "name", "channel")
+
+    def __init__(self, id: int, node_id: Optional[int] = None, direction: str = "",
+                 name: str = "", channel: str = ""):
+        self.id = id
+        self.node_id = node_id
+        self.direction = direction
+        self.name = name
+        self.channel = channel
+
+    @classmethod
+    def from_dump(cls, obj: dict) -> "Port":
+        """Build a port from a pw-dump object."""
+        info = _info(obj)
+        props = info.get("props", {})
+        return cls(
+            obj["id"],
+            node_id=_int(props.get("node.id")),
+            direction=info.get("direction", ""),
+            name=props.get("port.name", ""),
+            channel=props.get("audio.channel", ""),
+        )
+
+    def __repr__(self):
+        return f"Port({self.id}, node={self.node_id}, {self.direction!r})"
+
+
+class Link:
+    """A link from an output port of one node to an input port of another."""
+
+    __slots__ = ("id", "output_node", "output_port", "input_node", "input_port")
+
+    def __init__(self, id: int, output_node: Optional[int] = None,
+                 output_port: Optional[int] = None, input_node: Optional[int] = None,
+                 input_port: Optional[int] = None):
+        self.id = id
+        self.output_node = output_node
+        self.output_port = output_port
+        self.input_node = input_node
+        self.input_port = input_port
+
+    @classmethod
+    def from_dump(cls, obj: dict) -> "Link":
+        """Build a link from a pw-dump object."""
+        info = _info(obj)
+        return cls(
+            obj["id"],
+            output_node=info.get("output-node-id"),
+            output_port=info.get("output-port-id"),
+            input_node=info.get("input-node-id"),
+            input_port=info.get("input-port-id"),
+        )
+
+    def __repr__(self):
+        return f"Link({self.id}, {self.output_node}->{self.input_node})"
+
+
+GraphObject = Union[Node, Device, Port, Link]
+
+_BUILDERS = {
+    DEVICE_TYPE: Device.from_dump,
+    PORT_TYPE: Port.from_dump,
+    LINK_TYPE: Link.from_dump,
+}
+
+MODEL_TYPES = frozenset(_BUILDERS) | {NODE_TYPE}
+
+
+def _add_to(index: Dict, key, object_id: int) -> None:
+    """Add an id to a set-valued index."""
+    if key is not None:
+        index.setdefault(key, set()).add(object_id)
+
+
+def _discard_from(index: Dict, key, object_id: int) -> None:
+    """Remove an id from a set-valued index, dropping empty entries."""
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(object_id)
+        if not ids:
+            del index[key]
+
+
+class Graph:
+    """
+    Nodes, devices, ports and links with lookup indexes.
+
+    Indexes are maintained on every add/remove, so questions like "which nodes
+    support 96 kHz" or "which ports feed this sink" are dictionary lookups.
+    """
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        self.objects: Dict[int, GraphObject] = {}
+        self.nodes_by_class: Dict[str, Set[int]] = {}
+        self.nodes_by_name: Dict[str, int] = {}
+        self.nodes_by_device: Dict[int, Set[int]] = {}
+        self.nodes_by_rate: Dict[int, Set[int]] = {}
+        self.ports_by_node: Dict[int, Set[int]] = {}
+        self.links_out: Dict[int, Set[int]] = {}
+        self.links_in: Dict[int, Set[int]] = {}
+        self.capabilities = CapabilityIndex()
+
+    @classmethod
+    def from_objects(cls, objects: Iterable[dict]) -> "Graph":
+        """Build a graph from raw pw-dump objects, ignoring unsupported types."""
+        graph = cls()
+        for obj in objects:
+            graph.update(obj)
+        return graph
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, object_id: int) -> bool:
+        return object_id in self.objects
+
+    def get(self, object_id: int) -> Optional[GraphObject]:
+        """Return the object with the given id."""
+        return self.objects.get(object_id)
+
+    def update(self, obj: dict) -> Optional[GraphObject]:
+        """
+        Add or replace an object from its raw pw-dump form.
+
+        Returns:
+            The model object, or None if the type is not modelled or the
+            object has no id
+        """
+        object_type = obj.get("type")
+        if obj.get("id") is None:
+            return None
+        if object_type == NODE_TYPE:
+            previous = self.objects.get(obj["id"])
+            item = Node.from_dump(obj, previous if isinstance(previous, Node) else None)
+        elif object_type in _BUILDERS:
+            item = _BUILDERS[object_type](obj)
+        else:
+            return None
+        self.add(item)
+        return item
+
+    def add(self, item: GraphObject) -> Optional[GraphObject]:
+        """Insert an object, replacing one with the same id. Returns the old one."""
+        previous = self.remove(item.id)
+        self.objects[item.id] = item
+
+        if isinstance(item, Node):
+            _add_to(self.nodes_by_class, item.media_class, item.id)
+            if item.name:
+                self.nodes_by_name[item.name] = item.id
+            _add_to(self.nodes_by_device, item.device_id, item.id)
+            for rate in item.rates:
+                _add_to(self.nodes_by_rate, rate, item.id)
+            if item.is_audio_device:
+                self.capabilities.add(item.id, node_direction(item.media_class), item.rates,
+                                      item.modes)
+        elif isinstance(item, Port):
+            _add_to(self.ports_by_node, item.node_id, item.id)
+        elif isinstance(item, Link):
+            _add_to(self.links_out, item.output_node, item.id)
+            _add_to(self.links_in, item.input_node, item.id)
+        return previous
+
+    def remove(self, object_id: int) -> Optional[GraphObject]:
+        """Remove an object and its index entries. Returns the removed object."""
+        item = self.objects.pop(object_id, None)
+
+        if isinstance(item, Node):
+            _discard_from(self.nodes_by_class, item.media_class, item.id)
+            if self.nodes_by_name.get(item.name) == item.id:
+                del self.nodes_by_name[item.name]
+            _discard_from(self.nodes_by_device, item.device_id, item.id)
+            for rate in item.rates:
+                _discard_from(self.nodes_by_rate, rate, item.id)
+            self.capabilities.remove(item.id)
+        elif isinstance(item, Port):
+            _discard_from(self.ports_by_node, item.node_id, item.id)
+        elif isinstance(item, Link):
+            _discard_from(self.links_out, item.output_node, item.id)
+            _discard_from(self.links_in, item.input_node, item.id)
+        return item
+
+    def nodes(self, media_class: Optional[str] = None) -> List[Node]:
+        """All nodes, or the nodes of one exact media class."""
+        if media_class is None:
+            return [item for item in self.objects.values() if isinstance(item, Node)]
+        return [self.objects[i] for i in self.nodes_by_class.get(media_class, ())]
+
+    def audio_nodes(self) -> Iterator[Node]:
+        """Audio sink and source nodes."""
+        for media_class, ids in self.nodes_by_class.items():
+            if any(cls in media_class for cls in AUDIO_DEVICE_CLASSES):
+                for node_id in ids:
+                    yield self.objects[node_id]
+
+    def playback_streams(self) -> List[Node]:
+        """Audio playback streams that are running."""
+        return [node for node in self.nodes(PLAYBACK_CLASS) if node.state == "running"]
+
+    def node_by_name(self, name: str) -> Optional[Node]:
+        """The node with the given ``node.name``."""
+        node_id = self.nodes_by_name.get(name)
+        return None if node_id is None else self.objects[node_id]
+
+    def device_nodes(self, device_id: int) -> List[Node]:
+        """Nodes that belong to a device."""
+        return [self.objects[i] for i in self.nodes_by_device.get(device_id, ())]
+
+    def nodes_supporting(self, rate: int) -> List[Node]:
+        """Audio device nodes that support a sample rate."""
+        return [self.objects[i] for i in self.nodes_by_rate.get(rate, ())]
+
+    def supported_rates(self) -> FrozenSet[int]:
+        """Union of the sample rates of every audio device node."""
+        return frozenset(self.nodes_by_rate)
+
+    def active_nodes(self, direction: Optional[str] = None) -> List[Node]:
+        """
+        Audio device nodes that are running or idle, optionally of one direction.
+
+        Nodes rebuilt from the capability cache carry no state; their device
+        was listed just now, so they count as active.
+        """
+        return [
+            self.objects[i] for i in self.capabilities.devices(direction)
+            if self.objects[i].state in ACTIVE_STATES or not self.objects[i].state
+        ]
+
+    def common_rates(self, direction: Optional[str] = None) -> FrozenSet[int]:
+        """Rates supported by every active audio device node."""
+        return self.capabilities.supported_by_all(
+            [node.id for node in self.active_nodes(direction)], direction
+        )
+
+    def rates_of(self, name: str) -> FrozenSet[int]:
+        """Rates supported by the node with the given ``node.name``."""
+        node_id = self.nodes_by_name.get(name)
+        return self.capabilities.rates(node_id) if node_id is not None else frozenset()
+
+    def sink_for(self, device_info: str) -> Optional[Node]:
+        """
+        The audio sink a ``device_info`` line refers to.
+
+        The id is tried first; nodes rebuilt from the capability cache keep
+        the ids of an earlier probe, so the description is the fallback.
+        """
+        match = _DEVICE_LINE.search(device_info)
+        if match is None:
+            return None
+        sinks = [self.objects[i] for i in self.capabilities.devices(SINK)]
+        node_id, description = int(match.group(1)), match.group(2)
+        for node in sinks:
+            if node.id == node_id:
+                return node
+        for node in sinks:
+            if description in (node.description, node.name):
+                return node
+        return None
+
+    def devices(self) -> List[Device]:
+        """All devices."""
+        return [item for item in self.objects.values() if isinstance(item, Device)]
+
+    def ports(self, node_id: int) -> List[Port]:
+        """Ports of a node."""
+        return [self.objects[i] for i in self.ports_by_node.get(node_id, ())]
+
+    def links_into(self, node_id: int) -> List[Link]:
+        """Links whose input side is the given node."""
+        return [self.objects[i] for i in self.links_in.get(node_id, ())]
+
+    def links_from(self, node_id: int) -> List[Link]:
+        """Links whose output side is the given node."""
+        return [self.objects[i] for i in self.links_out.get(node_id, ())]
+
+    def feeders(self, node_id: int) -> List[Port]:
+        """Output ports linked into the given node."""
+        ports = []
+        for link in self.links_into(node_id):
+            port = self.objects.get(link.output_port)
+            if isinstance(port, Port):
+                ports.append(port)
+        return ports
@@ -0,0 +1,362 @@
+"""Live DSP load and xrun statistics streamed from ``pw-top --batch-mode``."""
+
+import re
+import subprocess
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TOP_COMMAND = ["pw-top", "--batch-mode"]
+
+# Called after every pw-top refresh, on the monitor's reader thread
+LoadCallback = Callable[[], None]
+
+# Health of the busiest driver, from best to worst (see ``health``)
+HEALTH_OK = "ok"
+HEALTH_BUSY = "busy"
+HEALTH_XRUNS = "xruns"
+
+_UNITS = {"ns": 1e-9, "us": 1e-6, "ms": 1e-3, "s": 1.0}
+_DURATION = re.compile(r"^([\d.]+)(ns|us|ms|s)$")
+
+# S ID QUANT RATE WAIT BUSY W/Q B/Q ERR, then the format (may be blank) and the name;
+# followers of a driver are listed right after it with "+ " before their name
+_ROW = re.compile(
+    r"^\s*([A-Z])\s+(\d+)\s+(\d+)\s+(\d+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\d+)"
+    r"\s(.*)$"
+)
+_FORMAT = re.compile(r"^\s*(?:([A-Z][A-Z0-9_]*)\s+(\d+)\s+(\d+)\s)?\s*(\+ )?(.*?)\s*$")
+
+
+@dataclass
+class TopRow:
+    """One node line of pw-top; times in seconds, None where pw-top prints ``---``."""
+
+    status: str
+    id: int
+    quantum: int
+    rate: int
+    wait: Optional[float]
+    busy: Optional[float]
+    wait_ratio: Optional[float]
+    busy_ratio: Optional[float]
+    errors: int
+    format: str
+    name: str
+    follower: bool
+
+
+def parse_duration(text: str) -> Optional[float]:
+    """Seconds of a pw-top time such as ``"64.1us"``; None for ``"---"``."""
+    match = _DURATION.match(text)
+    if match is None:
+        return None
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def _ratio(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_top_line(line: str) -> Optional[TopRow]:
+    """Parse a node line of pw-top output; None for the header and anything else."""
+    match = _ROW.match(line)
+    if match is None:
+        return None
+    (status, node_id, quantum, rate, wait, busy,
+     wait_ratio, busy_ratio, errors, rest) = match.groups()
+    tail = _FORMAT.match(rest)
+    fmt = " ".join(part for part in tail.group(1, 2, 3) if part) if tail.group(1) else ""
+    return TopRow(status, int(node_id), int(quantum), int(rate), parse_duration(wait),
+                  parse_duration(busy), _ratio(wait_ratio), _ratio(busy_ratio), int(errors),
+                  fmt, tail.group(5), tail.group(4) is not None)
+
+
+class RingBuffer:
+    """Fixed number of floats; appending beyond the size overwrites the oldest."""
+
+    __slots__ = ("_data", "_next", "_count")
+
+    def __init__(self, size: int):
+        self._data = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: float) -> None:
+        """Add a value in O(1)."""
+        self._data[self._next] = value
+        self._next = (self._next + 1) % len(self._data)
+        self._count = min(self._count + 1, len(self._data))
+
+    def values(self) -> List[float]:
+        """The values, oldest first."""
+        if self._count < len(self._data):
+            return self._data[:self._count].tolist()
+        return self._data[self._next:].tolist() + self._data[:self._next].tolist()
+
+    def last(self, default: float = 0.0) -> float:
+        """The newest value."""
+        return self._data[self._next - 1] if self._count else default
+
+    def oldest(self, default: float = 0.0) -> float:
+        """The oldest value still held."""
+        if not self._count:
+            return default
+        return self._data[0] if self._count < len(self._data) else self._data[self._next]
+
+    def percentiles(self, *fractions: float) -> List[float]:
+        """Percentiles of the held values, from one sort."""
+        ordered = sorted(self._data[:self._count] if self._count < len(self._data)
+                         else self._data)
+        if not ordered:
+            return [0.0 for _fraction in fractions]
+        return [ordered[min(len(ordered) - 1, int(f * len(ordered)))] for f in fractions]
+
+
+class DriverLoad:
+    """Ring buffers of the samples of one driver node."""
+
+    def __init__(self, node_id: int, name: str, samples: int):
+        self.id = node_id
+        self.name = name
+        self.status = ""
+        self.quantum = 0
+        self.rate = 0
+        self.load = RingBuffer(samples)
+        self.busy = RingBuffer(samples)
+        self.wait = RingBuffer(samples)
+        # Sample times and the xruns counted up to then, for rates over a window
+        self.times = RingBuffer(samples)
+        self.xrun_totals = RingBuffer(samples)
+        self.xruns = 0
+        self._errors: Dict[int, int] = {}
+
+    def add(self, rows: List[TopRow], now: float) -> None:
+        """Record one refresh: the driver row followed by its followers."""
+        driver = rows[0]
+        self.status = driver.status
+        self.quantum = driver.quantum
+        self.rate = driver.rate
+        # The driver's wait and busy span the graph cycle: its DSP load
+        load = (driver.wait_ratio or 0.0) + (driver.busy_ratio or 0.0)
+        self.load.append(load)
+        self.busy.append(driver.busy or 0.0)
+        self.wait.append(driver.wait or 0.0)
+
+        errors = {row.id: row.errors for row in rows}
+        for node_id, count in errors.items():
+            previous = self._errors.get(node_id)
+            if previous is None:
+                continue
+            # A counter going down belongs to a node that was recreated
+            self.xruns += count - previous if count >= previous else count
+        self._errors = errors
+        self.times.append(now)
+        self.xrun_totals.append(self.xruns)
+
+    def xruns_since(self, since: float) -> int:
+        """Xruns counted in samples taken after ``since``."""
+        times = self.times.values()
+        totals = self.xrun_totals.values()
+        for when, total in zip(times, totals):
+            if when >= since:
+                return int(self.xruns - total)
+        return 0
+
+    def stats(self, window: float, now: float) -> Dict[str, Any]:
+        """Load percentiles over the held samples and xruns over the last ``window`` seconds."""
+        p50, p95, p99 = self.load.percentiles(0.50, 0.95, 0.99)
+        covered = min(window, now - self.times.oldest(now)) if len(self.times) else 0.0
+        recent = self.xruns_since(now - window)
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "quantum": self.quantum,
+            "rate": self.rate,
+            "samples": len(self.load),
+            "load": self.load.last(),
+            "load_p50": p50,
+            "load_p95": p95,
+            "load_p99": p99,
+            "busy": self.busy.last(),
+            "wait": self.wait.last(),
+            "xruns": self.xruns,
+            "xruns_window": recent,
+            "xrun_rate": recent * 60 / covered if covered > 0 else 0.0,
+        }
+
+
+class LoadMonitor:
+    """
+    Per-driver DSP load and xruns from a long-lived ``pw-top --batch-mode``.
+
+    Lines are parsed as they arrive and each refresh appends one sample per
+    driver to fixed-size ring buffers, so memory and per-refresh cost do not
+    grow with the history. Percentiles are computed only when ``stats`` is
+    asked for. Subscribed callbacks run on the monitor's reader thread.
+    """
+
+    def __init__(self, samples: int = 600, window: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the monitor.
+
+        Args:
+            samples: Refreshes kept per driver (pw-top refreshes once a second)
+            window: Seconds over which the xrun rate is reported
+            clock: Time source, replaceable in tests
+        """
+        self.samples = samples
+        self.window = window
+        self.clock = clock
+        self._drivers: Dict[int, DriverLoad] = {}
+        self._block: List[List[TopRow]] = []
+        self._block_time: Optional[float] = None
+        self._latest: List[TopRow] = []
+        self._latest_time: Optional[float] = None
+        self._callbacks: List[LoadCallback] = []
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the pw-top process is alive."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> bool:
+        """Start pw-top. Returns False if it cannot be spawned."""
+        if self.running:
+            return True
+        try:
+            self._process = subprocess.Popen(
+                TOP_COMMAND,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+        except OSError:
+            self._process = None
+            return False
+
+        self._thread = threading.Thread(
+            target=self._read_loop,
+            args=(self._process,),
+            name="pw-top-monitor",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Terminate pw-top and forget the samples."""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+        with self._lock:
+            self._drivers.clear()
+            self._block = []
+            self._latest = []
+            self._latest_time = None
+
+    def subscribe(self, callback: LoadCallback) -> Callable[[], None]:
+        """Register a callback run after every refresh. Returns a function that removes it."""
+        self._callbacks.append(callback)
+
+        def unsubscribe():
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+        return unsubscribe
+
+    def feed(self, line: str) -> None:
+        """Apply one line of pw-top output."""
+        row = parse_top_line(line)
+        if row is not None:
+            if row.follower and self._block:
+                self._block[-1].append(row)
+            elif not row.follower:
+                self._block.append([row])
+        elif line.lstrip().startswith("S ") and "QUANT" in line:
+            # The header starts the next refresh, which is timed from its arrival
+            self.flush()
+            self._block_time = self.clock()
+        elif not line.strip():
+            # Blank lines end a refresh where pw-top prints them
+            self.flush()
+
+    def flush(self) -> None:
+        """Record the refresh read so far and notify subscribers."""
+        block, self._block = self._block, []
+        block_time, self._block_time = self._block_time, None
+        if not block:
+            return
+        now = self.clock() if block_time is None else block_time
+        with self._lock:
+            self._latest = [rows[0] for rows in block]
+            self._latest_time = now
+            for rows in block:
+                driver = rows[0]
+                entry = self._drivers.get(driver.id)
+                if entry is None or entry.name != driver.name:
+                    entry = self._drivers[driver.id] = DriverLoad(driver.id, driver.name,
+                                                                  self.samples)
+                entry.add(rows, now)
+        for callback in list(self._callbacks):
+            callback()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Statistics of every driver seen (see ``DriverLoad.stats``)."""
+        now = self.clock()
+        with self._lock:
+            return [entry.stats(self.window, now) for entry in self._drivers.values()]
+
+    def latest(self) -> Tuple[Optional[float], List[TopRow]]:
+        """Time and driver rows of the last refresh (drivers only, no followers)."""
+        with self._lock:
+            return self._latest_time, list(self._latest)
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """Statistics of the running driver with the highest recent load, if any."""
+        running = [entry for entry in self.stats() if entry["status"] == "R"]
+        if not running:
+            return None
+        return max(running, key=lambda entry: (entry["load_p95"], entry["xruns_window"]))
+
+    def _read_loop(self, process: subprocess.Popen) -> None:
+        """Reader thread body: feed every output line."""
+        for line in process.stdout:
+            self.feed(line)
+        self.flush()
+        process.stdout.close()
+
+
+def health(summary: Optional[Dict[str, Any]], busy_load: float = 0.8) -> str:
+    """
+    ``HEALTH_XRUNS`` if the driver had xruns in the window, ``HEALTH_BUSY`` if
+    its p95 load exceeds ``busy_load``, else ``HEALTH_OK``.
+    """
+    if summary is None:
+        return HEALTH_OK
+    if summary["xruns_window"]:
+        return HEALTH_XRUNS
+    if summary["load_p95"] > busy_load:
+        return HEALTH_BUSY
+    return HEALTH_OK
@@ -0,0 +1,489 @@
+"""Minimal pure-Python client for the PipeWire native protocol."""
+
+import array
+import os
+import socket
+import struct
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# SPA POD types
+POD_NONE = 1
+POD_BOOL = 2
+POD_ID = 3
+POD_INT = 4
+POD_LONG = 5
+POD_FLOAT = 6
+POD_DOUBLE = 7
+POD_STRING = 8
+POD_BYTES = 9
+POD_RECTANGLE = 10
+POD_FRACTION = 11
+POD_ARRAY = 13
+POD_STRUCT = 14
+POD_OBJECT = 15
+POD_FD = 18
+POD_CHOICE = 19
+
+# SPA choice kinds
+CHOICE_NONE = 0
+CHOICE_RANGE = 1
+CHOICE_STEP = 2
+CHOICE_ENUM = 3
+CHOICE_FLAGS = 4
+
+# Param ids and format object keys
+PARAM_ENUM_FORMAT = 3
+PARAM_FORMAT = 4
+OBJECT_FORMAT = 0x40003
+FORMAT_MEDIA_TYPE = 1
+FORMAT_MEDIA_SUBTYPE = 2
+FORMAT_AUDIO_FORMAT = 0x10001
+FORMAT_AUDIO_RATE = 0x10003
+FORMAT_AUDIO_CHANNELS = 0x10004
+
+# Interface opcodes
+CORE_ID = 0
+CLIENT_ID = 1
+CORE_HELLO = 1
+CORE_SYNC = 2
+CORE_PONG = 3
+CORE_GET_REGISTRY = 5
+CORE_DESTROY = 7
+CORE_EVENT_DONE = 1
+CORE_EVENT_PING = 2
+CORE_EVENT_ERROR = 3
+CORE_EVENT_REMOVE_ID = 4
+CLIENT_UPDATE_PROPERTIES = 2
+REGISTRY_BIND = 1
+REGISTRY_EVENT_GLOBAL = 0
+REGISTRY_EVENT_GLOBAL_REMOVE = 1
+METADATA_SET_PROPERTY = 1
+METADATA_EVENT_PROPERTY = 0
+NODE_ENUM_PARAMS = 2
+NODE_EVENT_PARAM = 1
+
+PROTOCOL_VERSION = 3
+HEADER = struct.Struct("<IIII")
+
+_INTERLEAVED_FORMATS = [
+    "S8", "U8", "S16LE", "S16BE", "U16LE", "U16BE", "S24_32LE", "S24_32BE",
+    "U24_32LE", "U24_32BE", "S32LE", "S32BE", "U32LE", "U32BE", "S24LE", "S24BE",
+    "U24LE", "U24BE", "S20LE", "S20BE", "U20LE", "U20BE", "S18LE", "S18BE",
+    "U18LE", "U18BE", "F32LE", "F32BE", "F64LE", "F64BE", "ULAW", "ALAW",
+]
+_PLANAR_FORMATS = ["U8P", "S16P", "S24_32P", "S32P", "S24P", "F32P", "F64P", "S8P"]
+
+# spa_audio_format ids, named the way pw-dump prints them
+AUDIO_FORMATS = {0x101 + i: name for i, name in enumerate(_INTERLEAVED_FORMATS)}
+AUDIO_FORMATS.update({0x201 + i: name for i, name in enumerate(_PLANAR_FORMATS)})
+
+
+class ProtocolError(Exception):
+    """Raised when the connection fails or the server reports an error."""
+
+
+class Id(int):
+    """An SPA Id value (encoded differently from a plain Int)."""
+
+
+class Object:
+    """An SPA object pod: a typed set of (key, value) properties."""
+
+    def __init__(self, type: int, id: int, properties: List[Tuple[int, Any]]):
+        self.type = type
+        self.id = id
+        self.properties = properties
+
+    def get(self, key: int, default: Any = None) -> Any:
+        """Return the value of a property key."""
+        for prop_key, value in self.properties:
+            if prop_key == key:
+                return value
+        return default
+
+
+class Choice:
+    """An SPA choice pod: a default value plus alternatives, a range or flags."""
+
+    def __init__(self, kind: int, values: List[Any], child_type: int = POD_INT):
+        self.kind = kind
+        self.values = values
+        self.child_type = child_type
+
+
+_SCALARS = {
+    POD_BOOL: struct.Struct("<I"),
+    POD_ID: struct.Struct("<I"),
+    POD_INT: struct.Struct("<i"),
+    POD_LONG: struct.Struct("<q"),
+    POD_FLOAT: struct.Struct("<f"),
+    POD_DOUBLE: struct.Struct("<d"),
+    POD_FD: struct.Struct("<q"),
+    POD_RECTANGLE: struct.Struct("<II"),
+    POD_FRACTION: struct.Struct("<II"),
+}
+
+
+def _pad(data: bytes) -> bytes:
+    """Pad a pod body to a multiple of 8 bytes."""
+    return data + b"\0" * (-len(data) % 8)
+
+
+def _pod_type(value: Any) -> int:
+    """SPA type used to encode a Python value."""
+    if value is None:
+        return POD_NONE
+    if isinstance(value, bool):
+        return POD_BOOL
+    if isinstance(value, Id):
+        return POD_ID
+    if isinstance(value, int):
+        return POD_INT if -2**31 <= value < 2**31 else POD_LONG
+    if isinstance(value, float):
+        return POD_DOUBLE
+    if isinstance(value, str):
+        return POD_STRING
+    if isinstance(value, bytes):
+        return POD_BYTES
+    if isinstance(value, (list, tuple)):
+        return POD_STRUCT
+    if isinstance(value, Object):
+        return POD_OBJECT
+    if isinstance(value, Choice):
+        return POD_CHOICE
+    raise TypeError(f"cannot encode {type(value).__name__} as SPA pod")
+
+
+def _encode_body(pod_type: int, value: Any) -> bytes:
+    """Encode the body (without header or padding) of a pod."""
+    if pod_type == POD_NONE:
+        return b""
+    if pod_type in _SCALARS:
+        if pod_type in (POD_RECTANGLE, POD_FRACTION):
+            return _SCALARS[pod_type].pack(*value)
+        if pod_type in (POD_FLOAT, POD_DOUBLE):
+            return _SCALARS[pod_type].pack(float(value))
+        return _SCALARS[pod_type].pack(int(value))
+    if pod_type == POD_STRING:
+        return value.encode() + b"\0"
+    if pod_type == POD_BYTES:
+        return value
+    if pod_type == POD_STRUCT:
+        return b"".join(encode_pod(item) for item in value)
+    if pod_type == POD_OBJECT:
+        body = struct.pack("<II", value.type, value.id)
+        for key, prop in value.properties:
+            body += struct.pack("<II", key, 0) + encode_pod(prop)
+        return body
+    if pod_type == POD_CHOICE:
+        items = [_encode_body(value.child_type, item) for item in value.values]
+        size = len(items[0]) if items else 0
+        return struct.pack("<IIII", value.kind, 0, size, value.child_type) + b"".join(items)
+    raise TypeError(f"cannot encode SPA type {pod_type}")
+
+
+def encode_pod(value: Any) -> bytes:
+    """Encode a Python value as a padded SPA pod."""
+    pod_type = _pod_type(value)
+    body = _encode_body(pod_type, value)
+    return _pad(struct.pack("<II", len(body), pod_type) + body)
+
+
+def _decode_body(pod_type: int, body: bytes) -> Any:
+    """Decode the body of a pod of the given type."""
+    if pod_type == POD_NONE:
+        return None
+    if pod_type in _SCALARS:
+        values = _SCALARS[pod_type].unpack_from(body)
+        if pod_type == POD_BOOL:
+            return bool(values[0])
+        if pod_type == POD_ID:
+            return Id(values[0])
+        return values if len(values) > 1 else values[0]
+    if pod_type == POD_STRING:
+        return body.split(b"\0", 1)[0].decode(errors="replace")
+    if pod_type == POD_BYTES:
+        return bytes(body)
+    if pod_type == POD_STRUCT:
+        items = []
+        offset = 0
+        while offset + 8 <= len(body):
+            item, offset = decode_pod(body, offset)
+            items.append(item)
+        return items
+    if pod_type == POD_OBJECT:
+        object_type, object_id = struct.unpack_from("<II", body)
+        properties = []
+        offset = 8
+        while offset + 16 <= len(body):
+            key, _flags = struct.unpack_from("<II", body, offset)
+            value, offset = decode_pod(body, offset + 8)
+            properties.append((key, value))
+        return Object(object_type, object_id, properties)
+    if pod_type == POD_CHOICE:
+        kind, _flags, size, child_type = struct.unpack_from("<IIII", body)
+        values = [
+            _decode_body(child_type, body[offset:offset + size])
+            for offset in range(16, len(body) - size + 1, size or len(body))
+        ]
+        return Choice(kind, values, child_type)
+    if pod_type == POD_ARRAY:
+        size, child_type = struct.unpack_from("<II", body)
+        return [
+            _decode_body(child_type, body[offset:offset + size])
+            for offset in range(8, len(body) - size + 1, size or len(body))
+        ]
+    # Types the controller never needs (pointers, bitmaps, sequences)
+    return None
+
+
+def decode_pod(data: bytes, offset: int = 0) -> Tuple[Any, int]:
+    """
+    Decode one pod.
+
+    Returns:
+        The decoded value and the offset just past the padded pod
+    """
+    size, pod_type = struct.unpack_from("<II", data, offset)
+    start = offset + 8
+    value = _decode_body(pod_type, data[start:start + size])
+    return value, start + size + (-size % 8)
+
+
+def decode_dict(items: List[Any]) -> Dict[str, str]:
+    """Decode an spa_dict encoded as ``[n_items, key, value, ...]``."""
+    if not items:
+        return {}
+    pairs = items[1:1 + 2 * items[0]]
+    return {pairs[i]: pairs[i + 1] for i in range(0, len(pairs) - 1, 2)}
+
+
+def encode_dict(values: Dict[str, str]) -> list:
+    """Encode a dict as an spa_dict struct."""
+    items: list = [len(values)]
+    for key, value in values.items():
+        items += [key, value]
+    return items
+
+
+def _choice_to_dump(choice: Choice, convert: Callable[[Any], Any]) -> Any:
+    """Render a choice the way pw-dump prints it in JSON."""
+    values = [convert(value) for value in choice.values]
+    if choice.kind == CHOICE_NONE or len(values) == 1:
+        return values[0] if values else None
+    if choice.kind == CHOICE_RANGE:
+        return dict(zip(("default", "min", "max"), values))
+    if choice.kind == CHOICE_STEP:
+        return dict(zip(("default", "min", "max", "step"), values))
+    label = "flag" if choice.kind == CHOICE_FLAGS else "alt"
+    result = {"default": values[0]}
+    result.update({f"{label}{i}": value for i, value in enumerate(values[1:], 1)})
+    return result
+
+
+def format_to_dump(param: Object) -> Dict[str, Any]:
+    """Convert an audio Format/EnumFormat object into pw-dump's JSON form."""
+    names = {
+        FORMAT_MEDIA_TYPE: ("mediaType", lambda v: "audio" if v == 1 else v),
+        FORMAT_MEDIA_SUBTYPE: ("mediaSubtype", lambda v: "raw" if v == 1 else v),
+        FORMAT_AUDIO_FORMAT: ("format", lambda v: AUDIO_FORMATS.get(v, v)),
+        FORMAT_AUDIO_RATE: ("rate", int),
+        FORMAT_AUDIO_CHANNELS: ("channels", int),
+    }
+    result = {}
+    for key, value in param.properties:
+        if key not in names:
+            continue
+        name, convert = names[key]
+        if isinstance(value, Choice):
+            result[name] = _choice_to_dump(value, convert)
+        else:
+            result[name] = convert(value)
+    return result
+
+
+def default_socket_path() -> str:
+    """Path of the PipeWire socket, honouring PIPEWIRE_REMOTE and runtime dirs."""
+    remote = os.environ.get("PIPEWIRE_REMOTE", "pipewire-0")
+    if os.path.isabs(remote):
+        return remote
+    runtime_dir = (
+        os.environ.get("PIPEWIRE_RUNTIME_DIR")
+        or os.environ.get("XDG_RUNTIME_DIR")
+        or f"/run/user/{os.getuid()}"
+    )
+    return os.path.join(runtime_dir, remote)
+
+
+class NativeClient:
+    """
+    One persistent connection to the PipeWire daemon.
+
+    The client keeps the registry up to date from server events and offers
+    the few operations the controller needs: metadata get/set and parameter
+    enumeration. All methods are serialized by an internal lock.
+    """
+
+    def __init__(self, path: Optional[str] = None, name: str = "pipewire-controller"):
+        """Initialize the client; ``connect`` opens the socket."""
+        self.path = path or default_socket_path()
+        self.name = name
+        self.globals: Dict[int, Tuple[str, Dict[str, str]]] = {}
+        self.lock = threading.RLock()
+        self._sock: Optional[socket.socket] = None
+        self._buffer = b""
+        self._seq = 0
+        self._next_id = 3
+        self._done: set = set()
+        self._errors: Dict[int, str] = {}
+        self._handlers: Dict[int, Callable[[int, list], None]] = {}
+
+    @property
+    def connected(self) -> bool:
+        """Whether the socket is open."""
+        return self._sock is not None
+
+    def connect(self, timeout: float = 5) -> None:
+        """
+        Connect, say hello and load the registry.
+
+        Raises:
+            ProtocolError: If the daemon cannot be reached
+        """
+        with self.lock:
+            self.close()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise ProtocolError(f"cannot connect to {self.path}: {e}") from e
+
+            self._sock = sock
+            self._buffer = b""
+            self._next_id = 3
+            self.globals.clear()
+            self._handlers = {2: self._on_registry}
+            self.send(CORE_ID, CORE_HELLO, [PROTOCOL_VERSION])
+            self.send(CLIENT_ID, CLIENT_UPDATE_PROPERTIES,
+                      [encode_dict({"application.name": self.name})])
+            self.send(CORE_ID, CORE_GET_REGISTRY, [PROTOCOL_VERSION, 2])
+            self.roundtrip(timeout)
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self.lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def send(self, object_id: int, opcode: int, args: list) -> int:
+        """Send one method call; returns its sequence number."""
+        if self._sock is None:
+            raise ProtocolError("not connected")
+        body = encode_pod(args)
+        self._seq += 1
+        header = HEADER.pack(object_id, (opcode << 24) | len(body), self._seq, 0)
+        try:
+            self._sock.sendall(header + body)
+        except OSError as e:
+            self.close()
+            raise ProtocolError(f"send failed: {e}") from e
+        return self._seq
+
+    def roundtrip(self, timeout: float = 5) -> None:
+        """Process events until the server has handled everything sent so far."""
+        with self.lock:
+            self._seq += 1
+            seq = self._seq
+            self.send(CORE_ID, CORE_SYNC, [CORE_ID, seq])
+            if self._sock is not None:
+                self._sock.settimeout(timeout)
+            while seq not in self._done:
+                self._dispatch(self._read_message())
+            self._done.discard(seq)
+
+    def bind(self, global_id: int, handler: Callable[[int, list], None]) -> int:
+        """Bind a global and route its events to ``handler(opcode, args)``."""
+        object_type, _props = self.globals[global_id]
+        proxy_id = self._next_id
+        self._next_id += 1
+        self._handlers[proxy_id] = handler
+        self.send(2, REGISTRY_BIND, [global_id, object_type, PROTOCOL_VERSION, proxy_id])
+        return proxy_id
+
+    def destroy(self, proxy_id: int) -> None:
+        """Destroy a bound proxy."""
+        self._handlers.pop(proxy_id, None)
+        self.send(CORE_ID, CORE_DESTROY, [proxy_id])
+
+    def take_error(self, proxy_id: int) -> Optional[str]:
+        """Return and clear the last error the server reported for a proxy."""
+        return self._errors.pop(proxy_id, None)
+
+    def find_global(self, object_type: str,
+                    props: Optional[Dict[str, str]] = None) -> Optional[int]:
+        """Id of the first global of a type whose props include ``props``."""
+        wanted = props or {}
+        for global_id, (gtype, gprops) in self.globals.items():
+            if gtype == object_type and all(gprops.get(k) == v for k, v in wanted.items()):
+                return global_id
+        return None
+
+    def _read_message(self) -> Tuple[int, int, list]:
+        """Read one complete message from the socket."""
+        while True:
+            if len(self._buffer) >= HEADER.size:
+                object_id, op_size, _seq, _n_fds = HEADER.unpack_from(self._buffer)
+                size = op_size & 0xFFFFFF
+                end = HEADER.size + size
+                if len(self._buffer) >= end:
+                    body = self._buffer[HEADER.size:end]
+                    self._buffer = self._buffer[end:]
+                    args, _ = decode_pod(body) if size else ([], 0)
+                    return object_id, op_size >> 24, args or []
+            self._receive()
+
+    def _receive(self) -> None:
+        """Append more data from the socket to the buffer, closing passed fds."""
+        if self._sock is None:
+            raise ProtocolError("not connected")
+        fds = array.array("i")
+        try:
+            data, ancdata, _flags, _addr = self._sock.recvmsg(
+                65536, socket.CMSG_SPACE(28 * fds.itemsize)
+            )
+        except OSError as e:
+            self.close()
+            raise ProtocolError(f"receive failed: {e}") from e
+        for level, kind, payload in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(payload[:len(payload) - len(payload) % fds.itemsize])
+        for fd in fds:
+            os.close(fd)
+        if not data:
+            self.close()
+            raise ProtocolError("connection closed by server")
+        self._buffer += data
+
+    def _dispatch(self, message: Tuple[int, int, list]) -> None:
+        """Route an event to the core handler or a proxy handler."""
+        object_id, opcode, args = message
+        if object_id == CORE_ID:
+            if opcode == CORE_EVENT_DONE:
+                self._done.add(args[1])
+            elif opcode == CORE_EVENT_PING:
+                self.send(CORE_ID, CORE_PONG, args[:2])
+            elif opcode == CORE_EVENT_ERROR:
+                self._errors[args[0]] = args[3] if len(args) > 3 else "error"
+        elif object_id in self._handlers:
+            self._handlers[object_id](opcode, args)
+
+    def _on_registry(self, opcode: int, args: list) -> None:
+        """Keep the global list current."""
+        if opcode == REGISTRY_EVENT_GLOBAL:
+            self.globals[args[0]] = (args[2], decode_dict(args[4]))
+        elif opcode == REGISTRY_EVENT_GLOBAL_REMOVE:
+            self.globals.pop(args[0], None)
@@ -0,0 +1,267 @@
+"""Central, instrumented runner for the PipeWire command line tools."""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Upper bounds of the latency histogram buckets, in milliseconds; slower
+# calls fall into a final overflow bucket
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+STATS_VERSION = 1
+
+
+def command_name(args: Sequence[str]) -> str:
+    """
+    Default name of a command line in the statistics.
+
+    The program plus its first argument unless that is an option, e.g.
+    ``"wpctl status"`` or ``"pw-dump"``.
+    """
+    name = os.path.basename(args[0]) if args else "?"
+    if len(args) > 1 and not args[1].startswith("-"):
+        name += f" {args[1]}"
+    return name
+
+
+def _size(output: Any) -> int:
+    """Length of captured output; 0 for anything that is not text or bytes."""
+    return len(output) if isinstance(output, (str, bytes)) else 0
+
+
+class CommandStats:
+    """Latencies, outcomes and output sizes of one command."""
+
+    def __init__(self, samples: int = 512):
+        """
+        Initialize empty statistics.
+
+        Args:
+            samples: Number of recent latencies kept for percentiles; the
+                histogram and the counters cover every call
+        """
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.exit_codes: Counter = Counter()
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.latencies: deque = deque(maxlen=samples)
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.output_total = 0
+        self.output_max = 0
+
+    def add(self, elapsed: float, returncode: Optional[int] = None, timed_out: bool = False,
+            error: bool = False, output: int = 0) -> None:
+        """Record one call."""
+        self.calls += 1
+        if timed_out:
+            self.timeouts += 1
+        elif error:
+            self.errors += 1
+        elif isinstance(returncode, int):
+            self.exit_codes[returncode] += 1
+            if returncode:
+                self.failures += 1
+        milliseconds = elapsed * 1000
+        bucket = next((i for i, bound in enumerate(BUCKETS_MS) if milliseconds <= bound),
+                      len(BUCKETS_MS))
+        self.histogram[bucket] += 1
+        self.latencies.append(elapsed)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.output_total += output
+        self.output_max = max(self.output_max, output)
+
+    def percentile(self, fraction: float) -> float:
+        """Latency percentile over the recent calls, in seconds."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary, also the form the statistics are saved in."""
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "exit_codes": {str(code): n for code, n in sorted(self.exit_codes.items())},
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max_time,
+            "total": self.total_time,
+            "histogram": {
+                label: count for label, count in zip(_bucket_labels(), self.histogram)
+            },
+            "output_total": self.output_total,
+            "output_max": self.output_max,
+            "latencies": list(self.latencies),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CommandStats":
+        """Rebuild statistics saved by ``to_dict``."""
+        stats = cls()
+        stats.calls = data["calls"]
+        stats.failures = data["failures"]
+        stats.timeouts = data["timeouts"]
+        stats.errors = data["errors"]
+        stats.exit_codes = Counter({int(code): n for code, n in data["exit_codes"].items()})
+        stats.histogram = [data["histogram"].get(label, 0) for label in _bucket_labels()]
+        stats.latencies.extend(data["latencies"])
+        stats.total_time = data["total"]
+        stats.max_time = data["max"]
+        stats.output_total = data["output_total"]
+        stats.output_max = data["output_max"]
+        return stats
+
+
+def _bucket_labels() -> List[str]:
+    return [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+
+
+class CommandRunner:
+    """
+    Runs commands and records how each one behaves.
+
+    Every call of a PipeWire tool goes through one runner, so latencies,
+    exit codes, timeouts and output sizes are collected per command name.
+    Commands run elsewhere (streamed with Popen, or by asyncio) are added
+    with ``record``. Thread-safe.
+    """
+
+    def __init__(self):
+        """Initialize a runner with no statistics."""
+        self._lock = threading.Lock()
+        self._stats: Dict[str, CommandStats] = {}
+
+    def run(self, args: List[str], timeout: float, name: Optional[str] = None,
+            check: bool = True, text: bool = True) -> subprocess.CompletedProcess:
+        """
+        Run a command to completion, capturing its output.
+
+        Args:
+            args: Command line
+            timeout: Seconds after which the command is killed
+            name: Name in the statistics (default: ``command_name(args)``)
+            check: Raise if the command exits with an error
+            text: Decode the output
+
+        Raises:
+            subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError:
+                As ``subprocess.run`` does
+        """
+        options = {"text": True} if text else {}
+        start = time.monotonic()
+        try:
+            result = subprocess.run(args, check=check, capture_output=True, timeout=timeout,
+                                    **options)
+        except subprocess.TimeoutExpired as e:
+            self.record(args, time.monotonic() - start, timed_out=True,
+                        output=_size(e.output), name=name)
+            raise
+        except subprocess.CalledProcessError as e:
+            self.record(args, time.monotonic() - start, returncode=e.returncode,
+                        output=_size(e.output) + _size(e.stderr), name=name)
+            raise
+        except OSError:
+            self.record(args, time.monotonic() - start, error=True, name=name)
+            raise
+        self.record(args, time.monotonic() - start, returncode=result.returncode,
+                    output=_size(result.stdout) + _size(result.stderr), name=name)
+        return result
+
+    def record(self, args: Sequence[str], elapsed: float, returncode: Optional[int] = None,
+               timed_out: bool = False, error: bool = False, output: int = 0,
+               name: Optional[str] = None) -> None:
+        """
+        Add one call made outside ``run``.
+
+        Args:
+            args: Command line, for the default name
+            elapsed: Seconds the call took
+            returncode: Exit status, if it exited
+            timed_out: Whether it was killed for exceeding its timeout
+            error: Whether it could not be started
+            output: Characters (or bytes) of output read
+            name: Name in the statistics (default: ``command_name(args)``)
+        """
+        name = name or command_name(args)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CommandStats()
+            stats.add(elapsed, returncode, timed_out, error, output)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Summary per command name, the commands taking the most total time first."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: -item[1].total_time)
+            return {name: stats.to_dict() for name, stats in items}
+
+    def reset(self) -> None:
+        """Forget every recorded call."""
+        with self._lock:
+            self._stats.clear()
+
+    def report(self) -> str:
+        """Table of the statistics, one line per command."""
+        return format_report(self.stats())
+
+    def save(self, path: Path) -> bool:
+        """Write the statistics to a JSON file. Returns False if it could not be written."""
+        data = {"version": STATS_VERSION, "commands": self.stats()}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data))
+            os.replace(tmp, path)
+            return True
+        except OSError:
+            return False
+
+    def load(self, path: Path) -> bool:
+        """Merge in statistics saved by ``save``, replacing same-named commands."""
+        try:
+            data = json.loads(path.read_text())
+            if data.get("version") != STATS_VERSION:
+                return False
+            loaded = {name: CommandStats.from_dict(entry)
+                      for name, entry in data["commands"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            self._stats.update(loaded)
+        return True
+
+
+def format_report(stats: Dict[str, Dict[str, Any]]) -> str:
+    """Text table of ``CommandRunner.stats()``."""
+    if not stats:
+        return "No commands recorded."
+    lines = [
+        f"{'command':<22} {'calls':>6} {'fail':>5} {'t/o':>4} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'total s':>8} {'avg out':>9}"
+    ]
+    for name, entry in stats.items():
+        average = entry["output_total"] // entry["calls"] if entry["calls"] else 0
+        lines.append(
+            f"{name:<22} {entry['calls']:>6} {entry['failures'] + entry['errors']:>5} "
+            f"{entry['timeouts']:>4} {entry['p50'] * 1000:>8.1f} {entry['p95'] * 1000:>8.1f} "
+            f"{entry['p99'] * 1000:>8.1f} {entry['max'] * 1000:>8.1f} {entry['total']:>8.2f} "
+            f"{average:>9}"
+        )
+    return "\n".join(lines)
+
+
+# Shared by every module that runs the PipeWire tools
+RUNNER = CommandRunner()
@@ -0,0 +1,135 @@
+"""Coalescing of rapid settings writes - Pure logic with no GUI dependencies."""
+
+import time
+from typing import Any, Dict, Optional
+
+
+class WriteScheduler:
+    """
+    Decides which settings writes actually reach PipeWire.
+
+    Every write reconfigures the graph, so while the user clicks through
+    values only the last one is worth writing. ``request`` records a wanted
+    value; values equal to what PipeWire has (or will have once the writes
+    in flight land) are dropped, and a burst of requests for a key collapses
+    into its final value. The caller arms a timer for ``delay()`` seconds
+    and, when it fires, writes the batch from ``take()`` and reports the
+    outcome with ``confirm`` or ``reject``.
+
+    The scheduler keeps no thread or timer itself, so the same logic serves
+    the Qt tray and tests with a fake clock.
+    """
+
+    def __init__(self, window: float = 0.15, max_delay: float = 0.6, clock=time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            window: Seconds without a new request before the batch is due
+            max_delay: Seconds after the first request of a burst at which the
+                batch is due even if requests keep coming
+            clock: Monotonic time source
+        """
+        self.window = window
+        self.max_delay = max_delay
+        self._clock = clock
+        self._confirmed: Dict[str, Any] = {}
+        # Confirmed values overlaid with the batches taken but not confirmed yet
+        self._expected: Dict[str, Any] = {}
+        self._pending: Dict[str, Any] = {}
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self.requested = 0
+        self.written = 0
+        self.noop = 0
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> Dict[str, Any]:
+        """Values requested but not written yet."""
+        return dict(self._pending)
+
+    @property
+    def suppressed(self) -> int:
+        """Requests that never turned into a write."""
+        return self.noop + self.coalesced
+
+    def confirmed(self, key: str) -> Any:
+        """Last value known to be in PipeWire for a key, or None."""
+        return self._confirmed.get(key)
+
+    def request(self, key: str, value: Any) -> bool:
+        """
+        Ask for a key to be written.
+
+        Returns:
+            True if a write is now pending for the key, False if the value
+            is already in place and nothing needs to be written
+        """
+        self.requested += 1
+        if key in self._pending:
+            # The earlier value of this burst will never be written
+            self.coalesced += 1
+            del self._pending[key]
+            if self._expected.get(key) == value:
+                self.noop += 1
+                self._settle()
+                return False
+        elif self._expected.get(key) == value:
+            self.noop += 1
+            return False
+
+        now = self._clock()
+        self._pending[key] = value
+        self._first = now if self._first is None else self._first
+        self._last = now
+        return True
+
+    def delay(self) -> Optional[float]:
+        """Seconds until the pending batch is due, or None if nothing is pending."""
+        if not self._pending:
+            return None
+        due = min(self._last + self.window, self._first + self.max_delay)
+        return max(0.0, due - self._clock())
+
+    def take(self) -> Dict[str, Any]:
+        """Remove and return the pending batch, to be written now."""
+        batch = self._pending
+        self._pending = {}
+        self._expected.update(batch)
+        self._settle()
+        return batch
+
+    def confirm(self, key: str, value: Any, written: bool = False) -> None:
+        """
+        Record a value that is now in PipeWire.
+
+        Call it for every key of a successful batch (with ``written=True``)
+        and for changes made outside the application, so a later request
+        for the same value is recognized as a no-op.
+        """
+        self._confirmed[key] = value
+        self._expected[key] = value
+        if written:
+            self.written += 1
+
+    def reject(self, key: str) -> None:
+        """Record that the write of a taken key failed."""
+        if key in self._confirmed:
+            self._expected[key] = self._confirmed[key]
+        else:
+            self._expected.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since the scheduler was created."""
+        return {
+            "requested": self.requested,
+            "written": self.written,
+            "suppressed": self.suppressed,
+            "noop": self.noop,
+            "coalesced": self.coalesced,
+        }
+
+    def _settle(self) -> None:
+        if not self._pending:
+            self._first = self._last = None
@@ -0,0 +1,223 @@
+"""Parsing of SPA pod choices as printed by pw-dump."""
+
+import functools
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, FrozenSet, Iterable, Optional, Tuple
+
+# Standard rates a Range or Step choice is checked against; an Enum or a plain
+# value is taken as it is, standard or not. Lower rates are left out since a
+# range starting at 8 kHz is common and those rates are no use for playback.
+STANDARD_RATES = (
+    44100, 48000, 88200, 96000, 176400, 192000, 352800, 384000, 705600, 768000,
+)
+
+# pw-dump numbers Enum alternatives and Flags values: {"default": x, "alt1": y, ...}
+_NUMBERED = re.compile(r"^(alt|flag)(\d+)$")
+
+
+class ChoiceType(Enum):
+    """Kinds of SPA choices (``SPA_CHOICE_*``)."""
+
+    NONE = "none"
+    RANGE = "range"
+    STEP = "step"
+    ENUM = "enum"
+    FLAGS = "flags"
+
+
+@dataclass(frozen=True)
+class Choice:
+    """
+    One parsed choice.
+
+    ``values`` holds the default followed by the alternatives (Enum), the
+    flags (Flags) or just the value (None). ``minimum``, ``maximum`` and
+    ``step`` are set for Range and Step.
+    """
+
+    type: ChoiceType
+    default: Any
+    values: Tuple[Any, ...] = ()
+    minimum: Any = None
+    maximum: Any = None
+    step: Any = None
+
+    def allows(self, value: Any) -> bool:
+        """Whether the choice admits a value."""
+        if self.type is ChoiceType.RANGE:
+            return self.minimum <= value <= self.maximum
+        if self.type is ChoiceType.STEP:
+            return (self.minimum <= value <= self.maximum
+                    and (value - self.minimum) % (self.step or 1) == 0)
+        if self.type is ChoiceType.FLAGS:
+            # Any combination of the offered flags
+            mask = 0
+            for flag in self.values:
+                mask |= flag
+            return value & ~mask == 0
+        return value in self.values
+
+    def expand(self, candidates: Iterable[Any]) -> FrozenSet[Any]:
+        """
+        The admitted values as a finite set.
+
+        Enum and None choices list their values; Range, Step and Flags
+        choices are checked against ``candidates``.
+        """
+        if self.type in (ChoiceType.NONE, ChoiceType.ENUM):
+            return frozenset(self.values)
+        return frozenset(value for value in candidates if self.allows(value))
+
+
+def parse_choice(value: Any) -> Optional[Choice]:
+    """
+    Parse a property value from pw-dump JSON.
+
+    A plain value is a None choice; ``{"default", "min", "max"}`` a Range,
+    with ``"step"`` a Step; ``{"default", "alt1", ...}`` (or an
+    ``"alternatives"`` list) an Enum and ``{"default", "flag1", ...}`` Flags.
+
+    Returns:
+        The choice, or None for a missing or unrecognized value
+    """
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        return Choice(ChoiceType.NONE, value, (value,))
+
+    default = value.get("default")
+    if "min" in value and "max" in value:
+        if value.get("step"):
+            return Choice(ChoiceType.STEP, default, minimum=value["min"],
+                          maximum=value["max"], step=value["step"])
+        return Choice(ChoiceType.RANGE, default, minimum=value["min"], maximum=value["max"])
+
+    if isinstance(value.get("alternatives"), list):
+        alternatives = value["alternatives"]
+        values = ([default] if default is not None else []) + alternatives
+        return Choice(ChoiceType.ENUM, default, tuple(dict.fromkeys(values)))
+
+    numbered = {"alt": [], "flag": []}
+    for key, item in value.items():
+        match = _NUMBERED.match(key)
+        if match:
+            numbered[match.group(1)].append((int(match.group(2)), item))
+    kind = "flag" if numbered["flag"] else "alt"
+    items = [item for _index, item in sorted(numbered[kind])]
+    if default is None and not items:
+        return None
+
+    values = ([default] if default is not None else []) + items
+    choice_type = ChoiceType.FLAGS if kind == "flag" else ChoiceType.ENUM
+    return Choice(choice_type, default, tuple(dict.fromkeys(values)))
+
+
+def choice_values(value: Any, candidates: Iterable[Any] = ()) -> FrozenSet[Any]:
+    """Admitted values of a pw-dump property (see ``Choice.expand``)."""
+    choice = parse_choice(value)
+    return choice.expand(candidates) if choice is not None else frozenset()
+
+
+def format_rates(fmt: dict, candidates: Iterable[int] = STANDARD_RATES) -> FrozenSet[int]:
+    """Sample rates of one EnumFormat entry."""
+    value = fmt.get("rate")
+    if isinstance(value, int):
+        return frozenset((value,)) if value > 0 else frozenset()
+    if not isinstance(value, dict):
+        return frozenset()
+    key = _freeze(value)
+    if key is None:
+        return _rates(parse_choice(value), candidates)
+    return _choice_rates(key, tuple(candidates))
+
+
+def _freeze(value: dict) -> Optional[tuple]:
+    """Hashable form of a choice dict, for memoising; None if it has no such form."""
+    try:
+        key = tuple(sorted(
+            (k, tuple(v) if isinstance(v, list) else v) for k, v in value.items()
+        ))
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
+def _thaw(key: tuple) -> dict:
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in key}
+
+
+# Nodes repeat the same choices for every sample format and rate they offer,
+# so parsed results are memoised per distinct choice.
+@functools.lru_cache(maxsize=256)
+def _choice_rates(key: tuple, candidates: Tuple[int, ...]) -> FrozenSet[int]:
+    return _rates(parse_choice(_thaw(key)), candidates)
+
+
+@functools.lru_cache(maxsize=256)
+def _choice_names(key: tuple) -> FrozenSet[str]:
+    return frozenset(name for name in choice_values(_thaw(key)) if isinstance(name, str))
+
+
+def _rates(choice: Optional[Choice], candidates: Iterable[int]) -> FrozenSet[int]:
+    if choice is None:
+        return frozenset()
+    if choice.type is ChoiceType.FLAGS:
+        # Flags make no sense for a rate; only the default is meaningful
+        rates = {choice.default}
+    else:
+        rates = choice.expand(candidates)
+    return frozenset(rate for rate in rates if isinstance(rate, int) and rate > 0)
+
+
+# Bits per sample by format family (see ``format_family``)
+FORMAT_BITS = {
+    "U8": 8, "S8": 8, "S16": 16, "U16": 16, "S18": 18, "U18": 18, "S20": 20, "U20": 20,
+    "S24": 24, "U24": 24, "S24_32": 24, "U24_32": 24, "S32": 32, "U32": 32,
+    "F32": 32, "F64": 64,
+}
+
+_ENDIAN_SUFFIX = re.compile(r"(LE|BE|_OE)?P?$")
+
+
+def format_family(name: str) -> str:
+    """A sample format without endianness or planarity: "S24_32LE" -> "S24_32"."""
+    return _ENDIAN_SUFFIX.sub("", name) or name
+
+
+def bit_depth(name: str) -> int:
+    """Bits per sample of a format, 0 if unknown."""
+    return FORMAT_BITS.get(format_family(name), 0)
+
+
+def format_names(fmt: dict) -> FrozenSet[str]:
+    """Sample formats of one EnumFormat entry."""
+    value = fmt.get("format")
+    if isinstance(value, str):
+        return frozenset((value,))
+    if not isinstance(value, dict):
+        return frozenset()
+    key = _freeze(value)
+    if key is None:
+        return frozenset(name for name in choice_values(value) if isinstance(name, str))
+    return _choice_names(key)
+
+
+def format_modes(fmt: dict, candidates: Iterable[int] = STANDARD_RATES,
+                 rates: Optional[FrozenSet[int]] = None) -> FrozenSet[Tuple[str, int]]:
+    """
+    (sample format, rate) pairs offered by one EnumFormat entry.
+
+    ``rates`` may pass the entry's ``format_rates`` if already known.
+    """
+    names = format_names(fmt)
+    if not names:
+        return frozenset()
+    return _modes(names, format_rates(fmt, candidates) if rates is None else rates)
+
+
+@functools.lru_cache(maxsize=256)
+def _modes(names: FrozenSet[str], rates: FrozenSet[int]) -> FrozenSet[Tuple[str, int]]:
+    return frozenset((name, rate) for name in names for rate in rates)
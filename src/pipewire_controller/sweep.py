@@ -0,0 +1,268 @@
+"""Offline quantum sweep that finds the smallest stable buffer size."""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+QUANTA = (32, 64, 128, 256, 512, 1024, 2048)
+
+SWEEPS_VERSION = 1
+
+
+@dataclass
+class SweepStep:
+    """What the graph did while one quantum was held."""
+
+    quantum: int
+    latency_ms: float
+    samples: int
+    xruns: int
+    load_p50: float
+    load_p95: float
+    load_max: float
+    stable: bool
+
+
+@dataclass
+class SweepResult:
+    """Outcome of a sweep on one device at one rate."""
+
+    device: str
+    rate: int
+    steps: List[SweepStep] = field(default_factory=list)
+    recommended: Optional[int] = None
+    aborted: bool = False
+    finished: float = 0.0
+
+    def table(self) -> str:
+        """Text table of the steps, the recommended quantum marked."""
+        lines = [f"{'quantum':>7} {'ms':>6} {'xruns':>5} {'p50':>5} {'p95':>5} {'max':>5}  result"]
+        for step in self.steps:
+            verdict = "stable" if step.stable else "unstable"
+            if step.quantum == self.recommended:
+                verdict += " (recommended)"
+            lines.append(
+                f"{step.quantum:>7} {step.latency_ms:>6.2f} {step.xruns:>5} "
+                f"{step.load_p50:>5.0%} {step.load_p95:>5.0%} {step.load_max:>5.0%}  {verdict}"
+            )
+        if self.aborted:
+            lines.append("Aborted; settings restored.")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Form the result is saved in."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SweepResult":
+        """Rebuild a result saved by ``to_dict``."""
+        steps = [SweepStep(**step) for step in data.get("steps", [])]
+        return cls(**dict(data, steps=steps))
+
+
+def recommend(steps: Sequence[SweepStep]) -> Optional[int]:
+    """
+    The smallest quantum that was stable, as was every larger one tested.
+
+    A small quantum that happened to pass while a larger one failed is not
+    trusted.
+    """
+    recommended = None
+    for step in sorted(steps, key=lambda s: -s.quantum):
+        if not step.stable:
+            break
+        recommended = step.quantum
+    return recommended
+
+
+class QuantumSweep:
+    """
+    Holds each quantum for a while and measures xruns and DSP load.
+
+    The quanta allowed at the current rate (within ``clock.min-quantum`` and
+    ``clock.max-quantum``) are forced with ``set_buffer_size`` from the
+    largest down, so the graph starts from the safest setting. The sweep
+    stops once ``give_up`` quanta in a row were unstable, since smaller
+    ones only do worse. Samples come from the engine's load profiler, which
+    is started for the sweep if it is not running. The forced quantum found
+    at the start (``get_current_quantum``) is restored when the sweep ends,
+    whether it finished, was aborted or failed.
+
+    ``run`` blocks for up to ``len(quanta) * (settle + hold)`` seconds and is
+    meant for a worker thread; ``abort`` may be called from any thread.
+    """
+
+    def __init__(self, engine, quanta: Sequence[int] = QUANTA, hold: float = 10.0,
+                 settle: float = 1.0, max_load: float = 0.75, give_up: int = 1):
+        """
+        Initialize the sweep.
+
+        Args:
+            engine: ``PipewireEngine`` to apply quanta and read the profiler with
+            quanta: Candidate quanta
+            hold: Seconds each quantum is measured for
+            settle: Seconds after each change that are not measured
+            max_load: Highest DSP load a stable quantum may reach
+            give_up: Unstable quanta in a row after which smaller ones are skipped
+        """
+        self.engine = engine
+        self.quanta = sorted(quanta, reverse=True)
+        self.hold = hold
+        self.settle = settle
+        self.max_load = max_load
+        self.give_up = give_up
+        self._abort = threading.Event()
+
+    def abort(self) -> None:
+        """Stop after the current wait and restore the settings."""
+        self._abort.set()
+
+    @property
+    def aborted(self) -> bool:
+        """Whether ``abort`` was called."""
+        return self._abort.is_set()
+
+    def candidates(self, settings: Dict[str, Any]) -> List[int]:
+        """The quanta within the bounds of the settings metadata, largest first."""
+        low = settings.get("clock.min-quantum")
+        high = settings.get("clock.max-quantum")
+        return [q for q in self.quanta
+                if (not isinstance(low, int) or q >= low)
+                and (not isinstance(high, int) or q <= high)]
+
+    def run(self, device: str,
+            on_step: Optional[Callable[[SweepStep], None]] = None) -> SweepResult:
+        """
+        Sweep the quanta on the current driver.
+
+        Args:
+            device: Name the result is stored under (the default sink)
+            on_step: Called with each measured step, on the calling thread
+
+        Returns:
+            The measured steps and the recommendation; ``aborted`` is set if
+            ``abort`` was called or the profiler could not be started
+        """
+        settings = self.engine.get_settings_snapshot()
+        rate = settings.get("clock.force-rate") or settings.get("clock.rate") or 48000
+        result = SweepResult(device, rate)
+        original = self.engine.get_current_quantum() or 0
+
+        started_profiler = self.engine.profiler is None
+        if started_profiler and not self.engine.start_profiler():
+            result.aborted = True
+            return result
+        samples: List[Dict[str, Any]] = []
+        unsubscribe = self.engine.subscribe_load(
+            lambda: samples.append(self.engine.profiler.summary() or {})
+            if self.engine.profiler is not None else None
+        )
+        try:
+            failures = 0
+            for quantum in self.candidates(settings):
+                if not self.engine.set_buffer_size(quantum) or self._abort.wait(self.settle):
+                    break
+                samples.clear()
+                if self._abort.wait(self.hold):
+                    break
+                step = self._measure(quantum, rate, list(samples))
+                result.steps.append(step)
+                if on_step is not None:
+                    on_step(step)
+                failures = 0 if step.stable else failures + 1
+                if failures >= self.give_up:
+                    break
+        finally:
+            unsubscribe()
+            self.engine.set_buffer_size(original)
+            if started_profiler:
+                self.engine.stop_profiler()
+
+        result.aborted = self.aborted
+        result.recommended = None if result.aborted else recommend(result.steps)
+        result.finished = time.time()
+        return result
+
+    def _measure(self, quantum: int, rate: int, samples: List[Dict[str, Any]]) -> SweepStep:
+        """Summarize the profiler samples taken while ``quantum`` was held."""
+        samples = [sample for sample in samples if sample.get("quantum") == quantum]
+        loads = sorted(sample["load"] for sample in samples)
+        # Each sample is of the busiest driver, whose counter is its own:
+        # add up the change of every driver's count instead of mixing them
+        first: Dict[Any, int] = {}
+        last: Dict[Any, int] = {}
+        for sample in samples:
+            first.setdefault(sample.get("id"), sample["xruns"])
+            last[sample.get("id")] = sample["xruns"]
+        xruns = sum(max(0, last[driver] - first[driver]) for driver in last)
+
+        def percentile(fraction):
+            return loads[min(len(loads) - 1, int(fraction * len(loads)))] if loads else 0.0
+
+        load_max = loads[-1] if loads else 0.0
+        return SweepStep(
+            quantum=quantum,
+            latency_ms=quantum / rate * 1000,
+            samples=len(samples),
+            xruns=max(0, xruns),
+            load_p50=percentile(0.50),
+            load_p95=percentile(0.95),
+            load_max=load_max,
+            # Without samples nothing is known about the quantum
+            stable=bool(samples) and xruns <= 0 and load_max <= self.max_load,
+        )
+
+
+class SweepStore:
+    """Sweep results per device and rate, kept in a JSON file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._results: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """Saved results by device, then by rate, loaded on first use."""
+        if self._results is None:
+            self._results = self._read()
+        return self._results
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SWEEPS_VERSION:
+            return {}
+        devices = data.get("devices")
+        return devices if isinstance(devices, dict) else {}
+
+    def get(self, device: str, rate: int) -> Optional[SweepResult]:
+        """The last completed sweep of a device at a rate."""
+        entry = self.results.get(device, {}).get(str(rate))
+        if entry is None:
+            return None
+        try:
+            return SweepResult.from_dict(entry)
+        except TypeError:
+            return None
+
+    def put(self, result: SweepResult) -> bool:
+        """Store a completed sweep and write the file; aborted sweeps are not kept."""
+        if result.aborted:
+            return False
+        self.results.setdefault(result.device, {})[str(result.rate)] = result.to_dict()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump({"version": SWEEPS_VERSION, "devices": self.results}, f)
+            os.replace(tmp, self.path)
+            return True
+        except IOError:
+            return False
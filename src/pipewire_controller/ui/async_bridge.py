@@ -0,0 +1,164 @@
+"""Bridge between an asyncio event loop and the Qt event loop."""
+
+import asyncio
+import concurrent.futures
+import sys
+import threading
+from typing import Any, Callable, Coroutine, Optional, Set
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class Pending:
+    """Awaitable, from a GUI coroutine, for work running on the asyncio loop."""
+
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+
+    def __await__(self):
+        return (yield self)
+
+
+class GuiTask:
+    """
+    A coroutine driven on the GUI thread.
+
+    The coroutine may only await ``Pending`` objects (from ``AsyncBridge.run``).
+    Between awaits it runs on the GUI thread, so it can touch widgets freely;
+    while it waits, the Qt event loop keeps running.
+    """
+
+    def __init__(self, bridge: "AsyncBridge", coro: Coroutine):
+        self._bridge = bridge
+        self._coro = coro
+        self._pending: Optional[Pending] = None
+        self.done = False
+        self.result: Any = None
+        self.exception: Optional[BaseException] = None
+
+    def cancel(self) -> None:
+        """Cancel the work being awaited; the coroutine sees CancelledError."""
+        if self._pending is not None:
+            self._pending.future.cancel()
+
+    def _step(self, value: Any = None, error: Optional[BaseException] = None) -> None:
+        """Run the coroutine up to its next await."""
+        self._pending = None
+        try:
+            awaited = self._coro.throw(error) if error is not None else self._coro.send(value)
+        except StopIteration as stop:
+            self._finish(result=stop.value)
+            return
+        except BaseException as e:
+            self._finish(exception=e)
+            if not isinstance(e, (asyncio.CancelledError, concurrent.futures.CancelledError)):
+                sys.excepthook(type(e), e, e.__traceback__)
+            return
+
+        if not isinstance(awaited, Pending):
+            self._step(error=TypeError(f"GUI coroutines can only await AsyncBridge.run(), "
+                                       f"not {awaited!r}"))
+            return
+        self._pending = awaited
+        awaited.future.add_done_callback(
+            lambda future: self._bridge._completed.emit(self._resume, future)
+        )
+
+    def _resume(self, future: concurrent.futures.Future) -> None:
+        """Continue the coroutine with the outcome of the awaited work."""
+        try:
+            value = future.result()
+        except BaseException as e:
+            self._step(error=e)
+        else:
+            self._step(value)
+
+    def _finish(self, result: Any = None, exception: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.result = result
+        self.exception = exception
+        self._bridge._tasks.discard(self)
+
+
+class AsyncBridge(QObject):
+    """
+    Runs an asyncio event loop in a background thread for the Qt application.
+
+    ``run`` schedules a coroutine on that loop and returns something a GUI
+    coroutine can await; ``spawn`` starts such a GUI coroutine. Completions
+    are delivered through a queued signal, so GUI code never runs on the
+    asyncio thread and the asyncio work never blocks the Qt event loop.
+    """
+
+    # (callback, concurrent future); emitted on the asyncio thread
+    _completed = pyqtSignal(object, object)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="asyncio",
+                                        daemon=True)
+        self._thread.start()
+        self._tasks: Set[GuiTask] = set()
+        self._completed.connect(self._deliver)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The asyncio event loop."""
+        return self._loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the asyncio loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine) -> Pending:
+        """Schedule a coroutine on the asyncio loop; ``await`` the result in a GUI coroutine."""
+        return Pending(self.submit(coro))
+
+    def call(self, coro: Coroutine, on_result: Optional[Callable[[Any], None]] = None,
+             on_error: Optional[Callable[[BaseException], None]] = None
+             ) -> concurrent.futures.Future:
+        """Schedule a coroutine and call back on the GUI thread when it finishes."""
+        future = self.submit(coro)
+
+        def deliver(done: concurrent.futures.Future):
+            try:
+                value = done.result()
+            except BaseException as e:
+                if on_error is not None:
+                    on_error(e)
+            else:
+                if on_result is not None:
+                    on_result(value)
+
+        future.add_done_callback(lambda done: self._completed.emit(deliver, done))
+        return future
+
+    def spawn(self, coro: Coroutine) -> GuiTask:
+        """Start driving a coroutine on the GUI thread."""
+        task = GuiTask(self, coro)
+        self._tasks.add(task)
+        task._step()
+        return task
+
+    def stop(self, timeout: float = 1) -> None:
+        """Cancel outstanding work and stop the asyncio loop."""
+        if not self._loop.is_running():
+            return
+
+        async def shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(shutdown()).result(timeout)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def _deliver(self, callback: Callable[[Any], None], future: concurrent.futures.Future):
+        """GUI-thread end of ``_completed``."""
+        callback(future)
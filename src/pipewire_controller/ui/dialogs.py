@@ -1,6 +1,9 @@
 """UI dialogs for the application."""
 
-from PyQt6.QtWidgets import QDialog, QLabel, QVBoxLayout
+from typing import Callable
+
+from PyQt6.QtWidgets import QDialog, QLabel, QPlainTextEdit, QPushButton, QVBoxLayout
+from PyQt6.QtGui import QFontDatabase
 from PyQt6.QtCore import Qt
 
 from .. import __version__
@@ -44,3 +47,47 @@ class AboutDialog(QDialog):
             self.hide()
         else:
             super().keyPressEvent(event)
+
+
+class DiagnosticsDialog(QDialog):
+    """Read-only view of the command statistics and other timings."""
+
+    def __init__(self, report: Callable[[], str]):
+        """
+        Args:
+            report: Returns the text to show; called again on Refresh
+        """
+        super().__init__()
+        self.report = report
+        self.setWindowTitle("Diagnostics")
+        self.resize(760, 420)
+
+        layout = QVBoxLayout()
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        layout.addWidget(self.text)
+
+        refresh = QPushButton("Refresh")
+        refresh.clicked.connect(self.refresh)
+        layout.addWidget(refresh)
+
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        """Show the current report."""
+        self.text.setPlainText(self.report())
+
+    def closeEvent(self, event):
+        """Hide instead of close."""
+        event.ignore()
+        self.hide()
+
+    def keyPressEvent(self, event):
+        """Handle Escape key to hide dialog."""
+        if event.key() == Qt.Key.Key_Escape:
+            self.hide()
+        else:
+            super().keyPressEvent(event)
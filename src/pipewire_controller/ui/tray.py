@@ -1,38 +1,162 @@
 """System tray application UI."""
 
+import asyncio
 import sys
+import time
+from collections import deque
 from pathlib import Path
+from typing import Dict, Optional
 from PyQt6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
 from PyQt6.QtGui import QIcon, QAction
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QTimer, pyqtSignal
 
-from ..core.pipewire import PipeWireController
-from ..core.hardware import HardwareDetector
-from ..engine import PipewireEngine
+from ..async_engine import AsyncPipewireEngine
+from ..autotune import QuantumTuner
+from ..backend import create_backend
+from ..capabilities import PROCESSING_FORMAT, SINK, detect_conversion
+from ..dump import COMMON_RATES
+from ..engine import PipewireEngine, latency_quantum, native_rate_settings
+from ..follower import RateFollower
+from ..graph import GraphEventType
+from ..guard import FAILED, Probation
+from ..profiler import HEALTH_BUSY, HEALTH_OK, HEALTH_XRUNS, health
+from ..runner import RUNNER
+from ..scheduler import WriteScheduler
+from ..spa import bit_depth, format_family
+from ..sweep import QuantumSweep, SweepStore
+from ..utils.cache import CapabilityCache
 from ..utils.config import Config
 from ..utils.process import ProcessManager
-from .dialogs import AboutDialog
+from ..utils.wireplumber import write_format_rules
+from .async_bridge import AsyncBridge
+from .dialogs import AboutDialog, DiagnosticsDialog
+from .worker import EngineExecutor, ResponsivenessMonitor
 
 
 class TrayApplication(QApplication):
     """Main system tray application."""
 
     BUFFER_SIZES = [32, 64, 128, 256, 512, 1024, 2048]
+    # Milliseconds offered by "Target Latency"
+    TARGET_LATENCIES = [1, 2, 3, 5, 10, 20, 40]
+    
+    # Saved setting -> settings metadata key it is applied to
+    METADATA_KEYS = {
+        "samplerate": "clock.force-rate", "buffer_size": "clock.force-quantum",
+        "min_quantum": "clock.min-quantum", "max_quantum": "clock.max-quantum",
+    }
+    
+    # Submenu -> saved setting its actions choose
+    SUBMENU_KEYS = {
+        "Sample Rate": "samplerate", "Buffer Size": "buffer_size",
+        "Min Buffer Size": "min_quantum", "Max Buffer Size": "max_quantum",
+    }
+
+    # Theme icons shown instead of the application icon while the graph struggles
+    HEALTH_ICONS = {HEALTH_BUSY: "dialog-warning", HEALTH_XRUNS: "dialog-error"}
+
+    # Emitted from the settings monitor thread, delivered on the GUI thread
+    setting_changed = pyqtSignal(str, object)
+    # Emitted from the load profiler thread after every pw-top refresh
+    load_updated = pyqtSignal()
+    # Emitted from the sweep thread with each measured ``SweepStep``
+    sweep_progress = pyqtSignal(object)
+    # Emitted from the graph mirror thread with each ``GraphEvent``
+    graph_changed = pyqtSignal(object)
+    # Emitted once a probation ends with its ``GuardResult`` and ``Probation``
+    probation_judged = pyqtSignal(object, object)
+
+    def __init__(self, argv, started: Optional[float] = None):
+        """
+        Show the tray icon, then start everything that talks to PipeWire.
 
-    def __init__(self, argv):
+        Args:
+            argv: Command line arguments
+            started: ``time.monotonic()`` at process start, for the startup
+                timings (defaults to now)
+        """
         super().__init__(argv)
+        self.started = time.monotonic() if started is None else started
+        # Seconds from start to "icon", "probe" and "ready"
+        self.startup_times: Dict[str, float] = {}
         
         self.config = Config()
         self.settings = self.config.load()
         
-        # Use engine for all PipeWire operations
-        self.engine = PipewireEngine()
+        # The menu starts from what the last run learned about the hardware
+        state = self.config.load_state()
+        self.supported_rates = state.get("rates") or list(COMMON_RATES)
+        
+        # Known devices are not probed again (see "Re-probe Hardware")
+        self.cache = CapabilityCache()
+        
+        # Probed devices and the default sink, for conversion checks
+        self.hardware = None
+        self.sink = None
+        # Rates the default sink, and every active output together, play
+        # without resampling; kept current from the engine
+        self.sink_rates = frozenset()
+        self.common_rates = frozenset()
+        
+        # Busiest driver's DSP load and xruns (see ``profiler.LoadMonitor.summary``)
+        self.load = None
+        self.health = HEALTH_OK
+        # Settings metadata as PipeWire last reported it: the limits in effect
+        self.metadata = {}
+        self.icon = QIcon()
+        
+        # Adapts the buffer size to the load while "Auto-tune Buffer Size" is on
+        self.tuner = QuantumTuner(floor=self.settings["autotune_floor"],
+                                  ceiling=self.settings["autotune_ceiling"])
+        self.tuner.reset(self.settings["buffer_size"])
         
-        # Get hardware-supported sample rates
-        self.supported_rates = self.engine.get_supported_sample_rates()
+        # Switches the rate to the playing streams' while "Follow Source Rate" is on;
+        # polled as well as woken by graph events, since streams only count once
+        # they have played for a while
+        self.follower = RateFollower()
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self._follow_source)
         
-        # Apply saved settings
-        self._apply_settings()
+        # "Find Best Latency" runs on its own thread so menu actions are not held up;
+        # results are kept per device and rate
+        self.sweeps = SweepStore(self.config.sweep_file)
+        self.sweep = None
+        self.sweep_step = None
+        self.last_sweep = None
+        self.sweep_executor = EngineExecutor(self)
+        self.sweep_progress.connect(self._on_sweep_step)
+        self.aboutToQuit.connect(self._abort_sweep)
+        self.aboutToQuit.connect(self.sweep_executor.wait)
+        
+        # Until the background stage connects, the engine runs the command line tools
+        self.engine = PipewireEngine(cache=self.cache)
+        self.async_engine = AsyncPipewireEngine(engine=self.engine)
+        self.aboutToQuit.connect(lambda: self.engine.backend.close())
+        
+        # Asyncio loop for the startup queries
+        self.bridge = AsyncBridge(self)
+        self.aboutToQuit.connect(self.bridge.stop)
+        
+        # Menu actions run on a worker thread; values being applied are pending
+        self.executor = EngineExecutor(self)
+        self.pending = {}
+        self.aboutToQuit.connect(self.executor.wait)
+        
+        # Bursts of menu clicks become one write of the final values
+        self.scheduler = WriteScheduler()
+        # (latency, silence) in seconds of the switches confirmed by the driver
+        self.switches = deque(maxlen=100)
+        # Values and settings before the change, per ``Probation`` still running;
+        # judged from the profiler's refreshes so the worker is not held meanwhile
+        self.probations = {}
+        self.probation_judged.connect(self._on_probation_judged)
+        self.write_timer = QTimer(self)
+        self.write_timer.setSingleShot(True)
+        self.write_timer.timeout.connect(self._flush_writes)
+        
+        # Measures how long the event loop is ever kept busy
+        self.responsiveness = ResponsivenessMonitor(self)
+        self.responsiveness.start()
         
         # Setup tray icon
         self.tray_icon = QSystemTrayIcon()
@@ -40,14 +164,49 @@ class TrayApplication(QApplication):
         self.tray_icon.setContextMenu(self._create_menu())
         self.tray_icon.activated.connect(self._on_tray_activated)
         self.tray_icon.show()
+        self.startup_times["icon"] = time.monotonic() - self.started
         
         self.about_dialog = None
+        self.diagnostics_dialog = None
+        
+        # Kept for ``pipewire-controller --stats``
+        self.aboutToQuit.connect(lambda: RUNNER.save(self.config.stats_file))
+        
+        # Follow clock changes made by other tools; connected now so no
+        # change is missed, started once the icon is up
+        self.setting_changed.connect(self._on_setting_changed)
+        self.engine.subscribe(self.setting_changed.emit)
+        self.aboutToQuit.connect(self.engine.stop_monitor)
+        self.load_updated.connect(self._on_load_updated)
+        self.engine.subscribe_load(self.load_updated.emit)
+        self.aboutToQuit.connect(self.engine.stop_profiler)
+        self.graph_changed.connect(self._on_graph_changed)
+        self.engine.subscribe_graph(self.graph_changed.emit)
+        self.aboutToQuit.connect(self.engine.stop_graph_mirror)
+        
+        # Connect, probe hardware and apply saved settings without blocking the event loop
+        self.startup = None
+        self.reprobing = None
+        QTimer.singleShot(0, self._start_background)
         
         # Keep event loop alive
         self.timer = QTimer()
         self.timer.timeout.connect(lambda: None)
         self.timer.start(1000)
 
+    @property
+    def time_to_icon(self) -> float:
+        """Seconds from start until the tray icon was shown."""
+        return self.startup_times["icon"]
+
+    def _start_background(self):
+        """Second startup stage, run once the icon is on screen."""
+        self.engine.start_monitor()
+        self.engine.start_profiler()
+        if self.settings["follow_source"]:
+            self._start_following()
+        self.startup = self.bridge.spawn(self._startup())
+
     def _setup_icon(self):
         """Setup tray icon with fallback."""
         icon_paths = [
@@ -57,10 +216,11 @@ class TrayApplication(QApplication):
         
         for path in icon_paths:
             if path.exists():
-                self.tray_icon.setIcon(QIcon(str(path)))
+                self.icon = QIcon(str(path))
                 break
         else:
-            self.tray_icon.setIcon(QIcon.fromTheme("audio-card"))
+            self.icon = QIcon.fromTheme("audio-card")
+        self.tray_icon.setIcon(self.icon)
         
         self._update_tooltip()
 
@@ -70,24 +230,87 @@ class TrayApplication(QApplication):
         
         # Sample rate submenu
         rate_menu = QMenu("Sample Rate", menu)
-        for rate in self.supported_rates:
-            action = QAction(f"{rate} Hz", rate_menu, checkable=True)
-            action.setChecked(rate == self.settings["samplerate"])
-            action.triggered.connect(lambda checked, r=rate: self._change_sample_rate(r))
-            rate_menu.addAction(action)
+        self._fill_rate_menu(rate_menu)
         menu.addMenu(rate_menu)
         
         # Buffer size submenu
         buffer_menu = QMenu("Buffer Size", menu)
         for size in self.BUFFER_SIZES:
             action = QAction(f"{size}", buffer_menu, checkable=True)
-            action.setChecked(size == self.settings["buffer_size"])
+            action.setData(size)
             action.triggered.connect(lambda checked, s=size: self._change_buffer_size(s))
             buffer_menu.addAction(action)
         menu.addMenu(buffer_menu)
         
+        # Buffer size chosen for a latency in milliseconds at the active rate
+        latency_menu = QMenu("Target Latency", menu)
+        for ms in [0] + self.TARGET_LATENCIES:
+            action = QAction(f"{ms} ms" if ms else "Off", latency_menu, checkable=True)
+            action.setData(ms)
+            action.triggered.connect(lambda checked, m=ms: self._set_latency_target(m))
+            latency_menu.addAction(action)
+        menu.addMenu(latency_menu)
+        
+        # Bounds on the buffer size PipeWire picks while none is forced
+        for title in ("Min Buffer Size", "Max Buffer Size"):
+            bound_menu = QMenu(title, menu)
+            key = self.SUBMENU_KEYS[title]
+            for size in [0] + self.BUFFER_SIZES:
+                action = QAction(f"{size}", bound_menu, checkable=True)
+                action.setData(size)
+                action.triggered.connect(
+                    lambda checked, k=key, s=size: self._set_quantum_bound(k, s)
+                )
+                bound_menu.addAction(action)
+            menu.addMenu(bound_menu)
+        
+        # Let xruns and DSP load choose the buffer size
+        autotune_action = QAction("Auto-tune Buffer Size", menu, checkable=True)
+        autotune_action.triggered.connect(self._set_autotune)
+        menu.addAction(autotune_action)
+        
+        # Let PipeWire switch between the supported rates by itself
+        native_action = QAction("Native Rate Switching", menu, checkable=True)
+        native_action.triggered.connect(self._set_native_rates)
+        menu.addAction(native_action)
+        
+        # Let the playing streams choose the sample rate
+        follow_action = QAction("Follow Source Rate", menu, checkable=True)
+        follow_action.triggered.connect(self._set_follow_source)
+        menu.addAction(follow_action)
+        
+        # Revert changes that cause xruns (see guard.Probation)
+        safe_action = QAction("Safe Apply", menu, checkable=True)
+        safe_action.triggered.connect(self._set_safe_apply)
+        menu.addAction(safe_action)
+        
+        # Measure every buffer size, and apply what the last measurement found
+        self.sweep_action = QAction("Find Best Latency", menu)
+        self.sweep_action.triggered.connect(self._toggle_sweep)
+        menu.addAction(self.sweep_action)
+        self.best_action = QAction("Apply Best Latency", menu)
+        self.best_action.triggered.connect(self._apply_best_latency)
+        menu.addAction(self.best_action)
+        
+        # Sample format the default sink is opened with
+        format_menu = QMenu("Sink Format", menu)
+        self._fill_format_menu(format_menu)
+        menu.addMenu(format_menu)
+        
+        self._update_menu(menu)
+        
         menu.addSeparator()
         
+        # Forget cached capabilities and enumerate every device again
+        reprobe_action = QAction("Re-probe Hardware", menu)
+        reprobe_action.triggered.connect(self._reprobe)
+        menu.addAction(reprobe_action)
+        
+        # Command latencies, event loop lag and write counters
+        diagnostics_action = QAction("Diagnostics", menu)
+        diagnostics_action.triggered.connect(self._show_diagnostics)
+        menu.addAction(diagnostics_action)
+        
         # About
         about_action = QAction("About", menu)
         about_action.triggered.connect(self._show_about)
@@ -100,50 +323,689 @@ class TrayApplication(QApplication):
         
         return menu
 
+    def _fill_rate_menu(self, rate_menu):
+        """Add one action per supported rate."""
+        for rate in self.supported_rates:
+            action = QAction(f"{rate} Hz", rate_menu, checkable=True)
+            action.setData(rate)
+            action.triggered.connect(lambda checked, r=rate: self._change_sample_rate(r))
+            rate_menu.addAction(action)
+
+    def _fill_format_menu(self, format_menu):
+        """Add the formats of the default sink, deepest first."""
+        if self.sink is None or not self.sink.formats:
+            action = QAction("Unknown until probed", format_menu)
+            action.setEnabled(False)
+            format_menu.addAction(action)
+            return
+        formats = sorted(self.sink.formats, key=lambda f: (-bit_depth(f), f))
+        for fmt in [None] + formats:
+            action = QAction(fmt or "Automatic", format_menu, checkable=True)
+            action.setData(fmt)
+            action.triggered.connect(lambda checked, f=fmt: self._change_sink_format(f))
+            format_menu.addAction(action)
+
+    def _set_hardware(self, graph, device_info):
+        """Take the probed devices and find the default sink among them."""
+        self.hardware = graph
+        self.sink = graph.sink_for(device_info) if graph and device_info else None
+        self.sink_rates = self.sink.rates if self.sink is not None else frozenset()
+        self.common_rates = graph.common_rates(SINK) if graph else frozenset()
+        for action in self.tray_icon.contextMenu().actions():
+            if action.menu() and action.text() == "Sink Format":
+                action.menu().clear()
+                self._fill_format_menu(action.menu())
+        self._update_menu()
+        self._update_tooltip()
+
+    def _refresh_sink_rates(self):
+        """Ask the engine again which rates play without resampling."""
+        sink = self.sink.name if self.sink is not None else None
+        
+        def job():
+            sink_rates = self.engine.get_node_rates(sink) if sink else []
+            return frozenset(sink_rates), frozenset(self.engine.get_common_rates(SINK))
+        
+        self.executor.submit("common_rates", job, on_result=self._on_sink_rates)
+
+    def _on_sink_rates(self, rates):
+        """Take the rates of ``_refresh_sink_rates`` (GUI thread)."""
+        self.sink_rates, self.common_rates = rates
+        self._update_menu()
+
+    def _unresampled_rates(self):
+        """Rates the default sink plays natively, narrowed to those every active output plays."""
+        if not self.common_rates:
+            return self.sink_rates
+        if not self.sink_rates:
+            return self.common_rates
+        return self.sink_rates & self.common_rates
+
+    def _conversion(self):
+        """Per-cycle conversion for the default sink at the shown rate, if known."""
+        if self.sink is None:
+            return None
+        rate = self._active_rate()
+        forced = self.settings["sink_formats"].get(self.sink.name)
+        return detect_conversion(self.hardware.capabilities, self.sink.id, rate, forced)
+
+    def _set_supported_rates(self, rates):
+        """Replace the rate actions in the existing menu."""
+        self.supported_rates = rates
+        for action in self.tray_icon.contextMenu().actions():
+            if action.menu() and action.text() == "Sample Rate":
+                action.menu().clear()
+                self._fill_rate_menu(action.menu())
+        self._update_menu()
+
     def _change_sample_rate(self, rate: int):
-        """Change sample rate and update UI."""
-        if self.engine.set_sample_rate(rate):
-            self.settings["samplerate"] = rate
-            self.config.save(self.settings)
-            self._update_menu()
-            self._update_tooltip()
+        """Change sample rate in the background and show it as pending."""
+        # A rate picked by hand ends following the streams or PipeWire's choice
+        if self.settings["follow_source"]:
+            self._set_follow_source(False)
+        if self.settings["native_rates"]:
+            self._set_native_rates(False)
+        self._submit_change("samplerate", rate)
 
     def _change_buffer_size(self, size: int):
-        """Change buffer size and update UI."""
-        if self.engine.set_buffer_size(size):
-            self.settings["buffer_size"] = size
-            self.config.save(self.settings)
-            self._update_menu()
+        """Change buffer size in the background and show it as pending."""
+        # A size picked by hand ends auto-tuning and the latency target
+        if self.settings["autotune"]:
+            self._set_autotune(False)
+        if self.settings["latency_target"]:
+            self._set_latency_target(0)
+        self._submit_change("buffer_size", size)
+
+    def _set_autotune(self, enabled: bool):
+        """Turn auto-tuning of the buffer size on or off."""
+        self.settings["autotune"] = enabled
+        self.tuner.reset(self.pending.get("buffer_size", self.settings["buffer_size"]))
+        # Both choose the buffer size
+        if enabled and self.settings["latency_target"]:
+            self._set_latency_target(0)
+        self._update_menu()
+        self._update_tooltip()
+        self.executor.submit(
+            "autotune", lambda: self.config.save(dict(self.config.load(), autotune=enabled))
+        )
+
+    def _set_follow_source(self, enabled: bool):
+        """Turn following the rate of the playing streams on or off."""
+        self.settings["follow_source"] = enabled
+        self.follower.reset()
+        # Following forces the rate
+        if enabled and self.settings["native_rates"]:
+            self._set_native_rates(False)
+        if enabled:
+            self._start_following()
+        else:
+            self.follow_timer.stop()
+            self.executor.submit("graph_mirror", self.engine.stop_graph_mirror)
+        self._update_menu()
+        self._update_tooltip()
+        self.executor.submit(
+            "follow_source",
+            lambda: self.config.save(dict(self.config.load(), follow_source=enabled))
+        )
+
+    def _start_following(self):
+        """Mirror the graph to see the streams, and check them periodically."""
+        self.executor.submit("graph_mirror", self.engine.start_graph_mirror)
+        self.follow_timer.start(int(self.follower.hold * 1000 / 2))
+
+    def _on_graph_changed(self, event):
+        """Re-check the source rate, or the native rates when a device node changed."""
+        if event.type == GraphEventType.STREAM_CHANGED:
+            self._follow_source()
+        elif event.type in (GraphEventType.NODE_ADDED, GraphEventType.NODE_REMOVED,
+                            GraphEventType.PARAMS_CHANGED):
+            self._refresh_sink_rates()
+
+    def _follow_source(self):
+        """Switch to the rate of the playing streams once it has settled."""
+        mirror = self.engine.graph
+        # Until startup is done the saved rate is still to be applied, and a
+        # sweep must measure at one rate
+        if (not self.settings["follow_source"] or mirror is None or self.sweep is not None
+                or "ready" not in self.startup_times):
+            return
+        # Rates the outputs open at natively, else every rate the hardware has
+        supported = self._unresampled_rates() or self.supported_rates
+        source = self.follower.source
+        rate = self.follower.update(mirror.playback_streams(), supported,
+                                    self.pending.get("samplerate", self.settings["samplerate"]))
+        if rate is not None:
+            self._submit_change("samplerate", rate)
+        elif self.follower.source != source:
             self._update_tooltip()
 
-    def _update_menu(self):
-        """Update menu checkmarks."""
-        menu = self.tray_icon.contextMenu()
+    def _set_native_rates(self, enabled: bool):
+        """Allow the supported rates and stop forcing one, or force the chosen rate again."""
+        self.settings["native_rates"] = enabled
+        if enabled:
+            if self.settings["follow_source"]:
+                self._set_follow_source(False)
+            self._write_native_rates()
+        else:
+            self._submit_change("samplerate", self.settings["samplerate"])
+        self._update_menu()
+        self._update_tooltip()
+        self.executor.submit(
+            "native_rates",
+            lambda: self.config.save(dict(self.config.load(), native_rates=enabled))
+        )
+
+    def _write_native_rates(self):
+        """Allow the detected rates and clear the forced rate on the worker thread."""
+        rates = self.supported_rates
+        
+        def done(result):
+            if result.results.get("clock.force-rate"):
+                self.scheduler.confirm("clock.force-rate", 0, written=True)
+        
+        self.executor.submit("native_rates", lambda: self.engine.set_allowed_rates(rates),
+                             on_result=done)
+
+    def _set_quantum_bound(self, key: str, size: int):
+        """Write both buffer size bounds on the worker thread; a crossed pair moves together."""
+        bounds = {name: self.pending.get(name, self.settings[name])
+                  for name in ("min_quantum", "max_quantum")}
+        bounds[key] = size
+        if size and bounds["min_quantum"] and bounds["max_quantum"] \
+                and bounds["min_quantum"] > bounds["max_quantum"]:
+            other = "max_quantum" if key == "min_quantum" else "min_quantum"
+            bounds[other] = size
+        batch = {self.METADATA_KEYS[name]: value for name, value in bounds.items()}
+        self.pending.update(bounds)
+        
+        def job():
+            result = self.engine.set_quantum_limits(bounds["min_quantum"], bounds["max_quantum"])
+            if result.ok:
+                self.config.save(dict(self.config.load(), **bounds))
+            return result
+        
+        self.executor.submit(
+            "quantum_limits", job,
+            on_result=lambda result: self._on_writes_done(batch, result.results),
+            on_error=lambda error: self._on_writes_done(batch, {}),
+        )
+        # The bounds move the buffer size of the latency target
+        self._retarget()
+        self._update_menu()
+        self._update_tooltip()
+
+    def _active_rate(self) -> int:
+        """Rate being applied or forced, else the one the driver runs at."""
+        if "samplerate" in self.pending or not self.settings["native_rates"]:
+            return self.pending.get("samplerate", self.settings["samplerate"])
+        return self._effective().get("samplerate") or self.settings["samplerate"]
+
+    def _effective(self) -> Dict[str, int]:
+        """
+        Values in effect per setting: the busiest running driver's rate and
+        quantum (while the profiler reports one), and the quantum bounds in
+        the settings metadata.
+        """
+        effective = {}
+        for key, meta in (("min_quantum", "clock.min-quantum"),
+                          ("max_quantum", "clock.max-quantum")):
+            if isinstance(self.metadata.get(meta), int):
+                effective[key] = self.metadata[meta]
+        if self.load is not None and self.load.get("status") == "R":
+            effective["samplerate"] = self.load["rate"]
+            effective["buffer_size"] = self.load["quantum"]
+        return effective
+
+    def _set_latency_target(self, ms: float):
+        """Keep the buffer size at ``ms`` milliseconds across rate changes (0: off)."""
+        self.settings["latency_target"] = ms
+        if ms and self.settings["autotune"]:
+            self._set_autotune(False)
+        self._retarget()
+        self._update_menu()
+        self._update_tooltip()
+        self.executor.submit(
+            "latency_target",
+            lambda: self.config.save(dict(self.config.load(), latency_target=ms))
+        )
+
+    def _quantum_bounds(self):
+        """Smallest and largest buffer size PipeWire allows, as chosen or in effect."""
+        effective = self._effective()
+        return [self.pending.get(key, self.settings[key]) or effective.get(key) or default
+                for key, default in (("min_quantum", 32), ("max_quantum", 2048))]
+
+    def _target_quantum(self, ms: float) -> int:
+        """Buffer size closest to ``ms`` milliseconds at the active rate."""
+        return latency_quantum(ms, self._active_rate(), *self._quantum_bounds())
+
+    def _retarget(self):
+        """Request the buffer size of the latency target for the active rate."""
+        ms = self.settings["latency_target"]
+        # A running sweep sets the buffer size itself
+        if not ms or self.sweep is not None:
+            return
+        quantum = self._target_quantum(ms)
+        if quantum != self.pending.get("buffer_size", self.settings["buffer_size"]):
+            self._submit_change("buffer_size", quantum)
+
+    def _latency_ms(self) -> float:
+        """Latency of one cycle: the running driver's, else that of the values shown."""
+        effective = self._effective()
+        rate = effective.get("samplerate") or self._active_rate()
+        quantum = effective.get("buffer_size") \
+            or self.pending.get("buffer_size", self.settings["buffer_size"])
+        return quantum / rate * 1000
+
+    def _set_safe_apply(self, enabled: bool):
+        """Turn probation of rate and buffer size changes on or off."""
+        self.settings["safe_apply"] = enabled
+        self._update_menu()
+        self.executor.submit(
+            "safe_apply", lambda: self.config.save(dict(self.config.load(), safe_apply=enabled))
+        )
+
+    def _sweep_device(self) -> str:
+        """Name sweep results are stored under: the default sink."""
+        return self.sink.name if self.sink is not None else "default"
+
+    def _best_latency(self):
+        """Saved sweep of the default sink at the current rate, if it has a recommendation."""
+        result = self.sweeps.get(self._sweep_device(), self._active_rate())
+        return result if result is not None and result.recommended else None
+
+    def _toggle_sweep(self):
+        """Start a quantum sweep, or abort the running one."""
+        if self.sweep is not None:
+            self.sweep.abort()
+            return
+        self.sweep = QuantumSweep(self.engine)
+        self.sweep_step = None
+        device = self._sweep_device()
+        self.sweep_executor.submit(
+            "sweep", lambda: self.sweep.run(device, on_step=self.sweep_progress.emit),
+            on_result=self._on_sweep_done,
+            on_error=lambda error: self._on_sweep_done(None),
+        )
+        self._update_menu()
+        self._update_tooltip()
+
+    def _abort_sweep(self):
+        """Abort a running sweep; it restores the settings before it returns."""
+        if self.sweep is not None:
+            self.sweep.abort()
+
+    def _on_sweep_step(self, step):
+        """Show the quantum just measured."""
+        self.sweep_step = step
+        self._update_tooltip()
+
+    def _on_sweep_done(self, result):
+        """Keep a completed sweep and report the recommendation."""
+        self.sweep = None
+        self.sweep_step = None
+        self.last_sweep = result
+        if result is None or result.aborted:
+            message = "Sweep aborted; the buffer size was restored."
+        elif result.recommended is None:
+            message = "No buffer size ran without xruns."
+        else:
+            step = next(s for s in result.steps if s.quantum == result.recommended)
+            message = (f"Recommended buffer size: {step.quantum} samples "
+                       f"({step.latency_ms:.1f} ms). Use \"Apply Best Latency\".")
+        if result is not None and not result.aborted:
+            self.sweeps.put(result)
+        self.tray_icon.showMessage("Find Best Latency", message)
+        self._update_menu()
+        self._update_tooltip()
+
+    def _apply_best_latency(self):
+        """Apply the buffer size recommended by the last sweep of this device and rate."""
+        result = self._best_latency()
+        if result is not None:
+            self._change_buffer_size(result.recommended)
+
+    def _autotune(self):
+        """Let the tuner judge the latest load and apply what it decides."""
+        decision = self.tuner.update(self.load)
+        if decision is None:
+            return
+        self._submit_change("buffer_size", decision.new)
+        line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {decision.describe()}"
+        self.executor.submit("autotune_log", lambda: self.config.append_autotune_log(line))
+
+    def _change_sink_format(self, fmt: Optional[str]):
+        """Open the default sink with a format (None: let PipeWire choose)."""
+        formats = dict(self.settings["sink_formats"])
+        if fmt is None:
+            formats.pop(self.sink.name, None)
+        else:
+            formats[self.sink.name] = fmt
+        self.settings["sink_formats"] = formats
+        self._update_menu()
+        self._update_tooltip()
+        
+        def job():
+            if not write_format_rules(formats):
+                return False
+            return self.config.save(dict(self.config.load(), sink_formats=formats))
+        
+        def done(ok):
+            if ok:
+                self.tray_icon.showMessage(
+                    "Sink Format", "Takes effect when WirePlumber is restarted."
+                )
+        
+        self.executor.submit("sink_format", job, on_result=done)
+
+    def _submit_change(self, key: str, value: int):
+        """Queue a setting change; it is written once the burst of clicks ends."""
+        if self.scheduler.request(self.METADATA_KEYS[key], value):
+            self.pending[key] = value
+            self.write_timer.start(int(self.scheduler.delay() * 1000))
+        else:
+            # Back to the value PipeWire already has
+            self.pending.pop(key, None)
+        # A new rate or bound moves the buffer size of the latency target
+        if key != "buffer_size":
+            self._retarget()
+        self._update_menu()
+        self._update_tooltip()
+
+    def _flush_writes(self):
+        """Write the coalesced batch on the worker thread; the config once it is kept."""
+        batch = self.scheduler.take()
+        if not batch:
+            return
+        names = {meta: key for key, meta in self.METADATA_KEYS.items()}
+        values = {names[meta]: value for meta, value in batch.items()}
+        before = {key: self.settings[key] for key in self.METADATA_KEYS}
+        # Auto-tune watches xruns itself
+        guarded = self.settings["safe_apply"] and not self.settings["autotune"]
+        probation = Probation(window=self.settings["probation_window"],
+                              max_rate=self.settings["probation_max_xruns"])
+        
+        if guarded:
+            self.probations[probation] = (values, before)
+        
+        def job():
+            if guarded:
+                return self.engine.start_guarded(
+                    batch, probation, lambda guard: self.probation_judged.emit(guard, probation)
+                )
+            # Still shown as being applied until the driver runs with it
+            guard = self.engine.apply_and_wait(batch)
+            if guard.applied.ok:
+                # Re-read so batches still in flight are not overwritten
+                self.config.save(dict(self.config.load(), **values))
+            return guard
+        
+        def done(guard):
+            if not guarded and guard.confirmed:
+                self.switches.append((guard.latency, guard.silence))
+            self._on_writes_done(batch, guard.applied.results)
+        
+        def failed(error):
+            self.probations.pop(probation, None)
+            self._on_writes_done(batch, {})
+        
+        self.executor.submit("settings", job, on_result=done, on_error=failed)
+
+    def _on_probation_judged(self, guard, probation):
+        """Save a change that passed probation, or show the values reverted to."""
+        values, before = self.probations.pop(probation)
+        if guard.verdict == FAILED:
+            self._on_probation_failed(guard, before, probation)
+        elif guard.passed:
+            self.executor.submit(
+                "settings", lambda: self.config.save(dict(self.config.load(), **values))
+            )
+
+    def _on_probation_failed(self, guard, before, probation):
+        """Show the settings the engine reverted to and tell the user why."""
+        names = {meta: key for key, meta in self.METADATA_KEYS.items()}
+        for meta, value in guard.previous.items():
+            key = names[meta]
+            self.scheduler.confirm(meta, value, written=True)
+            # An unforced value leaves the one shown before the change
+            self.settings[key] = value or before[key]
+        # The target would only ask for the failed buffer size again
+        if self.settings["latency_target"]:
+            self._set_latency_target(0)
+        self._update_menu()
+        self._update_tooltip()
+        if guard.reverted:
+            message = (f"{guard.xruns} xruns within {probation.window:.0f} s; reverted to "
+                       f"{self.settings['samplerate']} Hz @ {self.settings['buffer_size']} "
+                       f"samples.")
+        else:
+            message = f"{guard.xruns} xruns within {probation.window:.0f} s; reverting failed."
+        self.tray_icon.showMessage("Safe Apply", message,
+                                   QSystemTrayIcon.MessageIcon.Warning)
+
+    def _on_writes_done(self, batch, results):
+        """Apply a finished batch to the UI (GUI thread)."""
+        queued = self.scheduler.pending
+        names = {meta: key for key, meta in self.METADATA_KEYS.items()}
+        for meta, value in batch.items():
+            key = names[meta]
+            if results.get(meta):
+                self.scheduler.confirm(meta, value, written=True)
+                self.settings[key] = value
+            else:
+                self.scheduler.reject(meta)
+            if self.pending.get(key) == value and meta not in queued:
+                del self.pending[key]
+        self._update_menu()
+        self._update_tooltip()
+
+    def _update_menu(self, menu=None):
+        """Update menu checkmarks and mark values still being applied."""
+        menu = menu or self.tray_icon.contextMenu()
+        sink_rates = self._unresampled_rates()
+        effective = self._effective()
         for action in menu.actions():
             submenu = action.menu()
-            if submenu:
-                for sub_action in submenu.actions():
-                    if action.text() == "Sample Rate":
-                        sub_action.setChecked(
-                            sub_action.text() == f"{self.settings['samplerate']} Hz"
-                        )
-                    elif action.text() == "Buffer Size":
-                        sub_action.setChecked(
-                            sub_action.text() == str(self.settings["buffer_size"])
-                        )
+            if action.text() == "Auto-tune Buffer Size":
+                action.setChecked(self.settings["autotune"])
+            elif action.text() == "Native Rate Switching":
+                action.setChecked(self.settings["native_rates"])
+            elif action.text() == "Follow Source Rate":
+                action.setChecked(self.settings["follow_source"])
+            elif action.text() == "Safe Apply":
+                action.setChecked(self.settings["safe_apply"])
+            elif action is self.sweep_action:
+                action.setText("Abort Latency Sweep" if self.sweep is not None
+                               else "Find Best Latency")
+            elif action is self.best_action:
+                best = self._best_latency()
+                action.setEnabled(best is not None and self.sweep is None)
+                action.setText(f"Apply Best Latency ({best.recommended})" if best is not None
+                               else "Apply Best Latency")
+            if submenu and action.text() == "Sink Format":
+                self._update_format_menu(submenu)
+            elif submenu and action.text() == "Target Latency":
+                self._update_latency_menu(submenu)
+            key = self.SUBMENU_KEYS.get(action.text())
+            if not submenu or key is None:
+                continue
+            pending = self.pending.get(key)
+            # With native switching no rate is forced
+            forced = None if key == "samplerate" and self.settings["native_rates"] \
+                else self.settings[key]
+            for sub_action in submenu.actions():
+                value = sub_action.data()
+                if key == "samplerate":
+                    label = f"{value} Hz"
+                else:
+                    label = f"{value}" if value else "PipeWire Default"
+                if key == "samplerate" and sink_rates and value not in sink_rates:
+                    label += " (resampled)"
+                if value and value == effective.get(key):
+                    label += " (active)"
+                if value == pending:
+                    label += " (applying…)"
+                sub_action.setText(label)
+                sub_action.setChecked(value == forced)
+
+    def _update_latency_menu(self, submenu):
+        """Check the latency target and show the buffer size each gives at the active rate."""
+        for sub_action in submenu.actions():
+            ms = sub_action.data()
+            if ms:
+                sub_action.setText(f"{ms} ms ({self._target_quantum(ms)} samples)")
+            sub_action.setChecked(ms == self.settings["latency_target"])
+
+    def _update_format_menu(self, submenu):
+        """Check the chosen sink format and mark those needing no conversion."""
+        if self.sink is None:
+            return
+        chosen = self.settings["sink_formats"].get(self.sink.name)
+        for sub_action in submenu.actions():
+            fmt = sub_action.data()
+            if fmt is None:
+                sub_action.setChecked(chosen is None)
+                continue
+            label = fmt
+            if format_family(fmt) == PROCESSING_FORMAT:
+                label += " (no conversion)"
+            sub_action.setText(label)
+            sub_action.setChecked(fmt == chosen)
 
     def _update_tooltip(self):
         """Update tooltip with current settings."""
-        tooltip = (
-            f"PipeWire Controller\n"
-            f"{self.settings['samplerate']} Hz @ {self.settings['buffer_size']} samples"
-        )
+        rate = (f"Native rate ({self._effective().get('samplerate', '?')} Hz)"
+                if self.settings["native_rates"] else f"{self.settings['samplerate']} Hz")
+        tooltip = f"PipeWire Controller\n{rate} @ {self.settings['buffer_size']} samples"
+        tooltip += f"\nLatency {self._latency_ms():.1f} ms"
+        if self.settings["latency_target"]:
+            tooltip += f" (target {self.settings['latency_target']} ms)"
+        if self.pending:
+            rate = self.pending.get("samplerate", self.settings["samplerate"])
+            size = self.pending.get("buffer_size", self.settings["buffer_size"])
+            tooltip += f"\nApplying {rate} Hz @ {size} samples…"
+        if self.sweep is not None:
+            measured = f", {self.sweep_step.quantum} measured" if self.sweep_step else ""
+            tooltip += f"\nFinding best latency{measured}…"
+        if self.settings["autotune"]:
+            tooltip += (f"\nBuffer size auto-tuned ({self.tuner.floor}-"
+                        f"{self.tuner.ceiling} samples)")
+        if self.settings["follow_source"]:
+            tooltip += (f"\nFollowing {self.follower.source} ({self.follower.dominant} Hz)"
+                        if self.follower.source else "\nFollowing the source rate")
+        conversion = self._conversion()
+        if conversion is not None and conversion.needed:
+            tooltip += f"\nConverting {conversion.describe()}"
+        if self.load is not None:
+            tooltip += (
+                f"\nDSP load {self.load['load_p50']:.0%} (p95 {self.load['load_p95']:.0%}, "
+                f"p99 {self.load['load_p99']:.0%})"
+                f"\nXruns: {self.load['xruns_window']} in {self._load_window():.0f} s "
+                f"({self.load['xrun_rate']:.1f}/min)"
+            )
         self.tray_icon.setToolTip(tooltip)
 
-    def _apply_settings(self):
+    def _load_window(self) -> float:
+        """Seconds over which the xruns in the tooltip are counted."""
+        profiler = self.engine.profiler
+        return profiler.window if profiler is not None else 0.0
+
+    def _on_load_updated(self):
+        """Show the latest DSP load and switch the icon when the graph's health changes."""
+        profiler = self.engine.profiler
+        before = self._effective()
+        self.load = profiler.summary() if profiler is not None else None
+        if self._effective() != before:
+            # PipeWire switched the rate itself
+            if self.settings["native_rates"] and \
+                    self._effective().get("samplerate") != before.get("samplerate"):
+                self._retarget()
+            self._update_menu()
+        state = health(self.load)
+        if state != self.health:
+            self.health = state
+            name = self.HEALTH_ICONS.get(state)
+            self.tray_icon.setIcon(QIcon.fromTheme(name, self.icon) if name else self.icon)
+        # A running sweep sets the buffer size itself, and until startup is done
+        # the saved buffer size is still to be applied
+        if self.settings["autotune"] and self.sweep is None and "ready" in self.startup_times:
+            self._autotune()
+        self._update_tooltip()
+
+    async def _startup(self):
+        """Connect to PipeWire, probe hardware-supported rates, then apply saved settings."""
+        backend = await self.bridge.run(
+            asyncio.to_thread(create_backend, self.settings["backend"])
+        )
+        # The async engine shares it through the engine
+        self.engine.backend = backend
+        
+        await self._probe()
+        self.startup_times["probe"] = time.monotonic() - self.started
+        await self._apply_settings()
+        self.startup_times["ready"] = time.monotonic() - self.started
+
+    async def _probe(self, refresh: bool = False):
+        """Query supported rates and patch them into the menu."""
+        probe = await self.bridge.run(self.async_engine.probe(refresh=refresh))
+        if "rates" in probe.errors:
+            return
+        self._set_hardware(probe.graph, probe.device_info)
+        if probe.rates != self.supported_rates:
+            self._set_supported_rates(probe.rates)
+            # Re-probed: allow what was found now
+            if self.settings["native_rates"] and "ready" in self.startup_times:
+                self._write_native_rates()
+        state = {"rates": probe.rates}
+        self.executor.submit("state", lambda: self.config.save_state(state))
+
+    def _reprobe(self):
+        """Probe every device again, ignoring the capability cache."""
+        busy = [task for task in (self.startup, self.reprobing) if task is not None]
+        if any(not task.done for task in busy):
+            return
+        self.reprobing = self.bridge.spawn(self._probe(refresh=True))
+
+    async def _apply_settings(self):
         """Apply saved settings to PipeWire."""
-        self.engine.set_sample_rate(self.settings["samplerate"])
-        self.engine.set_buffer_size(self.settings["buffer_size"])
+        if self.settings["latency_target"]:
+            self.settings["buffer_size"] = self._target_quantum(self.settings["latency_target"])
+        # A bound of 0 is left to PipeWire (or whatever set it)
+        settings = {meta: self.settings[key] for key, meta in self.METADATA_KEYS.items()
+                    if self.settings[key]}
+        if self.settings["native_rates"]:
+            settings.update(native_rate_settings(self.supported_rates))
+        result = await self.bridge.run(self.async_engine.apply(settings))
+        for meta, ok in result.results.items():
+            if ok:
+                self.scheduler.confirm(meta, settings[meta])
+
+    def _on_setting_changed(self, key: str, value):
+        """Reflect a clock change made outside the tray."""
+        # Also clearing a forced value, so a later request for the old one is written
+        self.scheduler.confirm(key, value)
+        if value is None:
+            self.metadata.pop(key, None)
+        else:
+            self.metadata[key] = value
+        if key in ("clock.min-quantum", "clock.max-quantum"):
+            self._update_menu()
+            return
+        if not isinstance(value, int) or value <= 0:
+            return
+        if key == "clock.force-rate":
+            self.settings["samplerate"] = value
+            # Set by another tool: keep the latency
+            self._retarget()
+        elif key == "clock.force-quantum":
+            self.settings["buffer_size"] = value
+            # Set by another tool: tune on from there
+            if value != self.tuner.quantum:
+                self.tuner.reset(value)
+        else:
+            return
+        self._update_menu()
+        self._update_tooltip()
 
     def _on_tray_activated(self, reason):
         """Handle tray icon activation."""
@@ -163,12 +1025,79 @@ class TrayApplication(QApplication):
             self.about_dialog.activateWindow()
 
 
+    def _show_diagnostics(self):
+        """Show or toggle the diagnostics dialog."""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self._diagnostics_report)
+        
+        if self.diagnostics_dialog.isVisible():
+            self.diagnostics_dialog.hide()
+        else:
+            self.diagnostics_dialog.refresh()
+            self.diagnostics_dialog.show()
+            self.diagnostics_dialog.raise_()
+            self.diagnostics_dialog.activateWindow()
+
+    def _diagnostics_report(self) -> str:
+        """Command statistics, startup times, event loop lag and write counters."""
+        lag = self.responsiveness.stats()
+        startup = ", ".join(f"{stage} {seconds * 1000:.0f} ms"
+                            for stage, seconds in self.startup_times.items())
+        writes = ", ".join(f"{name} {count}" for name, count in self.scheduler.stats().items())
+        return "\n".join([
+            "Commands (slowest in total first)",
+            RUNNER.report(),
+            "",
+            f"Backend: {self.engine.backend.name}",
+            f"Startup: {startup}",
+            f"Event loop lag: p50 {lag['p50'] * 1000:.1f} ms, p95 {lag['p95'] * 1000:.1f} ms, "
+            f"p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms",
+            f"Writes: {writes}",
+            f"Switches: {self._switch_report()}",
+            f"DSP load: {self._load_report()}",
+            "Auto-tune decisions:" + "".join(
+                f"\n  {line}" for line in self.tuner.decisions()[-10:]
+            ) if self.tuner.log else "Auto-tune decisions: none",
+            "Last latency sweep:\n" + self.last_sweep.table() if self.last_sweep is not None
+            else "Last latency sweep: none this session",
+        ])
+
+    def _switch_report(self) -> str:
+        """Latency and silence of the rate and buffer size switches confirmed so far."""
+        if not self.switches:
+            return "none confirmed"
+        latencies = sorted(latency for latency, _silence in self.switches)
+        silences = sorted(silence for _latency, silence in self.switches)
+        n = len(latencies)
+        latency, silence = self.switches[-1]
+        return (f"{n} confirmed, last {latency * 1000:.0f} ms (silent {silence * 1000:.0f} ms), "
+                f"p50 {latencies[n // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms, "
+                f"longest silence {silences[-1] * 1000:.0f} ms")
+
+    def _load_report(self) -> str:
+        """One line per driver seen by the load profiler."""
+        profiler = self.engine.profiler
+        if profiler is None:
+            return "pw-top is not running"
+        drivers = profiler.stats()
+        if not drivers:
+            return "no samples yet"
+        return "".join(
+            f"\n  {entry['name']}: {entry['quantum']}/{entry['rate']}, "
+            f"p50 {entry['load_p50']:.0%}, p95 {entry['load_p95']:.0%}, "
+            f"p99 {entry['load_p99']:.0%}, xruns {entry['xruns']} "
+            f"({entry['xrun_rate']:.1f}/min)"
+            for entry in drivers
+        )
+
+
 def run():
     """Entry point for the application."""
+    started = time.monotonic()
     process_mgr = ProcessManager()
     process_mgr.ensure_single_instance()
     
-    app = TrayApplication(sys.argv)
+    app = TrayApplication(sys.argv, started=started)
     app.aboutToQuit.connect(process_mgr.cleanup)
     
     sys.exit(app.exec())
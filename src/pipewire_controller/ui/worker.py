@@ -0,0 +1,171 @@
+"""Background execution of engine calls and event loop responsiveness tracking."""
+
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+ResultCallback = Callable[[Any], None]
+ErrorCallback = Callable[[BaseException], None]
+
+
+class _JobSignals(QObject):
+    """Signals of one job; QRunnable itself cannot emit signals."""
+
+    # (job, result) and (job, exception), emitted on the worker thread
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+
+
+class Job(QRunnable):
+    """A named engine call queued on ``EngineExecutor``."""
+
+    def __init__(self, name: str, func: Callable[[], Any],
+                 on_result: Optional[ResultCallback] = None,
+                 on_error: Optional[ErrorCallback] = None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.func = func
+        self.on_result = on_result
+        self.on_error = on_error
+        self.signals = _JobSignals()
+        self.queued = time.monotonic()
+        self.started: Optional[float] = None
+        self.ended: Optional[float] = None
+
+    def run(self):
+        """Worker thread body."""
+        self.started = time.monotonic()
+        try:
+            result = self.func()
+        except Exception as e:
+            self.ended = time.monotonic()
+            self.signals.failed.emit(self, e)
+        else:
+            self.ended = time.monotonic()
+            self.signals.finished.emit(self, result)
+
+
+class EngineExecutor(QObject):
+    """
+    Runs blocking engine calls on a worker thread.
+
+    Jobs run one at a time and in submission order, so PipeWire sees writes
+    in the order the user made them. Callbacks and signals are delivered on
+    the thread that owns the executor (the GUI thread).
+    """
+
+    job_started = pyqtSignal(str)
+    job_finished = pyqtSignal(str, object)
+    job_failed = pyqtSignal(str, object)
+
+    def __init__(self, parent: Optional[QObject] = None, threads: int = 1):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(threads)
+        self._jobs: Dict[int, Job] = {}
+
+    @property
+    def pending(self) -> Dict[str, int]:
+        """Names of queued or running jobs with how many of each."""
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.name] = counts.get(job.name, 0) + 1
+        return counts
+
+    def is_pending(self, name: str) -> bool:
+        """Whether a job with this name is queued or running."""
+        return any(job.name == name for job in self._jobs.values())
+
+    def submit(self, name: str, func: Callable[[], Any],
+               on_result: Optional[ResultCallback] = None,
+               on_error: Optional[ErrorCallback] = None) -> Job:
+        """
+        Queue a call.
+
+        Args:
+            name: Label used for pending state, e.g. ``"samplerate"``
+            func: Blocking call to run on the worker thread
+            on_result: Called on the GUI thread with the return value
+            on_error: Called on the GUI thread with the exception raised
+        """
+        job = Job(name, func, on_result, on_error)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        self._jobs[id(job)] = job
+        self.job_started.emit(name)
+        self._pool.start(job)
+        return job
+
+    def wait(self, timeout: float = 5) -> bool:
+        """Block until every job ran; for shutdown and tests only."""
+        return self._pool.waitForDone(int(timeout * 1000))
+
+    def _on_finished(self, job: Job, result: Any):
+        self._jobs.pop(id(job), None)
+        if job.on_result is not None:
+            job.on_result(result)
+        self.job_finished.emit(job.name, result)
+
+    def _on_failed(self, job: Job, error: BaseException):
+        self._jobs.pop(id(job), None)
+        if job.on_error is not None:
+            job.on_error(error)
+        self.job_failed.emit(job.name, error)
+
+
+class ResponsivenessMonitor(QObject):
+    """
+    Measures how promptly the Qt event loop handles events.
+
+    A timer fires every ``interval`` ms; the delay between when it was due and
+    when it ran is the time the loop was busy. Anything beyond a few tens of
+    milliseconds is a visible freeze.
+    """
+
+    def __init__(self, parent: Optional[QObject] = None, interval: int = 50,
+                 samples: int = 1200):
+        super().__init__(parent)
+        self.interval = interval / 1000
+        self._lags: deque = deque(maxlen=samples)
+        self._max = 0.0
+        self._expected: Optional[float] = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._expected = time.monotonic() + self.interval
+        self._timer.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._timer.stop()
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        if self._expected is not None:
+            lag = max(0.0, now - self._expected)
+            self._lags.append(lag)
+            self._max = max(self._max, lag)
+        self._expected = now + self.interval
+
+    def stats(self) -> Dict[str, float]:
+        """Lag percentiles over the recent samples and the all-time maximum, in seconds."""
+        lags = sorted(self._lags)
+        if not lags:
+            return {"samples": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+        def percentile(fraction: float) -> float:
+            return lags[min(len(lags) - 1, int(fraction * len(lags)))]
+
+        return {
+            "samples": len(lags),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": self._max,
+        }
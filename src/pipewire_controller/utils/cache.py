@@ -0,0 +1,161 @@
+"""On-disk cache of per-device capabilities."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from ..dump import NODE_TYPE
+from ..model import Device, Graph, Node
+
+# Version 2 added the node ids
+CACHE_VERSION = 2
+
+
+def default_cache_dir() -> Path:
+    """``$XDG_CACHE_HOME/pipewire-controller``, or the config directory without it."""
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    if xdg:
+        return Path(xdg) / "pipewire-controller"
+    return Path.home() / ".config" / "pipewire-controller"
+
+
+class CapabilityCache:
+    """
+    Formats and rates of each device, keyed by ``Device.identity``.
+
+    Hardware does not change between runs, so once a device has been probed
+    its audio nodes (with their EnumFormat params) are stored together with
+    the device's property fingerprint. ``lookup`` rebuilds the graph for the
+    devices present now without enumerating any node; a device that is new or
+    whose fingerprint changed (different driver setup) misses and a full
+    probe is needed. A replugged card usually keeps its fingerprint, so the
+    engine also invalidates a device when the graph mirror sees it go away
+    (see ``PipewireEngine.start_graph_mirror``).
+
+    Nodes that do not belong to a device (virtual sinks and the like) are
+    not cached.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Cache file (default ``capabilities.json`` in ``default_cache_dir()``)
+        """
+        self.path = Path(path) if path is not None else default_cache_dir() / "capabilities.json"
+        self._devices: Optional[Dict[str, Dict[str, Any]]] = None
+        # Entries are invalidated from the graph mirror's thread
+        self._lock = threading.RLock()
+
+    @property
+    def devices(self) -> Dict[str, Dict[str, Any]]:
+        """Cached entries by device identity, loaded on first use."""
+        with self._lock:
+            if self._devices is None:
+                self._devices = self._read()
+            return self._devices
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        devices = data.get("devices")
+        return devices if isinstance(devices, dict) else {}
+
+    def save(self) -> bool:
+        """Write the cache file."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with self._lock, open(tmp, "w") as f:
+                json.dump({"version": CACHE_VERSION, "devices": self.devices}, f)
+            tmp.replace(self.path)
+            return True
+        except IOError:
+            return False
+
+    def store(self, graph: Graph) -> None:
+        """Record the audio nodes of every device in a freshly probed graph."""
+        entries = {
+            device.identity: {
+                "fingerprint": device.fingerprint,
+                "description": device.description,
+                "nodes": [_node_entry(node) for node in graph.device_nodes(device.id)
+                          if node.is_audio_device],
+            }
+            for device in graph.devices()
+        }
+        with self._lock:
+            self.devices.update(entries)
+
+    def lookup(self, devices: Iterable[Device]) -> Optional[Graph]:
+        """
+        Rebuild the graph of the given devices from the cache.
+
+        Nodes keep the ids they had when they were probed.
+
+        Returns:
+            A graph with the devices and their cached audio nodes, or None if
+            any device is unknown or its fingerprint changed, or if node ids
+            cached at different times collide
+        """
+        graph = Graph()
+        entries = []
+        for device in devices:
+            entry = self.devices.get(device.identity)
+            if entry is None or entry.get("fingerprint") != device.fingerprint:
+                return None
+            graph.add(device)
+            entries.append((device, entry))
+        if not entries:
+            return None
+
+        for device, entry in entries:
+            for node in entry["nodes"]:
+                if graph.get(node["id"]) is not None:
+                    return None
+                graph.update(_node_object(node, device.id))
+        return graph
+
+    def invalidate(self, identity: Optional[str] = None) -> None:
+        """Forget one device, or every device."""
+        with self._lock:
+            if identity is None:
+                self.devices.clear()
+            else:
+                self.devices.pop(identity, None)
+
+
+def _node_entry(node: Node) -> Dict[str, Any]:
+    return {
+        "id": node.id,
+        "name": node.name,
+        "description": node.description,
+        "media_class": node.media_class,
+        "enum_formats": list(node.enum_formats),
+    }
+
+
+def _node_object(entry: Dict[str, Any], device_id: int) -> dict:
+    """A pw-dump style node from a cache entry."""
+    return {
+        "id": entry["id"],
+        "type": NODE_TYPE,
+        "info": {
+            "props": {
+                "node.name": entry["name"],
+                "node.description": entry["description"],
+                "media.class": entry["media_class"],
+                "device.id": device_id,
+            },
+            "params": {"EnumFormat": entry["enum_formats"]},
+        },
+    }
+
@@ -11,12 +11,41 @@ class Config:
 
     DEFAULT_SETTINGS = {
         "samplerate": 48000,
-        "buffer_size": 512
+        "buffer_size": 512,
+        "backend": "auto",
+        # node.name -> sample format the sink is opened with (see utils.wireplumber)
+        "sink_formats": {},
+        # Adapt the buffer size to xruns and DSP load, within these bounds (see autotune)
+        "autotune": False,
+        "autotune_floor": 64,
+        "autotune_ceiling": 2048,
+        # Revert rate and buffer size changes followed by more than this many
+        # xruns per minute within the window, in seconds (see guard)
+        "safe_apply": False,
+        "probation_window": 10,
+        "probation_max_xruns": 6,
+        # Switch the rate to that of the playing streams (see follower)
+        "follow_source": False,
+        # Let PipeWire choose among the supported rates instead of forcing
+        # one, and bound the quantum (0 leaves PipeWire's own bound)
+        "native_rates": False,
+        "min_quantum": 0,
+        "max_quantum": 0,
+        # Milliseconds the buffer size is chosen for at whatever rate is
+        # active, instead of a fixed number of samples (0: off)
+        "latency_target": 0
     }
 
     def __init__(self):
         self.config_dir = Path.home() / ".config" / "pipewire-controller"
         self.config_file = self.config_dir / "settings.json"
+        self.state_file = self.config_dir / "last-known.json"
+        # Command statistics of the last tray session (see ``--stats``)
+        self.stats_file = self.config_dir / "command-stats.json"
+        # Buffer size changes made by auto-tune, one line each
+        self.autotune_log = self.config_dir / "autotune.log"
+        # Quantum sweep results per device and rate (see sweep.SweepStore)
+        self.sweep_file = self.config_dir / "sweeps.json"
         self.config_dir.mkdir(parents=True, exist_ok=True)
 
     def load(self) -> Dict[str, Any]:
@@ -24,7 +53,7 @@ class Config:
         if self.config_file.exists():
             try:
                 with open(self.config_file, "r") as f:
-                    return json.load(f)
+                    return {**self.DEFAULT_SETTINGS, **json.load(f)}
             except (json.JSONDecodeError, IOError):
                 pass
         return self.DEFAULT_SETTINGS.copy()
@@ -37,3 +66,30 @@ class Config:
             return True
         except IOError:
             return False
+
+    def load_state(self) -> Dict[str, Any]:
+        """Load what was last learned about the hardware, or {} if nothing was."""
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def save_state(self, state: Dict[str, Any]) -> bool:
+        """Save what was learned about the hardware for the next start."""
+        try:
+            with open(self.state_file, "w") as f:
+                json.dump(state, f, indent=2)
+            return True
+        except IOError:
+            return False
+
+    def append_autotune_log(self, line: str) -> bool:
+        """Add a line to the auto-tune decision log."""
+        try:
+            with open(self.autotune_log, "a") as f:
+                f.write(line + "\n")
+            return True
+        except IOError:
+            return False
@@ -0,0 +1,60 @@
+"""WirePlumber configuration written on behalf of the user."""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+FORMAT_RULES_NAME = "60-pipewire-controller-format.conf"
+
+
+def config_dir() -> Path:
+    """``$XDG_CONFIG_HOME/wireplumber/wireplumber.conf.d`` (``~/.config`` by default)."""
+    xdg = os.environ.get("XDG_CONFIG_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".config"
+    return base / "wireplumber" / "wireplumber.conf.d"
+
+
+def format_rules(formats: Dict[str, str]) -> str:
+    """
+    SPA-JSON rules that open each ALSA node with a fixed sample format.
+
+    Args:
+        formats: ``node.name`` -> sample format, e.g. ``{"alsa_output.x": "F32LE"}``
+    """
+    rules = []
+    for name, fmt in sorted(formats.items()):
+        rules.append(
+            "  {\n"
+            f"    matches = [ {{ node.name = {json.dumps(name)} }} ]\n"
+            f"    actions = {{ update-props = {{ audio.format = {json.dumps(fmt)} }} }}\n"
+            "  }"
+        )
+    return (
+        "# Written by pipewire-controller (Sink Format menu); edits are overwritten\n"
+        "monitor.alsa.rules = [\n" + "\n".join(rules) + "\n]\n"
+    )
+
+
+def write_format_rules(formats: Dict[str, str], path: Optional[Path] = None) -> bool:
+    """
+    Write the sample format rules, or remove the file when there are none.
+
+    WirePlumber reads them when it opens the devices, so they take effect
+    after it is restarted.
+
+    Returns:
+        False if the file could not be written
+    """
+    path = path or config_dir() / FORMAT_RULES_NAME
+    try:
+        if not formats:
+            path.unlink(missing_ok=True)
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(format_rules(formats))
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
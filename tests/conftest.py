@@ -1,5 +1,6 @@
 """Pytest configuration and shared fixtures."""
 
+import io
 import os
 import pytest
 from unittest.mock import Mock, MagicMock
@@ -21,6 +22,23 @@ def mock_subprocess_run(mocker):
     return mocker.patch("subprocess.run")
 
 
+@pytest.fixture
+def mock_subprocess_popen(mocker):
+    """Mock subprocess.Popen; call the result with the output the process should print."""
+    mock_popen = mocker.patch("subprocess.Popen")
+
+    def configure(stdout="", returncode=0):
+        process = Mock()
+        process.stdout = io.StringIO(stdout)
+        process.returncode = returncode
+        process.poll.return_value = returncode
+        process.wait.return_value = returncode
+        mock_popen.return_value = process
+        return mock_popen
+
+    return configure
+
+
 @pytest.fixture
 def mock_config_file(tmp_path):
     """Create a temporary config directory."""
@@ -51,3 +69,13 @@ def sample_pw_dump_output():
         }
     ]
     """
+
+
+@pytest.fixture
+def fake_pipewire(tmp_path, monkeypatch):
+    """A simulated PipeWire (pw-metadata, pw-dump, wpctl, pw-top) first on PATH."""
+    from tests.fake_pipewire import FakePipewire
+
+    fake = FakePipewire(tmp_path / "fake-pipewire")
+    fake.activate(monkeypatch)
+    return fake
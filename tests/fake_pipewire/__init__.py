@@ -0,0 +1,195 @@
+"""Stateful fake PipeWire toolchain for hermetic tests and benchmarks.
+
+``FakePipewire`` installs drop-in ``pw-metadata``, ``pw-dump``, ``wpctl`` and
+``pw-top`` executables into a directory and puts them first on ``PATH``. The tools
+share one state directory, so a write made through ``pw-metadata`` shows up
+in the next ``pw-dump`` and in every running monitor.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .state import DIR_VARIABLE, State
+from .synth import generate_graph, make_node
+from .tools import TOOLS
+
+_WRAPPER = """#!{python}
+import sys
+sys.path.insert(0, {path!r})
+from fake_pipewire.tools import main
+sys.exit(main({tool!r}, sys.argv[1:]))
+"""
+
+
+class FakePipewire:
+    """
+    A simulated PipeWire installation in a directory.
+
+    Args:
+        root: Directory for the executables (``bin/``) and the shared state
+        nodes: Number of nodes in the generated graph
+        seed: Seed for the generated graph
+        audio_ratio: Fraction of nodes that are audio sinks or sources
+        ports: Generate ports and links for the stream nodes
+    """
+
+    def __init__(self, root: os.PathLike, nodes: int = 10, seed: int = 0,
+                 audio_ratio: float = 0.5, ports: bool = True):
+        self.root = Path(root)
+        self.bin_dir = self.root / "bin"
+        self.state = State(self.root / "state")
+        objects, defaults = generate_graph(nodes, seed, audio_ratio, ports)
+        self.state.initialize(objects, defaults["default.audio.sink"],
+                              defaults["default.audio.source"])
+        self._install()
+
+    def _install(self) -> None:
+        """Write the wrapper executables."""
+        self.bin_dir.mkdir(parents=True, exist_ok=True)
+        package_parent = str(Path(__file__).resolve().parent.parent)
+        for tool in TOOLS:
+            path = self.bin_dir / tool
+            path.write_text(_WRAPPER.format(python=sys.executable, path=package_parent,
+                                            tool=tool))
+            path.chmod(0o755)
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """Environment variables that make the fake tools the ones on ``PATH``."""
+        return {
+            "PATH": f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            DIR_VARIABLE: str(self.state.root),
+        }
+
+    def activate(self, monkeypatch=None) -> None:
+        """Export ``env`` into this process (through ``monkeypatch`` if given)."""
+        for key, value in self.env.items():
+            if monkeypatch is not None:
+                monkeypatch.setenv(key, value)
+            else:
+                os.environ[key] = value
+
+    # -- settings -----------------------------------------------------------
+
+    @property
+    def settings(self) -> Dict[str, str]:
+        """The settings metadata as raw strings."""
+        return self.state.load()["settings"]
+
+    def set_setting(self, key: str, value: Optional[Any]) -> None:
+        """Change (or remove, with None) a settings key as another client would."""
+        text = None if value is None else str(value)
+        with self.state.locked():
+            current = self.state.load()
+            if text is None:
+                current["settings"].pop(key, None)
+            else:
+                current["settings"][key] = text
+            self.state.save(current)
+            self.state.renegotiate(current)
+            self.state.append_event({"kind": "metadata", "name": "settings",
+                                     "key": key, "value": text})
+
+    def set_default(self, node_name: str, key: str = "default.audio.sink") -> None:
+        """Change the default sink (or source) node."""
+        with self.state.locked():
+            current = self.state.load()
+            current["defaults"][key] = node_name
+            self.state.save(current)
+            self.state.append_event({"kind": "metadata", "name": "default",
+                                     "key": key, "value": node_name})
+
+    def set_load(self, busy: Optional[float] = None, wait: Optional[float] = None,
+                 xruns: Optional[int] = None, interval: Optional[float] = None,
+                 cycle_cost: Optional[float] = None,
+                 switch_gap: Optional[float] = None, idle: Optional[bool] = None) -> None:
+        """
+        Change what pw-top reports for the default sink.
+
+        Args:
+            busy: Fraction of the cycle the graph spends processing
+            wait: Fraction of the cycle between wakeup and processing
+            xruns: The driver's cumulative xrun counter
+            interval: Seconds between pw-top refreshes
+            cycle_cost: Seconds of fixed work per cycle, added to ``busy``; a
+                quantum too small to fit it produces xruns
+            switch_gap: Seconds the driver is suspended after its rate or
+                quantum changed
+            idle: Nothing plays: the sink is shown idle, without streams
+        """
+        changes = {"busy": busy, "wait": wait, "xruns": xruns, "interval": interval,
+                   "cycle_cost": cycle_cost, "switch_gap": switch_gap, "idle": idle}
+        with self.state.locked():
+            current = self.state.load()
+            current["load"].update({k: v for k, v in changes.items() if v is not None})
+            self.state.save(current)
+
+    # -- graph --------------------------------------------------------------
+
+    @property
+    def objects(self) -> List[dict]:
+        """The graph objects."""
+        return self.state.load_graph()
+
+    def add_object(self, obj: dict) -> None:
+        """Add or replace a graph object (hotplug or a params change)."""
+        with self.state.locked():
+            objects = [o for o in self.state.load_graph() if o["id"] != obj["id"]]
+            objects.append(obj)
+            self.state.save_graph(objects)
+            self.state.append_event({"kind": "graph", "object": obj})
+
+    def add_node(self, node_id: int, name: str, media_class: str = "Audio/Sink",
+                 **kwargs) -> dict:
+        """Add a node built by ``synth.make_node``; returns it."""
+        node = make_node(node_id, name, media_class, **kwargs)
+        self.add_object(node)
+        return node
+
+    def remove_object(self, object_id: int) -> None:
+        """Remove a graph object (unplug)."""
+        with self.state.locked():
+            objects = [o for o in self.state.load_graph() if o["id"] != object_id]
+            self.state.save_graph(objects)
+            self.state.append_event({"kind": "graph", "remove": object_id})
+
+    # -- faults and call log ------------------------------------------------
+
+    def inject(self, tool: str, latency: float = 0.0, jitter: float = 0.0,
+               hang: bool = False, fail: bool = False, fail_rate: float = 0.0) -> None:
+        """
+        Make a tool slow, hang or fail on its next invocations.
+
+        Args:
+            tool: ``"pw-metadata"``, ``"pw-dump"``, ``"wpctl"`` or ``"pw-top"``
+            latency: Seconds to sleep before doing anything
+            jitter: Up to this many extra seconds, chosen at random per call
+            hang: Never exit (until killed)
+            fail: Exit with status 1 without doing anything
+            fail_rate: Probability of failing like ``fail``
+        """
+        with self.state.locked():
+            current = self.state.load()
+            current["faults"][tool] = {"latency": latency, "jitter": jitter, "hang": hang,
+                                       "fail": fail, "fail_rate": fail_rate}
+            self.state.save(current)
+
+    def clear_faults(self) -> None:
+        """Remove every injected fault."""
+        with self.state.locked():
+            current = self.state.load()
+            current["faults"] = {}
+            self.state.save(current)
+
+    def calls(self, tool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Logged invocations that finished, optionally of one tool."""
+        return [call for call in self.state.calls() if tool is None or call["tool"] == tool]
+
+    def __repr__(self):
+        return f"FakePipewire({str(self.root)!r}, {json.dumps(self.env)})"
+
+
+__all__ = ["FakePipewire", "State", "generate_graph", "make_node"]
@@ -0,0 +1,31 @@
+"""Set up a fake PipeWire installation for manual runs.
+
+Usage::
+
+    eval "$(python -m tests.fake_pipewire /tmp/fake-pw --nodes 1000)"
+    pipewire-controller
+"""
+
+import argparse
+import shlex
+
+from . import FakePipewire
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m tests.fake_pipewire")
+    parser.add_argument("root", help="directory for the executables and state")
+    parser.add_argument("--nodes", type=int, default=10, help="nodes in the graph")
+    parser.add_argument("--seed", type=int, default=0, help="graph generator seed")
+    parser.add_argument("--audio-ratio", type=float, default=0.5,
+                        help="fraction of nodes that are sinks or sources")
+    args = parser.parse_args()
+
+    fake = FakePipewire(args.root, nodes=args.nodes, seed=args.seed,
+                        audio_ratio=args.audio_ratio)
+    for key, value in fake.env.items():
+        print(f"export {key}={shlex.quote(value)}")
+
+
+if __name__ == "__main__":
+    main()
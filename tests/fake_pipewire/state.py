@@ -0,0 +1,156 @@
+"""Shared on-disk state of the fake PipeWire toolchain.
+
+Every fake tool invocation and the controlling test share one directory:
+
+- ``state.json``: settings metadata, default nodes, the DSP load pw-top
+  reports and injected faults
+- ``graph.json``: the pw-dump objects of the graph
+- ``events.jsonl``: append-only change log followed by the monitor modes
+- ``calls.jsonl``: one line per tool invocation (argv, exit code, duration)
+
+Writers hold an exclusive ``flock`` on ``lock`` while they modify the files.
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+DIR_VARIABLE = "FAKE_PIPEWIRE_DIR"
+
+DEFAULT_SETTINGS = {
+    "log.level": "2",
+    "clock.rate": "48000",
+    "clock.allowed-rates": "[ 48000 ]",
+    "clock.quantum": "1024",
+    "clock.min-quantum": "32",
+    "clock.max-quantum": "2048",
+    "clock.force-quantum": "0",
+    "clock.force-rate": "0",
+}
+
+# DSP load of the default sink's graph as pw-top shows it: busy and wait as
+# fractions of the cycle, the driver's cumulative xruns and the refresh period
+DEFAULT_LOAD = {"busy": 0.05, "wait": 0.10, "xruns": 0, "interval": 0.05}
+
+NO_FAULTS = {"latency": 0.0, "jitter": 0.0, "hang": False, "fail": False, "fail_rate": 0.0}
+
+
+class State:
+    """Access to one fake PipeWire state directory."""
+
+    def __init__(self, root: Optional[os.PathLike] = None):
+        self.root = Path(root or os.environ[DIR_VARIABLE])
+        self.state_file = self.root / "state.json"
+        self.graph_file = self.root / "graph.json"
+        self.events_file = self.root / "events.jsonl"
+        self.calls_file = self.root / "calls.jsonl"
+        self.lock_file = self.root / "lock"
+
+    def initialize(self, objects: List[dict], default_sink: Optional[str] = None,
+                   default_source: Optional[str] = None) -> None:
+        """Write a fresh state with the given graph."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.locked():
+            self._write(self.state_file, {
+                "settings": dict(DEFAULT_SETTINGS),
+                "defaults": {
+                    "default.audio.sink": default_sink,
+                    "default.audio.source": default_source,
+                },
+                "load": dict(DEFAULT_LOAD),
+                "faults": {},
+            })
+            self._write(self.graph_file, objects)
+            self.events_file.write_text("")
+            self.calls_file.write_text("")
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the state lock."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write(self, path: Path, data: Any) -> None:
+        """Replace a JSON file atomically."""
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+
+    def load(self) -> Dict[str, Any]:
+        """Settings, defaults, load and faults."""
+        return json.loads(self.state_file.read_text())
+
+    def save(self, state: Dict[str, Any]) -> None:
+        """Store settings, defaults, load and faults (hold ``locked``)."""
+        self._write(self.state_file, state)
+
+    def load_graph(self) -> List[dict]:
+        """The pw-dump objects of the graph."""
+        return json.loads(self.graph_file.read_text())
+
+    def save_graph(self, objects: List[dict]) -> None:
+        """Store the graph objects (hold ``locked``)."""
+        self._write(self.graph_file, objects)
+
+    def append_event(self, event: Dict[str, Any]) -> None:
+        """Publish a change to running monitors (hold ``locked``)."""
+        with open(self.events_file, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def renegotiate(self, state: Dict[str, Any]) -> None:
+        """
+        Publish the default sink running at the rate of ``state``'s settings.
+
+        Like a driver that takes up a new forced rate, the sink's Format param
+        and state change, unless nothing plays or the rate stayed the same
+        (hold ``locked``).
+        """
+        settings = state["settings"]
+        rate = int(settings.get("clock.force-rate", "0")) \
+            or int(settings.get("clock.rate", "48000"))
+        sink = state["defaults"].get("default.audio.sink")
+        objects = self.load_graph()
+        for obj in objects:
+            info = obj.get("info") or {}
+            if state["load"].get("idle") or info.get("props", {}).get("node.name") != sink:
+                continue
+            formats = info["params"].get("Format") or [{
+                "mediaType": "audio", "mediaSubtype": "raw", "format": "F32LE",
+                "channels": 2, "position": ["FL", "FR"],
+            }]
+            if info["state"] == "running" and formats[0].get("rate") == rate:
+                continue
+            info["state"] = "running"
+            info["params"]["Format"] = [dict(formats[0], rate=rate)]
+            self.save_graph(objects)
+            self.append_event({"kind": "graph", "object": obj})
+            return
+
+    def events_offset(self) -> int:
+        """Current end of the event log."""
+        return self.events_file.stat().st_size
+
+    def faults(self, tool: str) -> Dict[str, Any]:
+        """Faults injected into one tool, with defaults for unset ones."""
+        return {**NO_FAULTS, **self.load()["faults"].get(tool, {})}
+
+    def record_call(self, tool: str, args: List[str], returncode: int, elapsed: float) -> None:
+        """Log one tool invocation."""
+        line = json.dumps({"tool": tool, "args": args, "returncode": returncode,
+                           "elapsed": elapsed})
+        with open(self.calls_file, "a") as f:
+            f.write(line + "\n")
+
+    def calls(self) -> List[Dict[str, Any]]:
+        """Every logged tool invocation, oldest first."""
+        if not self.calls_file.exists():
+            return []
+        return [json.loads(line) for line in self.calls_file.read_text().splitlines() if line]
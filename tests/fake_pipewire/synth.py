@@ -0,0 +1,207 @@
+"""Synthetic PipeWire graphs in pw-dump's JSON form."""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+NODE_TYPE = "PipeWire:Interface:Node"
+DEVICE_TYPE = "PipeWire:Interface:Device"
+PORT_TYPE = "PipeWire:Interface:Port"
+LINK_TYPE = "PipeWire:Interface:Link"
+
+FIRST_ID = 30
+
+# EnumFormat rate entries seen on real hardware
+RATE_PROFILES = [
+    {"default": 48000, "min": 44100, "max": 192000},
+    {"default": 48000, "min": 8000, "max": 384000},
+    {"default": 44100, "min": 44100, "max": 96000},
+    48000,
+    {"default": 48000, "alt1": 44100, "alt2": 96000, "alt3": 192000, "alt4": 384000},
+    {"default": 44100, "min": 44100, "max": 768000, "step": 44100},
+]
+SAMPLE_FORMATS = ["S32LE", "S24_32LE", "S16LE", "F32LE"]
+
+
+def make_node(node_id: int, name: str, media_class: str = "Audio/Sink",
+              description: str = "", device_id: Optional[int] = None,
+              rates: Optional[List] = None, formats: Optional[List[str]] = None,
+              state: str = "suspended", rate: Optional[int] = None) -> dict:
+    """
+    Build a pw-dump Node object.
+
+    Args:
+        rates: EnumFormat ``rate`` entries (ints or choice dicts); one
+            EnumFormat param is emitted per rate entry and format
+        formats: Sample formats offered for each rate entry
+        rate: Negotiated rate, emitted as the Format param (a stream's
+            native rate)
+    """
+    props = {
+        "object.id": node_id,
+        "node.name": name,
+        "node.description": description or name,
+        "media.class": media_class,
+    }
+    if device_id is not None:
+        props["device.id"] = device_id
+    enum_formats = [
+        {
+            "mediaType": "audio",
+            "mediaSubtype": "raw",
+            "format": fmt,
+            "rate": rate,
+            "channels": 2,
+            "position": ["FL", "FR"],
+        }
+        for rate in (rates or [])
+        for fmt in (formats or ["S32LE"])
+    ]
+    return {
+        "id": node_id,
+        "type": NODE_TYPE,
+        "version": 3,
+        "permissions": ["r", "w", "x", "m"],
+        "info": {
+            "max-input-ports": 64 if "Sink" in media_class else 0,
+            "max-output-ports": 0 if "Sink" in media_class else 64,
+            "state": state,
+            "error": None,
+            "props": props,
+            "params": {
+                "EnumFormat": enum_formats,
+                "Format": [] if rate is None else [{
+                    "mediaType": "audio", "mediaSubtype": "raw", "format": "F32LE",
+                    "rate": rate, "channels": 2, "position": ["FL", "FR"],
+                }],
+            },
+        },
+    }
+
+
+def make_device(device_id: int, name: str, description: str = "") -> dict:
+    """Build a pw-dump Device object."""
+    return {
+        "id": device_id,
+        "type": DEVICE_TYPE,
+        "version": 3,
+        "permissions": ["r", "w", "x", "m"],
+        "info": {
+            "props": {
+                "object.id": device_id,
+                "device.name": name,
+                "device.description": description or name,
+                "device.api": "alsa",
+                "api.alsa.card.name": description or name,
+            },
+            "params": {},
+        },
+    }
+
+
+def make_port(port_id: int, node_id: int, direction: str, channel: str) -> dict:
+    """Build a pw-dump Port object."""
+    return {
+        "id": port_id,
+        "type": PORT_TYPE,
+        "version": 3,
+        "permissions": ["r", "w", "x", "m"],
+        "info": {
+            "direction": direction,
+            "props": {
+                "object.id": port_id,
+                "node.id": node_id,
+                "port.name": f"{direction}_{channel}",
+                "audio.channel": channel,
+            },
+        },
+    }
+
+
+def make_link(link_id: int, out_node: int, out_port: int, in_node: int, in_port: int) -> dict:
+    """Build a pw-dump Link object."""
+    return {
+        "id": link_id,
+        "type": LINK_TYPE,
+        "version": 3,
+        "permissions": ["r", "w", "x", "m"],
+        "info": {
+            "output-node-id": out_node,
+            "output-port-id": out_port,
+            "input-node-id": in_node,
+            "input-port-id": in_port,
+            "state": "active",
+        },
+    }
+
+
+def generate_graph(nodes: int = 10, seed: int = 0, audio_ratio: float = 0.5,
+                   ports: bool = True) -> Tuple[List[dict], Dict[str, Optional[str]]]:
+    """
+    Generate a graph with a given number of nodes.
+
+    Audio device nodes come in sink/source pairs that share a Device; the
+    remaining nodes are playback streams linked into the first sink.
+
+    Args:
+        nodes: Total number of Node objects (10 to 10,000 are typical)
+        seed: Seed for the choice of rate profiles and formats
+        audio_ratio: Fraction of nodes that are audio sinks or sources
+        ports: Also generate ports and links for the streams
+
+    Returns:
+        The objects and the names of the default sink and source
+    """
+    rng = random.Random(seed)
+    objects: List[dict] = []
+    next_id = FIRST_ID
+    audio = min(nodes, max(1, round(nodes * audio_ratio))) if nodes else 0
+    defaults: Dict[str, Optional[str]] = {
+        "default.audio.sink": None,
+        "default.audio.source": None,
+    }
+
+    device_id = None
+    for index in range(audio):
+        card = index // 2
+        if index % 2 == 0:
+            device_id = next_id
+            objects.append(make_device(device_id, f"alsa_card.fake-{card}", f"Fake Card {card}"))
+            next_id += 1
+        sink = index % 2 == 0
+        kind = "output" if sink else "input"
+        name = f"alsa_{kind}.fake-{card}.analog-stereo"
+        media_class = "Audio/Sink" if sink else "Audio/Source"
+        rates = [rng.choice(RATE_PROFILES)]
+        formats = rng.sample(SAMPLE_FORMATS, rng.randint(1, len(SAMPLE_FORMATS)))
+        objects.append(make_node(
+            next_id, name, media_class,
+            description=f"Fake {media_class.split('/')[1]} {card}",
+            device_id=device_id, rates=rates, formats=formats,
+        ))
+        key = "default.audio.sink" if sink else "default.audio.source"
+        if defaults[key] is None:
+            defaults[key] = name
+            if sink:
+                first_sink = next_id
+        next_id += 1
+
+    sink_ports = []
+    if ports and audio:
+        for channel in ("FL", "FR"):
+            objects.append(make_port(next_id, first_sink, "input", channel))
+            sink_ports.append(next_id)
+            next_id += 1
+
+    for index in range(nodes - audio):
+        stream_id = next_id
+        objects.append(make_node(stream_id, f"stream-{index}", "Stream/Output/Audio",
+                                 description=f"Player {index}", state="running"))
+        next_id += 1
+        if not (ports and sink_ports):
+            continue
+        for channel, sink_port in zip(("FL", "FR"), sink_ports):
+            objects.append(make_port(next_id, stream_id, "output", channel))
+            objects.append(make_link(next_id + 1, stream_id, next_id, first_sink, sink_port))
+            next_id += 2
+
+    return objects, defaults
@@ -0,0 +1,355 @@
+"""Fake ``pw-metadata``, ``pw-dump``, ``wpctl`` and ``pw-top`` executables.
+
+Each generated wrapper script calls ``main(tool, argv)``. The tools read and
+write the shared ``State`` named by ``$FAKE_PIPEWIRE_DIR``, honour the faults
+injected for them and log every invocation.
+"""
+
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .state import State
+
+METADATA_IDS = {"settings": 20, "default": 21}
+POLL_INTERVAL = 0.01
+
+
+class UsageError(Exception):
+    """Bad command line; reported on stderr with exit code 1."""
+
+
+def _metadata_entries(state: Dict[str, Any], name: str) -> Dict[str, str]:
+    """Properties of a metadata object as the strings pw-metadata prints."""
+    if name == "settings":
+        return dict(state["settings"])
+    return {
+        key: json.dumps({"name": node})
+        for key, node in state["defaults"].items()
+        if node is not None
+    }
+
+
+def _metadata_type(name: str) -> str:
+    """Type pw-metadata reports for the properties of a metadata object."""
+    return "Spa:String:JSON" if name == "default" else ""
+
+
+def _update_line(key: str, value: str, type_: str) -> str:
+    return f"update: id:0 key:'{key}' value:'{value}' type:'{type_}'"
+
+
+def _follow(state: State, offset: int) -> Iterator[Dict[str, Any]]:
+    """Yield events appended to the log after ``offset``, forever."""
+    pending = ""
+    with open(state.events_file) as f:
+        f.seek(offset)
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(POLL_INTERVAL)
+                continue
+            pending += chunk
+            if pending.endswith("\n"):
+                yield json.loads(pending)
+                pending = ""
+
+
+def pw_metadata(state: State, argv: List[str]) -> int:
+    """``pw-metadata [-m] [-d] [-n name] [id [key [value [type]]]]``"""
+    name, monitor, delete, positional = "default", False, False, []
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-n", "--name"):
+            name = next(args, "")
+        elif arg.startswith("--name="):
+            name = arg.split("=", 1)[1]
+        elif arg in ("-m", "--monitor"):
+            monitor = True
+        elif arg in ("-d", "--delete"):
+            delete = True
+        elif arg.startswith("-"):
+            raise UsageError(f"unknown option '{arg}'")
+        else:
+            positional.append(arg)
+    if name not in METADATA_IDS:
+        print(f'Metadata "{name}" not found', file=sys.stderr)
+        return 1
+
+    subject, key, value = (positional + [None] * 3)[:3]
+    if subject not in (None, "0"):
+        raise UsageError("only subject 0 is simulated")
+
+    if value is not None or delete:
+        if name != "settings":
+            raise UsageError("only the settings metadata is writable")
+        with state.locked():
+            current = state.load()
+            if delete and key is None:
+                current["settings"].clear()
+            elif delete:
+                current["settings"].pop(key, None)
+            else:
+                current["settings"][key] = value
+            state.save(current)
+            state.renegotiate(current)
+            state.append_event({"kind": "metadata", "name": name, "key": key,
+                                "value": None if delete else value})
+        print(f'Found "{name}" metadata {METADATA_IDS[name]}')
+        if delete:
+            print(f"delete property: id:0 key:{key or 'all keys'}")
+        else:
+            print(f"set property: id:0 key:{key} value:{value} type:(null)")
+        return 0
+
+    with state.locked():
+        entries = _metadata_entries(state.load(), name)
+        offset = state.events_offset()
+    print(f'Found "{name}" metadata {METADATA_IDS[name]}')
+    for entry_key, entry_value in entries.items():
+        if key is None or entry_key == key:
+            print(_update_line(entry_key, entry_value, _metadata_type(name)))
+    sys.stdout.flush()
+    if not monitor:
+        return 0
+
+    for event in _follow(state, offset):
+        if event["kind"] != "metadata" or event["name"] != name:
+            continue
+        if event["key"] is None:
+            print("remove: id:0 all keys")
+        elif event["value"] is None:
+            print(f"remove: id:0 key:'{event['key']}'")
+        else:
+            print(_update_line(event["key"], event["value"], _metadata_type(name)))
+        sys.stdout.flush()
+
+
+def _json_value(value: str) -> Any:
+    """Value of a metadata property the way pw-dump prints it."""
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def _metadata_object(state: Dict[str, Any], name: str) -> dict:
+    """A Metadata object in pw-dump's form."""
+    return {
+        "id": METADATA_IDS[name],
+        "type": "PipeWire:Interface:Metadata",
+        "version": 3,
+        "permissions": ["r", "w", "x", "m"],
+        "props": {"object.id": METADATA_IDS[name], "metadata.name": name},
+        "metadata": [
+            {"subject": 0, "key": key, "type": _metadata_type(name), "value": _json_value(value)}
+            for key, value in _metadata_entries(state, name).items()
+        ],
+    }
+
+
+def _print_array(objects: List[dict]) -> None:
+    """Print objects as one indented JSON array, like pw-dump."""
+    out = sys.stdout
+    out.write("[")
+    for index, obj in enumerate(objects):
+        out.write(",\n  " if index else "\n  ")
+        out.write(json.dumps(obj, indent=2).replace("\n", "\n  "))
+    out.write("\n]\n")
+    out.flush()
+
+
+def pw_dump(state: State, argv: List[str]) -> int:
+    """``pw-dump [-m] [-N] [id]``"""
+    monitor, wanted = False, None
+    for arg in argv:
+        if arg in ("-m", "--monitor"):
+            monitor = True
+        elif arg in ("-N", "--no-colors"):
+            pass
+        elif arg.startswith("-"):
+            raise UsageError(f"unknown option '{arg}'")
+        else:
+            wanted = int(arg)
+
+    with state.locked():
+        current = state.load()
+        objects = [_metadata_object(current, name) for name in METADATA_IDS]
+        objects += state.load_graph()
+        offset = state.events_offset()
+    if wanted is not None:
+        objects = [obj for obj in objects if obj["id"] == wanted]
+    _print_array(objects)
+    if not monitor:
+        return 0
+
+    for event in _follow(state, offset):
+        if event["kind"] == "metadata":
+            _print_array([_metadata_object(state.load(), event["name"])])
+        elif "remove" in event:
+            _print_array([{"id": event["remove"], "info": None}])
+        else:
+            _print_array([event["object"]])
+
+
+def wpctl(state: State, argv: List[str]) -> int:
+    """``wpctl status``"""
+    if argv[:1] != ["status"]:
+        raise UsageError("only 'wpctl status' is simulated")
+
+    current = state.load()
+    nodes = [obj for obj in state.load_graph() if obj["type"].endswith(":Node")]
+    devices = [obj for obj in state.load_graph() if obj["type"].endswith(":Device")]
+
+    def section(title: str, rows: List[str], last: bool = False) -> None:
+        print(f" {'└─' if last else '├─'} {title}:")
+        for row in rows:
+            print(f" {' ' if last else '│'}  {row}")
+        if not last:
+            print(" │  ")
+
+    def node_rows(media_class: str, default_key: str) -> List[str]:
+        rows = []
+        for node in nodes:
+            props = node["info"]["props"]
+            if props["media.class"] != media_class:
+                continue
+            mark = "*" if props["node.name"] == current["defaults"].get(default_key) else " "
+            label = f"{node['id']}. {props['node.description']}"
+            rows.append(f"{mark}   {label:<40} [vol: 1.00]")
+        return rows
+
+    print("PipeWire 'pipewire-0' [1.0.0, fake@localhost, cookie:0]")
+    print(" └─ Clients:")
+    print("        33. WirePlumber                         [1.0.0, fake@localhost, pid:1]")
+    print("")
+    print("Audio")
+    section("Devices", [
+        f"    {dev['id']}. {dev['info']['props']['device.description']:<40} [alsa]"
+        for dev in devices
+    ])
+    section("Sinks", node_rows("Audio/Sink", "default.audio.sink"))
+    section("Sink endpoints", [])
+    section("Sources", node_rows("Audio/Source", "default.audio.source"))
+    section("Source endpoints", [])
+    section("Streams", [
+        f"    {node['id']}. {node['info']['props']['node.description']}"
+        for node in nodes if node["info"]["props"]["media.class"].startswith("Stream/")
+    ], last=True)
+    return 0
+
+
+TOP_HEADER = "S   ID  QUANT   RATE    WAIT    BUSY   W/Q   B/Q  ERR FORMAT           NAME"
+
+
+def _top_time(seconds: float) -> str:
+    """A duration the way pw-top prints it."""
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def _top_row(node_id: int, quantum: int, rate: int, wait: float, busy: float,
+             errors: int, fmt: str, name: str) -> str:
+    period = quantum / rate
+    return (f"R {node_id:>4} {quantum:>6} {rate:>6} {_top_time(wait * period):>7} "
+            f"{_top_time(busy * period):>7} {wait:>5.2f} {busy:>5.2f} {errors:>4} "
+            f"{fmt:<16} {name}")
+
+
+def pw_top(state: State, argv: List[str]) -> int:
+    """
+    ``pw-top -b``: the default sink drives every stream; refreshes until killed.
+
+    With a ``cycle_cost`` the busy time includes that many seconds of fixed
+    work per cycle, and every refresh at which the cycle does not fit into
+    the period counts one more xrun. With a ``switch_gap`` the driver is
+    shown suspended for that many seconds after its rate or quantum changed.
+    With ``idle`` nothing plays and the sink is shown idle.
+    """
+    if not any(arg in ("-b", "--batch-mode") for arg in argv):
+        raise UsageError("only batch mode is simulated")
+
+    overruns = 0
+    clock, switched = None, 0.0
+    while True:
+        current = state.load()
+        load = current["load"]
+        settings = current["settings"]
+        # Unforced, the quantum stays within the bounds (0 meaning PipeWire's)
+        quantum = int(settings.get("clock.force-quantum", "0")) or min(
+            max(int(settings.get("clock.quantum", "1024")),
+                int(settings.get("clock.min-quantum", "0")) or 32),
+            int(settings.get("clock.max-quantum", "0")) or 2048,
+        )
+        rate = int(settings.get("clock.force-rate", "0")) \
+            or int(settings.get("clock.rate", "48000"))
+        nodes = [obj for obj in state.load_graph() if obj["type"].endswith(":Node")]
+        sink = current["defaults"].get("default.audio.sink")
+        busy = load["busy"] + load.get("cycle_cost", 0.0) * rate / quantum
+        if clock is not None and clock != (quantum, rate):
+            switched = time.monotonic()
+        clock = (quantum, rate)
+        suspended = time.monotonic() - switched < load.get("switch_gap", 0.0)
+        idle = load.get("idle", False)
+        if load["wait"] + busy >= 1.0:
+            overruns += 1
+
+        print(TOP_HEADER)
+        for node in nodes:
+            props = node["info"]["props"]
+            if props["node.name"] == sink and (suspended or idle):
+                print(f"{'I' if idle else 'S'} {node['id']:>4}      0      0    ---     ---"
+                      f"   ---   ---    0 {'':<16} {props['node.name']}")
+            elif props["node.name"] == sink:
+                print(_top_row(node["id"], quantum, rate, load["wait"], busy,
+                               load["xruns"] + overruns, f"F32LE 2 {rate}",
+                               props["node.name"]))
+        for node in nodes:
+            props = node["info"]["props"]
+            if (sink and not (suspended or idle)
+                    and props["media.class"].startswith("Stream/Output")):
+                print(_top_row(node["id"], quantum, rate, load["wait"], load["busy"] / 4,
+                               0, f"F32LE 2 {rate}", f" + {props['node.name']}"))
+        print()
+        sys.stdout.flush()
+        time.sleep(load["interval"])
+
+
+TOOLS: Dict[str, Callable[[State, List[str]], Optional[int]]] = {
+    "pw-metadata": pw_metadata,
+    "pw-dump": pw_dump,
+    "wpctl": wpctl,
+    "pw-top": pw_top,
+}
+
+
+def main(tool: str, argv: List[str]) -> int:
+    """Run one fake tool with the faults injected for it."""
+    state = State()
+    start = time.monotonic()
+    faults = state.faults(tool)
+    rng = random.Random()
+
+    delay = faults["latency"] + rng.uniform(0, faults["jitter"])
+    if delay:
+        time.sleep(delay)
+    if faults["hang"]:
+        while True:
+            time.sleep(3600)
+
+    try:
+        if faults["fail"] or rng.random() < faults["fail_rate"]:
+            print(f"{tool}: injected failure", file=sys.stderr)
+            returncode = 1
+        else:
+            returncode = TOOLS[tool](state, argv) or 0
+    except UsageError as e:
+        print(f"{tool}: {e}", file=sys.stderr)
+        returncode = 1
+    except (BrokenPipeError, KeyboardInterrupt):
+        returncode = 0
+    state.record_call(tool, argv, returncode, time.monotonic() - start)
+    return returncode
@@ -0,0 +1,231 @@
+"""Tests for AsyncPipewireEngine and the Qt asyncio bridge."""
+
+import asyncio
+import os
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from pipewire_controller.async_engine import AsyncPipewireEngine
+from pipewire_controller.backend import NativeBackend
+from pipewire_controller.engine import PipewireEngine
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncEngine:
+    """Test the coroutine API against the fake toolchain."""
+
+    def test_settings_round_trip(self, fake_pipewire):
+        """Test apply followed by reads."""
+        engine = AsyncPipewireEngine()
+
+        async def scenario():
+            result = await engine.apply({"clock.force-rate": 96000, "clock.force-quantum": 64})
+            return result, await engine.get_current_rate(), await engine.get_current_quantum()
+
+        result, rate, quantum = _run(scenario())
+
+        assert result.ok
+        assert (rate, quantum) == (96000, 64)
+        assert fake_pipewire.settings["clock.force-rate"] == "96000"
+
+    def test_shares_the_blocking_engine(self, fake_pipewire):
+        """Test reads from the shared settings monitor and a confirmed switch."""
+        fake_pipewire.set_load(interval=0.02)
+        blocking = PipewireEngine()
+        engine = AsyncPipewireEngine(engine=blocking)
+
+        async def scenario():
+            assert await engine.start_monitor()
+            try:
+                reads = len(fake_pipewire.calls("pw-metadata"))
+                switch = await engine.apply_and_wait({"clock.force-rate": 96000})
+                rate = await engine.get_current_rate()
+                return switch, rate, len(fake_pipewire.calls("pw-metadata")) - reads
+            finally:
+                await engine.stop_monitor()
+                blocking.stop_profiler()
+
+        switch, rate, calls = _run(scenario())
+
+        assert switch.confirmed and blocking.monitoring is False
+        assert rate == 96000
+        # Only the write: the snapshots came from the monitor
+        assert calls == 1
+
+    def test_probe_runs_queries_concurrently(self, fake_pipewire):
+        """Test that three slow tools take about as long as one."""
+        for tool in ("pw-dump", "pw-metadata", "wpctl"):
+            fake_pipewire.inject(tool, latency=0.5)
+
+        result = _run(AsyncPipewireEngine().probe())
+
+        assert result.ok
+        assert result.settings["clock.rate"] == 48000
+        assert "Sink" in result.device_info
+        assert result.elapsed < 1.4
+
+    def test_probe_deadline(self, fake_pipewire):
+        """Test that a hung query is cancelled at the deadline and reported."""
+        fake_pipewire.inject("pw-dump", hang=True)
+
+        result = _run(AsyncPipewireEngine().probe(deadline=0.5))
+
+        assert set(result.errors) == {"rates"}
+        assert result.rates == [44100, 48000, 88200, 96000, 176400, 192000]
+        assert result.settings["clock.force-rate"] == 0
+        assert result.elapsed < 2
+
+    def test_probe_logs_failed_device_info(self, fake_pipewire, caplog):
+        """Test that a failing device query is reported and logged."""
+        fake_pipewire.inject("wpctl", fail=True)
+
+        result = _run(AsyncPipewireEngine().probe())
+
+        assert set(result.errors) == {"device_info"}
+        assert result.device_info is None
+        assert "device_info" in caplog.text
+
+    def test_graph_streamed_in_chunks(self, fake_pipewire, monkeypatch):
+        """Test that pw-dump output is scanned as it arrives, not read in full."""
+        import pipewire_controller.async_engine as async_engine
+        monkeypatch.setattr(async_engine, "CHUNK_SIZE", 7)
+        reads = []
+        original = asyncio.StreamReader.read
+
+        async def counting_read(self, n=-1):
+            reads.append(n)
+            return await original(self, n)
+
+        monkeypatch.setattr(asyncio.StreamReader, "read", counting_read)
+
+        rates = _run(AsyncPipewireEngine().get_supported_sample_rates())
+
+        assert rates == PipewireEngine().get_supported_sample_rates()
+        assert len(reads) > 10 and set(reads) == {7}
+
+    def test_failed_dump_is_reported(self, fake_pipewire):
+        """Test that a failing pw-dump fails only the rates query."""
+        fake_pipewire.inject("pw-dump", fail=True)
+
+        result = _run(AsyncPipewireEngine().probe())
+
+        assert set(result.errors) == {"rates"}
+
+    def test_cancel_kills_process(self, fake_pipewire, monkeypatch):
+        """Test that cancelling a call kills the process it started."""
+        fake_pipewire.inject("pw-metadata", hang=True)
+        processes = []
+        create = asyncio.create_subprocess_exec
+
+        async def recording_create(*args, **kwargs):
+            process = await create(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        monkeypatch.setattr(asyncio, "create_subprocess_exec", recording_create)
+
+        async def scenario():
+            task = asyncio.ensure_future(AsyncPipewireEngine().set_sample_rate(44100))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        _run(scenario())
+
+        assert processes and processes[0].returncode is not None
+        with pytest.raises(ProcessLookupError):
+            os.kill(processes[0].pid, 0)
+
+    def test_missing_tools(self, monkeypatch, tmp_path):
+        """Test fallbacks when the tools are not installed."""
+        monkeypatch.setenv("PATH", str(tmp_path))
+        engine = AsyncPipewireEngine()
+
+        result = _run(engine.probe())
+
+        assert set(result.errors) == {"rates", "settings", "device_info"}
+        assert _run(engine.set_buffer_size(256)) is False
+        assert _run(engine.get_device_info()) is None
+
+    def test_persistent_backend_runs_in_thread(self):
+        """Test that a persistent backend is used from a worker thread."""
+        threads = []
+        backend = Mock(spec=NativeBackend)
+        backend.read_settings.side_effect = lambda timeout: (
+            threads.append(threading.current_thread()) or {"clock.force-rate": 44100}
+        )
+
+        rate = _run(AsyncPipewireEngine(backend=backend).get_current_rate())
+
+        assert rate == 44100
+        assert threads and threads[0] is not threading.main_thread()
+
+
+class TestAsyncBridge:
+    """Test awaiting asyncio work from the Qt thread."""
+
+    @pytest.fixture
+    def bridge(self):
+        from PyQt6.QtCore import QCoreApplication
+        from pipewire_controller.ui.async_bridge import AsyncBridge
+
+        app = QCoreApplication.instance() or QCoreApplication([])
+        bridge = AsyncBridge()
+        yield bridge, app
+        bridge.stop()
+
+    def _wait(self, app, task, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not task.done and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+
+    def test_gui_coroutine_resumes_on_gui_thread(self, bridge):
+        """Test that results come back to the GUI thread while the loop stays free."""
+        bridge, app = bridge
+        seen = []
+
+        async def slow():
+            await asyncio.sleep(0.2)
+            return threading.current_thread().name
+
+        async def gui():
+            worker = await bridge.run(slow())
+            seen.append((worker, threading.current_thread() is threading.main_thread()))
+            return "done"
+
+        task = bridge.spawn(gui())
+        assert not task.done
+        self._wait(app, task)
+
+        assert task.result == "done"
+        assert seen == [("asyncio", True)]
+
+    def test_errors_and_cancellation(self, bridge):
+        """Test that exceptions propagate and cancellation reaches the loop."""
+        bridge, app = bridge
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def gui():
+            try:
+                await bridge.run(fail())
+            except ValueError as e:
+                caught = str(e)
+            await bridge.run(asyncio.sleep(30))
+            return caught
+
+        task = bridge.spawn(gui())
+        self._wait(app, task, timeout=0.3)
+        task.cancel()
+        self._wait(app, task)
+
+        assert task.done
+        assert task.result is None
+        assert task.exception is not None
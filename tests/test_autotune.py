@@ -0,0 +1,105 @@
+"""Tests for the adaptive quantum tuner."""
+
+import pytest
+from pipewire_controller.autotune import QuantumTuner
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def tuner(clock):
+    tuner = QuantumTuner(floor=64, ceiling=1024, high_load=0.75, low_load=0.4, quiet=10,
+                         settle=2, clock=clock)
+    tuner.reset(256)
+    return tuner
+
+
+def _run(tuner, clock, seconds, load=0.2, xruns=0):
+    """Feed one summary per second; returns the decisions made."""
+    decisions = []
+    for _ in range(seconds):
+        decision = tuner.update({"quantum": tuner.quantum, "load": load, "xruns": xruns})
+        if decision is not None:
+            decisions.append(decision)
+        clock.now += 1
+    return decisions
+
+
+class TestQuantumTuner:
+    """Test when the quantum is raised and lowered."""
+
+    def test_xruns_raise_at_once(self, tuner, clock):
+        """Test that new xruns double the quantum, then changes settle first."""
+        _run(tuner, clock, 1, load=0.5, xruns=3)
+        decision = tuner.update({"quantum": 256, "load": 0.5, "xruns": 5})
+        assert (decision.old, decision.new, decision.reason) == (256, 512, "2 xruns")
+
+        clock.now += 1
+        assert tuner.update({"quantum": 512, "load": 0.5, "xruns": 6}) is None
+        clock.now += 2
+        assert tuner.update({"quantum": 512, "load": 0.5, "xruns": 7}).new == 1024
+
+    def test_busiest_driver_changing_is_not_an_xrun(self, tuner, clock):
+        """Test that xrun counts of different drivers are never subtracted."""
+        for driver, xruns in [(1, 10), (2, 0), (1, 10), (2, 0)]:
+            assert tuner.update({"id": driver, "quantum": 256, "load": 0.5,
+                                 "xruns": xruns}) is None
+            clock.now += 1
+
+        tuner.update({"id": 2, "quantum": 256, "load": 0.5, "xruns": 0})
+        clock.now += 1
+        decision = tuner.update({"id": 2, "quantum": 256, "load": 0.5, "xruns": 1})
+        assert (decision.new, decision.reason) == (512, "1 xruns")
+
+    def test_load_raises_up_to_ceiling(self, tuner, clock):
+        """Test that overload raises step by step and stops at the ceiling."""
+        decisions = _run(tuner, clock, 20, load=0.9)
+        assert [d.new for d in decisions] == [512, 1024]
+        assert decisions[0].reason == "load above 75%"
+
+    def test_quiet_lowers_step_by_step(self, tuner, clock):
+        """Test that lowering waits for the quiet period each step, down to the floor."""
+        assert _run(tuner, clock, 10) == []
+        decisions = _run(tuner, clock, 40)
+        assert [d.new for d in decisions] == [128, 64]
+        assert decisions[0].reason == "quiet for 10 s"
+        assert tuner.quantum == 64
+
+    def test_hysteresis_band_holds(self, tuner, clock):
+        """Test that a load between the thresholds neither raises nor lowers."""
+        assert _run(tuner, clock, 60, load=0.6) == []
+        assert _run(tuner, clock, 9) == []
+        assert _run(tuner, clock, 60, load=0.6) == []
+
+    def test_failed_step_backs_off(self, tuner, clock):
+        """Test that a quantum left soon after it was reached waits twice as long next time."""
+        assert [d.new for d in _run(tuner, clock, 11)] == [128]
+        # An xrun while the change settles is not held against it
+        assert _run(tuner, clock, 2, xruns=1) == []
+        assert [d.new for d in _run(tuner, clock, 1, xruns=2)] == [256]
+        assert tuner.quiet_needed(128) == 20
+
+        _run(tuner, clock, 3)
+        assert _run(tuner, clock, 15) == []
+        assert [d.new for d in _run(tuner, clock, 10)] == [128]
+        assert len(tuner.decisions()) == 3
+
+    def test_reset_and_bounds(self, clock):
+        """Test taking the driver's quantum and rejecting inverted bounds."""
+        tuner = QuantumTuner(floor=128, ceiling=512, clock=clock)
+        assert tuner.update(None) is None
+        tuner.update({"quantum": 32, "load": 0.5, "xruns": 0})
+        assert tuner.quantum == 128
+        with pytest.raises(ValueError):
+            QuantumTuner(floor=1024, ceiling=512)
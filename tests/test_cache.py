@@ -0,0 +1,192 @@
+"""Tests for the per-device capability cache."""
+
+import asyncio
+import copy
+import time
+from unittest.mock import Mock
+from pipewire_controller.async_engine import AsyncPipewireEngine
+from pipewire_controller.backend import Backend
+from pipewire_controller.capabilities import SINK
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.model import DEVICE_TYPE, Device, Graph
+from pipewire_controller.utils.cache import CapabilityCache, default_cache_dir
+from tests.fake_pipewire.synth import make_device, make_node
+
+
+def _wait_for(predicate, timeout=5):
+    """Poll until ``predicate`` is true."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _graph():
+    return Graph.from_objects([
+        make_device(40, "alsa_card.usb-dac", "USB DAC"),
+        make_node(41, "dac.out", "Audio/Sink", device_id=40, rates=[44100, 48000, 96000]),
+        make_node(42, "dac.in", "Audio/Source", device_id=40, rates=[48000]),
+        make_node(43, "virtual", "Audio/Sink", rates=[32000]),
+    ])
+
+
+def _device(device_id=70, **props):
+    obj = make_device(device_id, "alsa_card.usb-dac", "USB DAC")
+    obj["info"]["props"].update(props)
+    return Device.from_dump(obj)
+
+
+class TestCapabilityCache:
+    """Test storing and looking up device capabilities."""
+
+    def test_round_trip_with_new_ids(self, tmp_path):
+        """Test that a reloaded cache rebuilds the nodes under the current device id."""
+        cache = CapabilityCache(tmp_path / "capabilities.json")
+        cache.store(_graph())
+        assert cache.save()
+
+        graph = CapabilityCache(tmp_path / "capabilities.json").lookup([_device(70)])
+
+        assert graph.supported_rates() == {44100, 48000, 96000}
+        assert {node.name for node in graph.device_nodes(70)} == {"dac.out", "dac.in"}
+        # The nodes keep the ids they were probed with
+        assert graph.node_by_name("dac.out").id == 41
+        # Cached nodes have no state and count as active
+        assert graph.common_rates(SINK) == {44100, 48000, 96000}
+        assert graph.rates_of("dac.in") == {48000}
+
+    def test_misses(self, tmp_path):
+        """Test unknown devices, changed fingerprints and invalidation."""
+        cache = CapabilityCache(tmp_path / "capabilities.json")
+        cache.store(_graph())
+
+        assert cache.lookup([_device(), _device(71, **{"device.name": "alsa_card.hdmi"})]) is None
+        assert cache.lookup([_device(**{"api.alsa.card": "3"})]) is None
+        assert cache.lookup([]) is None
+
+        cache.invalidate(_device().identity)
+        assert cache.lookup([_device()]) is None
+
+        # Probed in different sessions, two devices' nodes got the same id
+        other = Graph.from_objects([
+            make_device(40, "alsa_card.hdmi", "HDMI"),
+            make_node(41, "hdmi.out", "Audio/Sink", device_id=40, rates=[48000]),
+        ])
+        cache.store(_graph())
+        cache.store(other)
+        assert cache.lookup([_device()]) is not None
+        assert cache.lookup([_device(), other.devices()[0]]) is None
+
+    def test_identity_ignores_object_ids(self):
+        """Test that ids and object serials do not change identity or fingerprint."""
+        first, second = _device(70, **{"object.serial": "5"}), _device(90, **{"object.serial": "9"})
+
+        assert first.identity == second.identity
+        assert first.fingerprint == second.fingerprint
+
+    def test_corrupt_or_old_file(self, tmp_path):
+        """Test that an unreadable cache is treated as empty."""
+        path = tmp_path / "capabilities.json"
+        path.write_text("{not json")
+        assert CapabilityCache(path).devices == {}
+        path.write_text('{"version": 0, "devices": {"x": {}}}')
+        assert CapabilityCache(path).devices == {}
+        # Version 1 entries had no node ids
+        path.write_text('{"version": 1, "devices": {"x": {}}}')
+        assert CapabilityCache(path).devices == {}
+
+    def test_default_location(self, monkeypatch, tmp_path):
+        """Test $XDG_CACHE_HOME and the fallback to the config directory."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_cache_dir() == tmp_path / "pipewire-controller"
+        monkeypatch.delenv("XDG_CACHE_HOME")
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert default_cache_dir() == tmp_path / ".config" / "pipewire-controller"
+
+
+class TestEngineCapabilities:
+    """Test load_capabilities against a backend and the fake toolchain."""
+
+    def test_known_devices_skip_enumeration(self, tmp_path):
+        """Test that a cache hit lists devices but never loads the graph."""
+        backend = Mock(spec=Backend)
+        backend.load_graph.return_value = _graph()
+        backend.list_devices.return_value = [_device(40)]
+        engine = PipewireEngine(backend=backend, cache=CapabilityCache(tmp_path / "c.json"))
+
+        assert engine.get_supported_sample_rates() == [32000, 44100, 48000, 96000]
+        assert engine.get_supported_sample_rates() == [44100, 48000, 96000]
+        assert backend.load_graph.call_count == 1
+
+        engine.load_capabilities(refresh=True)
+        assert backend.load_graph.call_count == 2
+
+    def test_conversion_from_cached_nodes(self, tmp_path):
+        """Test that a conversion found in the cache names the probed node."""
+        backend = Mock(spec=Backend)
+        backend.load_graph.return_value = _graph()
+        backend.list_devices.return_value = [_device(40)]
+        engine = PipewireEngine(backend=backend, cache=CapabilityCache(tmp_path / "c.json"))
+        engine.load_capabilities()
+
+        conversion = engine.get_conversion(sink="dac.out", rate=32000)
+
+        assert backend.load_graph.call_count == 1
+        assert conversion.node_id == 41 and conversion.resample
+
+    def test_hotplug_invalidates(self, fake_pipewire, tmp_path):
+        """Test that a new device or a changed one forces a full probe."""
+        cache = CapabilityCache(tmp_path / "c.json")
+        engine = PipewireEngine(cache=cache)
+        rates = engine.get_supported_sample_rates()
+        dumps = len(fake_pipewire.calls("pw-dump"))
+
+        assert engine.get_supported_sample_rates() == rates
+        assert len(fake_pipewire.calls("pw-dump")) == dumps + 1  # device listing only
+
+        device = next(o for o in fake_pipewire.objects if o["type"] == DEVICE_TYPE)
+        replugged = copy.deepcopy(device)
+        replugged["info"]["props"]["api.alsa.card"] = "7"
+        fake_pipewire.add_object(replugged)
+        engine.get_supported_sample_rates()
+        assert len(fake_pipewire.calls("pw-dump")) == dumps + 3  # listing and full load
+
+    def test_replug_seen_by_mirror_invalidates(self, fake_pipewire, tmp_path):
+        """Test that a device unplugged while mirrored is probed again when it returns."""
+        cache = CapabilityCache(tmp_path / "c.json")
+        engine = PipewireEngine(cache=cache)
+        engine.load_capabilities()
+        device = next(o for o in fake_pipewire.objects if o["type"] == DEVICE_TYPE)
+        identity = Device.from_dump(device).identity
+        assert identity in cache.devices
+
+        assert engine.start_graph_mirror()
+        try:
+            fake_pipewire.remove_object(device["id"])
+            assert _wait_for(lambda: identity not in cache.devices)
+        finally:
+            engine.stop_graph_mirror()
+        assert identity not in CapabilityCache(tmp_path / "c.json").devices
+
+        # Same fingerprint on return, still a full probe
+        fake_pipewire.add_object(device)
+        dumps = len(fake_pipewire.calls("pw-dump"))
+        engine.load_capabilities()
+        assert len(fake_pipewire.calls("pw-dump")) == dumps + 2
+        assert identity in cache.devices
+
+    def test_async_probe_uses_cache(self, fake_pipewire, tmp_path):
+        """Test the async engine fills and then reads the same cache."""
+        cache = CapabilityCache(tmp_path / "c.json")
+        first = asyncio.run(AsyncPipewireEngine(cache=cache).probe())
+        assert cache.devices
+
+        dumps = len(fake_pipewire.calls("pw-dump"))
+        second = asyncio.run(
+            AsyncPipewireEngine(cache=CapabilityCache(tmp_path / "c.json")).probe()
+        )
+
+        assert second.rates == first.rates
+        assert len(fake_pipewire.calls("pw-dump")) == dumps + 1  # device listing only
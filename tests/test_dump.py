@@ -0,0 +1,138 @@
+"""Tests for the streaming pw-dump parser."""
+
+import io
+import json
+import subprocess
+import sys
+import tracemalloc
+import pytest
+from pipewire_controller.dump import NODE_TYPE, iter_dump_objects, stream_command
+
+
+def _node(node_id, media_class="Audio/Sink"):
+    return {
+        "id": node_id,
+        "type": NODE_TYPE,
+        "info": {
+            "props": {"media.class": media_class, "node.name": f"node {{{node_id}}} \"x\""},
+            "params": {"EnumFormat": [{"rate": 48000}]}
+        }
+    }
+
+
+def _client(client_id):
+    return {
+        "id": client_id,
+        "type": "PipeWire:Interface:Client",
+        "info": {"props": {"application.name": "app } with [braces]" * 20}}
+    }
+
+
+class _LazyDump(io.TextIOBase):
+    """Text stream that renders a large dump on demand instead of holding it."""
+
+    def __init__(self, count):
+        self._remaining = count
+        self._client = json.dumps(_client(1), indent=2) + ",\n"
+        self._pending = "[" + json.dumps(_node(0), indent=2) + ",\n"
+        self.size = 0
+
+    def read(self, size=-1):
+        while self._remaining and len(self._pending) < size:
+            self._remaining -= 1
+            self._pending += self._client if self._remaining else "{}]"
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        self.size += len(chunk)
+        return chunk
+
+
+class TestIterDumpObjects:
+    """Test incremental decoding of pw-dump output."""
+
+    def test_yields_every_object(self):
+        """Test that all top-level objects are decoded in order."""
+        objects = [_node(1), _client(2), _node(3)]
+
+        parsed = list(iter_dump_objects(io.StringIO(json.dumps(objects, indent=2))))
+
+        assert parsed == objects
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+    def test_objects_split_across_chunks(self, chunk_size):
+        """Test that strings with braces and escapes survive chunk boundaries."""
+        objects = [_node(1), _client(2)]
+        text = json.dumps(objects)
+
+        parsed = list(iter_dump_objects(io.StringIO(text), chunk_size=chunk_size))
+
+        assert parsed == objects
+
+    def test_type_filter_skips_without_decoding(self):
+        """Test that filtered objects are never handed to the JSON decoder."""
+        text = (
+            '[{"id": 1, "type": "PipeWire:Interface:Link", "info": {not json}},'
+            + json.dumps(_node(2)) + "]"
+        )
+
+        parsed = list(iter_dump_objects(io.StringIO(text), types={NODE_TYPE}))
+
+        assert [obj["id"] for obj in parsed] == [2]
+
+    def test_monitor_arrays(self):
+        """Test consecutive arrays as printed by pw-dump --monitor."""
+        text = json.dumps([_node(1)]) + "\n" + json.dumps([{"id": 1, "info": None}])
+
+        parsed = list(iter_dump_objects(io.StringIO(text)))
+
+        assert parsed == [_node(1), {"id": 1, "info": None}]
+
+    def test_invalid_node_raises(self):
+        """Test that broken objects of a wanted type raise a decode error."""
+        text = '[{"id": 1, "type": "PipeWire:Interface:Node", broken}]'
+
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_dump_objects(io.StringIO(text), types={NODE_TYPE}))
+
+    def test_peak_memory_independent_of_dump_size(self):
+        """Test that memory stays bounded while streaming a large dump."""
+        stream = _LazyDump(3000)
+
+        tracemalloc.start()
+        try:
+            nodes = list(iter_dump_objects(stream, types={NODE_TYPE}))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert len(nodes) == 1
+        assert stream.size > 1_500_000
+        assert peak < stream.size // 4
+
+
+class TestStreamCommand:
+    """Test running a command as a stream."""
+
+    def test_streams_output(self):
+        """Test reading a real command's stdout."""
+        command = [sys.executable, "-c", "print('[{\"id\": 1}]')"]
+
+        with stream_command(command, timeout=5) as stdout:
+            parsed = list(iter_dump_objects(stdout))
+
+        assert parsed == [{"id": 1}]
+
+    def test_nonzero_exit_raises(self):
+        """Test that a failing command raises CalledProcessError."""
+        command = [sys.executable, "-c", "import sys; sys.exit(3)"]
+
+        with pytest.raises(subprocess.CalledProcessError):
+            with stream_command(command, timeout=5) as stdout:
+                stdout.read()
+
+    def test_timeout_kills_command(self):
+        """Test that a hanging command is killed after the timeout."""
+        command = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            with stream_command(command, timeout=0.2) as stdout:
+                stdout.read()
@@ -4,7 +4,10 @@ import pytest
 import json
 import subprocess
 from unittest.mock import Mock, patch
-from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.capabilities import SINK
+from pipewire_controller.engine import (
+    MAX_ALLOWED_RATES, PipewireEngine, allowed_rates, latency_quantum, native_rate_settings,
+)
 
 
 class TestPipewireEngine:
@@ -62,10 +65,11 @@ class TestPipewireEngine:
         
         assert result is False
 
-    def test_get_supported_rates_with_devices(self, mocker):
+    def test_get_supported_rates_with_devices(self, mock_subprocess_popen):
         """Test getting supported rates from pw-dump."""
         pw_dump_output = json.dumps([
             {
+                "id": 50,
                 "type": "PipeWire:Interface:Node",
                 "info": {
                     "props": {"media.class": "Audio/Sink"},
@@ -80,21 +84,20 @@ class TestPipewireEngine:
             }
         ])
         
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = Mock(stdout=pw_dump_output, returncode=0)
+        mock_popen = mock_subprocess_popen(pw_dump_output)
         
         engine = PipewireEngine()
         rates = engine.get_supported_sample_rates()
         
+        assert mock_popen.call_args[0][0] == ["pw-dump"]
         assert 48000 in rates
         assert 96000 in rates
         assert 192000 in rates
         assert rates == sorted(rates)
 
-    def test_get_supported_rates_fallback_on_error(self, mocker):
+    def test_get_supported_rates_fallback_on_error(self, mock_subprocess_popen):
         """Test fallback rates when pw-dump fails."""
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.side_effect = subprocess.CalledProcessError(1, "pw-dump")
+        mock_subprocess_popen("", returncode=1)
         
         engine = PipewireEngine()
         rates = engine.get_supported_sample_rates()
@@ -103,10 +106,11 @@ class TestPipewireEngine:
         assert 48000 in rates
         assert len(rates) > 0
 
-    def test_get_supported_rates_with_range(self, mocker):
+    def test_get_supported_rates_with_range(self, mock_subprocess_popen):
         """Test rate extraction with min/max range."""
         pw_dump_output = json.dumps([
             {
+                "id": 51,
                 "type": "PipeWire:Interface:Node",
                 "info": {
                     "props": {"media.class": "Audio/Source"},
@@ -119,8 +123,7 @@ class TestPipewireEngine:
             }
         ])
         
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = Mock(stdout=pw_dump_output, returncode=0)
+        mock_subprocess_popen(pw_dump_output)
         
         engine = PipewireEngine()
         rates = engine.get_supported_sample_rates()
@@ -134,6 +137,7 @@ class TestPipewireEngine:
         """Test that non-audio devices are ignored."""
         devices = [
             {
+                "id": 52,
                 "type": "PipeWire:Interface:Node",
                 "info": {
                     "props": {"media.class": "Video/Source"},
@@ -212,10 +216,9 @@ class TestPipewireEngine:
         engine = PipewireEngine()
         assert engine.timeout == 5
 
-    def test_json_parse_error_returns_fallback(self, mocker):
+    def test_json_parse_error_returns_fallback(self, mock_subprocess_popen):
         """Test that invalid JSON returns fallback rates."""
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = Mock(stdout="invalid json", returncode=0)
+        mock_subprocess_popen('[{"type": "PipeWire:Interface:Node", invalid json}]')
         
         engine = PipewireEngine()
         rates = engine.get_supported_sample_rates()
@@ -223,10 +226,9 @@ class TestPipewireEngine:
         assert len(rates) > 0
         assert 48000 in rates
 
-    def test_empty_devices_returns_fallback(self, mocker):
+    def test_empty_devices_returns_fallback(self, mock_subprocess_popen):
         """Test that empty device list returns fallback rates."""
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = Mock(stdout="[]", returncode=0)
+        mock_subprocess_popen("[]")
         
         engine = PipewireEngine()
         rates = engine.get_supported_sample_rates()
@@ -234,3 +236,237 @@ class TestPipewireEngine:
         assert len(rates) > 0
         assert 44100 in rates
         assert 48000 in rates
+
+    def test_monitor_mode_serves_reads_from_cache(self, mocker):
+        """Test that monitor mode reads do not spawn pw-metadata."""
+        mock_run = mocker.patch("subprocess.run")
+        engine = PipewireEngine()
+        mocker.patch.object(type(engine._monitor), "running", True)
+        engine._monitor.feed("update: id:0 key:'clock.force-rate' value:'96000' type:''")
+        engine._monitor.feed("update: id:0 key:'clock.force-quantum' value:'128' type:''")
+
+        assert engine.get_current_rate() == 96000
+        assert engine.get_current_quantum() == 128
+        mock_run.assert_not_called()
+
+    def test_subscribe_receives_monitor_changes(self):
+        """Test that engine subscribers see monitor updates."""
+        engine = PipewireEngine()
+        events = []
+        engine.subscribe(lambda key, value: events.append((key, value)))
+
+        engine._monitor.feed("update: id:0 key:'clock.force-quantum' value:'64' type:''")
+
+        assert events == [("clock.force-quantum", 64)]
+
+    def test_settings_snapshot_reads_all_clock_keys(self, mocker):
+        """Test that one pw-metadata call returns every clock key."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = Mock(
+            stdout=(
+                "Found \"settings\" metadata 31\n"
+                "update: id:0 key:'log.level' value:'2' type:''\n"
+                "update: id:0 key:'clock.rate' value:'48000' type:''\n"
+                "update: id:0 key:'clock.allowed-rates' value:'[ 44100, 48000 ]' type:''\n"
+                "update: id:0 key:'clock.min-quantum' value:'32' type:''\n"
+                "update: id:0 key:'clock.force-quantum' value:'256' type:''\n"
+            ),
+            returncode=0
+        )
+
+        engine = PipewireEngine()
+        snapshot = engine.get_settings_snapshot()
+
+        assert snapshot == {
+            "clock.rate": 48000,
+            "clock.allowed-rates": [44100, 48000],
+            "clock.min-quantum": 32,
+            "clock.force-quantum": 256,
+        }
+        mock_run.assert_called_once_with(
+            ["pw-metadata", "-n", "settings"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5
+        )
+
+    def test_settings_snapshot_ttl_shares_one_call(self, mocker):
+        """Test that reads within the TTL share a single process."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = Mock(
+            stdout=(
+                "key='clock.force-rate' value='96000' type=''\n"
+                "key='clock.force-quantum' value='128' type=''\n"
+            ),
+            returncode=0
+        )
+
+        engine = PipewireEngine(snapshot_ttl=60)
+
+        assert engine.get_current_rate() == 96000
+        assert engine.get_current_quantum() == 128
+        assert mock_run.call_count == 1
+
+    def test_settings_snapshot_invalidated_by_write(self, mocker):
+        """Test that a write forces the next read to query PipeWire."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = Mock(stdout="key='clock.force-rate' value='48000' type=''\n")
+
+        engine = PipewireEngine(snapshot_ttl=60)
+        engine.get_current_rate()
+        engine.set_sample_rate(96000)
+        engine.get_current_rate()
+
+        assert mock_run.call_count == 3
+
+    def test_settings_snapshot_failure(self, mocker):
+        """Test that a failed read yields an empty snapshot."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.side_effect = subprocess.TimeoutExpired("pw-metadata", 5)
+
+        engine = PipewireEngine()
+
+        assert engine.get_settings_snapshot() == {}
+        assert engine.get_current_quantum() is None
+
+    def test_apply_orders_quantum_before_rate(self, mocker):
+        """Test that a batch writes the quantum before the rate."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = Mock(stdout="", returncode=0)
+
+        engine = PipewireEngine()
+        result = engine.apply({"clock.force-rate": 96000, "clock.force-quantum": 256})
+
+        writes = [call.args[0] for call in mock_run.call_args_list[1:]]
+        assert writes == [
+            ["pw-metadata", "-n", "settings", "0", "clock.force-quantum", "256"],
+            ["pw-metadata", "-n", "settings", "0", "clock.force-rate", "96000"],
+        ]
+        assert result.results == {"clock.force-quantum": True, "clock.force-rate": True}
+        assert result.ok is True
+        assert result.elapsed >= 0
+
+    def test_apply_skips_values_already_in_effect(self, mocker):
+        """Test that unchanged keys are not rewritten."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = Mock(
+            stdout="update: id:0 key:'clock.force-rate' value:'48000' type:''\n",
+            returncode=0
+        )
+
+        engine = PipewireEngine()
+        result = engine.apply({"clock.force-rate": 48000, "clock.force-quantum": 512})
+
+        assert mock_run.call_count == 2
+        assert mock_run.call_args.args[0][-2:] == ["clock.force-quantum", "512"]
+        assert result.results == {"clock.force-quantum": True, "clock.force-rate": True}
+
+    def test_apply_reports_failed_keys(self, mocker):
+        """Test per-key results when one write fails."""
+        def run(args, **kwargs):
+            if args[-2:] == ["clock.force-rate", "96000"]:
+                raise subprocess.CalledProcessError(1, "pw-metadata")
+            return Mock(stdout="", returncode=0)
+
+        mocker.patch("subprocess.run", side_effect=run)
+
+        engine = PipewireEngine()
+        result = engine.apply({"clock.force-rate": 96000, "clock.allowed-rates": [48000, 96000]})
+
+        assert result.results == {"clock.allowed-rates": True, "clock.force-rate": False}
+        assert result.ok is False
+
+    def test_allowed_rates_keeps_those_nearest_preferred(self):
+        """Test that a long rate list is cut down to the rates around 48 kHz."""
+        assert allowed_rates([96000, 44100, 48000, 44100]) == [44100, 48000, 96000]
+        rates = allowed_rates(range(8000, 8000 + 1000 * 100, 1000))
+        assert len(rates) == MAX_ALLOWED_RATES
+        assert 48000 in rates and rates == sorted(rates)
+
+    def test_set_allowed_rates_from_supported(self, fake_pipewire):
+        """Test that the detected rates are written as one list and the rate is unforced."""
+        engine = PipewireEngine()
+        fake_pipewire.add_node(900, "dac", rates=[44100, 96000])
+        fake_pipewire.set_setting("clock.force-rate", 96000)
+
+        assert engine.set_allowed_rates().ok
+        written = fake_pipewire.settings["clock.allowed-rates"]
+        expected = allowed_rates(engine.get_supported_sample_rates())
+        assert written == "[ " + " ".join(map(str, expected)) + " ]"
+        assert "44100" in written and "96000" in written
+        assert fake_pipewire.settings["clock.force-rate"] == "0"
+
+        assert engine.set_allowed_rates([48000]).ok
+        assert engine.get_settings_snapshot()["clock.allowed-rates"] == [48000]
+
+    def test_native_rate_settings(self):
+        """Test the batch that hands the rate choice to PipeWire."""
+        assert native_rate_settings([96000, 44100]) == {
+            "clock.allowed-rates": [44100, 96000], "clock.force-rate": 0,
+        }
+
+    def test_common_and_node_rates(self, fake_pipewire):
+        """Test the rate queries with one dump per call and from the graph mirror."""
+        fake_pipewire.add_node(900, "dac", rates=[44100, 48000, 96000], state="running")
+        fake_pipewire.add_node(901, "hdmi", rates=[48000, 96000], state="idle")
+        fake_pipewire.add_node(902, "spare", rates=[32000], state="suspended")
+        engine = PipewireEngine()
+
+        assert engine.get_common_rates(SINK) == [48000, 96000]
+        assert engine.get_node_rates("dac") == [44100, 48000, 96000]
+        assert engine.get_node_rates("missing") == []
+
+        assert engine.start_graph_mirror()
+        try:
+            dumps = len(fake_pipewire.calls("pw-dump"))
+            assert engine.get_common_rates(SINK) == [48000, 96000]
+            assert engine.get_node_rates("spare") == [32000]
+            assert len(fake_pipewire.calls("pw-dump")) == dumps
+        finally:
+            engine.stop_graph_mirror()
+
+    def test_set_quantum_limits(self, fake_pipewire):
+        """Test writing both bounds, and refusing crossed ones."""
+        engine = PipewireEngine()
+        assert engine.set_quantum_limits(64, 1024).ok
+        assert fake_pipewire.settings["clock.min-quantum"] == "64"
+        assert fake_pipewire.settings["clock.max-quantum"] == "1024"
+        with pytest.raises(ValueError):
+            engine.set_quantum_limits(512, 256)
+
+    @pytest.mark.parametrize("target, rate, bounds, quantum", [
+        (10, 48000, (32, 2048), 512),
+        (10, 192000, (32, 2048), 2048),
+        (10, 44100, (32, 2048), 512),
+        (10, 192000, (32, 1024), 1024),
+        (1, 48000, (64, 2048), 64),
+        (8, 48000, (32, 2048), 512),
+    ])
+    def test_latency_quantum(self, target, rate, bounds, quantum):
+        """Test the nearest power of two within the bounds, ties to the larger."""
+        assert latency_quantum(target, rate, *bounds) == quantum
+
+    def test_set_latency_at_forced_rate(self, fake_pipewire):
+        """Test that the quantum follows the forced rate and the max-quantum bound."""
+        engine = PipewireEngine()
+        fake_pipewire.set_setting("clock.force-rate", 96000)
+        fake_pipewire.set_setting("clock.max-quantum", 512)
+
+        assert engine.set_latency(10) == 512
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+        assert engine.set_latency(5, rate=48000) == 256
+
+    def test_conversion_for_default_sink(self, fake_pipewire):
+        """Test conversion detection for the default sink at the forced rate."""
+        fake_pipewire.add_node(900, "dac", description="USB DAC Sink", rates=[48000, 96000],
+                               formats=["S24_32LE"], state="running")
+        fake_pipewire.set_default("dac")
+        fake_pipewire.set_setting("clock.force-rate", 44100)
+
+        conversion = PipewireEngine().get_conversion()
+
+        assert conversion.node_id == 900
+        assert conversion.resample and conversion.device_rate == 48000
+        assert conversion.device_format == "S24_32LE"
+        assert PipewireEngine().get_conversion(sink="missing") is None
@@ -0,0 +1,220 @@
+"""End-to-end tests of the engine against the fake PipeWire toolchain."""
+
+import subprocess
+import time
+import pytest
+from pipewire_controller.engine import ApplyResult, PipewireEngine
+from pipewire_controller.graph import GraphEventType
+from pipewire_controller.model import Graph
+from tests.fake_pipewire import generate_graph
+
+
+def _wait_for(predicate, timeout=5):
+    """Poll until ``predicate`` is true."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestSynth:
+    """Test the synthetic graph generator."""
+
+    @pytest.mark.parametrize("nodes", [10, 100, 10000])
+    def test_node_count(self, nodes):
+        """Test that the requested number of nodes is generated."""
+        objects, defaults = generate_graph(nodes, ports=False)
+        graph = Graph.from_objects(objects)
+
+        assert len(graph.nodes()) == nodes
+        assert len(list(graph.audio_nodes())) == nodes // 2
+        assert graph.node_by_name(defaults["default.audio.sink"]) is not None
+
+    def test_seed_is_deterministic(self):
+        """Test that a seed always yields the same graph."""
+        assert generate_graph(50, seed=3) == generate_graph(50, seed=3)
+        assert generate_graph(50, seed=3) != generate_graph(50, seed=4)
+
+
+class TestTools:
+    """Test the fake executables directly."""
+
+    def test_metadata_write_is_shared(self, fake_pipewire):
+        """Test that a write through pw-metadata is seen by pw-dump."""
+        subprocess.run(["pw-metadata", "-n", "settings", "0", "clock.force-rate", "96000"],
+                       check=True, capture_output=True)
+        dump = subprocess.run(["pw-dump"], check=True, capture_output=True, text=True).stdout
+
+        assert fake_pipewire.settings["clock.force-rate"] == "96000"
+        assert '"value": 96000' in dump
+        assert [call["tool"] for call in fake_pipewire.calls()] == ["pw-metadata", "pw-dump"]
+
+    def test_injected_failure(self, fake_pipewire):
+        """Test that an injected failure exits non-zero without side effects."""
+        fake_pipewire.inject("pw-metadata", fail=True)
+
+        result = subprocess.run(["pw-metadata", "-n", "settings", "0", "clock.rate", "1"],
+                                capture_output=True, text=True)
+
+        assert result.returncode == 1
+        assert "injected failure" in result.stderr
+        assert fake_pipewire.settings["clock.rate"] == "48000"
+
+    def test_injected_latency(self, fake_pipewire):
+        """Test that injected latency delays the tool."""
+        fake_pipewire.inject("wpctl", latency=0.3)
+
+        start = time.monotonic()
+        subprocess.run(["wpctl", "status"], check=True, capture_output=True)
+
+        assert time.monotonic() - start >= 0.3
+
+
+class TestEngineAgainstFake:
+    """Test PipewireEngine end to end with real processes."""
+
+    def test_settings_round_trip(self, fake_pipewire):
+        """Test apply followed by reads."""
+        engine = PipewireEngine(snapshot_ttl=0)
+
+        result = engine.apply({"clock.force-rate": 96000, "clock.force-quantum": 256})
+
+        assert result.ok
+        assert engine.get_current_rate() == 96000
+        assert engine.get_current_quantum() == 256
+        assert engine.get_settings_snapshot()["clock.allowed-rates"] == [48000]
+
+    def test_supported_rates_and_device(self, fake_pipewire):
+        """Test capability and default device queries."""
+        fake_pipewire.add_node(500, "usb-dac", description="USB Sink",
+                               rates=[{"default": 48000, "min": 44100, "max": 96000}])
+        fake_pipewire.set_default("usb-dac")
+        engine = PipewireEngine()
+
+        assert engine.get_supported_sample_rates() == sorted(
+            Graph.from_objects(fake_pipewire.objects).supported_rates()
+        )
+        assert 88200 in engine.get_supported_sample_rates()
+        assert "*   500. USB Sink" in engine.get_device_info()
+
+    def test_hang_hits_timeout(self, fake_pipewire):
+        """Test that a hung tool is reported as a failure after the timeout."""
+        fake_pipewire.inject("pw-metadata", hang=True)
+        engine = PipewireEngine()
+        engine.timeout = 0.5
+
+        start = time.monotonic()
+        assert engine.set_sample_rate(44100) is False
+        assert time.monotonic() - start < 3
+
+    def test_settings_monitor(self, fake_pipewire):
+        """Test that the monitor sees changes made by other clients."""
+        engine = PipewireEngine()
+        seen = []
+        engine.subscribe(lambda key, value: seen.append((key, value)))
+        assert engine.start_monitor()
+        try:
+            assert _wait_for(lambda: engine.get_current_rate() == 0)
+            fake_pipewire.set_setting("clock.force-rate", 44100)
+
+            assert _wait_for(lambda: ("clock.force-rate", 44100) in seen)
+            assert engine.get_current_rate() == 44100
+        finally:
+            engine.stop_monitor()
+
+    def test_graph_mirror_hotplug(self, fake_pipewire):
+        """Test that the graph mirror follows hotplug and default changes."""
+        engine = PipewireEngine()
+        events = []
+        engine.subscribe_graph(events.append)
+        assert engine.start_graph_mirror()
+        try:
+            fake_pipewire.add_node(600, "hotplug", rates=[192000])
+            assert _wait_for(lambda: 192000 in engine.get_supported_sample_rates())
+
+            fake_pipewire.set_default("hotplug")
+            assert _wait_for(lambda: engine.get_device_info() == "600. hotplug")
+
+            fake_pipewire.remove_object(600)
+            assert _wait_for(lambda: any(
+                e.type == GraphEventType.NODE_REMOVED and e.id == 600 for e in events
+            ))
+        finally:
+            engine.stop_graph_mirror()
+
+
+class TestApplyAndWait:
+    """Test waiting for the driver to run with written settings."""
+
+    @pytest.fixture
+    def engine(self, fake_pipewire):
+        fake_pipewire.set_load(interval=0.02)
+        engine = PipewireEngine()
+        yield engine
+        engine.stop_profiler()
+
+    def test_confirmed_switch(self, engine, fake_pipewire):
+        """Test the latency and silence of a switch with the driver suspended on the way."""
+        fake_pipewire.set_load(switch_gap=0.3)
+        assert engine.start_profiler()
+        assert _wait_for(lambda: engine.profiler.latest()[1])
+
+        result = engine.apply_and_wait({"clock.force-rate": 96000, "clock.force-quantum": 256})
+
+        assert result.applied.ok and result.confirmed
+        assert (result.rate, result.quantum) == (96000, 256)
+        assert 0.25 <= result.silence <= result.latency
+        assert engine.profiler is not None
+
+    def test_rate_confirmed_by_graph_event(self, engine, fake_pipewire):
+        """Test that the mirror confirms a rate before pw-top refreshes again."""
+        fake_pipewire.set_load(interval=5)
+        assert engine.start_graph_mirror()
+        try:
+            assert engine.start_profiler()
+            assert _wait_for(lambda: engine.profiler.latest()[1])
+            refreshed = engine.profiler.latest()[0]
+
+            result = engine.apply_and_wait({"clock.force-rate": 96000}, timeout=3)
+
+            assert result.confirmed and result.latency < 1
+            assert engine.profiler.latest()[0] == refreshed
+        finally:
+            engine.stop_graph_mirror()
+
+    def test_unconfirmed_switch(self, engine, monkeypatch):
+        """Test a quantum the driver never reports, with the profiler started for the call."""
+        # The metadata write succeeds, but the graph keeps its old quantum
+        monkeypatch.setattr(engine, "apply", lambda settings: ApplyResult(
+            {key: True for key in settings}))
+
+        result = engine.apply_and_wait({"clock.force-quantum": 128}, timeout=0.3)
+
+        assert result.applied.ok and not result.confirmed and result.latency is None
+        assert engine.profiler is None
+
+    def test_idle_driver_is_not_waited_for(self, engine, fake_pipewire):
+        """Test that a write to an idle graph returns without waiting for the timeout."""
+        fake_pipewire.set_load(idle=True)
+        assert engine.start_profiler()
+        assert _wait_for(lambda: engine.profiler.latest()[1])
+        start = time.monotonic()
+
+        result = engine.apply_and_wait({"clock.force-rate": 96000}, timeout=5)
+
+        assert time.monotonic() - start < 1
+        assert result.applied.ok and result.idle and not result.confirmed
+        assert fake_pipewire.settings["clock.force-rate"] == "96000"
+
+    def test_idle_driver_with_profiler_started_for_the_call(self, engine, fake_pipewire):
+        """Test that the first refresh decides when the profiler was not running."""
+        fake_pipewire.set_load(idle=True)
+        start = time.monotonic()
+
+        result = engine.apply_and_wait({"clock.force-quantum": 128}, timeout=5)
+
+        assert time.monotonic() - start < 2
+        assert result.applied.ok and result.idle
+        assert engine.profiler is None
@@ -0,0 +1,107 @@
+"""Tests for following the rate of the playing streams."""
+
+import time
+import pytest
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.follower import RateFollower
+from pipewire_controller.model import Node
+
+SUPPORTED = {44100, 48000, 96000}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _stream(node_id, rate, name="player"):
+    return Node(node_id, name, media_class="Stream/Output/Audio", state="running", rate=rate)
+
+
+class TestRateFollower:
+    """Test choosing and debouncing the source rate."""
+
+    def test_switches_after_age_and_hold(self, clock):
+        """Test that a stream counts after ``min_age`` and wins after ``hold``."""
+        follower = RateFollower(min_age=2, hold=1, clock=clock)
+        streams = [_stream(70, 44100, "Music")]
+        assert follower.update(streams, SUPPORTED, 48000) is None
+        clock.now += 2
+        assert follower.update(streams, SUPPORTED, 48000) is None
+        assert (follower.dominant, follower.source) == (44100, "Music")
+        clock.now += 1
+        assert follower.update(streams, SUPPORTED, 48000) == 44100
+        assert follower.update(streams, SUPPORTED, 44100) is None
+
+    def test_short_sounds_are_ignored(self, clock):
+        """Test that a notification sound ending before ``min_age`` changes nothing."""
+        follower = RateFollower(min_age=2, hold=0, clock=clock)
+        music = _stream(70, 44100)
+        for _ in range(4):
+            clock.now += 1
+            assert follower.update([music], SUPPORTED, 44100) is None
+        assert follower.update([music, _stream(80, 48000, "ding")], SUPPORTED, 44100) is None
+        clock.now += 1
+        assert follower.update([music], SUPPORTED, 44100) is None
+        clock.now += 5
+        assert follower.update([music], SUPPORTED, 44100) is None
+
+    def test_majority_then_oldest(self, clock):
+        """Test that most streams win, and the stream that started first breaks ties."""
+        follower = RateFollower(min_age=0, hold=0, clock=clock)
+        first = _stream(70, 96000)
+        assert follower.update([first], SUPPORTED, 48000) == 96000
+        clock.now += 1
+        tie = [first, _stream(71, 44100)]
+        assert follower.update(tie, SUPPORTED, 96000) is None
+        majority = tie + [_stream(72, 44100)]
+        assert follower.update(majority, SUPPORTED, 96000) == 44100
+
+    def test_unsupported_rates_and_silence(self, clock):
+        """Test that rates the hardware lacks and the end of playback keep the rate."""
+        follower = RateFollower(min_age=0, hold=0, clock=clock)
+        assert follower.update([_stream(70, 22050)], SUPPORTED, 48000) is None
+        assert follower.update([], SUPPORTED, 48000) is None
+        assert follower.source is None
+
+    def test_rate_change_restarts_age(self, clock):
+        """Test that a stream switching rate has to play long enough again."""
+        follower = RateFollower(min_age=2, hold=0, clock=clock)
+        follower.update([_stream(70, 44100)], SUPPORTED, 44100)
+        clock.now += 3
+        assert follower.update([_stream(70, 96000)], SUPPORTED, 44100) is None
+        clock.now += 2
+        assert follower.update([_stream(70, 96000)], SUPPORTED, 44100) == 96000
+
+
+class TestFakeStreams:
+    """Test seeing streams through the graph mirror of the fake PipeWire."""
+
+    def test_playback_streams(self, fake_pipewire):
+        """Test that running playback streams and their rates are mirrored."""
+        engine = PipewireEngine()
+        assert engine.start_graph_mirror()
+        try:
+            fake_pipewire.add_node(700, "spotify", "Stream/Output/Audio",
+                                   state="running", rate=44100)
+            fake_pipewire.add_node(701, "recorder", "Stream/Input/Audio",
+                                   state="running", rate=48000)
+            fake_pipewire.add_node(702, "paused", "Stream/Output/Audio", rate=96000)
+
+            def added():
+                return {n.id: n.rate for n in engine.graph.playback_streams() if n.id >= 700}
+
+            deadline = time.monotonic() + 5
+            while not added() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert added() == {700: 44100}
+        finally:
+            engine.stop_graph_mirror()
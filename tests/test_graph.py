@@ -0,0 +1,225 @@
+"""Tests for the live graph mirror."""
+
+import io
+import json
+import os
+import pytest
+from unittest.mock import Mock
+from pipewire_controller import model
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.graph import GraphEventType, GraphMirror
+from tests.fake_pipewire.synth import make_device
+
+
+def _node(node_id, rates, name="dac", media_class="Audio/Sink"):
+    return {
+        "id": node_id,
+        "type": "PipeWire:Interface:Node",
+        "info": {
+            "props": {"media.class": media_class, "node.name": name,
+                      "node.description": name.upper()},
+            "params": {"EnumFormat": [{"rate": rate} for rate in rates]}
+        }
+    }
+
+
+def _defaults(sink):
+    return {
+        "id": 40,
+        "type": "PipeWire:Interface:Metadata",
+        "props": {"metadata.name": "default"},
+        "metadata": [
+            {"subject": 0, "key": "default.audio.sink", "type": "Spa:String:JSON",
+             "value": {"name": sink}}
+        ]
+    }
+
+
+@pytest.fixture
+def mirror():
+    """Mirror with an event recorder attached."""
+    mirror = GraphMirror()
+    mirror.events = []
+    mirror.subscribe(mirror.events.append)
+    return mirror
+
+
+class TestGraphMirror:
+    """Test applying pw-dump deltas to the mirror."""
+
+    def test_node_added_and_rates(self, mirror):
+        """Test that audio nodes contribute their rates."""
+        mirror.apply(_node(50, [44100, 48000]))
+        mirror.apply(_node(51, [96000], name="mic", media_class="Audio/Source"))
+        mirror.apply(_node(52, [30], media_class="Video/Source"))
+
+        assert mirror.supported_rates() == {44100, 48000, 96000}
+        assert [event.type for event in mirror.events] == [
+            GraphEventType.NODE_ADDED, GraphEventType.NODE_ADDED
+        ]
+
+    def test_node_removed(self, mirror):
+        """Test that removals drop the node's rates."""
+        mirror.apply(_node(50, [44100]))
+        mirror.apply(_node(51, [96000]))
+
+        mirror.apply({"id": 51, "info": None})
+
+        assert mirror.supported_rates() == {44100}
+        assert mirror.events[-1].type == GraphEventType.NODE_REMOVED
+        assert mirror.events[-1].id == 51
+
+    def test_device_added_and_removed(self, mirror):
+        """Test that devices are reported with their model object."""
+        device = make_device(40, "alsa_card.usb-dac", "USB DAC")
+        mirror.apply(device)
+        mirror.apply(device)
+        mirror.apply({"id": 40, "info": None})
+
+        assert [event.type for event in mirror.events] == [
+            GraphEventType.DEVICE_ADDED, GraphEventType.DEVICE_REMOVED
+        ]
+        assert mirror.events[-1].data.name == "alsa_card.usb-dac"
+
+    def test_params_changed_recomputes_only_that_node(self, mirror, mocker):
+        """Test that unchanged nodes are not re-parsed."""
+        mirror.apply(_node(50, [44100]))
+        mirror.apply(_node(51, [48000]))
+        spy = mocker.spy(model, "node_capabilities")
+
+        mirror.apply(_node(50, [44100]))
+        mirror.apply(_node(51, [48000, 192000]))
+
+        assert spy.call_count == 1
+        assert mirror.node_rates(51) == {48000, 192000}
+        assert mirror.events[-1].type == GraphEventType.PARAMS_CHANGED
+
+    def test_default_sink(self, mirror):
+        """Test tracking the default sink from the default metadata."""
+        mirror.apply(_node(50, [44100], name="alsa_output.usb"))
+        mirror.apply(_defaults("alsa_output.usb"))
+
+        assert mirror.default_node_name() == "alsa_output.usb"
+        assert mirror.default_node().id == 50
+        assert mirror.events[-1].type == GraphEventType.DEFAULT_CHANGED
+        assert mirror.events[-1].data == ("default.audio.sink", "alsa_output.usb")
+
+    def test_default_metadata_removed(self, mirror):
+        """Test that removing the default metadata clears the defaults."""
+        mirror.apply(_node(50, [44100], name="alsa_output.usb"))
+        mirror.apply(_defaults("alsa_output.usb"))
+
+        mirror.apply({"id": 40, "metadata": None})
+
+        assert mirror.default_node_name() is None
+        assert mirror.default_node() is None
+        assert mirror.events[-1].type == GraphEventType.DEFAULT_CHANGED
+        assert mirror.events[-1].data == ("default.audio.sink", None)
+
+    def test_stream_changes(self, mirror):
+        """Test stream events on start, rate change and removal, but not on other updates."""
+        stream = _node(70, [], name="player", media_class="Stream/Output/Audio")
+        stream["info"]["state"] = "running"
+        stream["info"]["props"]["node.rate"] = "1/44100"
+        mirror.apply(stream)
+        mirror.apply(stream)
+        stream["info"]["params"]["Format"] = [{"rate": 96000}]
+        mirror.apply(stream)
+        mirror.apply({"id": 70, "info": None})
+
+        assert [(event.type, event.data and event.data.rate) for event in mirror.events] == [
+            (GraphEventType.STREAM_CHANGED, 44100),
+            (GraphEventType.STREAM_CHANGED, 96000),
+            (GraphEventType.STREAM_CHANGED, None),
+        ]
+        assert mirror.playback_streams() == []
+
+    def test_node_changes(self, mirror):
+        """Test that a sink reports its state and negotiated rate, but not other updates."""
+        sink = _node(50, [44100, 96000])
+        mirror.apply(sink)
+        sink["info"]["state"] = "running"
+        sink["info"]["params"]["Format"] = [{"rate": 44100}]
+        mirror.apply(sink)
+        mirror.apply(sink)
+        sink["info"]["params"]["Format"] = [{"rate": 96000}]
+        mirror.apply(sink)
+
+        changes = [event for event in mirror.events
+                   if event.type == GraphEventType.NODE_CHANGED]
+        assert [(event.data.state, event.data.rate) for event in changes] == [
+            ("running", 44100), ("running", 96000)
+        ]
+
+    def test_start_reads_monitor_stream(self, mocker):
+        """Test that start() waits for the initial dump and applies deltas."""
+        output = (
+            json.dumps([_node(50, [44100]), _defaults("dac")]) + "\n"
+            + json.dumps([_node(51, [88200], name="other")]) + "\n"
+        )
+        # The monitor keeps its stdout open until it exits
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, output.encode())
+        process = Mock()
+        process.stdout = os.fdopen(read_fd, "rb")
+        process.poll.return_value = None
+        mock_popen = mocker.patch("subprocess.Popen", return_value=process)
+
+        mirror = GraphMirror()
+        assert mirror.start(timeout=1) is True
+        os.close(write_fd)
+        mirror._thread.join(timeout=1)
+
+        assert mock_popen.call_args[0][0] == ["pw-dump", "--monitor"]
+        assert mirror.supported_rates() == {44100, 88200}
+
+    def test_failing_subscriber_does_not_stop_mirror(self, mirror):
+        """Test that a callback raising is logged and later objects still apply."""
+        mirror.subscribe(Mock(side_effect=RuntimeError("boom")))
+
+        mirror.apply(_node(50, [44100]))
+        mirror.apply(_node(51, [96000]))
+
+        assert mirror.supported_rates() == {44100, 96000}
+        assert len(mirror.events) == 2
+
+    def test_broken_stream_stops_mirror(self):
+        """Test that invalid output kills the process and the mirror stops serving."""
+        output = json.dumps([_node(50, [44100])]) + "\n" + "[{\"id\": 51, \"type\": }]\n"
+        process = Mock()
+        process.stdout = io.BytesIO(output.encode())
+        process.poll.return_value = None
+
+        # Read on this thread: through start() the stream can break before
+        # start() sees the initial graph
+        mirror = GraphMirror()
+        mirror._process = process
+        mirror._read_loop(process)
+
+        process.kill.assert_called_once()
+        assert mirror.supported_rates() == {44100}
+        assert not mirror.running
+
+    def test_start_failure(self, mocker):
+        """Test that a missing pw-dump binary is reported."""
+        mocker.patch("subprocess.Popen", side_effect=FileNotFoundError)
+
+        assert GraphMirror().start(timeout=1) is False
+
+
+class TestEngineGraphMirror:
+    """Test engine queries served from the mirror."""
+
+    def test_queries_served_from_memory(self, mocker):
+        """Test that capability queries do not spawn processes."""
+        mock_run = mocker.patch("subprocess.run")
+        mock_popen = mocker.patch("subprocess.Popen")
+        engine = PipewireEngine()
+        mocker.patch.object(GraphMirror, "running", True)
+        engine._graph.apply(_node(50, [48000, 96000], name="usb"))
+        engine._graph.apply(_defaults("usb"))
+
+        assert engine.get_supported_sample_rates() == [48000, 96000]
+        assert engine.get_device_info() == "50. USB"
+        mock_run.assert_not_called()
+        mock_popen.assert_not_called()
@@ -0,0 +1,145 @@
+"""Tests for probation of applied settings and the guarded apply."""
+
+import threading
+import time
+import pytest
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.guard import FAILED, PASSED, Probation
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _summary(xruns):
+    return {"xruns": xruns, "load": 0.3, "quantum": 256}
+
+
+class TestProbation:
+    """Test the verdict on a change."""
+
+    def test_passes_after_clean_window(self, clock):
+        """Test that xruns while settling are ignored and a clean window passes."""
+        probation = Probation(window=10, max_rate=6, settle=1, clock=clock)
+        probation.start()
+        assert probation.update(_summary(5)) is None
+        clock.now += 0.5
+        assert probation.update(_summary(7)) is None
+        clock.now += 5
+        assert probation.update(_summary(8)) is None
+        assert probation.xruns == 1
+        clock.now += 6
+        assert probation.update(_summary(8)) == PASSED
+
+    def test_fails_as_soon_as_over_budget(self, clock):
+        """Test that exceeding the rate fails before the window ends."""
+        probation = Probation(window=10, max_rate=6, settle=1, clock=clock)
+        assert probation.budget == 1
+        probation.start()
+        clock.now += 2
+        assert probation.update(_summary(3)) is None
+        clock.now += 1
+        assert probation.update(_summary(5)) == FAILED
+        assert probation.verdict() == FAILED
+
+    def test_busiest_driver_changing(self, clock):
+        """Test two running drivers with different xrun totals taking turns."""
+        probation = Probation(window=10, max_rate=12, settle=1, clock=clock)
+        assert probation.budget == 2
+        probation.start()
+        clock.now += 2
+        for driver, xruns in [(1, 40), (2, 3), (1, 40), (2, 3)]:
+            assert probation.update(dict(_summary(xruns), id=driver)) is None
+            clock.now += 1
+        assert probation.xruns == 0
+
+        # New xruns on either driver add up
+        assert probation.update(dict(_summary(41), id=1)) is None
+        assert probation.update(dict(_summary(5), id=2)) == FAILED
+        assert probation.xruns == 3
+
+    def test_without_summaries(self, clock):
+        """Test the time-based verdict when the profiler reports nothing."""
+        probation = Probation(window=2, settle=0, clock=clock)
+        with pytest.raises(RuntimeError):
+            probation.update(None)
+        probation.start()
+        assert probation.update(None) is None
+        clock.now += 3
+        assert probation.update(None) == PASSED and probation.verdict() == PASSED
+
+
+class TestApplyGuarded:
+    """Test the guarded apply against the fake PipeWire."""
+
+    @pytest.fixture
+    def engine(self, fake_pipewire):
+        # 1.5 ms of work per cycle: 64 samples at 48 kHz (1.33 ms) cannot keep up
+        fake_pipewire.set_load(busy=0.05, wait=0.1, cycle_cost=0.0015, interval=0.03)
+        fake_pipewire.set_setting("clock.force-quantum", 512)
+        engine = PipewireEngine()
+        yield engine
+        engine.stop_profiler()
+
+    def test_reverts_on_xruns(self, engine, fake_pipewire):
+        """Test that a quantum producing xruns is reverted with the rate."""
+        guard = engine.apply_guarded({"clock.force-rate": 44100, "clock.force-quantum": 32},
+                                     Probation(window=1, settle=0.1))
+
+        assert guard.applied.ok and guard.verdict == FAILED and guard.reverted
+        assert not guard.passed and guard.xruns > 0
+        assert guard.previous == {"clock.force-rate": 0, "clock.force-quantum": 512}
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+        assert fake_pipewire.settings["clock.force-rate"] == "0"
+        assert engine.profiler is None
+
+    def test_keeps_clean_change(self, engine, fake_pipewire):
+        """Test that a stable quantum passes and stays."""
+        guard = engine.apply_guarded({"clock.force-quantum": 256},
+                                     Probation(window=0.3, settle=0.1))
+
+        assert guard.verdict == PASSED and guard.passed and not guard.reverted
+        assert fake_pipewire.settings["clock.force-quantum"] == "256"
+
+    def test_failed_write_is_not_watched(self, engine, fake_pipewire):
+        """Test that nothing is judged when the write itself fails."""
+        fake_pipewire.inject("pw-metadata", fail=True)
+        guard = engine.apply_guarded({"clock.force-quantum": 256})
+
+        assert not guard.judged and not guard.passed
+
+    def test_start_guarded_returns_before_the_verdict(self, engine, fake_pipewire):
+        """Test that the write returns at once and the revert is reported later."""
+        verdicts = []
+        judged = threading.Event()
+        start = time.monotonic()
+
+        guard = engine.start_guarded({"clock.force-quantum": 32}, Probation(window=1, settle=0.1),
+                                     lambda result: verdicts.append(result) or judged.set())
+
+        assert time.monotonic() - start < 0.5
+        assert guard.applied.ok and not guard.judged
+        assert fake_pipewire.settings["clock.force-quantum"] == "32"
+        assert judged.wait(5)
+        assert verdicts == [guard] and guard.verdict == FAILED and guard.reverted
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+
+    def test_new_write_ends_running_probation(self, engine, fake_pipewire):
+        """Test that a second guarded write judges the first instead of letting it revert."""
+        first = engine.start_guarded({"clock.force-quantum": 256}, Probation(window=30))
+        second = engine.apply_guarded({"clock.force-quantum": 1024},
+                                      Probation(window=0.3, settle=0.1))
+
+        assert first.verdict == PASSED and not first.reverted
+        assert second.verdict == PASSED
+        assert second.previous["clock.force-quantum"] == 256
+        assert fake_pipewire.settings["clock.force-quantum"] == "1024"
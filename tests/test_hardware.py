@@ -9,12 +9,9 @@ from pipewire_controller.core.hardware import HardwareDetector
 class TestHardwareDetector:
     """Test hardware detection functionality."""
 
-    def test_get_supported_rates_success(self, mock_subprocess_run, sample_pw_dump_output):
+    def test_get_supported_rates_success(self, mock_subprocess_popen, sample_pw_dump_output):
         """Test successful rate detection."""
-        mock_subprocess_run.return_value = Mock(
-            stdout=sample_pw_dump_output,
-            returncode=0
-        )
+        mock_subprocess_popen(sample_pw_dump_output)
         
         rates = HardwareDetector.get_supported_sample_rates()
         
@@ -23,9 +20,9 @@ class TestHardwareDetector:
         assert 96000 in rates
         assert rates == sorted(rates)
 
-    def test_get_supported_rates_fallback(self, mock_subprocess_run):
+    def test_get_supported_rates_fallback(self, mock_subprocess_popen):
         """Test fallback to default rates on error."""
-        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, "pw-dump")
+        mock_subprocess_popen("", returncode=1)
         
         rates = HardwareDetector.get_supported_sample_rates()
         
@@ -34,9 +31,13 @@ class TestHardwareDetector:
         assert 44100 in rates
         assert 48000 in rates
 
-    def test_get_supported_rates_timeout(self, mock_subprocess_run):
+    def test_get_supported_rates_timeout(self, mocker, mock_subprocess_popen):
         """Test timeout handling."""
-        mock_subprocess_run.side_effect = subprocess.TimeoutExpired("pw-dump", 5)
+        mock_subprocess_popen("")
+        mocker.patch(
+            "pipewire_controller.core.hardware.stream_command",
+            side_effect=subprocess.TimeoutExpired("pw-dump", 5)
+        )
         
         rates = HardwareDetector.get_supported_sample_rates()
         
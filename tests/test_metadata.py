@@ -0,0 +1,123 @@
+"""Tests for settings metadata parsing and monitoring."""
+
+import io
+from unittest.mock import Mock
+from pipewire_controller.metadata import (
+    SettingsMonitor,
+    parse_metadata_line,
+    parse_value,
+    tokenize_line,
+)
+
+
+class TestMetadataParsing:
+    """Test the pw-metadata line tokenizer."""
+
+    def test_tokenize_monitor_line(self):
+        """Test tokenizing the colon form printed by current pw-metadata."""
+        fields = tokenize_line("update: id:0 key:'clock.force-rate' value:'48000' type:''")
+
+        assert fields["id"] == "0"
+        assert fields["key"] == "clock.force-rate"
+        assert fields["value"] == "48000"
+        assert fields["type"] == ""
+
+    def test_tokenize_keeps_quotes_inside_values(self):
+        """Test that JSON values containing quotes are not split."""
+        line = ("update: id:0 key:'default.audio.sink' value:'{ \"name\": \"it's\" }' "
+                "type:'Spa:String:JSON'")
+
+        fields = tokenize_line(line)
+
+        assert fields["value"] == "{ \"name\": \"it's\" }"
+        assert fields["type"] == "Spa:String:JSON"
+
+    def test_parse_value_types(self):
+        """Test conversion of integers and rate lists."""
+        assert parse_value("48000") == 48000
+        assert parse_value("[ 44100, 48000 ]") == [44100, 48000]
+        assert parse_value("[ 44100 48000 ]") == [44100, 48000]
+        assert parse_value("auto") == "auto"
+
+    def test_parse_legacy_equals_form(self):
+        """Test the ``key='...'`` form used by older pw-metadata releases."""
+        parsed = parse_metadata_line("key='clock.force-quantum' value='512' type=''")
+
+        assert parsed == ("update", "clock.force-quantum", 512)
+
+    def test_parse_removal_and_other_subjects(self):
+        """Test removals and lines for other subjects."""
+        assert parse_metadata_line("remove: id:0 key:'clock.force-rate'") == (
+            "remove", "clock.force-rate", None
+        )
+        assert parse_metadata_line("remove: id:0 all keys") == ("remove", None, None)
+        assert parse_metadata_line("update: id:31 key:'target.node' value:'5' type:''") is None
+        assert parse_metadata_line('Found "settings" metadata 31') is None
+
+
+class TestSettingsMonitor:
+    """Test the monitor-fed settings cache."""
+
+    def test_feed_updates_cache_and_notifies(self):
+        """Test that updates reach the cache and subscribers once."""
+        monitor = SettingsMonitor()
+        events = []
+        monitor.subscribe(lambda key, value: events.append((key, value)))
+
+        monitor.feed("update: id:0 key:'clock.force-rate' value:'96000' type:''")
+        monitor.feed("update: id:0 key:'clock.force-rate' value:'96000' type:''")
+        monitor.feed("update: id:0 key:'log.level' value:'2' type:''")
+
+        assert monitor.get("clock.force-rate") == 96000
+        assert monitor.get("log.level") is None
+        assert events == [("clock.force-rate", 96000)]
+
+    def test_feed_removal(self):
+        """Test that removed keys leave the cache and notify with None."""
+        monitor = SettingsMonitor()
+        events = []
+        monitor.feed("update: id:0 key:'clock.force-quantum' value:'256' type:''")
+        monitor.subscribe(lambda key, value: events.append((key, value)))
+
+        monitor.feed("remove: id:0 key:'clock.force-quantum'")
+
+        assert monitor.get("clock.force-quantum") is None
+        assert events == [("clock.force-quantum", None)]
+
+    def test_unsubscribe(self):
+        """Test that unsubscribed callbacks stop firing."""
+        monitor = SettingsMonitor()
+        callback = Mock()
+        unsubscribe = monitor.subscribe(callback)
+
+        unsubscribe()
+        monitor.feed("update: id:0 key:'clock.rate' value:'48000' type:''")
+
+        callback.assert_not_called()
+
+    def test_start_streams_monitor_output(self, mocker):
+        """Test that the monitor process output fills the cache."""
+        process = Mock()
+        process.stdout = io.StringIO(
+            "Found \"settings\" metadata 31\n"
+            "update: id:0 key:'clock.force-rate' value:'44100' type:''\n"
+        )
+        process.poll.return_value = None
+        mock_popen = mocker.patch("subprocess.Popen", return_value=process)
+
+        monitor = SettingsMonitor()
+        assert monitor.start() is True
+        monitor._thread.join(timeout=1)
+
+        assert mock_popen.call_args[0][0] == ["pw-metadata", "-n", "settings", "--monitor"]
+        assert monitor.get("clock.force-rate") == 44100
+        assert monitor.running is True
+
+    def test_start_failure(self, mocker):
+        """Test that a missing pw-metadata binary is reported."""
+        mocker.patch("subprocess.Popen", side_effect=FileNotFoundError)
+
+        monitor = SettingsMonitor()
+
+        assert monitor.start() is False
+        assert monitor.running is False
@@ -0,0 +1,157 @@
+"""Tests for the indexed pw-dump object model."""
+
+import tracemalloc
+import pytest
+from pipewire_controller import model
+from pipewire_controller.model import Graph, Link, Node, Port
+
+
+def _node(node_id, rates=(), name=None, media_class="Audio/Sink", device=None):
+    props = {"media.class": media_class, "node.name": name or f"node{node_id}"}
+    if device is not None:
+        props["device.id"] = str(device)
+    return {
+        "id": node_id,
+        "type": "PipeWire:Interface:Node",
+        "info": {
+            "state": "running",
+            "props": props,
+            "params": {"EnumFormat": [{"rate": rate} for rate in rates]}
+        }
+    }
+
+
+def _port(port_id, node_id, direction="output"):
+    return {
+        "id": port_id,
+        "type": "PipeWire:Interface:Port",
+        "info": {"direction": direction, "props": {"node.id": str(node_id), "port.name": "p"}}
+    }
+
+
+def _link(link_id, out_node, out_port, in_node, in_port):
+    return {
+        "id": link_id,
+        "type": "PipeWire:Interface:Link",
+        "info": {
+            "output-node-id": out_node, "output-port-id": out_port,
+            "input-node-id": in_node, "input-port-id": in_port
+        }
+    }
+
+
+@pytest.fixture
+def graph():
+    """A small graph: a player stream feeding a DAC, plus a microphone."""
+    return Graph.from_objects([
+        {"id": 30, "type": "PipeWire:Interface:Device", "info": {"props": {"device.name": "usb"}}},
+        _node(50, [44100, 48000, 96000], name="dac", device=30),
+        _node(51, [48000], name="mic", media_class="Audio/Source", device=30),
+        _node(60, name="player", media_class="Stream/Output/Audio"),
+        _port(61, 60), _port(62, 60), _port(52, 50, "input"),
+        _link(70, 60, 61, 50, 52),
+        {"id": 80, "type": "PipeWire:Interface:Client", "info": {}},
+    ])
+
+
+class TestGraph:
+    """Test graph construction and index lookups."""
+
+    def test_objects_and_unmodelled_types(self, graph):
+        """Test that modelled types are stored and others ignored."""
+        assert len(graph) == 8
+        assert 80 not in graph
+        assert isinstance(graph.get(50), Node)
+        assert isinstance(graph.get(70), Link)
+
+    def test_objects_without_id_are_skipped(self, graph):
+        """Test that an object without an id is not stored under a made-up one."""
+        obj = _node(53, [32000], name="anonymous")
+        del obj["id"]
+
+        assert graph.update(obj) is None
+        assert graph.node_by_name("anonymous") is None
+        assert len(graph) == 8
+
+    def test_rate_index(self, graph):
+        """Test rate lookups without scanning nodes."""
+        assert {node.name for node in graph.nodes_supporting(48000)} == {"dac", "mic"}
+        assert [node.name for node in graph.nodes_supporting(96000)] == ["dac"]
+        assert graph.supported_rates() == {44100, 48000, 96000}
+
+    def test_class_name_and_device_indexes(self, graph):
+        """Test media class, name and device lookups."""
+        assert [node.id for node in graph.nodes("Audio/Source")] == [51]
+        assert graph.node_by_name("player").id == 60
+        assert {node.id for node in graph.device_nodes(30)} == {50, 51}
+        assert {node.id for node in graph.audio_nodes()} == {50, 51}
+
+    def test_link_adjacency(self, graph):
+        """Test which ports feed a sink."""
+        assert [port.id for port in graph.feeders(50)] == [61]
+        assert [link.id for link in graph.links_from(60)] == [70]
+        assert {port.id for port in graph.ports(60)} == {61, 62}
+
+    def test_remove_updates_indexes(self, graph):
+        """Test that removal clears every index entry."""
+        graph.remove(50)
+        graph.remove(70)
+
+        assert graph.nodes_supporting(96000) == []
+        assert graph.node_by_name("dac") is None
+        assert graph.feeders(50) == []
+        assert graph.links_from(60) == []
+
+    def test_replacing_node_reindexes(self, graph):
+        """Test that changed params move a node between rate entries."""
+        graph.update(_node(50, [192000], name="dac", device=30))
+
+        assert graph.nodes_supporting(96000) == []
+        assert [node.id for node in graph.nodes_supporting(192000)] == [50]
+
+    def test_unchanged_formats_reuse_rates(self, graph, mocker):
+        """Test that rates are not re-derived for identical params."""
+        spy = mocker.spy(model, "node_capabilities")
+
+        graph.update(_node(50, [44100, 48000, 96000], name="dac", device=30))
+
+        spy.assert_not_called()
+
+    def test_port_and_link_fields(self, graph):
+        """Test conversion of raw pw-dump fields."""
+        port = graph.get(61)
+        link = graph.get(70)
+
+        assert (port.node_id, port.direction) == (60, "output")
+        assert (link.output_node, link.output_port, link.input_node, link.input_port) == (
+            60, 61, 50, 52
+        )
+
+
+class TestFootprint:
+    """Test that the model stays small."""
+
+    @pytest.mark.parametrize("cls", [Node, model.Device, Port, Link])
+    def test_objects_have_no_instance_dict(self, cls):
+        """Test that model classes use __slots__."""
+        assert not hasattr(cls(1), "__dict__")
+
+    def test_memory_per_object(self):
+        """Test the average cost of an object, indexes included."""
+        objects = []
+        for i in range(0, 5000, 5):
+            objects.append(_node(i, [48000], media_class="Stream/Output/Audio"))
+            objects.append(_port(i + 1, i))
+            objects.append(_port(i + 2, i))
+            objects.append(_link(i + 3, i, i + 1, 0, 1))
+            objects.append(_link(i + 4, i, i + 2, 0, 2))
+
+        tracemalloc.start()
+        try:
+            graph = Graph.from_objects(objects)
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert len(graph) == 5000
+        assert size / len(graph) < 512
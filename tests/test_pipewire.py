@@ -82,3 +82,18 @@ class TestPipeWireController:
         quantum = PipeWireController.get_current_quantum()
         
         assert quantum == 512
+
+    def test_get_settings_snapshot(self, mock_subprocess_run):
+        """Test reading all clock settings in one call."""
+        mock_subprocess_run.return_value = Mock(
+            stdout=(
+                "update: id:0 key:'clock.force-rate' value:'44100' type:''\n"
+                "update: id:0 key:'clock.max-quantum' value:'2048' type:''\n"
+            ),
+            returncode=0
+        )
+        
+        snapshot = PipeWireController.get_settings_snapshot()
+        
+        assert snapshot == {"clock.force-rate": 44100, "clock.max-quantum": 2048}
+        assert mock_subprocess_run.call_count == 1
@@ -0,0 +1,198 @@
+"""Tests for the pw-top load profiler."""
+
+import time
+import pytest
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.profiler import (
+    HEALTH_BUSY, HEALTH_OK, HEALTH_XRUNS, LoadMonitor, RingBuffer, health, parse_duration,
+    parse_top_line,
+)
+
+HEADER = "S   ID  QUANT   RATE    WAIT    BUSY   W/Q   B/Q  ERR FORMAT           NAME"
+
+
+def _block(load=0.25, driver_errors=0, follower_errors=0, quantum=1024):
+    """One pw-top refresh: a USB DAC driving one stream, and an idle HDMI sink."""
+    wait = load / 2
+    return [
+        HEADER,
+        f"R   46 {quantum:>6}  48000  67.2us  14.0us  {wait:.2f}  {load - wait:.2f} "
+        f"{driver_errors:>4}    S32LE 2 48000 alsa_output.usb-dac",
+        f"R   70 {quantum:>6}  48000  14.1us  10.3us  0.01  0.02 {follower_errors:>4}"
+        f"    F32LE 2 48000  + Firefox",
+        "S   52      0      0    ---     ---   ---   ---     0                  alsa_output.hdmi",
+    ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _feed(monitor, clock, blocks, period=1.0):
+    """Feed refreshes ``period`` seconds apart."""
+    for block in blocks:
+        for line in block:
+            monitor.feed(line)
+        clock.now += period
+    monitor.flush()
+
+
+class TestParsing:
+    """Test the pw-top line parser."""
+
+    @pytest.mark.parametrize("text, seconds", [
+        ("67.2us", 67.2e-6), ("1.5ms", 1.5e-3), ("850ns", 850e-9), ("1.0s", 1.0), ("---", None),
+    ])
+    def test_durations(self, text, seconds):
+        """Test every unit pw-top prints."""
+        assert parse_duration(text) == pytest.approx(seconds)
+
+    def test_driver_and_follower(self):
+        """Test the fields of a driver row and of a follower row."""
+        driver = parse_top_line(_block()[1])
+        assert (driver.status, driver.id, driver.quantum, driver.rate) == ("R", 46, 1024, 48000)
+        assert driver.busy == pytest.approx(14.0e-6)
+        assert (driver.format, driver.name, driver.follower) == \
+            ("S32LE 2 48000", "alsa_output.usb-dac", False)
+
+        follower = parse_top_line(_block(follower_errors=3)[2])
+        assert (follower.name, follower.follower, follower.errors) == ("Firefox", True, 3)
+
+    def test_idle_and_other_lines(self):
+        """Test a suspended node and lines that are not node rows."""
+        idle = parse_top_line(_block()[3])
+        assert idle.wait is None and idle.wait_ratio is None and idle.format == ""
+        assert parse_top_line(HEADER) is None
+        assert parse_top_line("") is None
+
+
+class TestRingBuffer:
+    """Test the fixed-size sample buffer."""
+
+    def test_wraps_around(self):
+        """Test that the oldest values are overwritten in order."""
+        ring = RingBuffer(3)
+        assert ring.percentiles(0.5) == [0.0] and ring.last() == 0.0
+        for value in range(5):
+            ring.append(value)
+        assert ring.values() == [2.0, 3.0, 4.0]
+        assert (len(ring), ring.last(), ring.oldest()) == (3, 4.0, 2.0)
+        assert ring.percentiles(0.0, 0.5, 1.0) == [2.0, 3.0, 4.0]
+
+
+class TestLoadMonitor:
+    """Test statistics built from pw-top refreshes."""
+
+    def test_load_percentiles(self):
+        """Test that one sample per refresh is kept per driver, up to the buffer size."""
+        clock = FakeClock()
+        monitor = LoadMonitor(samples=10, clock=clock)
+        _feed(monitor, clock, [_block(load=0.1)] * 15 + [_block(load=0.9)])
+
+        stats = {entry["name"]: entry for entry in monitor.stats()}
+        usb = stats["alsa_output.usb-dac"]
+        assert usb["samples"] == 10
+        assert usb["load_p50"] == pytest.approx(0.1)
+        assert usb["load_p99"] == pytest.approx(0.9)
+        assert stats["alsa_output.hdmi"]["status"] == "S"
+        assert monitor.summary()["id"] == 46
+
+    def test_xruns_of_driver_and_followers(self):
+        """Test that counter increases are summed and only recent ones are in the window."""
+        clock = FakeClock()
+        monitor = LoadMonitor(window=10, clock=clock)
+        blocks = [_block(driver_errors=2)] * 5
+        blocks += [_block(driver_errors=3, follower_errors=1)]
+        blocks += [_block(driver_errors=3, follower_errors=1)] * 20
+        _feed(monitor, clock, blocks[:6])
+
+        summary = monitor.summary()
+        assert summary["xruns"] == 2
+        assert summary["xruns_window"] == 2
+        assert summary["xrun_rate"] == pytest.approx(2 * 60 / 6)
+        assert health(summary) == HEALTH_XRUNS
+
+        _feed(monitor, clock, blocks[6:])
+        summary = monitor.summary()
+        assert (summary["xruns"], summary["xruns_window"]) == (2, 0)
+        assert health(summary) == HEALTH_OK
+
+    def test_recreated_node(self):
+        """Test that a counter going down counts from zero again."""
+        clock = FakeClock()
+        monitor = LoadMonitor(clock=clock)
+        _feed(monitor, clock, [_block(driver_errors=5), _block(driver_errors=1)])
+        assert monitor.summary()["xruns"] == 1
+
+    def test_busy_and_callbacks(self):
+        """Test the busy state and one notification per refresh."""
+        clock = FakeClock()
+        monitor = LoadMonitor(clock=clock)
+        seen = []
+        unsubscribe = monitor.subscribe(lambda: seen.append(monitor.summary()["load"]))
+        _feed(monitor, clock, [_block(load=0.95)] * 3)
+        unsubscribe()
+        _feed(monitor, clock, [_block()])
+
+        assert len(seen) == 3
+        assert health(monitor.summary()) == HEALTH_BUSY
+        assert health(None) == HEALTH_OK
+
+    def test_blank_line_ends_refresh(self):
+        """Test that a refresh is recorded at its blank line, timed from its header."""
+        clock = FakeClock()
+        monitor = LoadMonitor(clock=clock)
+        seen = []
+        monitor.subscribe(lambda: seen.append(monitor.latest()))
+        for line in _block():
+            monitor.feed(line)
+        clock.now += 0.5
+        monitor.feed("")
+
+        when, drivers = seen[0]
+        assert when == 1000.0
+        assert [row.id for row in drivers] == [46, 52]
+
+    def test_partial_lines_before_header(self):
+        """Test that rows without a driver and an empty refresh are ignored."""
+        monitor = LoadMonitor()
+        monitor.feed(_block()[2])
+        monitor.feed(HEADER)
+        monitor.flush()
+        assert monitor.stats() == [] and monitor.summary() is None
+
+
+class TestFakePwTop:
+    """Test the profiler against the fake pw-top."""
+
+    def test_engine_profiler(self, fake_pipewire):
+        """Test load, xruns and the quantum as the fake reports them."""
+        engine = PipewireEngine()
+        assert engine.profiler is None
+        try:
+            assert engine.start_profiler()
+            fake_pipewire.set_setting("clock.force-quantum", 256)
+            fake_pipewire.set_load(busy=0.7, wait=0.2)
+
+            def ready():
+                summary = engine.profiler.summary()
+                return summary is not None and summary["quantum"] == 256 \
+                    and summary["load"] == pytest.approx(0.9)
+
+            deadline = time.monotonic() + 5
+            while not ready() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert ready()
+
+            fake_pipewire.set_load(xruns=4)
+            deadline = time.monotonic() + 5
+            while engine.profiler.summary()["xruns"] < 4 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert engine.profiler.summary()["xruns_window"] == 4
+        finally:
+            engine.stop_profiler()
+        assert engine.profiler is None
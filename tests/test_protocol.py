@@ -0,0 +1,280 @@
+"""Tests for the native protocol client and backends, against a fake server."""
+
+import socket
+import struct
+import threading
+import pytest
+from pipewire_controller import protocol
+from pipewire_controller.backend import Backend, NativeBackend, SubprocessBackend, create_backend
+from pipewire_controller.protocol import (
+    Choice,
+    Id,
+    NativeClient,
+    Object,
+    ProtocolError,
+    decode_pod,
+    encode_pod,
+    format_to_dump,
+)
+
+NODE = "PipeWire:Interface:Node"
+METADATA = "PipeWire:Interface:Metadata"
+
+
+def _enum_format(rate, fmt=0x10B):
+    """An EnumFormat object offering one sample format (S32LE by default) and a rate."""
+    return Object(protocol.OBJECT_FORMAT, protocol.PARAM_ENUM_FORMAT, [
+        (protocol.FORMAT_MEDIA_TYPE, Id(1)),
+        (protocol.FORMAT_MEDIA_SUBTYPE, Id(1)),
+        (protocol.FORMAT_AUDIO_FORMAT, Choice(protocol.CHOICE_NONE, [fmt], protocol.POD_ID)),
+        (protocol.FORMAT_AUDIO_RATE, rate),
+        (protocol.FORMAT_AUDIO_CHANNELS, 2),
+    ])
+
+
+class FakePipewire:
+    """
+    Minimal PipeWire daemon speaking just enough of the native protocol:
+    registry globals, bind, metadata properties and EnumParams.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.globals = {
+            40: (METADATA, {"metadata.name": "settings"}),
+            41: (METADATA, {"metadata.name": "default"}),
+            50: (NODE, {"media.class": "Audio/Sink", "node.name": "dac",
+                        "node.description": "USB DAC"}),
+            51: (NODE, {"media.class": "Stream/Output/Audio", "node.name": "player"}),
+        }
+        self.metadata = {
+            40: {"clock.rate": "48000", "clock.force-rate": "0", "log.level": "2"},
+            41: {"default.audio.sink": '{ "name": "dac" }'},
+        }
+        self.params = {
+            50: [_enum_format(Choice(protocol.CHOICE_RANGE, [48000, 44100, 96000])),
+                 _enum_format(192000)],
+        }
+        self.rejected_keys = {"clock.bogus"}
+        self.calls = []
+        self.proxies = {}
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(1)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.close()
+
+    def _send(self, conn, object_id, opcode, args):
+        body = encode_pod(args)
+        conn.sendall(struct.pack("<IIII", object_id, (opcode << 24) | len(body), 0, 0) + body)
+
+    def _serve(self):
+        try:
+            conn, _ = self._server.accept()
+        except OSError:
+            return
+        buffer = b""
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                buffer += data
+                while len(buffer) >= 16:
+                    object_id, op_size, _seq, _fds = struct.unpack_from("<IIII", buffer)
+                    end = 16 + (op_size & 0xFFFFFF)
+                    if len(buffer) < end:
+                        break
+                    args, _ = decode_pod(buffer[16:end])
+                    buffer = buffer[end:]
+                    self._handle(conn, object_id, op_size >> 24, args)
+
+    def _handle(self, conn, object_id, opcode, args):
+        self.calls.append((object_id, opcode))
+        if object_id == 0 and opcode == protocol.CORE_SYNC:
+            self._send(conn, 0, protocol.CORE_EVENT_DONE, [args[0], args[1]])
+        elif object_id == 0 and opcode == protocol.CORE_GET_REGISTRY:
+            for global_id, (object_type, props) in self.globals.items():
+                self._send(conn, args[1], protocol.REGISTRY_EVENT_GLOBAL, [
+                    global_id, 0x1FF, object_type, 3, protocol.encode_dict(props)
+                ])
+        elif object_id == 0 and opcode == protocol.CORE_DESTROY:
+            self.proxies.pop(args[0], None)
+        elif object_id == 2 and opcode == protocol.REGISTRY_BIND:
+            global_id, _type, _version, proxy_id = args
+            self.proxies[proxy_id] = global_id
+            for key, value in self.metadata.get(global_id, {}).items():
+                self._send(conn, proxy_id, protocol.METADATA_EVENT_PROPERTY,
+                           [0, key, "", value])
+        elif (self.proxies.get(object_id) in self.metadata
+              and opcode == protocol.METADATA_SET_PROPERTY):
+            subject, key, _type, value = args
+            if key in self.rejected_keys:
+                self._send(conn, 0, protocol.CORE_EVENT_ERROR,
+                           [object_id, 0, -22, "invalid key"])
+                return
+            self.metadata[self.proxies[object_id]][key] = value
+            self._send(conn, object_id, protocol.METADATA_EVENT_PROPERTY,
+                       [subject, key, "", value])
+        elif object_id in self.proxies and opcode == protocol.NODE_ENUM_PARAMS:
+            for index, param in enumerate(self.params.get(self.proxies[object_id], [])):
+                self._send(conn, object_id, protocol.NODE_EVENT_PARAM,
+                           [args[0], args[1], index, index + 1, param])
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A fake daemon listening on a socket in a temporary directory."""
+    fake = FakePipewire(str(tmp_path / "pipewire-0"))
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def backend(server):
+    """A native backend connected to the fake daemon."""
+    native = NativeBackend(NativeClient(server.path))
+    assert native.connect(timeout=2)
+    yield native
+    native.close()
+
+
+class TestPod:
+    """Test SPA pod encoding."""
+
+    @pytest.mark.parametrize("value", [
+        None, True, 7, -3, 2**40, 1.5, "text", b"\x01\x02", [1, "a", [None, 2]], Id(4),
+    ])
+    def test_round_trip(self, value):
+        """Test that values survive encoding and decoding."""
+        data = encode_pod(value)
+        decoded, end = decode_pod(data)
+
+        assert len(data) % 8 == 0
+        assert end == len(data)
+        assert decoded == value
+        assert type(decoded) is type(value) or isinstance(value, (list, tuple))
+
+    def test_format_object_to_dump(self):
+        """Test conversion of an EnumFormat object to pw-dump's JSON form."""
+        decoded, _ = decode_pod(encode_pod(_enum_format(
+            Choice(protocol.CHOICE_RANGE, [48000, 44100, 96000])
+        )))
+
+        assert format_to_dump(decoded) == {
+            "mediaType": "audio",
+            "mediaSubtype": "raw",
+            "format": "S32LE",
+            "rate": {"default": 48000, "min": 44100, "max": 96000},
+            "channels": 2,
+        }
+
+    def test_socket_path_from_environment(self, monkeypatch):
+        """Test PIPEWIRE_REMOTE and runtime dir handling."""
+        monkeypatch.setenv("PIPEWIRE_RUNTIME_DIR", "/run/pw")
+        monkeypatch.delenv("PIPEWIRE_REMOTE", raising=False)
+        assert protocol.default_socket_path() == "/run/pw/pipewire-0"
+
+        monkeypatch.setenv("PIPEWIRE_REMOTE", "/tmp/other")
+        assert protocol.default_socket_path() == "/tmp/other"
+
+
+class TestNativeClient:
+    """Test the connection against the fake daemon."""
+
+    def test_connect_loads_registry(self, server):
+        """Test that connecting fills the global list."""
+        client = NativeClient(server.path)
+        client.connect(timeout=2)
+
+        assert client.find_global(NODE, {"node.name": "dac"}) == 50
+        assert client.find_global(METADATA, {"metadata.name": "default"}) == 41
+        client.close()
+
+    def test_connect_failure(self, tmp_path):
+        """Test that a missing socket raises ProtocolError."""
+        client = NativeClient(str(tmp_path / "missing"))
+
+        with pytest.raises(ProtocolError):
+            client.connect(timeout=1)
+
+
+class TestBackendInterface:
+    """Test the backend base class."""
+
+    def test_incomplete_backend_fails_when_built(self):
+        """Test that a backend missing part of the interface cannot be created."""
+        class SettingsOnly(Backend):
+            def read_settings(self, timeout):
+                return {}
+
+        with pytest.raises(TypeError):
+            SettingsOnly()
+        with pytest.raises(TypeError):
+            Backend()
+
+
+class TestNativeBackend:
+    """Test backend operations over the native protocol."""
+
+    def test_read_settings(self, backend):
+        """Test that only clock keys are returned, parsed."""
+        assert backend.read_settings(2) == {"clock.rate": 48000, "clock.force-rate": 0}
+
+    def test_write_batch_uses_one_connection(self, backend, server):
+        """Test that several writes are sent together and confirmed."""
+        results = backend.write_settings(
+            [("clock.force-quantum", 256), ("clock.force-rate", 96000)], 2
+        )
+
+        assert results == {"clock.force-quantum": True, "clock.force-rate": True}
+        assert server.metadata[40]["clock.force-rate"] == "96000"
+        assert backend.read_settings(2)["clock.force-quantum"] == 256
+
+    def test_rejected_write(self, backend):
+        """Test that a server error marks the batch as failed."""
+        results = backend.write_settings([("clock.bogus", 1)], 2)
+
+        assert results == {"clock.bogus": False}
+
+    def test_load_graph(self, backend, server):
+        """Test rate enumeration of audio nodes, with proxies released after."""
+        graph = backend.load_graph(2)
+
+        assert graph.supported_rates() == {44100, 48000, 88200, 96000, 192000}
+        assert [node.name for node in graph.audio_nodes()] == ["dac"]
+        backend.client.roundtrip(2)
+        assert all(global_id not in (50, 51) for global_id in server.proxies.values())
+
+    def test_device_info(self, backend):
+        """Test default sink lookup through the default metadata."""
+        assert backend.device_info(2) == "50. USB DAC"
+
+    def test_falls_back_when_disconnected(self, tmp_path, mocker):
+        """Test that calls go to the fallback backend without a daemon."""
+        fallback = mocker.Mock(spec=SubprocessBackend)
+        fallback.read_settings.return_value = {"clock.rate": 44100}
+        native = NativeBackend(NativeClient(str(tmp_path / "missing")), fallback=fallback)
+
+        assert native.read_settings(1) == {"clock.rate": 44100}
+
+    def test_create_backend_fallback(self, tmp_path, monkeypatch):
+        """Test that auto selection degrades to the subprocess backend."""
+        monkeypatch.setenv("PIPEWIRE_REMOTE", str(tmp_path / "missing"))
+
+        assert isinstance(create_backend("auto", timeout=1), SubprocessBackend)
+        assert isinstance(create_backend("subprocess"), SubprocessBackend)
+
+    def test_engine_with_native_backend(self, backend):
+        """Test the engine end to end over the native backend."""
+        from pipewire_controller.engine import PipewireEngine
+
+        engine = PipewireEngine(backend=backend)
+        result = engine.apply({"clock.force-rate": 44100, "clock.force-quantum": 128})
+
+        assert result.ok
+        assert engine.get_current_rate() == 44100
+        assert engine.get_current_quantum() == 128
@@ -0,0 +1,157 @@
+"""Tests for the instrumented command runner."""
+
+import asyncio
+import json
+import subprocess
+import sys
+import pytest
+from pipewire_controller import __main__ as cli
+from pipewire_controller.async_engine import AsyncPipewireEngine
+from pipewire_controller.backend import SubprocessBackend
+from pipewire_controller.runner import RUNNER, CommandRunner, CommandStats, command_name
+
+
+@pytest.fixture(autouse=True)
+def clean_runner():
+    """Start every test with empty shared statistics."""
+    RUNNER.reset()
+    yield
+    RUNNER.reset()
+
+
+class TestCommandStats:
+    """Test the per-command counters and histogram."""
+
+    def test_outcomes_and_histogram(self):
+        """Test that each outcome is counted once and latencies are bucketed."""
+        stats = CommandStats()
+        stats.add(0.0005, returncode=0, output=10)
+        stats.add(0.015, returncode=1, output=30)
+        stats.add(5.0, timed_out=True)
+        stats.add(0.001, error=True)
+
+        summary = stats.to_dict()
+        assert (summary["calls"], summary["failures"], summary["timeouts"], summary["errors"]) \
+            == (4, 1, 1, 1)
+        assert summary["exit_codes"] == {"0": 1, "1": 1}
+        assert summary["histogram"]["<=1ms"] == 2
+        assert summary["histogram"]["<=20ms"] == 1
+        assert summary["histogram"]["<=5000ms"] == 1
+        assert (summary["output_total"], summary["output_max"]) == (40, 30)
+        assert summary["max"] == 5.0
+
+    def test_round_trip(self):
+        """Test that saved statistics rebuild the same summary."""
+        stats = CommandStats()
+        for elapsed in (0.01, 0.02, 0.3):
+            stats.add(elapsed, returncode=0, output=5)
+        assert CommandStats.from_dict(stats.to_dict()).to_dict() == stats.to_dict()
+
+    def test_command_name(self):
+        """Test the default names."""
+        assert command_name(["wpctl", "status"]) == "wpctl status"
+        assert command_name(["/usr/bin/pw-dump"]) == "pw-dump"
+        assert command_name(["pw-metadata", "-n", "settings"]) == "pw-metadata"
+
+
+class TestCommandRunner:
+    """Test running and recording commands."""
+
+    def test_run_records_exit_codes_and_output(self):
+        """Test a successful and a failing command."""
+        runner = CommandRunner()
+        runner.run([sys.executable, "-c", "print('x' * 99)"], 10, name="ok")
+        with pytest.raises(subprocess.CalledProcessError):
+            runner.run([sys.executable, "-c", "raise SystemExit(3)"], 10, name="fail")
+        with pytest.raises(OSError):
+            runner.run(["/nonexistent/tool"], 10)
+
+        stats = runner.stats()
+        assert stats["ok"]["output_total"] == 100
+        assert stats["fail"]["exit_codes"] == {"3": 1}
+        assert stats["tool"]["errors"] == 1
+
+    def test_timeout(self):
+        """Test that a killed command counts as a timeout."""
+        runner = CommandRunner()
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run([sys.executable, "-c", "import time; time.sleep(5)"], 0.2, name="slow")
+        assert runner.stats()["slow"]["timeouts"] == 1
+
+    def test_report_orders_by_total_time(self):
+        """Test that the command taking the most time comes first."""
+        runner = CommandRunner()
+        runner.record(["fast"], 0.001, returncode=0)
+        runner.record(["slow"], 0.5, returncode=0)
+        lines = runner.report().splitlines()
+        assert lines[1].startswith("slow") and lines[2].startswith("fast")
+        assert CommandRunner().report() == "No commands recorded."
+
+    def test_save_and_load(self, tmp_path):
+        """Test persistence and that unreadable files are rejected."""
+        runner = CommandRunner()
+        runner.record(["pw-dump"], 0.05, returncode=0, output=1000)
+        assert runner.save(tmp_path / "stats.json")
+
+        loaded = CommandRunner()
+        assert loaded.load(tmp_path / "stats.json")
+        assert loaded.stats() == runner.stats()
+
+        (tmp_path / "bad.json").write_text("{")
+        assert not loaded.load(tmp_path / "bad.json")
+        assert not loaded.load(tmp_path / "missing.json")
+
+
+class TestInstrumentedCallers:
+    """Test that the engines' commands all end up in the shared runner."""
+
+    def test_backend_commands(self, fake_pipewire):
+        """Test reads, writes, streamed dumps and wpctl from the subprocess backend."""
+        backend = SubprocessBackend()
+        backend.read_settings(5)
+        backend.write_settings([("clock.force-rate", 48000)], 5)
+        backend.load_graph(5)
+        backend.device_info(5)
+        fake_pipewire.inject("pw-dump", fail=True)
+        backend.list_devices(5)
+
+        stats = RUNNER.stats()
+        assert set(stats) == {"pw-metadata read", "pw-metadata write", "pw-dump", "wpctl status"}
+        assert stats["pw-dump"]["calls"] == 2
+        assert stats["pw-dump"]["exit_codes"] == {"0": 1, "1": 1}
+        assert stats["pw-dump"]["output_max"] > 0
+
+    def test_async_commands(self, fake_pipewire):
+        """Test that commands run by the async engine are recorded too."""
+        fake_pipewire.inject("wpctl", hang=True)
+        asyncio.run(AsyncPipewireEngine().probe(deadline=1))
+
+        stats = RUNNER.stats()
+        assert stats["pw-metadata read"]["calls"] == 1
+        assert stats["pw-dump"]["calls"] == 1
+        assert stats["wpctl status"]["calls"] == 1
+
+
+class TestStatsOption:
+    """Test ``pipewire-controller --stats``."""
+
+    def test_prints_saved_stats(self, tmp_path, monkeypatch, capsys):
+        """Test the table and the JSON dump of a saved session."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert cli.print_stats() == 1
+
+        RUNNER.record(["wpctl", "status"], 0.02, returncode=0, output=500)
+        RUNNER.save(tmp_path / ".config" / "pipewire-controller" / "command-stats.json")
+        capsys.readouterr()
+
+        assert cli.print_stats() == 0
+        assert "wpctl status" in capsys.readouterr().out
+        assert cli.print_stats(as_json=True) == 0
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["wpctl status"]["output_total"] == 500
+        assert "latencies" not in summary["wpctl status"]
+
+    def test_options_leave_qt_arguments(self):
+        """Test that unknown arguments are left for Qt."""
+        args = cli.parse_args(["--stats", "-platform", "offscreen"])
+        assert args.stats and not args.json
@@ -0,0 +1,95 @@
+"""Tests for write coalescing."""
+
+import pytest
+from pipewire_controller.scheduler import WriteScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = WriteScheduler(window=0.15, max_delay=0.6, clock=clock)
+    scheduler.confirm("clock.force-quantum", 512)
+    return scheduler
+
+
+class TestWriteScheduler:
+    """Test which requests turn into writes."""
+
+    def test_noop_is_suppressed(self, scheduler):
+        """Test that the value PipeWire already has is not written."""
+        assert scheduler.request("clock.force-quantum", 512) is False
+        assert scheduler.pending == {}
+        assert scheduler.delay() is None
+        assert scheduler.stats()["noop"] == 1
+
+    def test_burst_collapses_to_final_value(self, scheduler):
+        """Test that clicking through values writes only the last one."""
+        for size in (256, 128, 64, 1024):
+            assert scheduler.request("clock.force-quantum", size) is True
+
+        assert scheduler.take() == {"clock.force-quantum": 1024}
+        scheduler.confirm("clock.force-quantum", 1024, written=True)
+        assert scheduler.stats() == {
+            "requested": 4, "written": 1, "suppressed": 3, "noop": 0, "coalesced": 3,
+        }
+
+    def test_burst_back_to_confirmed_value(self, scheduler):
+        """Test that a burst ending on the current value writes nothing."""
+        scheduler.request("clock.force-quantum", 256)
+        assert scheduler.request("clock.force-quantum", 512) is False
+
+        assert scheduler.take() == {}
+        assert scheduler.suppressed == 2
+
+    def test_keys_batch_together(self, scheduler):
+        """Test that different keys in one burst share a batch."""
+        scheduler.request("clock.force-quantum", 256)
+        scheduler.request("clock.force-rate", 96000)
+
+        assert scheduler.take() == {"clock.force-quantum": 256, "clock.force-rate": 96000}
+
+    def test_delay_restarts_and_is_capped(self, scheduler, clock):
+        """Test the trailing window and the maximum delay of a burst."""
+        scheduler.request("clock.force-quantum", 256)
+        assert scheduler.delay() == pytest.approx(0.15)
+
+        for _ in range(5):
+            clock.now += 0.1
+            scheduler.request("clock.force-quantum", 128)
+            scheduler.request("clock.force-quantum", 256)
+        # Each click restarts the window, but the burst started 0.5 s ago
+        assert scheduler.delay() == pytest.approx(0.1)
+
+        clock.now += 0.2
+        assert scheduler.delay() == 0.0
+
+    def test_in_flight_value_counts_as_expected(self, scheduler):
+        """Test requests against a batch that is written but not confirmed."""
+        scheduler.request("clock.force-quantum", 256)
+        scheduler.take()
+
+        # 256 is on its way; asking again is a no-op, going back is not
+        assert scheduler.request("clock.force-quantum", 256) is False
+        assert scheduler.request("clock.force-quantum", 512) is True
+
+    def test_reject_restores_confirmed_value(self, scheduler):
+        """Test that a failed write is not assumed to have landed."""
+        scheduler.request("clock.force-quantum", 256)
+        scheduler.take()
+        scheduler.reject("clock.force-quantum")
+
+        assert scheduler.confirmed("clock.force-quantum") == 512
+        assert scheduler.request("clock.force-quantum", 256) is True
+        assert scheduler.request("clock.force-quantum", 512) is False
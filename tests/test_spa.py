@@ -0,0 +1,221 @@
+"""Tests for SPA choice parsing, the capability index and conversion detection."""
+
+import pytest
+from pipewire_controller.capabilities import (
+    SINK, SOURCE, CapabilityIndex, best_format, conversion_free_rates, detect_conversion,
+)
+from pipewire_controller.dump import node_modes, node_rates
+from pipewire_controller.model import Graph
+from pipewire_controller.spa import (
+    ChoiceType, bit_depth, choice_values, format_family, format_modes, format_rates,
+    parse_choice,
+)
+from tests.fake_pipewire.synth import make_node
+
+
+class TestParseChoice:
+    """Test every choice form pw-dump prints."""
+
+    @pytest.mark.parametrize("value, expected_type", [
+        (48000, ChoiceType.NONE),
+        ({"default": 48000, "min": 44100, "max": 192000}, ChoiceType.RANGE),
+        ({"default": 44100, "min": 44100, "max": 176400, "step": 44100}, ChoiceType.STEP),
+        ({"default": 48000, "alt1": 44100, "alt2": 96000}, ChoiceType.ENUM),
+        ({"default": 48000, "alternatives": [44100, 96000]}, ChoiceType.ENUM),
+        ({"default": 0, "flag1": 1, "flag2": 4}, ChoiceType.FLAGS),
+    ])
+    def test_choice_types(self, value, expected_type):
+        """Test that each form is recognized."""
+        assert parse_choice(value).type is expected_type
+
+    def test_enum_values_in_order(self):
+        """Test that the default comes first and duplicates are dropped."""
+        choice = parse_choice({"default": "S32LE", "alt2": "S16LE", "alt1": "S32LE"})
+        assert choice.values == ("S32LE", "S16LE")
+
+    def test_allows(self):
+        """Test membership for ranges, steps and flags."""
+        step = parse_choice({"default": 44100, "min": 44100, "max": 176400, "step": 44100})
+        assert step.allows(88200) and not step.allows(96000) and not step.allows(352800)
+
+        flags = parse_choice({"default": 0, "flag1": 1, "flag2": 4})
+        assert flags.allows(5) and not flags.allows(2)
+
+    def test_unrecognized(self):
+        """Test values that are not choices."""
+        assert parse_choice(None) is None
+        assert parse_choice({"something": 1}) is None
+        assert choice_values(None) == frozenset()
+
+
+class TestFormatRates:
+    """Test rate extraction from EnumFormat entries."""
+
+    def test_high_rates_from_range(self):
+        """Test that ranges reach the 352.8k-768k rates."""
+        rates = format_rates({"rate": {"default": 48000, "min": 8000, "max": 768000}})
+        assert {352800, 384000, 705600, 768000} <= rates
+        assert 8000 not in rates
+
+    def test_enum_keeps_nonstandard_rates(self):
+        """Test that listed rates are taken even if not standard."""
+        assert format_rates({"rate": {"default": 32000, "alt1": 705600}}) == {32000, 705600}
+
+    def test_step(self):
+        """Test that a step only admits multiples."""
+        rates = format_rates({"rate": {"default": 44100, "min": 44100, "max": 768000,
+                                       "step": 44100}})
+        assert rates == {44100, 88200, 176400, 352800, 705600}
+
+    def test_node_rates_union(self):
+        """Test that a node's rates are the union over its formats."""
+        node = make_node(1, "dac", rates=[{"default": 384000, "alt1": 768000}, 44100])
+        assert node_rates(node) == {44100, 384000, 768000}
+
+
+class TestFormatModes:
+    """Test sample format extraction from EnumFormat entries."""
+
+    @pytest.mark.parametrize("name, family, bits", [
+        ("S16LE", "S16", 16),
+        ("S24_32LE", "S24_32", 24),
+        ("S32BE", "S32", 32),
+        ("F32P", "F32", 32),
+        ("F32LE", "F32", 32),
+        ("DSD_U32BE", "DSD_U32", 0),
+    ])
+    def test_family_and_depth(self, name, family, bits):
+        """Test that endianness and planarity are stripped."""
+        assert format_family(name) == family
+        assert bit_depth(name) == bits
+
+    def test_format_choice_times_rates(self):
+        """Test that every offered format pairs with every rate of the entry."""
+        modes = format_modes({"format": {"default": "S32LE", "alt1": "S16LE"},
+                              "rate": {"default": 48000, "alt1": 96000}})
+        assert modes == {("S32LE", 48000), ("S32LE", 96000),
+                         ("S16LE", 48000), ("S16LE", 96000)}
+        assert format_modes({"rate": 48000}) == frozenset()
+
+    def test_node_modes(self):
+        """Test that a node's modes are the union over its formats."""
+        node = make_node(1, "dac", rates=[48000, 192000], formats=["S24_32LE", "F32LE"])
+        assert node_modes(node) == {(fmt, rate) for fmt in ("S24_32LE", "F32LE")
+                                    for rate in (48000, 192000)}
+
+
+class TestCapabilityIndex:
+    """Test the per-direction rate/device index."""
+
+    @pytest.fixture
+    def index(self):
+        index = CapabilityIndex()
+        index.add(1, SINK, {44100, 48000, 96000, 384000})
+        index.add(2, SINK, {48000, 96000})
+        index.add(3, SOURCE, {48000})
+        return index
+
+    def test_queries(self, index):
+        """Test lookups in both directions of the mapping."""
+        assert index.devices_supporting(48000) == {1, 2, 3}
+        assert index.devices_supporting(96000, SOURCE) == frozenset()
+        assert index.rates(1) == {44100, 48000, 96000, 384000}
+        assert index.supported_by_any(SINK) == {44100, 48000, 96000, 384000}
+        assert index.supported_by_all(direction=SINK) == {48000, 96000}
+        assert index.supported_by_all() == {48000}
+        assert index.supported_by_all([1, 3], direction=SINK) == index.rates(1)
+        assert index.supported_by_all([]) == frozenset()
+
+    def test_remove_and_replace(self, index):
+        """Test that entries disappear and are replaced cleanly."""
+        index.remove(1)
+        assert 384000 not in index.supported_by_any()
+        index.add(2, SOURCE, {44100})
+        assert index.devices(SINK) == frozenset()
+        assert index.devices_supporting(44100) == {2}
+        assert len(index) == 2
+
+
+class TestConversion:
+    """Test format and rate conversion detection."""
+
+    @pytest.fixture
+    def index(self):
+        index = CapabilityIndex()
+        index.add(1, SINK, {48000, 96000},
+                  {("S32LE", 48000), ("S16LE", 48000), ("S32LE", 96000), ("F32LE", 96000)})
+        index.add(2, SINK, {48000}, {("F32LE", 48000)})
+        return index
+
+    def test_format_index(self, index):
+        """Test lookups of formats by device and devices by format."""
+        assert index.formats(1) == {"S32LE", "S16LE", "F32LE"}
+        assert index.formats(1, 48000) == {"S32LE", "S16LE"}
+        assert index.devices_supporting_format("F32LE", SINK) == {1, 2}
+        index.remove(2)
+        assert index.devices_supporting_format("F32LE") == {1}
+        assert index.devices_supporting_format("S16LE", SOURCE) == frozenset()
+
+    def test_best_format(self):
+        """Test that the processing format wins, then the deepest format."""
+        assert best_format(["S16LE", "F32LE", "S32LE"]) == "F32LE"
+        assert best_format(["S16LE", "S24_32LE"]) == "S24_32LE"
+        assert best_format([]) is None
+
+    def test_detect(self, index):
+        """Test format conversion, resampling and neither."""
+        conversion = detect_conversion(index, 1, 48000)
+        assert conversion.convert_format and not conversion.resample
+        assert conversion.describe() == "F32 → S32LE"
+
+        assert not detect_conversion(index, 1, 96000).needed
+
+        resampled = detect_conversion(index, 2, 44100)
+        assert resampled.resample and resampled.device_rate == 48000
+        assert not resampled.convert_format
+
+        assert detect_conversion(index, 99, 48000) is None
+
+    def test_forced_format(self, index):
+        """Test that a format chosen for the device is used where it is offered."""
+        assert detect_conversion(index, 1, 48000, "S16LE").device_format == "S16LE"
+        assert detect_conversion(index, 1, 96000, "S16LE").device_format == "F32LE"
+
+    def test_conversion_free_rates(self, index):
+        """Test the rates at which the processing format is taken directly."""
+        assert conversion_free_rates(index, 1) == {96000}
+        assert conversion_free_rates(index, 99) == frozenset()
+
+
+class TestGraphCapabilities:
+    """Test the index as maintained by Graph."""
+
+    def test_active_and_named_queries(self):
+        """Test common rates of active devices and rates of one device."""
+        graph = Graph.from_objects([
+            make_node(50, "dac", rates=[{"default": 48000, "min": 44100, "max": 384000}],
+                      state="running"),
+            make_node(51, "hdmi", rates=[48000], state="suspended"),
+            make_node(52, "usb", rates=[{"default": 48000, "alt1": 96000}], state="idle"),
+            make_node(53, "mic", "Audio/Source", rates=[48000], state="running"),
+        ])
+
+        assert graph.common_rates(SINK) == {48000, 96000}
+        assert graph.common_rates() == {48000}
+        assert graph.rates_of("dac") >= {352800, 384000}
+        assert graph.rates_of("missing") == frozenset()
+
+        graph.remove(52)
+        assert graph.common_rates(SINK) == graph.rates_of("dac")
+
+    def test_sink_for_device_info(self):
+        """Test finding the sink of a wpctl line by id, then by description."""
+        graph = Graph.from_objects([
+            make_node(50, "dac", description="USB DAC", rates=[48000]),
+            make_node(51, "mic", "Audio/Source", description="USB DAC", rates=[48000]),
+        ])
+
+        assert graph.sink_for("│  *   50. USB DAC                [vol: 1.00]").name == "dac"
+        assert graph.sink_for("*   77. USB DAC [vol: 0.40]").name == "dac"
+        assert graph.sink_for("77. Other") is None
+        assert graph.sink_for("") is None
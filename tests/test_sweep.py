@@ -0,0 +1,100 @@
+"""Tests for the quantum sweep."""
+
+import threading
+import pytest
+from pipewire_controller.engine import PipewireEngine
+from pipewire_controller.sweep import QuantumSweep, SweepResult, SweepStep, SweepStore, recommend
+
+
+def _step(quantum, stable, xruns=0):
+    return SweepStep(quantum, quantum / 48, 10, xruns, 0.3, 0.4, 0.5, stable)
+
+
+class TestRecommend:
+    """Test choosing the quantum from the measured steps."""
+
+    def test_smallest_of_the_stable_run(self):
+        """Test that a small quantum passing below a failed one is not trusted."""
+        steps = [_step(1024, True), _step(512, True), _step(256, False, 3), _step(128, True)]
+        assert recommend(steps) == 512
+        assert recommend([_step(1024, False)]) is None
+        assert recommend([]) is None
+
+    def test_table_and_round_trip(self):
+        """Test the text table and rebuilding a saved result."""
+        result = SweepResult("dac", 48000, [_step(512, True), _step(256, False, 3)], 512)
+        table = result.table().splitlines()
+        assert "stable (recommended)" in table[1] and "unstable" in table[2]
+        assert SweepResult.from_dict(result.to_dict()) == result
+
+    def test_xruns_counted_per_driver(self):
+        """Test that samples of two drivers do not mix their xrun counters."""
+        sweep = QuantumSweep(None)
+
+        def sample(driver, xruns):
+            return {"id": driver, "quantum": 256, "load": 0.3, "xruns": xruns}
+
+        samples = [sample(1, 40), sample(2, 3), sample(1, 40), sample(2, 3)]
+        step = sweep._measure(256, 48000, samples)
+        assert step.xruns == 0 and step.stable
+
+        step = sweep._measure(256, 48000, samples + [sample(1, 41), sample(2, 5)])
+        assert step.xruns == 3 and not step.stable
+
+
+class TestSweepStore:
+    """Test per-device persistence."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test that completed sweeps are kept per device and rate, aborted ones are not."""
+        store = SweepStore(tmp_path / "sweeps.json")
+        assert store.put(SweepResult("dac", 48000, [_step(256, True)], 256))
+        assert not store.put(SweepResult("dac", 96000, aborted=True))
+
+        loaded = SweepStore(tmp_path / "sweeps.json")
+        assert loaded.get("dac", 48000).recommended == 256
+        assert loaded.get("dac", 96000) is None
+        assert loaded.get("hdmi", 48000) is None
+
+        (tmp_path / "sweeps.json").write_text("{")
+        assert SweepStore(tmp_path / "sweeps.json").get("dac", 48000) is None
+
+
+class TestQuantumSweep:
+    """Test sweeping against the fake PipeWire."""
+
+    @pytest.fixture
+    def engine(self, fake_pipewire):
+        # 1.5 ms of work per cycle: 64 samples at 48 kHz (1.33 ms) cannot keep up
+        fake_pipewire.set_load(busy=0.05, wait=0.1, cycle_cost=0.0015, interval=0.03)
+        fake_pipewire.set_setting("clock.force-quantum", 512)
+        fake_pipewire.set_setting("clock.min-quantum", 64)
+        engine = PipewireEngine()
+        yield engine
+        engine.stop_profiler()
+
+    def test_finds_smallest_stable_quantum(self, engine, fake_pipewire):
+        """Test the measured steps, the recommendation and the restored quantum."""
+        seen = []
+        sweep = QuantumSweep(engine, hold=0.3, settle=0.15)
+        result = sweep.run("dac", on_step=seen.append)
+
+        assert [step.quantum for step in result.steps] == [2048, 1024, 512, 256, 128, 64]
+        assert seen == result.steps
+        assert not result.steps[-1].stable and result.steps[-1].xruns > 0
+        assert result.steps[-2].load_max == pytest.approx(0.71, abs=0.01)
+        assert result.recommended == 128 and not result.aborted
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+        assert engine.profiler is None
+
+    def test_abort_restores(self, engine, fake_pipewire):
+        """Test that aborting mid-sweep puts the original quantum back."""
+        sweep = QuantumSweep(engine, hold=5, settle=0.1)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(sweep.run("dac")))
+        thread.start()
+        threading.Timer(0.5, sweep.abort).start()
+        thread.join(timeout=10)
+
+        assert results[0].aborted and results[0].recommended is None
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
@@ -0,0 +1,373 @@
+"""Tests for the staged tray startup, each in a fresh process (one QApplication per process)."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+icon = [action.data() for action in app.tray_icon.contextMenu().actions()[0].menu().actions()]
+deadline = time.monotonic() + {wait}
+while "ready" not in app.startup_times and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+rates = [action.data() for action in app.tray_icon.contextMenu().actions()[0].menu().actions()]
+print(json.dumps({{"times": app.startup_times, "icon_rates": icon, "rates": rates}}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+AUTOTUNE_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 10
+while not app.tuner.log and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+while app.pending and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+print(json.dumps({"decisions": app.tuner.decisions(), "buffer_size": app.settings["buffer_size"],
+                  "tooltip": app.tray_icon.toolTip()}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+SAFE_APPLY_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+messages = []
+app.tray_icon.showMessage = lambda title, text, *args: messages.append(text)
+deadline = time.monotonic() + 10
+while "ready" not in app.startup_times and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+app._change_buffer_size(32)
+while (app.pending or app.executor.pending) and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+# The write is done while the change is still on probation
+free = bool(app.probations) and app.settings["buffer_size"] == 32
+while app.probations and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+app.executor.wait()
+print(json.dumps({"buffer_size": app.settings["buffer_size"], "messages": messages,
+                  "free": free}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+
+FOLLOW_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 15
+while (app.settings["samplerate"] != 44100 or app.pending) and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+print(json.dumps({"samplerate": app.settings["samplerate"], "tooltip": app.tray_icon.toolTip()}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.engine.stop_graph_mirror()
+app.bridge.stop()
+"""
+
+
+NATIVE_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 10
+# Until pw-top refreshes after the startup write the driver still runs at 44.1 kHz
+while ("ready" not in app.startup_times or app._effective().get("samplerate") != 48000
+       or "min_quantum" not in app._effective()) and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+app._update_menu()
+menus = {action.text(): [sub.text() for sub in action.menu().actions() if sub.isChecked()
+                         or "active" in sub.text()]
+         for action in app.tray_icon.contextMenu().actions() if action.menu()}
+print(json.dumps({"menus": menus, "tooltip": app.tray_icon.toolTip()}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+
+BOUNDS_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 10
+while "ready" not in app.startup_times and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+app._set_native_rates(True)
+app._set_quantum_bound("max_quantum", 256)
+app._set_quantum_bound("min_quantum", 1024)
+while (app.pending or app.executor.pending) and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+print(json.dumps({key: app.settings[key] for key in ("min_quantum", "max_quantum")}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+
+RESAMPLED_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 10
+while "ready" not in app.startup_times and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+app._update_menu()
+rates = next(action.menu() for action in app.tray_icon.contextMenu().actions()
+             if action.text() == "Sample Rate")
+print(json.dumps({"labels": [sub.text() for sub in rates.actions()]}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+
+LATENCY_SCRIPT = """
+import json, time
+from pipewire_controller.ui.tray import TrayApplication
+
+app = TrayApplication([])
+deadline = time.monotonic() + 10
+while "ready" not in app.startup_times and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+at_48k = app.settings["buffer_size"]
+# Another tool changes the rate; the monitor reports it
+app.engine.set_sample_rate(192000)
+while (app.settings["samplerate"] != 192000 or app.pending) and time.monotonic() < deadline:
+    app.processEvents()
+    time.sleep(0.01)
+print(json.dumps({"at_48k": at_48k, "at_192k": app.settings["buffer_size"],
+                  "tooltip": app.tray_icon.toolTip()}))
+app.executor.wait()
+app.engine.stop_monitor()
+app.engine.stop_profiler()
+app.bridge.stop()
+"""
+
+
+def _start_tray(home, wait=10, script=None):
+    src = Path(__file__).resolve().parent.parent / "src"
+    env = dict(os.environ, HOME=str(home), QT_QPA_PLATFORM="offscreen",
+               PYTHONPATH=str(src), XDG_RUNTIME_DIR=str(home),
+               XDG_CACHE_HOME=str(home / ".cache"))
+    result = subprocess.run([sys.executable, "-c", script or SCRIPT.format(wait=wait)],
+                            capture_output=True, text=True, env=env, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestStagedStartup:
+    """Test that the icon does not wait for PipeWire."""
+
+    def test_icon_before_slow_probe(self, fake_pipewire, tmp_path):
+        """Test that a slow pw-dump delays the menu update, not the icon."""
+        fake_pipewire.inject("pw-dump", latency=1.0)
+
+        result = _start_tray(tmp_path)
+
+        times = result["times"]
+        assert times["icon"] < 0.5
+        assert times["probe"] >= 1.0
+        assert times["ready"] >= times["probe"]
+        # No last-known data yet: the common rates, then the probed ones patched in
+        assert result["icon_rates"] == [44100, 48000, 88200, 96000, 176400, 192000]
+        assert result["rates"] == sorted(result["rates"]) and result["rates"]
+
+    def test_menu_starts_from_last_known_rates(self, fake_pipewire, tmp_path):
+        """Test that the previous run's probe result is shown right away."""
+        first = _start_tray(tmp_path)
+        state = json.loads(
+            (tmp_path / ".config" / "pipewire-controller" / "last-known.json").read_text()
+        )
+        assert state["rates"] == first["rates"]
+
+        fake_pipewire.inject("pw-dump", hang=True)
+        second = _start_tray(tmp_path, wait=0.5)
+
+        assert second["icon_rates"] == first["rates"]
+        assert "probe" not in second["times"]
+
+
+class TestAutotune:
+    """Test the tray reacting to the load profiler."""
+
+    def test_overload_raises_buffer_size(self, fake_pipewire, tmp_path):
+        """Test that a busy graph doubles the buffer size and logs the decision."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        (config_dir / "settings.json").write_text(json.dumps({"autotune": True,
+                                                              "buffer_size": 256}))
+        fake_pipewire.set_load(busy=0.8, wait=0.1)
+
+        result = _start_tray(tmp_path, script=AUTOTUNE_SCRIPT)
+
+        assert result["decisions"][0].startswith("256 -> 512: load above 75%")
+        assert result["buffer_size"] == 512
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+        assert "DSP load 90%" in result["tooltip"]
+        assert "auto-tuned" in result["tooltip"]
+        assert "256 -> 512" in (config_dir / "autotune.log").read_text()
+
+
+class TestFollowSource:
+    """Test the tray following the rate of the playing streams."""
+
+    def test_switches_to_stream_rate(self, fake_pipewire, tmp_path):
+        """Test that a stream playing at 44.1 kHz moves the clock there."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        (config_dir / "settings.json").write_text(json.dumps({"follow_source": True,
+                                                              "samplerate": 48000}))
+        fake_pipewire.add_node(600, "dac", rates=[44100, 48000])
+        fake_pipewire.set_default("dac")
+        fake_pipewire.add_node(700, "spotify", "Stream/Output/Audio", description="Spotify",
+                               state="running", rate=44100)
+
+        result = _start_tray(tmp_path, script=FOLLOW_SCRIPT)
+
+        assert result["samplerate"] == 44100
+        assert fake_pipewire.settings["clock.force-rate"] == "44100"
+        assert "Following Spotify (44100 Hz)" in result["tooltip"]
+
+
+class TestResampledRates:
+    """Test marking the rates that some output has to resample."""
+
+    def test_rates_missing_on_an_active_output(self, fake_pipewire, tmp_path):
+        """Test that a rate the default sink has but another running output lacks is marked."""
+        fake_pipewire.add_node(600, "dac", rates=[44100, 48000, 96000], state="running")
+        fake_pipewire.set_default("dac")
+        fake_pipewire.add_node(601, "hdmi", rates=[48000, 96000], state="running")
+        fake_pipewire.add_node(602, "spare", rates=[48000], state="suspended")
+
+        labels = _start_tray(tmp_path, script=RESAMPLED_SCRIPT)["labels"]
+
+        assert any(label.startswith("44100 Hz (resampled)") for label in labels)
+        assert not any("resampled" in label for label in labels
+                       if label.startswith(("48000 Hz", "96000 Hz")))
+
+
+class TestNativeRates:
+    """Test leaving the rate to PipeWire within the detected rates."""
+
+    def test_allowed_rates_and_bounds_applied(self, fake_pipewire, tmp_path):
+        """Test that startup allows the detected rates, unforces the rate and bounds the quantum."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        (config_dir / "settings.json").write_text(json.dumps({
+            "native_rates": True, "samplerate": 96000, "buffer_size": 256, "min_quantum": 128,
+        }))
+        fake_pipewire.set_setting("clock.force-rate", 44100)
+
+        result = _start_tray(tmp_path, script=NATIVE_SCRIPT)
+
+        settings = fake_pipewire.settings
+        assert settings["clock.force-rate"] == "0"
+        assert settings["clock.min-quantum"] == "128"
+        assert settings["clock.max-quantum"] == "2048"
+        assert settings["clock.allowed-rates"].startswith("[ ") and "48000" in \
+            settings["clock.allowed-rates"]
+        menus = result["menus"]
+        # Nothing forced: only the running rate is marked
+        assert menus["Sample Rate"] == ["48000 Hz (active)"]
+        assert menus["Buffer Size"] == ["256 (active)"]
+        assert menus["Min Buffer Size"] == ["128 (active)"]
+        assert menus["Max Buffer Size"] == ["PipeWire Default", "2048 (active)"]
+        assert "Native rate (48000 Hz) @ 256 samples" in result["tooltip"]
+
+
+    def test_switching_on_and_crossed_bounds(self, fake_pipewire, tmp_path):
+        """Test the menu actions: native switching, and a minimum above the maximum."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        settings_file = config_dir / "settings.json"
+        settings_file.write_text(json.dumps({"samplerate": 96000}))
+
+        result = _start_tray(tmp_path, script=BOUNDS_SCRIPT)
+
+        settings = fake_pipewire.settings
+        assert settings["clock.force-rate"] == "0"
+        assert "48000" in settings["clock.allowed-rates"]
+        # The maximum moved up with the minimum
+        assert result == {"min_quantum": 1024, "max_quantum": 1024}
+        assert settings["clock.min-quantum"] == settings["clock.max-quantum"] == "1024"
+        saved = json.loads(settings_file.read_text())
+        assert (saved["native_rates"], saved["min_quantum"], saved["max_quantum"]) == \
+            (True, 1024, 1024)
+
+
+class TestLatencyTarget:
+    """Test keeping the latency in milliseconds across rate changes."""
+
+    def test_buffer_size_follows_rate(self, fake_pipewire, tmp_path):
+        """Test the buffer size chosen at startup and after a rate change by another tool."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        (config_dir / "settings.json").write_text(json.dumps({
+            "latency_target": 10, "samplerate": 48000, "buffer_size": 128,
+        }))
+
+        result = _start_tray(tmp_path, script=LATENCY_SCRIPT)
+
+        assert result["at_48k"] == 512
+        assert result["at_192k"] == 2048
+        assert fake_pipewire.settings["clock.force-quantum"] == "2048"
+        assert "(target 10 ms)" in result["tooltip"]
+
+
+class TestSafeApply:
+    """Test that a change causing xruns is reverted and not saved."""
+
+    def test_small_buffer_is_reverted(self, fake_pipewire, tmp_path):
+        """Test the revert, the notification and the saved settings."""
+        config_dir = tmp_path / ".config" / "pipewire-controller"
+        config_dir.mkdir(parents=True)
+        settings_file = config_dir / "settings.json"
+        settings_file.write_text(json.dumps({"safe_apply": True, "probation_window": 1,
+                                             "buffer_size": 512}))
+        fake_pipewire.set_load(cycle_cost=0.0015, interval=0.03)
+
+        result = _start_tray(tmp_path, script=SAFE_APPLY_SCRIPT)
+
+        assert result["free"]
+        assert result["buffer_size"] == 512
+        assert "reverted to 48000 Hz @ 512 samples" in result["messages"][0]
+        assert fake_pipewire.settings["clock.force-quantum"] == "512"
+        assert json.loads(settings_file.read_text())["buffer_size"] == 512
@@ -0,0 +1,24 @@
+"""Tests for the WirePlumber rules written by the controller."""
+
+from pipewire_controller.utils.wireplumber import config_dir, format_rules, write_format_rules
+
+
+class TestFormatRules:
+    """Test the per-sink sample format rules file."""
+
+    def test_rules(self):
+        """Test that each sink gets a match and an audio.format update."""
+        text = format_rules({"alsa_output.usb": "F32LE"})
+        assert 'node.name = "alsa_output.usb"' in text
+        assert 'audio.format = "F32LE"' in text
+        assert text.startswith("#") and "monitor.alsa.rules = [" in text
+
+    def test_write_and_remove(self, tmp_path, monkeypatch):
+        """Test that the file is written under the config dir and removed when empty."""
+        monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+        path = config_dir() / "60-pipewire-controller-format.conf"
+
+        assert write_format_rules({"dac": "S32LE"})
+        assert 'audio.format = "S32LE"' in path.read_text()
+        assert write_format_rules({})
+        assert not path.exists()
@@ -0,0 +1,101 @@
+"""Tests for the tray's background executor and responsiveness monitor."""
+
+import threading
+import time
+import pytest
+
+
+@pytest.fixture
+def app():
+    from PyQt6.QtCore import QCoreApplication
+
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def _process_until(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+class TestEngineExecutor:
+    """Test running blocking calls off the GUI thread."""
+
+    def test_runs_off_gui_thread_and_calls_back_on_it(self, app):
+        """Test that the job runs on a worker and the callback on the GUI thread."""
+        from pipewire_controller.ui.worker import EngineExecutor
+
+        executor = EngineExecutor()
+        seen = {}
+
+        def job():
+            time.sleep(0.2)
+            seen["job"] = threading.current_thread() is threading.main_thread()
+            return 42
+
+        start = time.monotonic()
+        executor.submit("samplerate", job, on_result=lambda value: seen.update(
+            result=value, callback=threading.current_thread() is threading.main_thread()
+        ))
+
+        # submit returns at once and the job shows as pending until delivered
+        assert time.monotonic() - start < 0.1
+        assert executor.is_pending("samplerate")
+        _process_until(app, lambda: "result" in seen)
+
+        assert seen == {"job": False, "result": 42, "callback": True}
+        assert not executor.is_pending("samplerate")
+
+    def test_jobs_run_in_order(self, app):
+        """Test that jobs are serialized in submission order."""
+        from pipewire_controller.ui.worker import EngineExecutor
+
+        executor = EngineExecutor()
+        order = []
+        for value in (1, 2, 3):
+            executor.submit("buffer_size", lambda v=value: order.append(v) or v)
+
+        assert executor.pending == {"buffer_size": 3}
+        executor.wait()
+        _process_until(app, lambda: not executor.pending)
+
+        assert order == [1, 2, 3]
+
+    def test_failure_reaches_error_callback(self, app):
+        """Test that an exception in the job is delivered to on_error."""
+        from pipewire_controller.ui.worker import EngineExecutor
+
+        executor = EngineExecutor()
+        errors, failed = [], []
+        executor.job_failed.connect(lambda name, error: failed.append(name))
+
+        def job():
+            raise OSError("pw-metadata not found")
+
+        executor.submit("samplerate", job, on_error=errors.append)
+        _process_until(app, lambda: errors)
+
+        assert isinstance(errors[0], OSError)
+        assert failed == ["samplerate"]
+
+
+class TestResponsivenessMonitor:
+    """Test event loop lag measurement."""
+
+    def test_detects_blocked_loop(self, app):
+        """Test that a blocking call on the GUI thread shows up as lag."""
+        from pipewire_controller.ui.worker import ResponsivenessMonitor
+
+        monitor = ResponsivenessMonitor(interval=10)
+        monitor.start()
+        _process_until(app, lambda: monitor.stats()["samples"] >= 5)
+        assert monitor.stats()["max"] < 0.1
+
+        time.sleep(0.3)
+        _process_until(app, lambda: monitor.stats()["max"] > 0.2, timeout=1)
+        monitor.stop()
+
+        stats = monitor.stats()
+        assert stats["max"] > 0.2
+        assert stats["p50"] < 0.1